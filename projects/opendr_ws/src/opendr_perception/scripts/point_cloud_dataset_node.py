@@ -69,6 +69,8 @@ def main():
                         type=str, default="/opendr/dataset_point_cloud")
     parser.add_argument("-f", "--fps", help="Data FPS",
                         type=float, default=10)
+    parser.add_argument("-p", "--prefetch", help="Number of point clouds to load in the background ahead of publishing",
+                        type=int, default=2)
     args = parser.parse_args()
 
     dataset_path = args.dataset_path
@@ -86,6 +88,8 @@ def main():
         dataset_path + "/training/velodyne_reduced",
         dataset_path + "/training/label_2",
         dataset_path + "/training/calib",
+        mmap=True,
+        prefetch=args.prefetch,
     )
 
     rospy.init_node('opendr_point_cloud_dataset_node', anonymous=True)
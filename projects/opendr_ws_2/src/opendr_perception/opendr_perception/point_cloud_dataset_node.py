@@ -74,6 +74,8 @@ def main(args=None):
                         type=str, default="/opendr/dataset_point_cloud")
     parser.add_argument("-f", "--fps", help="Data FPS",
                         type=float, default=10)
+    parser.add_argument("-p", "--prefetch", help="Number of point clouds to load in the background ahead of publishing",
+                        type=int, default=2)
     args = parser.parse_args()
 
     dataset_path = args.dataset_path
@@ -91,6 +93,8 @@ def main(args=None):
         dataset_path + "/training/velodyne_reduced",
         dataset_path + "/training/label_2",
         dataset_path + "/training/calib",
+        mmap=True,
+        prefetch=args.prefetch,
     )
 
     dataset_node = PointCloudDatasetNode(
@@ -31,10 +31,11 @@ private:
   torch::Tensor mMeanTensor;
   torch::Tensor mStdTensor;
   std::vector<std::string> mLabels;
+  bool mBatched;
 
 public:
   NanoDet(torch::jit::script::Module network, torch::Tensor meanValues, torch::Tensor stdValues, torch::DeviceType device,
-          std::vector<std::string> labels);
+          std::vector<std::string> labels, bool batched);
   ~NanoDet();
 
   torch::Tensor preProcess(cv::Mat *image);
@@ -42,16 +43,18 @@ public:
   torch::Tensor meanTensor() const;
   torch::Tensor stdTensor() const;
   std::vector<std::string> labels() const;
+  bool batched() const;
   std::vector<OpenDRDetectionTarget> outputs;
 };
 
 NanoDet::NanoDet(torch::jit::script::Module network, torch::Tensor meanValues, torch::Tensor stdValues,
-                 torch::DeviceType device, const std::vector<std::string> labels) {
+                 torch::DeviceType device, const std::vector<std::string> labels, bool batched) {
   this->mDevice = device;
   this->mNetwork = network;
   this->mMeanTensor = meanValues.clone().to(device);
   this->mStdTensor = stdValues.clone().to(device);
   this->mLabels = labels;
+  this->mBatched = batched;
 }
 
 NanoDet::~NanoDet() {
@@ -102,6 +105,13 @@ std::vector<std::string> NanoDet::labels() const {
   return this->mLabels;
 }
 
+/**
+ * Getter of whether the jit model takes a batch of images, as those exported by newer versions of OpenDR
+ */
+bool NanoDet::batched() const {
+  return this->mBatched;
+}
+
 /**
  * Helper function to extract arrays or vectors of integers from JSON files
  * @param json a string of JSON file
@@ -300,6 +310,7 @@ void loadNanodetModel(const char *modelPath, const char *modelName, const char *
   // Parse inference params
   const std::vector<int> jsonSize = gestIntVectorFromJson(json, "input_size");
   const std::vector<std::string> labels = getStringVectorFromJson(json, "classes");
+  const bool batched = jsonGetBoolFromKeyInInferenceParams(json, "batched", 0) == 0;
 
   int **colorList = new int *[labels.size()];
   for (int i = 0; i < labels.size(); i++) {
@@ -322,7 +333,7 @@ void loadNanodetModel(const char *modelPath, const char *modelName, const char *
   torch::jit::script::Module network = torch::jit::load(jitModelPath.c_str(), initDevice);
   network.eval();
 
-  NanoDet *detector = new NanoDet(network, meanTensor, stdValues, initDevice, labels);
+  NanoDet *detector = new NanoDet(network, meanTensor, stdValues, initDevice, labels, batched);
 
   model->network = static_cast<void *>(detector);
   model->colorList = colorList;
@@ -344,8 +355,17 @@ void ffNanodet(NanoDet *model, torch::Tensor *inputTensor, cv::Mat *warpMatrix,
   torch::Tensor srcWidth = torch::tensor(originalSize->width);
   torch::Tensor warpMat = torch::from_blob(warpMatrix->data, {3, 3});
 
-  // Model inference
-  *outputs = (model->network()).forward({*inputTensor, srcHeight, srcWidth, warpMat}).toTensorVector();
+  if (!model->batched()) {
+    // Model inference
+    *outputs = (model->network()).forward({*inputTensor, srcHeight, srcWidth, warpMat}).toTensorVector();
+    return;
+  }
+  // The model takes a batch of images and returns the [image, x0, y0, x1, y1, score, label] detections of all of them
+  torch::Tensor detections = (model->network())
+                               .forward({inputTensor->unsqueeze(0), srcHeight.unsqueeze(0), srcWidth.unsqueeze(0),
+                                         warpMat.unsqueeze(0)})
+                               .toTensor();
+  *outputs = {detections.narrow(1, 1, 6).cpu()};
 }
 
 OpenDRDetectionVectorTargetT inferNanodet(NanodetModelT *model, OpenDRImageT *image) {
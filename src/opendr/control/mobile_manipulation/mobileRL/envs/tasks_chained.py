@@ -23,7 +23,7 @@ from geometry_msgs.msg import Point, Pose, Quaternion
 from pathlib import Path
 from pybindings import GMMPlanner, multiply_tfs
 from typing import List
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from opendr.control.mobile_manipulation.mobileRL.envs.eeplanner import LinearPlannerWrapper, GMMPlannerWrapper
 from opendr.control.mobile_manipulation.mobileRL.envs.env_utils import pose_to_list, list_to_pose
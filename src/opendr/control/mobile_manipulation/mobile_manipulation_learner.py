@@ -23,7 +23,7 @@ from stable_baselines3.common.utils import configure_logger
 from stable_baselines3.common.vec_env import VecEnv
 from stable_baselines3.sac import SAC
 from typing import Optional
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from opendr.control.mobile_manipulation.mobileRL.evaluation import evaluation_rollout
 from opendr.control.mobile_manipulation.mobileRL.stablebl_callbacks import MobileRLEvalCallback
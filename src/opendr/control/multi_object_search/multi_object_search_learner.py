@@ -22,7 +22,7 @@ from stable_baselines3.common.vec_env import VecEnv
 from opendr.control.multi_object_search.algorithm.SB3.ppo import PPO_AUX
 from opendr.control.multi_object_search.algorithm.SB3.encoder import EgocentricEncoders
 from igibson.utils.utils import parse_config
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.control.multi_object_search.algorithm.evaluation import evaluation_rollout
 from opendr.control.multi_object_search.algorithm.SB3.save_model_callback import SaveModel
 from opendr.engine.constants import OPENDR_SERVER_URL
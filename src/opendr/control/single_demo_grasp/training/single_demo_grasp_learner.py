@@ -15,7 +15,7 @@
 import os
 import numpy as np
 import zipfile
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import shutil
 
 # Detectron imports
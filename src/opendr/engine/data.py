@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import os
+import struct
 import cv2
 from abc import ABC, abstractmethod
 from opendr.engine.target import BoundingBoxList
@@ -206,6 +209,66 @@ class Timeseries(Data):
         return str(self.data)
 
 
+_JPEG_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                       (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _jpeg_size(filename):
+    """
+    Reads the (height, width) of a JPEG image from its frame header, without decoding it. None is returned if the file
+    is not a JPEG image or its header cannot be parsed.
+    """
+    with open(filename, "rb") as file:
+        if file.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = file.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            # Padding bytes may precede a marker
+            while marker[1] == 0xFF:
+                marker = marker[1:] + file.read(1)
+                if len(marker) < 2:
+                    return None
+            length = file.read(2)
+            if len(length) < 2:
+                return None
+            length = struct.unpack(">H", length)[0]
+            # Start of frame markers, excluding DHT (0xC4), JPG (0xC8) and DAC (0xCC)
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                header = file.read(5)
+                if len(header) < 5:
+                    return None
+                return struct.unpack(">HH", header[1:])
+            file.seek(length - 2, os.SEEK_CUR)
+
+
+def _decode_image(filename, max_side=None):
+    """
+    Decodes an image file into an HWC/BGR array. If max_side is given, the image is downscaled so that its longer
+    side is at most max_side pixels, decoding JPEG images at the largest reduced resolution that is still not smaller
+    than the requested one.
+    """
+    flags = cv2.IMREAD_COLOR
+    if max_side is not None:
+        size = _jpeg_size(filename)
+        if size is not None:
+            for factor, reduced_flags in _JPEG_REDUCED_FLAGS:
+                if max(size) // factor >= max_side:
+                    flags = reduced_flags
+                    break
+
+    img = cv2.imread(filename, flags)
+    if img is None:
+        raise ValueError('The image file "' + filename + '" could not be decoded.')
+
+    if max_side is not None and max(img.shape[:2]) > max_side:
+        scale = max_side / max(img.shape[:2])
+        size = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img
+
+
 class Image(Data):
     """
     A class used for representing image data.
@@ -214,6 +277,10 @@ class Image(Data):
     - returning a NumPy compatible representation of data (numpy())
     - loading an input directly into OpenDR compliant format (open())
     - getting an image into OpenCV-compliant format (opencv()) for visualization purposes
+
+    The image keeps the array it was created from in its original layout (e.g., HWC/BGR for OpenCV images) and
+    converts it lazily, when a different layout is first requested. Converted layouts are cached until new data
+    is set, so that several consumers of the same image do not repeat the same conversion.
     """
 
     def __init__(self, data=None, dtype=np.uint8, guess_format=True):
@@ -229,6 +296,7 @@ class Image(Data):
         super().__init__(data)
 
         self.dtype = dtype
+        self._layouts = {}
         if data is not None:
             # Check if the image is in the correct format
             try:
@@ -241,11 +309,12 @@ class Image(Data):
             if guess_format:
                 # If channels are found last and image is a color one, assume OpenCV format
                 if data.shape[2] == 3:
-                    data = cv2.cvtColor(data, cv2.COLOR_BGR2RGB)
-                    data = np.transpose(data, (2, 0, 1))
-                # If channels are found last and image is not a color one, just perform transpose
+                    self._set_layout(data, "channels_last", "bgr")
+                    return
+                # If channels are found last and image is not a color one, there is no channel order to convert
                 elif data.shape[2] < min(data.shape[0], data.shape[1]):
-                    data = np.transpose(data, (2, 0, 1))
+                    self._set_layout(data, "channels_last", "rgb")
+                    return
             self.data = data
         else:
             raise ValueError("Image is of type None")
@@ -257,10 +326,13 @@ class Image(Data):
         :return: the actual data held by the object
         :rtype: A *dtype* NumPy array
         """
-        if self._data is None:
+        if not self._layouts:
             raise ValueError("Image is empty")
 
-        return self._data
+        data = self._layout("channels_first", "rgb")
+        # The returned array can be modified in place, so the other cached layouts can no longer be trusted
+        self._layouts = {("channels_first", "rgb"): data}
+        return data
 
     @data.setter
     def data(self, data):
@@ -277,16 +349,58 @@ class Image(Data):
                 "Only 3-D arrays are supported by Image. Please supply a data object that can be casted "
                 "into a 3-D NumPy array.")
 
-        self._data = data
+        self._set_layout(data, "channels_first", "rgb")
 
-    def numpy(self):
+    def _set_layout(self, data, format, channel_order):
+        """
+        Replaces the data of the image with an array of the given layout and drops all the cached layouts.
+        """
+        self._layouts = {(format, channel_order): np.asarray(data, dtype=self.dtype)}
+
+    def _layout(self, format, channel_order):
+        """
+        Returns the image in the requested layout, converting and caching it if needed. The returned array is shared
+        with the cache and must not be modified.
+        """
+        if (format, channel_order) in self._layouts:
+            return self._layouts[(format, channel_order)]
+
+        if format not in ("channels_first", "channels_last"):
+            raise ValueError("format not in ('channels_first', 'channels_last')")
+        if channel_order not in ("rgb", "bgr"):
+            raise ValueError("channel_order not in ('rgb', 'bgr')")
+
+        if format == "channels_first":
+            data = np.transpose(self._layout("channels_last", channel_order), (2, 0, 1))
+        elif ("channels_first", channel_order) in self._layouts:
+            data = np.transpose(self._layouts[("channels_first", channel_order)], (1, 2, 0))
+        else:
+            # Reorder the channels in channels last, where OpenCV performs it in a single pass
+            other_order = "bgr" if channel_order == "rgb" else "rgb"
+            data = cv2.cvtColor(np.ascontiguousarray(self._layout("channels_last", other_order)), cv2.COLOR_RGB2BGR)
+
+        self._layouts[(format, channel_order)] = data
+        return data
+
+    def __getstate__(self):
+        """
+        Pickles a single layout of the image, preferring a contiguous one, which can be passed as an out-of-band
+        buffer (e.g., to a SharedMemoryPool). The other layouts are converted again lazily when needed.
+        """
+        state = self.__dict__.copy()
+        layouts = sorted(self._layouts.items(), key=lambda layout: not layout[1].flags.c_contiguous)
+        state["_layouts"] = dict(layouts[:1])
+        return state
+
+    def numpy(self, copy=True):
         """
         Returns a NumPy-compatible representation of data.
+        :param copy: if False, a read-only view of the (cached) data is returned instead of a copy
+        :type copy: bool, optional
         :return: a NumPy-compatible representation of data
         :rtype: numpy.ndarray
         """
-        # Since this class stores the data as NumPy arrays, we can directly return the data
-        return self.data.copy()
+        return self.convert("channels_first", "rgb", copy=copy)
 
     def __str__(self):
         """
@@ -294,62 +408,96 @@ class Image(Data):
         :return: a human-friendly string-based representation of the data
         :rtype: str
         """
-        return str(self.data)
+        return str(self._layout("channels_first", "rgb"))
 
     @classmethod
-    def open(cls, filename):
+    def open(cls, filename, max_side=None):
         """
         Create an Image from file and return it as RGB.
         :param cls: reference to the Image class
         :type cls: Image
         :param filename: path to the image file
         :type filename: str
+        :param max_side: if given, the image is downscaled (keeping its aspect ratio) so that its longer side is at
+            most max_side pixels. JPEG images are decoded directly at a reduced resolution when possible.
+        :type max_side: int, optional
         :return: image read from the specified file
         :rtype: Image
         """
         if not Path(filename).exists():
             raise FileNotFoundError('The image file does not exist.')
-        data = cv2.imread(filename)
-        # Change channel order and convert from HWC to CHW
-        data = cv2.cvtColor(data, cv2.COLOR_BGR2RGB)
-        data = np.transpose(data, (2, 0, 1))
-        return cls(data)
+        # The image is kept in the HWC/BGR layout returned by OpenCV and converted to CHW/RGB on first use
+        return cls(_decode_image(str(filename), max_side))
 
-    def opencv(self):
+    @classmethod
+    def open_many(cls, filenames, workers=None, max_side=None):
+        """
+        Create a list of Images from files, decoding them in parallel. OpenCV releases the GIL while decoding, so the
+        images are decoded on a pool of threads, which also convert them to the CHW/RGB layout.
+        :param cls: reference to the Image class
+        :type cls: Image
+        :param filenames: paths to the image files
+        :type filenames: list of str
+        :param workers: number of decoding threads, defaults to the number of CPUs
+        :type workers: int, optional
+        :param max_side: if given, the images are downscaled (keeping their aspect ratio) so that their longer side is
+            at most max_side pixels. JPEG images are decoded directly at a reduced resolution when possible.
+        :type max_side: int, optional
+        :return: images read from the specified files, in the same order
+        :rtype: list of Image
+        """
+        filenames = [str(filename) for filename in filenames]
+        for filename in filenames:
+            if not Path(filename).exists():
+                raise FileNotFoundError('The image file "' + filename + '" does not exist.')
+
+        def load(filename):
+            image = cls(_decode_image(filename, max_side))
+            image._layout("channels_first", "rgb")
+            return image
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(filenames)))
+        if workers == 1:
+            return [load(filename) for filename in filenames]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(load, filenames))
+
+    def opencv(self, copy=True):
         """
         Returns the stored image into a format that can be directly used by OpenCV.
         This function is useful due to the discrepancy between the way images are stored:
         HWC/BGR (OpenCV) and CWH/RGB (OpenDR/PyTorch)
+        :param copy: if False, a read-only view of the cached HWC/BGR image is returned instead of a copy
+        :type copy: bool, optional
         :return: an image into OpenCV compliant-format
         :rtype: NumPy array
         """
-        data = np.transpose(self.data, (1, 2, 0))
-        data = cv2.cvtColor(data, cv2.COLOR_RGB2BGR)
-        return data
+        return self.convert("channels_last", "bgr", copy=copy)
 
-    def convert(self, format='channels_first', channel_order='rgb'):
+    def convert(self, format='channels_first', channel_order='rgb', copy=True):
         """
         Returns the data in channels first/last format using either 'rgb' or 'bgr' ordering.
         :param format: either 'channels_first' or 'channels_last'
         :type format: str
         :param channel_order: either 'rgb' or 'bgr'
         :type channel_order: str
+        :param copy: if False, a read-only view of the cached conversion is returned instead of a copy, which avoids
+            converting the image again when several consumers request the same layout
+        :type copy: bool, optional
         :return an image (as NumPy array) with the appropriate format
         :rtype NumPy array
         """
-        if format == 'channels_last':
-            data = np.transpose(self.data, (1, 2, 0))
-        elif format == 'channels_first':
-            data = self.data.copy()
-        else:
-            raise ValueError("format not in ('channels_first', 'channels_last')")
+        if not self._layouts:
+            raise ValueError("Image is empty")
 
-        if channel_order == 'bgr':
-            # This causes a second copy operation. Can be potentially further optimized in the future.
-            data = cv2.cvtColor(data, cv2.COLOR_RGB2BGR)
-        elif channel_order not in ('rgb', 'bgr'):
-            raise ValueError("channel_order not in ('rgb', 'bgr')")
+        data = self._layout(format, channel_order)
+        if copy:
+            return data.copy()
 
+        data = data.view()
+        data.flags.writeable = False
         return data
 
 
@@ -366,56 +514,283 @@ class ImageWithDetections(Image):
 
         self.boundingBoxList = boundingBoxList
 
+    def numpy(self):
+        """
+        Returns a NumPy-compatible representation of data.
+
+        :return: a NumPy-compatible representation of data
+        :rtype: numpy.ndarray
+        """
+        # Since this class stores the data as NumPy arrays, we can directly return the data
+        return self.data
+
+    def __str__(self):
+        """
+        Returns a human-friendly string-based representation of the data.
+
+        :return: a human-friendly string-based representation of the data
+        :rtype: str
+        """
+        return "ImageWithDetections " + str(self.data) + str(self.boundingBoxList)
+
+
+class ImageBatch(Data):
+    """
+    A class used for representing a batch of images, stored in a single contiguous NCHW/RGB array that can be
+    directly fed to a model.
+
+    Images that do not match the size of the batch are letterboxed into it, i.e., they are resized keeping their
+    aspect ratio and centered on a background of pad_value. The original size, the scale and the padding of each
+    image are kept, so that coordinates predicted on the batch can be mapped back to each image (to_original()).
+    The array is preallocated and reused when the batch is refilled (set()), e.g., with the next frames of a
+    multi-camera rig.
+
+    This class provides abstract methods for:
+    - returning a NumPy compatible representation of data (numpy())
+    """
+
+    def __init__(self, images=None, size=None, capacity=None, dtype=np.uint8, pad_value=0):
+        """
+        ImageBatch constructor
+        :param images: images to be held by the batch
+        :type images: list of Image or numpy.ndarray
+        :param size: (height, width) of the batch, defaults to the size of the first image
+        :type size: tuple, optional
+        :param capacity: number of images to preallocate memory for, defaults to the number of images
+        :type capacity: int, optional
+        :param dtype: type of the batch data
+        :type dtype: numpy.dtype
+        :param pad_value: value used to fill the letterbox padding
+        :type pad_value: int or float
+        """
+        super().__init__(images)
+
+        self.dtype = dtype
+        self.pad_value = pad_value
+        self._size = None if size is None else (int(size[0]), int(size[1]))
+        self._count = 0
+        self._capacity = 0
+        self._data = None
+        self._original_sizes = np.zeros((0, 2), dtype=np.int64)
+        self._scales = np.zeros(0, dtype=np.float64)
+        self._pads = np.zeros((0, 2), dtype=np.int64)
+
+        if capacity is not None:
+            if self._size is None:
+                raise ValueError("The size of the batch is required to preallocate it")
+            self.reserve(capacity)
+        if images is not None:
+            self.set(images)
+
     @property
     def data(self):
         """
-        Getter of data. Image class returns a float32 NumPy array.
-
+        Getter of data. ImageBatch class returns a *dtype* NumPy array of shape (N, C, H, W), which shares memory with
+        the batch.
         :return: the actual data held by the object
-        :rtype: A float32 NumPy array
+        :rtype: A *dtype* NumPy array
         """
         if self._data is None:
-            raise ValueError("Image is empty")
-
-        return self._data
+            raise ValueError("ImageBatch is empty")
+        return self._data[:self._count]
 
     @data.setter
     def data(self, data):
         """
-        Setter for data.
-
-        :param: data to be used for creating a vector
+        Setter for data. The images of the supplied array are kept at their size, without any letterboxing.
+        :param: data to be used for creating the batch
         """
-        # Convert input data to a NumPy array
-        # Note that will also fail for non-numeric data (which is expected)
-        data = np.asarray(data, dtype=np.uint8)
-
-        # Check if the supplied vector is 3D, e.g. (width, height, channels)
-        if len(data.shape) != 3:
+        data = np.asarray(data, dtype=self.dtype)
+        if data.ndim != 4:
             raise ValueError(
-                "Only 3-D arrays are supported by Image. Please supply a data object that can be casted "
-                "into a 3-D NumPy array.")
+                "Only 4-D arrays are supported by ImageBatch. Please supply a data object that can be casted "
+                "into a 4-D NumPy array.")
 
         self._data = data
+        self._size = data.shape[2:]
+        self._count = data.shape[0]
+        self._capacity = data.shape[0]
+        self._original_sizes = np.tile(np.array(self._size, dtype=np.int64), (self._count, 1))
+        self._scales = np.ones(self._count, dtype=np.float64)
+        self._pads = np.zeros((self._count, 2), dtype=np.int64)
 
-    def numpy(self):
+    @property
+    def size(self):
         """
-        Returns a NumPy-compatible representation of data.
+        Returns the (height, width) of the batch.
+        """
+        return self._size
+
+    @property
+    def original_sizes(self):
+        """
+        Returns the (height, width) of each image before it was letterboxed into the batch, as an (N, 2) array.
+        """
+        return self._original_sizes[:self._count]
+
+    @property
+    def scales(self):
+        """
+        Returns the factor each image was resized by when it was letterboxed into the batch, as an (N,) array.
+        """
+        return self._scales[:self._count]
+
+    @property
+    def pads(self):
+        """
+        Returns the (top, left) padding of each image in the batch, as an (N, 2) array.
+        """
+        return self._pads[:self._count]
+
+    def reserve(self, capacity):
+        """
+        Preallocates memory for the given number of images, keeping the images already in the batch. The image data
+        of an empty batch is allocated when the first image is appended, as its number of channels is only known then.
+        :param capacity: number of images
+        :type capacity: int
+        """
+        if self._capacity >= capacity:
+            return
+        metadata = (np.zeros((capacity, 2), dtype=np.int64), np.ones(capacity, dtype=np.float64),
+                    np.zeros((capacity, 2), dtype=np.int64))
+        for array, old in zip(metadata, (self._original_sizes, self._scales, self._pads)):
+            array[:self._count] = old[:self._count]
+        if self._data is not None:
+            data = np.empty((capacity,) + self._data.shape[1:], dtype=self.dtype)
+            data[:self._count] = self._data[:self._count]
+            self._data = data
+        self._original_sizes, self._scales, self._pads = metadata
+        self._capacity = capacity
+
+    def set(self, images):
+        """
+        Replaces the images of the batch, reusing its memory when possible.
+        :param images: images to be held by the batch
+        :type images: list of Image or numpy.ndarray
+        """
+        self.clear()
+        images = [image if isinstance(image, Image) else Image(image, dtype=self.dtype) for image in images]
+        if self._size is None and len(images) > 0:
+            self._size = images[0].numpy(copy=False).shape[1:]
+        if len(images) > 0:
+            self.reserve(len(images))
+        for image in images:
+            self.append(image)
+
+    def append(self, image):
+        """
+        Appends an image to the batch, letterboxing it if its size is different from the size of the batch.
+        :param image: image to be added
+        :type image: Image or numpy.ndarray
+        """
+        if not isinstance(image, Image):
+            image = Image(image, dtype=self.dtype)
+        data = image.numpy(copy=False)
+        if self._size is None:
+            self._size = data.shape[1:]
+        if self._count == self._capacity:
+            self.reserve(max(1, 2 * self._count))
+        if self._data is None or (self._count == 0 and self._data.shape[1] != data.shape[0]):
+            # The first image sets the number of channels of the batch
+            self._data = np.empty((self._capacity, data.shape[0]) + tuple(self._size), dtype=self.dtype)
+        if data.shape[0] != self._data.shape[1]:
+            raise ValueError("All the images of a batch must have the same number of channels")
+
+        index = self._count
+        height, width = self._size
+        self._original_sizes[index] = data.shape[1:]
+        if data.shape[1:] == tuple(self._size):
+            self._scales[index] = 1.0
+            self._pads[index] = 0
+            self._data[index] = data
+        else:
+            scale = min(height / data.shape[1], width / data.shape[2])
+            new_height = min(height, max(1, round(data.shape[1] * scale)))
+            new_width = min(width, max(1, round(data.shape[2] * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            resized = cv2.resize(image.convert("channels_last", "rgb", copy=False), (new_width, new_height),
+                                 interpolation=interpolation).reshape(new_height, new_width, -1)
+            top, left = (height - new_height) // 2, (width - new_width) // 2
+            self._scales[index] = scale
+            self._pads[index] = (top, left)
+            self._data[index] = self.pad_value
+            self._data[index, :, top:top + new_height, left:left + new_width] = np.transpose(resized, (2, 0, 1))
+        self._count += 1
+
+    def clear(self):
+        """
+        Removes all the images from the batch, keeping its memory to be reused.
+        """
+        self._count = 0
+
+    def to_original(self, coordinates, index):
+        """
+        Maps coordinates predicted on the batch back to the original image they belong to.
+        :param coordinates: array whose last dimension holds (x, y) pairs, e.g., (N, 2) keypoints or (N, 4) boxes
+        :type coordinates: numpy.ndarray
+        :param index: index of the image in the batch
+        :type index: int
+        :return: the coordinates in the original image
+        :rtype: numpy.ndarray
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        top, left = self.pads[index]
+        return (coordinates - np.tile((left, top), coordinates.shape[-1] // 2)) / self.scales[index]
 
+    def numpy(self, copy=True):
+        """
+        Returns a NumPy-compatible representation of data.
+        :param copy: if False, a read-only view of the batch is returned instead of a copy
+        :type copy: bool, optional
         :return: a NumPy-compatible representation of data
         :rtype: numpy.ndarray
         """
-        # Since this class stores the data as NumPy arrays, we can directly return the data
-        return self.data
+        data = self.data
+        if copy:
+            return data.copy()
+
+        data = data.view()
+        data.flags.writeable = False
+        return data
+
+    @classmethod
+    def open(cls, filenames, size=None, workers=None, max_side=None, **kwargs):
+        """
+        Create an ImageBatch from files, decoding them in parallel (see Image.open_many()).
+        :param cls: reference to the ImageBatch class
+        :type cls: ImageBatch
+        :param filenames: paths to the image files
+        :type filenames: list of str
+        :param size: (height, width) of the batch, defaults to the size of the first image
+        :type size: tuple, optional
+        :param workers: number of decoding threads, defaults to the number of CPUs
+        :type workers: int, optional
+        :param max_side: if given, the images are downscaled while decoding so that their longer side is at most
+            max_side pixels
+        :type max_side: int, optional
+        :return: batch of the images read from the specified files
+        :rtype: ImageBatch
+        """
+        return cls(Image.open_many(filenames, workers=workers, max_side=max_side), size=size, **kwargs)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Returns the index-th image of the batch, as an Image that shares memory with the batch.
+        """
+        if not -self._count <= index < self._count:
+            raise IndexError("ImageBatch index out of range")
+        return Image(self._data[index % self._count], dtype=self.dtype, guess_format=False)
 
     def __str__(self):
         """
         Returns a human-friendly string-based representation of the data.
-
         :return: a human-friendly string-based representation of the data
         :rtype: str
         """
-        return "ImageWithDetections " + str(self.data) + str(self.boundingBoxList)
+        return str(self.data)
 
 
 class Video(Data):
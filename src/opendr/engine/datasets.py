@@ -13,9 +13,16 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import hashlib
+import mmap
 import os
+import struct
+import threading
 import numpy as np
 from opendr.engine.data import PointCloud
+from opendr.engine.helper.cache import ShardedCache, fingerprint as _fingerprint
 
 
 class Dataset(ABC):
@@ -63,19 +70,82 @@ class DatasetIterator(Dataset):
         pass
 
 
+_MISSING = object()
+_LOCK_TYPE = type(threading.Lock())
+
+
+def _is_dataset(obj):
+    return hasattr(obj, "__getitem__") and hasattr(obj, "__len__") and hasattr(obj, "__dict__")
+
+
+def _dataset_state(dataset, visited=None):
+    """
+    Returns the state of a dataset that identifies its samples, which is fingerprinted to key the cached samples of a
+    MappedDatasetIterator. The attributes of the dataset are walked recursively, so that nested datasets (e.g., the
+    original dataset of a MappedDatasetIterator) and all their map functions are covered.
+
+    :raises ValueError: if an attribute of the dataset cannot be fingerprinted
+    """
+    visited = set() if visited is None else visited
+    if id(dataset) in visited:
+        return "<cycle>"
+    visited.add(id(dataset))
+    state = {}
+    for key, value in vars(dataset).items():
+        # Caches, prefetchers and locks do not change the samples
+        if not isinstance(value, (ShardedCache, _Prefetcher, _LOCK_TYPE)):
+            state[key] = _attribute_state(value, visited, type(dataset).__name__ + "." + key)
+    return type(dataset), len(dataset), state
+
+
+def _attribute_state(value, visited, name):
+    if isinstance(value, (str, bytes, int, float, bool, complex, type(None))):
+        return value
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    if isinstance(value, (tuple, list)):
+        return type(value)(_attribute_state(item, visited, name) for item in value)
+    if isinstance(value, dict):
+        return {key: _attribute_state(item, visited, name) for key, item in value.items()}
+    if isinstance(value, np.memmap) and value.filename is not None:
+        return "memmap", value.filename, value.offset, str(value.dtype), value.shape
+    if isinstance(value, np.ndarray):
+        return "ndarray", str(value.dtype), value.shape, hashlib.sha256(np.ascontiguousarray(value)).hexdigest()
+    if isinstance(value, np.generic):
+        return value.item()
+    if _is_dataset(value):
+        return _dataset_state(value, visited)
+    if callable(value):
+        # Functions and callable objects are fingerprinted by their code
+        return value
+    raise ValueError("Cannot fingerprint the attribute %s of type %s, pass the fingerprint of the dataset to "
+                     "MappedDatasetIterator explicitly" % (name, type(value).__name__))
+
+
 class MappedDatasetIterator(DatasetIterator):
     """
     MappedDatasetIterator allows to transform elements of the original DatasetIterator.
 
+    If a cache is given, the mapped samples are stored on disk, keyed by their index and a fingerprint of the original
+    dataset and the map function, so that deterministic preprocessing is only performed once across runs. The cache
+    is either a ShardedCache or the path of its directory.
+
     This class provides the following methods:
     - __getitem__(i), a getter that allows for retrieving the i-th sample of the dataset, along with its annotation
     - __len__(), which allows for getting the size of the dataset
     """
-    def __init__(self, original, map_function):
+    def __init__(self, original, map_function, cache=None, fingerprint=None):
         super().__init__()
         self.map_function = map_function
         self.original = original
 
+        if cache is not None and not isinstance(cache, ShardedCache):
+            cache = ShardedCache(cache)
+        self.cache = cache
+        if cache is not None and fingerprint is None:
+            fingerprint = _fingerprint((_dataset_state(original), map_function))
+        self.fingerprint = fingerprint
+
     def __getitem__(self, idx):
         """
         This method is used for loading the idx-th sample of a dataset along with its annotation.
@@ -85,7 +155,15 @@ class MappedDatasetIterator(DatasetIterator):
         :rtype: Tuple of (Data, Target)
         """
 
-        return self.map_function(self.original[idx])
+        if self.cache is None:
+            return self.map_function(self.original[idx])
+
+        key = ShardedCache.key(self.fingerprint, idx)
+        sample = self.cache.get(key, _MISSING)
+        if sample is _MISSING:
+            sample = self.map_function(self.original[idx])
+            self.cache.put(key, sample)
+        return sample
 
     def __len__(self):
         """
@@ -162,20 +240,405 @@ class ExternalDataset(Dataset):
             self._dataset_type = value
 
 
-class PointCloudsDatasetIterator(DatasetIterator):
-    def __init__(self, path, num_point_features=4):
-        super().__init__()
+# Header of packed point cloud files: magic, version, number of point features and number of point clouds, followed
+# by (count + 1) uint64 point offsets and the concatenated float32 points of all the point clouds
+_PACKED_POINT_CLOUDS_MAGIC = b"ODRPCL"
+_PACKED_POINT_CLOUDS_VERSION = 1
+_PACKED_POINT_CLOUDS_HEADER = struct.Struct("<6sHIQ")
+
 
+def _load_point_cloud_file(path, num_point_features=4, mmap=False):
+    """
+    Loads a point cloud stored as raw float32 values (e.g., a KITTI velodyne .bin file).
+
+    :param path: path to the point cloud file
+    :type path: str
+    :param num_point_features: number of features per point
+    :type num_point_features: int
+    :param mmap: if True, the file is memory-mapped (copy-on-write) instead of read, so that the points are only read
+        from disk when they are accessed and modifying them does not change the file
+    :type mmap: bool
+    :return: the points of the point cloud
+    :rtype: numpy.ndarray of shape (N, num_point_features)
+    """
+    if mmap and os.path.getsize(path) > 0:
+        data = np.memmap(path, dtype=np.float32, mode="c")
+    else:
+        data = np.fromfile(path, dtype=np.float32, count=-1)
+    return data.reshape([-1, num_point_features])
+
+
+def _pack_point_cloud_files(paths, output_path, num_point_features=4):
+    """
+    Packs a sequence of point cloud files into a single file, which holds an index of the offsets of the point clouds
+    followed by all their points. A packed file can be read by PointCloudsDatasetIterator, which serves its point clouds
+    as zero-copy views of a single memory mapping.
+
+    :param paths: paths to the point cloud files, in the order they should be packed
+    :type paths: list of str
+    :param output_path: path of the packed file to create
+    :type output_path: str
+    :param num_point_features: number of features per point
+    :type num_point_features: int
+    :return: output_path
+    :rtype: str
+    """
+    sizes = [os.path.getsize(path) // (4 * num_point_features) for path in paths]
+    offsets = np.zeros(len(paths) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum(sizes, dtype=np.uint64)
+
+    with open(output_path, "wb") as file:
+        file.write(_PACKED_POINT_CLOUDS_HEADER.pack(
+            _PACKED_POINT_CLOUDS_MAGIC, _PACKED_POINT_CLOUDS_VERSION, num_point_features, len(paths)
+        ))
+        file.write(offsets.astype("<u8").tobytes())
+        for path, size in zip(paths, sizes):
+            points = np.fromfile(path, dtype=np.float32, count=size * num_point_features)
+            file.write(points.astype("<f4").tobytes())
+
+    return output_path
+
+
+def _is_packed_point_cloud_file(path):
+    """
+    Checks whether a path points to a file created by _pack_point_cloud_files().
+    """
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as file:
+        return file.read(len(_PACKED_POINT_CLOUDS_MAGIC)) == _PACKED_POINT_CLOUDS_MAGIC
+
+
+class _PointCloudFiles:
+    """
+    Provides the point clouds of either a directory of point cloud files or a packed point cloud file.
+    """
+    def __init__(self, path, num_point_features=4, mmap=False):
         self.path = path
         self.num_point_features = num_point_features
-        self.files = sorted(os.listdir(path))
+        self.mmap = mmap
+        self._points = None
+
+        if _is_packed_point_cloud_file(path):
+            with open(path, "rb") as file:
+                _, version, self.num_point_features, count = _PACKED_POINT_CLOUDS_HEADER.unpack(
+                    file.read(_PACKED_POINT_CLOUDS_HEADER.size)
+                )
+            if version != _PACKED_POINT_CLOUDS_VERSION:
+                raise ValueError("Unsupported packed point cloud file version: " + str(version))
+            self.offsets = np.fromfile(path, dtype="<u8", count=count + 1,
+                                       offset=_PACKED_POINT_CLOUDS_HEADER.size).astype(np.int64)
+            self.files = None
+        else:
+            self.offsets = None
+            self.files = sorted(os.listdir(path))
+
+    @property
+    def packed(self):
+        return self.offsets is not None
+
+    def __len__(self):
+        return len(self.files) if self.files is not None else len(self.offsets) - 1
 
     def __getitem__(self, idx):
-        data = np.fromfile(
-            str(self.path + "/" + self.files[idx]), dtype=np.float32, count=-1
-        ).reshape([-1, self.num_point_features])
+        if not self.packed:
+            return _load_point_cloud_file(os.path.join(self.path, self.files[idx]), self.num_point_features, self.mmap)
+
+        if self._points is None:
+            payload_offset = _PACKED_POINT_CLOUDS_HEADER.size + 8 * len(self.offsets)
+            if self.offsets[-1] == 0:
+                self._points = np.zeros((0, self.num_point_features), dtype=np.float32)
+            else:
+                self._points = np.memmap(self.path, dtype="<f4", mode="c", offset=payload_offset,
+                                         shape=(int(self.offsets[-1]), self.num_point_features))
+        return self._points[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def __getstate__(self):
+        # The memory mapping is created again by each process
+        state = self.__dict__.copy()
+        state["_points"] = None
+        return state
+
+
+def _is_memory_mapped(array):
+    """
+    Checks whether an array is backed by a memory mapping, either as a NumPy memmap or as a view of an mmap object
+    (e.g., the values loaded from a ShardedCache).
+    """
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = base.obj if isinstance(base, memoryview) else getattr(base, "base", None)
+    return False
+
+
+def _touch(data):
+    """
+    Reads one value of every memory page of the memory-mapped arrays of an item, so that they are loaded from disk.
+    """
+    for value in data:
+        if isinstance(value, np.ndarray) and value.size > 0 and _is_memory_mapped(value):
+            np.ravel(value)[::1024].sum()
+        elif isinstance(value, PointCloud):
+            _touch([value.data])
+        elif isinstance(value, (tuple, list)):
+            _touch(value)
+
+
+# Function used by the processes of a process-based _Prefetcher to load items
+_worker_load_function = None
+
 
-        return PointCloud(data)
+def _init_worker(load):
+    global _worker_load_function
+    _worker_load_function = load
+
+
+def _worker_load(idx):
+    return _worker_load_function(idx)
+
+
+class _Prefetcher:
+    """
+    Loads the items that follow the last accessed item of a dataset in a pool of background threads or processes, so
+    that sequential reads do not wait for I/O or preprocessing. Accessed items are expected to be mostly consecutive,
+    wrapping around at the end.
+    """
+    def __init__(self, load, length, depth, workers=1, mode="thread"):
+        self.load = load
+        self.length = length
+        self.depth = depth
+        if mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        elif mode == "process":
+            # The load function (and the dataset it belongs to) is sent to each process once, not with every item
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(load,))
+        else:
+            raise ValueError("mode should be either 'thread' or 'process'")
+        self.mode = mode
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, idx):
+        item = self.load(idx)
+        # Memory-mapped data is only read when it is accessed, so read it in the background as well
+        _touch([item])
+        return item
+
+    def submit(self, idx):
+        """
+        Starts loading an item and returns its future.
+        """
+        if self.mode == "thread":
+            return self._executor.submit(self._load, idx)
+        return self._executor.submit(_worker_load, idx)
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += self.length
+        if not 0 <= idx < self.length:
+            raise IndexError("index out of range")
+        # Only the prefetched items wrap around, for the next epoch
+        wanted = [(idx + i) % self.length for i in range(1, min(self.depth, self.length - 1) + 1)]
+        with self._lock:
+            # Drop the items that will not be needed, so that they do not delay the requested one
+            for stale in [key for key in self._pending if key != idx and key not in wanted]:
+                self._pending.pop(stale).cancel()
+            future = self._pending.pop(idx, None)
+            if future is None:
+                future = self.submit(idx)
+            for key in wanted:
+                if key not in self._pending:
+                    self._pending[key] = self.submit(key)
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+
+class PrefetchingDatasetIterator(DatasetIterator):
+    """
+    PrefetchingDatasetIterator wraps a DatasetIterator (e.g., a MappedDatasetIterator with heavy preprocessing) and
+    loads its items in a pool of threads or processes ahead of their use.
+
+    Iterating over it yields the items of the wrapped dataset, keeping at most prefetch items in flight. Items are
+    yielded in order, or as soon as they are ready if ordered is False. Indexing it prefetches the items that follow
+    the requested one, so that it can also be used as a drop-in replacement in loops such as
+    `for i in range(len(dataset)): dataset[i]`.
+
+    This class provides the following methods:
+    - __getitem__(i), a getter that allows for retrieving the i-th sample of the dataset, along with its annotation
+    - __len__(), which allows for getting the size of the dataset
+    - __iter__(), which allows for iterating over the samples of the dataset
+    """
+    def __init__(self, dataset, workers=None, mode="thread", prefetch=None, ordered=True):
+        """
+        :param dataset: the dataset to load the items of
+        :type dataset: DatasetIterator
+        :param workers: number of threads or processes, defaults to the number of CPUs
+        :type workers: int, optional
+        :param mode: either 'thread', for I/O bound or GIL releasing loading, or 'process', for Python-heavy loading.
+            In 'process' mode, the dataset must be picklable
+        :type mode: str, optional
+        :param prefetch: maximum number of items loaded ahead, defaults to twice the number of workers
+        :type prefetch: int, optional
+        :param ordered: whether iteration yields the items in order, or as soon as they are loaded
+        :type ordered: bool, optional
+        """
+        super().__init__()
+
+        if mode not in ("thread", "process"):
+            raise ValueError("mode should be either 'thread' or 'process'")
+
+        self.dataset = dataset
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.mode = mode
+        self.prefetch = prefetch if prefetch is not None else 2 * self.workers
+        self.ordered = ordered
+        self._prefetcher = None
+
+    def _get_prefetcher(self):
+        if self._prefetcher is None:
+            self._prefetcher = _Prefetcher(self.dataset.__getitem__, len(self.dataset), self.prefetch,
+                                           self.workers, self.mode)
+        return self._prefetcher
+
+    def __getitem__(self, idx):
+        """
+        This method is used for loading the idx-th sample of a dataset along with its annotation.
+
+        :param idx: the index of the sample to load
+        :return: the idx-th sample and its annotation
+        :rtype: Tuple of (Data, Target)
+        """
+        return self._get_prefetcher()[idx]
+
+    def __iter__(self):
+        """
+        Yields all the samples of the dataset, loading at most prefetch samples ahead.
+        """
+        prefetcher = self._get_prefetcher()
+        pending = deque()
+        try:
+            for idx in range(len(self)):
+                pending.append(prefetcher.submit(idx))
+                if len(pending) >= max(1, self.prefetch):
+                    yield from self._pop_loaded(pending)
+            while pending:
+                yield from self._pop_loaded(pending)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _pop_loaded(self, pending):
+        """
+        Waits for the next item (if ordered) or for any item to be loaded and removes the loaded items from pending.
+        """
+        if self.ordered:
+            return [pending.popleft().result()]
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+        return [future.result() for future in done]
+
+    def __len__(self):
+        """
+        This method returns the size of the dataset.
+
+        :return: the size of the dataset
+        :rtype: int
+        """
+        return len(self.dataset)
+
+    def __getstate__(self):
+        # Thread and process pools cannot be pickled, each process creates its own prefetcher
+        state = self.__dict__.copy()
+        state["_prefetcher"] = None
+        return state
+
+    def close(self):
+        """
+        Stops the background threads or processes.
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PointCloudsDatasetIterator(DatasetIterator):
+    """
+    PointCloudsDatasetIterator loads point clouds from a directory of point cloud files or from a single packed
+    point cloud file (see pack()).
+
+    If mmap is True, the files are memory-mapped and each PointCloud is a zero-copy view of the file, which is only
+    read from disk when accessed. Packed files are always memory-mapped. If prefetch is greater than zero, the next
+    prefetch point clouds are loaded in a background thread while the current one is processed.
+    """
+    def __init__(self, path, num_point_features=4, mmap=False, prefetch=0):
+        super().__init__()
+
+        self.path = path
+        self.mmap = mmap
+        self.prefetch = prefetch
+        self._point_clouds = _PointCloudFiles(path, num_point_features, mmap)
+        self.num_point_features = self._point_clouds.num_point_features
+        self.files = self._point_clouds.files
+        self._prefetcher = None
+
+    def _load(self, idx):
+        return PointCloud(self._point_clouds[idx])
+
+    def __getitem__(self, idx):
+        if self.prefetch > 0:
+            if self._prefetcher is None:
+                self._prefetcher = _Prefetcher(self._load, len(self), self.prefetch)
+            return self._prefetcher[idx]
+        return self._load(idx)
 
     def __len__(self):
-        return len(self.files)
+        return len(self._point_clouds)
+
+    def __getstate__(self):
+        # Background threads cannot be pickled, each process creates its own prefetcher
+        state = self.__dict__.copy()
+        state["_prefetcher"] = None
+        return state
+
+    def close(self):
+        """
+        Stops the background prefetching, if any.
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+
+    @staticmethod
+    def pack(path, output_path, num_point_features=4):
+        """
+        Packs all the point cloud files of a directory into a single file that can be loaded with
+        PointCloudsDatasetIterator(output_path).
+
+        :param path: directory of point cloud files
+        :type path: str
+        :param output_path: path of the packed file to create
+        :type output_path: str
+        :param num_point_features: number of features per point
+        :type num_point_features: int
+        :return: output_path
+        :rtype: str
+        """
+        return _pack_point_cloud_files(
+            [os.path.join(path, file) for file in sorted(os.listdir(path))], output_path, num_point_features
+        )
@@ -0,0 +1,379 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ftplib
+import hashlib
+import http.client
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote, urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_BLOCK_SIZE = 1024 * 1024
+
+# Errors after which a download is retried, resuming from the bytes that were already received
+_TRANSIENT_ERRORS = (OSError, EOFError, ftplib.Error, http.client.HTTPException)
+
+
+def _is_offline():
+    return os.environ.get("OPENDR_OFFLINE", "").lower() not in ("", "0", "false")
+
+
+def _url_key(url):
+    # Duplicated slashes are common in the URLs built with os.path.join(OPENDR_SERVER_URL, ...)
+    scheme, netloc, path, query, _ = urlsplit(url)
+    path = re.sub("/+", "/", path)
+    return hashlib.sha256(("%s://%s%s?%s" % (scheme, netloc, path, query)).encode()).hexdigest()
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactCache(object):
+    """Local content-addressed cache of the files downloaded by the learners and datasets (e.g., pretrained weights)
+
+    Each file is downloaded once and stored under its SHA-256 hash, and a manifest entry maps its URL to the hash, so
+    the learners of all the projects of a machine (or of several machines sharing the cache directory) reuse it.
+    Interrupted downloads are resumed from the received bytes (with HTTP ranges or FTP REST), the downloaded files are
+    moved into the cache with atomic renames, and in offline mode only the cached files are used.
+
+    The files are cached until they are removed, use refresh=True to download a new version of a file.
+    """
+
+    def __init__(self, path=None, offline=None, retries=3, timeout=60):
+        """
+        :param path: directory of the cache, defaults to the OPENDR_ARTIFACT_CACHE environment variable or to
+            ~/.cache/opendr/artifacts
+        :param offline: if True, nothing is downloaded and only the cached files are available, defaults to True
+            if the OPENDR_OFFLINE environment variable is set
+        :param retries: number of times an interrupted download is resumed before its error is raised
+        :param timeout: timeout in seconds of the network operations
+        """
+        if path is None:
+            path = os.environ.get("OPENDR_ARTIFACT_CACHE", os.path.join("~", ".cache", "opendr", "artifacts"))
+        self.path = os.path.expanduser(path)
+        self.offline = _is_offline() if offline is None else offline
+        self.retries = retries
+        self.timeout = timeout
+        for directory in ("objects", "urls", "partial"):
+            os.makedirs(os.path.join(self.path, directory), exist_ok=True)
+
+    def _object_path(self, sha256):
+        return os.path.join(self.path, "objects", sha256[:2], sha256)
+
+    def _entry_path(self, url):
+        return os.path.join(self.path, "urls", _url_key(url) + ".json")
+
+    def lookup(self, url):
+        """
+        Returns the manifest entry of a URL.
+
+        :param url: URL of the file
+        :return: a dictionary with the 'url', 'sha256' and 'size' of the file, or None if it is not cached
+        :rtype: dict
+        """
+        try:
+            with open(self._entry_path(url)) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        try:
+            if os.path.getsize(self._object_path(entry["sha256"])) != entry["size"]:
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def manifest(self):
+        """
+        Returns the manifest entries of all the cached files.
+
+        :rtype: list
+        """
+        entries = []
+        for name in sorted(os.listdir(os.path.join(self.path, "urls"))):
+            try:
+                with open(os.path.join(self.path, "urls", name)) as file:
+                    entries.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def fetch(self, url, sha256=None, reporthook=None, refresh=False):
+        """
+        Returns the path of a file in the cache, after downloading it if it is not cached.
+
+        The returned file is shared by all the users of the cache and must not be modified, use retrieve() to get a
+        copy of it.
+
+        :param url: URL of the file, e.g., on the OpenDR FTP server
+        :param sha256: expected SHA-256 hash of the file, a ValueError is raised if the downloaded file does not match
+        :param reporthook: function called with the progress of the download, as in urllib.request.urlretrieve
+        :param refresh: if True, the file is downloaded even if it is cached
+        :return: the path of the cached file
+        :rtype: str
+        """
+        entry = None if refresh else self.lookup(url)
+        if entry is None or (sha256 is not None and entry["sha256"] != sha256):
+            if self.offline:
+                raise URLError("%s is not in the artifact cache %s and offline mode is enabled" % (url, self.path))
+            with self._lock(url):
+                # Another process may have downloaded the file while this one was waiting
+                entry = None if refresh else self.lookup(url)
+                if entry is None or (sha256 is not None and entry["sha256"] != sha256):
+                    entry = self._download(url, sha256, reporthook)
+        elif reporthook is not None:
+            # Reports the cached file as a single block, after the initial call of urllib.request.urlretrieve
+            reporthook(0, entry["size"], entry["size"])
+            reporthook(1, entry["size"], entry["size"])
+        return self._object_path(entry["sha256"])
+
+    def retrieve(self, url, filename, sha256=None, reporthook=None, refresh=False):
+        """
+        Copies a file to a path, after downloading it if it is not cached. The copy replaces the destination
+        atomically, so the destination is never a partial file.
+
+        :param url: URL of the file
+        :param filename: path of the copy
+        :return: the path of the copy
+        :rtype: str
+
+        The other arguments are the ones of fetch().
+        """
+        source = self.fetch(url, sha256, reporthook, refresh)
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, ".%s.%d.tmp" % (os.path.basename(filename), os.getpid()))
+        try:
+            shutil.copyfile(source, temporary)
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return filename
+
+    def retrieve_many(self, items, workers=4):
+        """
+        Copies several files to their paths, downloading the ones that are not cached in parallel.
+
+        :param items: (url, filename) pairs
+        :param workers: number of files downloaded at the same time
+        :return: the paths of the copies
+        :rtype: list
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda item: self.retrieve(*item), items))
+
+    def remove(self, url):
+        """Removes the manifest entry of a URL. Its file is removed by prune() once no other URL refers to it."""
+        try:
+            os.remove(self._entry_path(url))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Removes the cached files that are not referred to by the manifest and the partial downloads"""
+        referenced = {entry["sha256"] for entry in self.manifest()}
+        for directory, _, names in os.walk(os.path.join(self.path, "objects")):
+            for name in names:
+                if name not in referenced:
+                    os.remove(os.path.join(directory, name))
+        for name in os.listdir(os.path.join(self.path, "partial")):
+            if name.endswith(".part"):
+                os.remove(os.path.join(self.path, "partial", name))
+
+    def verify(self):
+        """
+        Checks the hashes of the cached files and removes the manifest entries of the corrupted ones.
+
+        :return: the URLs of the corrupted files
+        :rtype: list
+        """
+        corrupted = []
+        for entry in self.manifest():
+            path = self._object_path(entry["sha256"])
+            if not os.path.exists(path) or _file_hash(path) != entry["sha256"]:
+                self.remove(entry["url"])
+                corrupted.append(entry["url"])
+        return corrupted
+
+    def size(self):
+        """Returns the total size in bytes of the cached files"""
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(os.path.join(self.path, "objects")) for name in names)
+
+    @contextmanager
+    def _lock(self, url):
+        # Prevents the processes (and threads) that share the cache from writing the same partial download
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, "partial", _url_key(url) + ".lock"), "w") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _download(self, url, sha256, reporthook):
+        partial = os.path.join(self.path, "partial", _url_key(url) + ".part")
+        for attempt in range(self.retries + 1):
+            try:
+                if urlsplit(url).scheme == "ftp":
+                    self._download_ftp(url, partial, reporthook)
+                else:
+                    self._download_url(url, partial, reporthook)
+                break
+            except HTTPError:
+                raise
+            except _TRANSIENT_ERRORS:
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+
+        digest = _file_hash(partial)
+        if sha256 is not None and digest != sha256:
+            os.remove(partial)
+            raise ValueError("The SHA-256 hash of %s is %s instead of %s" % (url, digest, sha256))
+
+        path = self._object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial, path)
+        entry = {"url": url, "sha256": digest, "size": os.path.getsize(path)}
+        temporary = self._entry_path(url) + ".%d.tmp" % os.getpid()
+        with open(temporary, "w") as file:
+            json.dump(entry, file)
+        os.replace(temporary, self._entry_path(url))
+        return entry
+
+    def _download_url(self, url, partial, reporthook):
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        request = urllib.request.Request(url)
+        if offset > 0 and urlsplit(url).scheme in ("http", "https"):
+            request.add_header("Range", "bytes=%d-" % offset)
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            if e.code != 416:
+                raise
+            # The range starts at the end of the file, the partial download is complete
+            return
+        with response:
+            if getattr(response, "status", None) != 206:
+                offset = 0
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else -1
+            with open(partial, "ab" if offset > 0 else "wb") as file:
+                self._copy(response.read, file, offset, total, reporthook)
+            if total >= 0 and os.path.getsize(partial) < total:
+                raise http.client.IncompleteRead(b"", total - os.path.getsize(partial))
+
+    def _download_ftp(self, url, partial, reporthook):
+        parts = urlsplit(url)
+        path = re.sub("/+", "/", unquote(parts.path))
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        with ftplib.FTP(timeout=self.timeout) as ftp:
+            ftp.connect(parts.hostname, parts.port or 21)
+            ftp.login(unquote(parts.username or "anonymous"), unquote(parts.password or ""))
+            ftp.voidcmd("TYPE I")
+            try:
+                total = ftp.size(path)
+            except ftplib.error_perm:
+                total = None
+            if total is not None and offset > total:
+                offset = 0
+            elif total is not None and offset == total > 0:
+                return
+            total = -1 if total is None else total
+            with open(partial, "ab" if offset > 0 else "wb") as file:
+                connection = ftp.transfercmd("RETR " + path, rest=offset or None)
+                with connection:
+                    self._copy(lambda size: connection.recv(size), file, offset, total, reporthook)
+                ftp.voidresp()
+
+    @staticmethod
+    def _copy(read, file, offset, total, reporthook):
+        count = 0
+        if reporthook is not None:
+            reporthook(0, _BLOCK_SIZE, total)
+            if offset > 0:
+                # Reports the bytes that were downloaded before as the first blocks
+                count = offset // _BLOCK_SIZE
+        while True:
+            block = read(_BLOCK_SIZE)
+            if not block:
+                break
+            file.write(block)
+            count += 1
+            if reporthook is not None:
+                reporthook(count, _BLOCK_SIZE, total)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Returns the ArtifactCache used by the learners, created with the default arguments when it is first used"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArtifactCache()
+    return _default_cache
+
+
+def urlretrieve(url, filename=None, reporthook=None, data=None):
+    """
+    Replacement of urllib.request.urlretrieve that downloads the files through the default ArtifactCache.
+
+    :param url: URL of the file
+    :param filename: path of the copy, defaults to a temporary file
+    :param reporthook: function called with the progress of the download, as in urllib.request.urlretrieve
+    :param data: data of a POST request, such requests are not cached
+    :return: the path of the copy and None instead of the headers of the response
+    :rtype: tuple
+    """
+    if data is not None or urlsplit(url).scheme not in ("ftp", "http", "https"):
+        return urllib.request.urlretrieve(url, filename, reporthook, data)
+    if filename is None:
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            filename = file.name
+    return default_cache().retrieve(url, filename, reporthook=reporthook), None
+
+
+def urlretrieve_many(items, workers=4):
+    """
+    Downloads several files in parallel through the default ArtifactCache.
+
+    :param items: (url, filename) pairs
+    :param workers: number of files downloaded at the same time
+    :return: the paths of the files
+    :rtype: list
+    """
+    return default_cache().retrieve_many(items, workers)
@@ -0,0 +1,316 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Union
+
+# Each record of a shard starts with a header holding its magic, key, pickle length and number of out-of-band
+# buffers, followed by the buffer lengths. The pickle and each buffer start at an offset aligned to _ALIGNMENT.
+_RECORD_MAGIC = b"ODRC"
+_RECORD_HEADER = struct.Struct("<4s32sQI")
+_BUFFER_LENGTH = struct.Struct("<Q")
+_ALIGNMENT = 64
+_SHARD_SUFFIX = ".shard"
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def fingerprint(obj) -> str:
+    """Computes a fingerprint of a function (or another object) that changes when its code changes
+
+    The fingerprint of a function covers its name, bytecode, constants, defaults and the values it closes over, so
+    that results cached for one version of a function are not used for another. Objects that are not functions are
+    fingerprinted by their type and (for simple values) their representation.
+    """
+    hasher = hashlib.sha256()
+    _update_fingerprint(hasher, obj, set())
+    return hasher.hexdigest()
+
+
+def _update_fingerprint(hasher, obj, visited):
+    if id(obj) in visited:
+        return
+    if isinstance(obj, (str, bytes, int, float, bool, complex, type(None))):
+        hasher.update(repr(obj).encode())
+    elif isinstance(obj, (tuple, list, frozenset, set)):
+        hasher.update(type(obj).__name__.encode())
+        for item in (sorted(obj, key=repr) if isinstance(obj, (set, frozenset)) else obj):
+            _update_fingerprint(hasher, item, visited)
+    elif isinstance(obj, dict):
+        hasher.update(b"dict")
+        for key in sorted(obj, key=repr):
+            _update_fingerprint(hasher, key, visited)
+            _update_fingerprint(hasher, obj[key], visited)
+    elif isinstance(obj, functools.partial):
+        visited.add(id(obj))
+        _update_fingerprint(hasher, (obj.func, obj.args, obj.keywords), visited)
+    elif hasattr(obj, "__code__"):
+        visited.add(id(obj))
+        hasher.update((getattr(obj, "__module__", None) or "").encode())
+        hasher.update(obj.__qualname__.encode())
+        _update_fingerprint(hasher, obj.__code__, visited)
+        _update_fingerprint(hasher, obj.__defaults__, visited)
+        if obj.__closure__ is not None:
+            for cell in obj.__closure__:
+                try:
+                    _update_fingerprint(hasher, cell.cell_contents, visited)
+                except ValueError:  # Empty cell
+                    pass
+    elif hasattr(obj, "co_code"):
+        hasher.update(obj.co_code)
+        _update_fingerprint(hasher, obj.co_names, visited)
+        _update_fingerprint(hasher, obj.co_consts, visited)
+    elif hasattr(obj, "__func__") and hasattr(obj, "__self__"):
+        # Bound methods depend on the type of the object they are bound to
+        visited.add(id(obj))
+        _update_fingerprint(hasher, obj.__func__, visited)
+        _update_fingerprint(hasher, type(obj.__self__), visited)
+    elif isinstance(obj, type):
+        hasher.update((obj.__module__ + "." + obj.__qualname__).encode())
+    else:
+        visited.add(id(obj))
+        _update_fingerprint(hasher, type(obj), visited)
+        if callable(obj) and hasattr(type(obj), "__call__"):
+            _update_fingerprint(hasher, type(obj).__call__, visited)
+        state = getattr(obj, "__dict__", None)
+        if state is not None:
+            _update_fingerprint(hasher, {key: value for key, value in state.items()
+                                         if isinstance(value, (str, bytes, int, float, bool, tuple, type(None)))},
+                                visited)
+
+
+class ShardedCache(object):
+    """Persistent key-value cache, stored in append-only shard files
+
+    Values are pickled with their NumPy arrays as out-of-band buffers, which are loaded back as copy-on-write views of
+    the memory-mapped shards, i.e., without reading or copying them until they are accessed.
+
+    Each process appends to its own shard, so the cache can be filled concurrently by several processes (e.g., the
+    workers of a DataLoader). When the size of the cache exceeds max_size, the least recently used shards are deleted.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = None, shard_size: int = 256 * 1024 ** 2):
+        """
+        :param path: directory of the cache, it is created if it does not exist
+        :param max_size: maximum size of the cache in bytes, defaults to no limit
+        :param shard_size: size in bytes after which a new shard is started
+        """
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.shard_size = shard_size
+
+        self._index = {}
+        self._scanned = {}
+        self._directory_mtime = None
+        self._shard = None
+        self._shard_pid = None
+        self._lock = threading.Lock()
+        self._scan()
+
+    def __getstate__(self):
+        # Open shards are not shared, each process appends to its own
+        return {"path": self.path, "max_size": self.max_size, "shard_size": self.shard_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def key(*parts) -> bytes:
+        """Returns the key of a value identified by the given parts (e.g., a fingerprint and an index)"""
+        return hashlib.sha256("\0".join(str(part) for part in parts).encode()).digest()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._index:
+                self._scan_if_changed()
+            return key in self._index
+
+    def get(self, key, default=None):
+        """Returns the value stored for a key, or default if there is none"""
+        with self._lock:
+            if key not in self._index:
+                self._scan_if_changed()
+            if key not in self._index:
+                return default
+
+            shard, offset, length, buffers = self._index[key]
+            end = buffers[-1][0] + buffers[-1][1] if buffers else offset + length
+            start = offset // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY
+            try:
+                with open(self.path / shard, "rb") as file:
+                    # Each value gets its own copy-on-write mapping, so that modifying the loaded arrays changes
+                    # neither the shard nor the values loaded later
+                    memory = memoryview(mmap.mmap(file.fileno(), end - start, offset=start, access=mmap.ACCESS_COPY))
+            except OSError:
+                # The shard was evicted by another process
+                self._drop(shard)
+                return default
+
+        # Mark the shard as recently used, for the eviction of the least recently used shards
+        now = time.time()
+        try:
+            os.utime(self.path / shard, (now, os.stat(self.path / shard).st_mtime))
+        except OSError:
+            pass
+        return pickle.loads(memory[offset - start:offset - start + length],
+                            buffers=[memory[position - start:position - start + size] for position, size in buffers])
+
+    def put(self, key, value):
+        """Stores a value for a key"""
+        buffers = []
+        data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+        buffers = [buffer.raw() for buffer in buffers]
+
+        header = _RECORD_HEADER.pack(_RECORD_MAGIC, key, len(data), len(buffers)) + \
+            b"".join(_BUFFER_LENGTH.pack(buffer.nbytes) for buffer in buffers)
+        with self._lock:
+            file = self._writable_shard()
+            start = file.tell()
+            chunks, position = [header], start + len(header)
+            for chunk in [data] + buffers:
+                padding = _aligned(position) - position
+                chunks.append(b"\0" * padding)
+                chunks.append(chunk)
+                position += padding + (chunk.nbytes if isinstance(chunk, memoryview) else len(chunk))
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+
+            self._parse(os.path.basename(file.name), start, position)
+            self._scanned[os.path.basename(file.name)] = position
+            if position >= self.shard_size:
+                file.close()
+                self._shard = None
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def evict(self, max_size):
+        """Deletes the least recently used shards until the size of the cache is at most max_size bytes"""
+        with self._lock:
+            active = None if self._shard is None else os.path.basename(self._shard.name)
+            shards = []
+            for path in self.path.glob("*" + _SHARD_SUFFIX):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                shards.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+            size = sum(shard[1] for shard in shards)
+            for _, shard_size, path in sorted(shards):
+                if size <= max_size:
+                    break
+                if path.name == active:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                self._drop(path.name)
+                size -= shard_size
+
+    def clear(self):
+        """Deletes all the values of the cache"""
+        self.evict(0)
+        with self._lock:
+            if self._shard is not None:
+                name = os.path.basename(self._shard.name)
+                self._shard.close()
+                self._shard = None
+                (self.path / name).unlink()
+                self._drop(name)
+
+    def refresh(self):
+        """Indexes the values that other processes stored since the last scan
+
+        Misses only scan the directory of the cache again when shards were created or deleted. Values that another
+        process appends to a shard that already existed are found after calling this method.
+        """
+        with self._lock:
+            self._scan()
+
+    def size(self):
+        """Returns the size of the cache in bytes"""
+        return sum(path.stat().st_size for path in self.path.glob("*" + _SHARD_SUFFIX))
+
+    def _writable_shard(self):
+        if self._shard is None or self._shard_pid != os.getpid():
+            name = "%d-%s%s" % (os.getpid(), uuid.uuid4().hex, _SHARD_SUFFIX)
+            self._shard = open(self.path / name, "ab")
+            self._shard_pid = os.getpid()
+        return self._shard
+
+    def _drop(self, shard):
+        self._scanned.pop(shard, None)
+        self._index = {key: entry for key, entry in self._index.items() if entry[0] != shard}
+
+    def _scan_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._directory_mtime:
+            self._scan()
+
+    def _scan(self):
+        """Indexes the records that were appended to the shards since the last scan"""
+        # The modification time is read first, so that shards created during the scan are found by the next one
+        try:
+            self._directory_mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._directory_mtime = None
+        for path in self.path.glob("*" + _SHARD_SUFFIX):
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            start = self._scanned.get(path.name, 0)
+            if size > start:
+                self._scanned[path.name] = self._parse(path.name, start, size)
+        for shard in [shard for shard in self._scanned if not (self.path / shard).exists()]:
+            self._drop(shard)
+
+    def _parse(self, shard, start, end):
+        """Indexes the complete records of a shard between two offsets and returns the offset after the last one"""
+        with open(self.path / shard, "rb") as file:
+            position = start
+            while position + _RECORD_HEADER.size <= end:
+                file.seek(position)
+                magic, key, length, count = _RECORD_HEADER.unpack(file.read(_RECORD_HEADER.size))
+                if magic != _RECORD_MAGIC:
+                    break
+                lengths = [_BUFFER_LENGTH.unpack(file.read(_BUFFER_LENGTH.size))[0] for _ in range(count)]
+                offset = _aligned(position + _RECORD_HEADER.size + count * _BUFFER_LENGTH.size)
+                next_position = offset + length
+                buffers = []
+                for size in lengths:
+                    buffers.append((_aligned(next_position), size))
+                    next_position = _aligned(next_position) + size
+                if next_position > end:
+                    # The record is still being written
+                    break
+                self._index[key] = (shard, offset, length, buffers)
+                position = next_position
+        return position
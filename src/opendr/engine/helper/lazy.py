@@ -0,0 +1,49 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import sys
+
+
+def lazy_attributes(package, attributes):
+    """
+    Returns the module level __getattr__ and __dir__ functions (PEP 562) of a package whose attributes are imported
+    when they are first accessed, instead of when the package is imported. Importing a package then does not import
+    the learners it holds (and their frameworks, e.g., PyTorch or MXNet) that are not used.
+
+    Usage, in the __init__.py of the package:
+        __getattr__, __dir__ = lazy_attributes(__name__, {"MyLearner": ".my_learner"})
+
+    :param package: name of the package, i.e., its __name__
+    :param attributes: dictionary with the name of the module of each attribute, relative to the package, from which
+        the attribute is imported as in 'from module import attribute', so an attribute can also be a submodule
+    :return: the __getattr__ and __dir__ functions of the package
+    """
+
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError("module '%s' has no attribute '%s'" % (package, name))
+        module = importlib.import_module(attributes[name], package)
+        try:
+            value = getattr(module, name)
+        except AttributeError:
+            value = importlib.import_module("%s.%s" % (module.__name__, name))
+        # The attribute is stored in the package, so that __getattr__ is only called once for it
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -0,0 +1,157 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Stages recorded by the instrumented learners
+STAGES = ("infer", "preprocess", "forward", "postprocess", "target")
+
+
+class Profiler(object):
+    """
+    Records the duration of the stages of inference (e.g., preprocessing, forward pass, postprocessing and target
+    construction) and reports their percentiles and throughput, or exports them as a Chrome trace.
+
+    Only the last max_samples records are kept, so that the profiler can stay enabled in long running applications.
+    """
+
+    def __init__(self, max_samples=10000, synchronize=None):
+        """
+        :param max_samples: maximum number of records that are kept
+        :param synchronize: function called at the end of each stage before it is timed, e.g.,
+            torch.cuda.synchronize to include the asynchronous GPU work in the stage that launched it
+        """
+        self.max_samples = max_samples
+        self.synchronize = synchronize
+        self._records = deque(maxlen=max_samples)
+        self._depth = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager that records the duration of a stage.
+
+        :param name: name of the stage
+        """
+        depth = getattr(self._depth, "value", 0)
+        self._depth.value = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.synchronize is not None:
+                self.synchronize()
+            end = time.perf_counter()
+            self._depth.value = depth
+            self._records.append((name, start, end - start, threading.get_ident(), depth))
+
+    def record(self, name, start, duration):
+        """
+        Records a stage that was timed by the caller, e.g., the latency of a frame from its capture to its result.
+
+        :param name: name of the stage
+        :param start: start time of the stage, from time.perf_counter()
+        :param duration: duration of the stage in seconds
+        """
+        depth = getattr(self._depth, "value", 0)
+        self._records.append((name, start, duration, threading.get_ident(), depth))
+
+    def reset(self):
+        """Removes all the records"""
+        self._records.clear()
+
+    def records(self):
+        """
+        Returns the recorded stages.
+
+        :return: a list of (stage, start time, duration, thread id, depth) tuples, with times in seconds
+        :rtype: list
+        """
+        return list(self._records)
+
+    def stats(self):
+        """
+        Returns the statistics of each stage.
+
+        :return: a dictionary with a dictionary per stage, holding its number of records ('count'), mean, median
+            ('p50') and 95th and 99th percentiles ('p95', 'p99') of its duration in seconds and its 'throughput', i.e.,
+            the number of records per second of wall time between the start of the first and the end of the last one
+        :rtype: dict
+        """
+        durations, starts, ends = {}, {}, {}
+        for name, start, duration, _, _ in self._records:
+            durations.setdefault(name, []).append(duration)
+            starts[name] = min(starts.get(name, start), start)
+            ends[name] = max(ends.get(name, start + duration), start + duration)
+
+        stats = {}
+        for name, values in durations.items():
+            values = np.asarray(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            elapsed = ends[name] - starts[name]
+            stats[name] = {
+                "count": len(values),
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "throughput": len(values) / elapsed if elapsed > 0 else float("inf"),
+            }
+        return stats
+
+    def summary(self):
+        """
+        Returns a human-readable table of the statistics of each stage, with durations in milliseconds.
+
+        :rtype: str
+        """
+        lines = ["%-12s %8s %10s %10s %10s %10s %12s" % ("stage", "count", "mean", "p50", "p95", "p99", "per second")]
+        for name, stage in sorted(self.stats().items(), key=lambda item: _stage_order(item[0])):
+            lines.append("%-12s %8d %10.3f %10.3f %10.3f %10.3f %12.2f" % (
+                name, stage["count"], stage["mean"] * 1000, stage["p50"] * 1000, stage["p95"] * 1000,
+                stage["p99"] * 1000, stage["throughput"]))
+        return "\n".join(lines)
+
+    def chrome_trace(self, path=None):
+        """
+        Returns the records in the Chrome trace event format, which can be opened in chrome://tracing or Perfetto.
+
+        :param path: if given, the trace is also written to this JSON file
+        :return: the trace
+        :rtype: dict
+        """
+        events = [{
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": thread,
+        } for name, start, duration, thread, _ in self._records]
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if path is not None:
+            with open(path, "w") as file:
+                json.dump(trace, file)
+        return trace
+
+
+def _stage_order(name):
+    return (STAGES.index(name), name) if name in STAGES else (len(STAGES), name)
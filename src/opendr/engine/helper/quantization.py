@@ -0,0 +1,127 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+
+import numpy as np
+
+# Targets of the optimize() methods of the learners that support CPU INT8 quantization
+TARGETS = ("onnx", "cpu-int8")
+
+
+def check_target(target, calibration_dataset, targets=TARGETS):
+    """Raises a ValueError if the target of optimize() is unknown, or if an INT8 target has no calibration dataset"""
+    if target not in targets:
+        raise ValueError("Unknown optimization target '%s', choose from %s" % (target, ", ".join(targets)))
+    if target == "cpu-int8" and calibration_dataset is None:
+        raise ValueError("The 'cpu-int8' target needs a calibration_dataset")
+
+
+def calibration_inputs(dataset, preprocess, samples=100):
+    """
+    Returns the inputs of a model for the first items of a dataset, which are used to calibrate its quantization.
+
+    :param dataset: DatasetIterator whose items are the inputs of infer() of the learner, or (input, target) tuples
+    :param preprocess: function that returns the input array of the model for the input of infer(), or None to skip it
+    :param samples: maximum number of items that are used
+    :return: the input arrays
+    :rtype: list of numpy.ndarray
+    """
+    inputs = []
+    for index in range(min(samples, len(dataset))):
+        item = dataset[index]
+        if isinstance(item, tuple):
+            item = item[0]
+        array = preprocess(item)
+        if array is not None:
+            inputs.append(np.ascontiguousarray(array, dtype=np.float32))
+    if not inputs:
+        raise ValueError("The calibration dataset does not contain any input")
+    return inputs
+
+
+def quantize_int8(float_path, int8_path, inputs, per_channel=True, reduce_range=False, verbose=False):
+    """
+    Quantizes an ONNX model to INT8 with post-training static quantization, with INT8 weights and UINT8 activations
+    whose ranges are calibrated on the given inputs, and returns how much the outputs of the quantized model differ
+    from those of the float model on these inputs.
+
+    :param float_path: path of the float ONNX model, which must have a single input
+    :param int8_path: path of the quantized model
+    :param inputs: input arrays of the model, see calibration_inputs()
+    :param per_channel: whether the weights are quantized per channel, which is more accurate for convolutions
+    :param reduce_range: whether the weights are quantized on 7 bits, which avoids saturation on processors without
+        VNNI instructions
+    :param verbose: whether to print the report
+    :return: the report, with the number of 'calibration_samples', the mean 'relative_error' and 'cosine_similarity' of
+        the outputs, the 'top1_agreement' of the first output for classification models (i.e., with (N, classes)
+        outputs), and the sizes of the models in bytes
+    :rtype: dict
+    """
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quant_pre_process, \
+        quantize_static
+    from opendr.engine.helper.sessions import SessionManager
+
+    manager = SessionManager(cache=False)
+    float_session = manager.session(float_path)
+    input_name = float_session.get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.inputs = iter(inputs)
+
+        def get_next(self):
+            array = next(self.inputs, None)
+            return None if array is None else {input_name: array}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = float_path
+        try:
+            # Shape inference and graph optimizations, which make more operators quantizable
+            model = os.path.join(temp_dir, "preprocessed.onnx")
+            quant_pre_process(float_path, model, skip_symbolic_shape=True)
+        except Exception:
+            model = float_path
+        quantize_static(model, int8_path, Reader(), quant_format=QuantFormat.QDQ, per_channel=per_channel,
+                        reduce_range=reduce_range, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    int8_session = manager.session(int8_path)
+    relative_errors, similarities, agreements = [], [], []
+    for array in inputs:
+        references = float_session.run(None, {input_name: array})
+        outputs = int8_session.run(None, {input_name: array})
+        for reference, output in zip(references, outputs):
+            reference, output = np.asarray(reference, np.float64).ravel(), np.asarray(output, np.float64).ravel()
+            norm = np.linalg.norm(reference)
+            relative_errors.append(np.linalg.norm(output - reference) / max(norm, 1e-12))
+            similarities.append(np.dot(output, reference) / max(norm * np.linalg.norm(output), 1e-12))
+        if references[0].ndim == 2:
+            agreements.extend(np.argmax(references[0], axis=1) == np.argmax(outputs[0], axis=1))
+
+    report = {
+        "target": "cpu-int8",
+        "calibration_samples": len(inputs),
+        "relative_error": float(np.mean(relative_errors)),
+        "cosine_similarity": float(np.mean(similarities)),
+        "float_size": os.path.getsize(float_path),
+        "int8_size": os.path.getsize(int8_path),
+    }
+    if agreements:
+        report["top1_agreement"] = float(np.mean(agreements))
+    if verbose:
+        print("Quantized the model to INT8 (%.1f MB -> %.1f MB), relative error of the outputs: %.4f, "
+              "cosine similarity: %.4f" % (report["float_size"] / 1e6, report["int8_size"] / 1e6,
+                                           report["relative_error"], report["cosine_similarity"]))
+    return report
@@ -0,0 +1,253 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import platform
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+# The global thread pools of ONNX Runtime are created once per process, by the first session of a SessionManager with
+# shared pools
+_global_pools_lock = threading.Lock()
+_global_pools = None
+
+
+def _create_global_pools(threads, inter_op_threads):
+    """
+    Returns whether the sessions can share the global thread pools of ONNX Runtime, creating them with the given sizes
+    if they do not exist yet
+    """
+    global _global_pools
+    with _global_pools_lock:
+        if _global_pools is None:
+            try:
+                from onnxruntime.capi import _pybind_state
+                _pybind_state.set_global_thread_pool_sizes(threads, inter_op_threads)
+                _global_pools = True
+            except AttributeError:
+                # ONNX Runtime builds without global thread pools
+                _global_pools = False
+            except Exception:
+                # The pools were already created, with other sizes
+                _global_pools = True
+        return _global_pools
+
+
+class SessionManager(object):
+    """
+    Creates the ONNX Runtime inference sessions of the learners with shared settings:
+    - a thread budget: by default, each session creates thread pools as large as the machine whose threads spin while
+      waiting for work, which oversubscribes the cores when several models run in a process. The sessions of a manager
+      have thread pools of the given size whose threads do not spin, or share the global thread pools of ONNX Runtime
+    - the graph optimization level
+    - a cache of the optimized models on disk, so that the graph optimizations are only run once per model
+    """
+
+    def __init__(self, threads=None, inter_op_threads=1, optimization_level="all", cache=True, cache_dir=None,
+                 shared_pools=None):
+        """
+        :param threads: number of intra-op threads of each session, or of the shared thread pools, defaults to the
+            OPENDR_ORT_THREADS environment variable or to the number of cores
+        :param inter_op_threads: number of inter-op threads of each session, or of the shared thread pools, which are
+            only used by the models with parallel branches
+        :param optimization_level: graph optimization level, one of 'disable', 'basic', 'extended' or 'all'
+        :param cache: whether to cache the optimized models on disk
+        :param cache_dir: directory of the optimized models, defaults to the OPENDR_ONNX_CACHE environment variable or
+            to ~/.cache/opendr/onnx
+        :param shared_pools: whether the sessions share the global thread pools of ONNX Runtime, so that the process
+            never runs more than threads intra-op threads, defaults to the OPENDR_ORT_SHARED_POOLS environment
+            variable. The global thread pools are created once per process, and the sessions created afterwards
+            without a SessionManager must then set use_per_session_threads to False in their options
+        """
+        if optimization_level not in OPTIMIZATION_LEVELS:
+            raise ValueError("Unknown optimization level '%s', choose from %s" %
+                             (optimization_level, ", ".join(OPTIMIZATION_LEVELS)))
+        if threads is None:
+            threads = int(os.environ.get("OPENDR_ORT_THREADS", 0)) or os.cpu_count() or 1
+        self.threads = threads
+        self.inter_op_threads = inter_op_threads
+        self.optimization_level = optimization_level
+        self.cache = cache and optimization_level != "disable"
+        if cache_dir is None:
+            cache_dir = os.environ.get("OPENDR_ONNX_CACHE", os.path.join("~", ".cache", "opendr", "onnx"))
+        self.cache_dir = os.path.expanduser(cache_dir)
+        if shared_pools is None:
+            shared_pools = os.environ.get("OPENDR_ORT_SHARED_POOLS", "").lower() not in ("", "0", "false")
+        self.shared_pools = shared_pools
+
+    def options(self):
+        """
+        Returns the options of the sessions.
+
+        :rtype: onnxruntime.SessionOptions
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[self.optimization_level]
+        if self.shared_pools and _create_global_pools(self.threads, self.inter_op_threads):
+            options.use_per_session_threads = False
+        else:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = self.inter_op_threads
+            # Idle threads sleep instead of spinning, so that they leave the cores to the other sessions
+            options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+            options.add_session_config_entry("session.inter_op.allow_spinning", "0")
+        return options
+
+    def session(self, path, providers=None, io_binding=False):
+        """
+        Creates an inference session.
+
+        :param path: path of the ONNX model
+        :param providers: execution providers of the session, defaults to those of onnxruntime.InferenceSession
+        :param io_binding: if True, returns a BoundSession, which reuses the buffers of its outputs
+        :return: the session
+        :rtype: onnxruntime.InferenceSession or BoundSession
+        """
+        import onnxruntime as ort
+
+        options = self.options()
+        model = os.fspath(path)
+        cached = self._cached_path(model, providers) if self.cache else None
+        if cached is not None and os.path.exists(cached):
+            # The cached model is already optimized
+            model = cached
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            session = ort.InferenceSession(model, options, providers=providers)
+        elif cached is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = "%s.%d.%d.part" % (cached, os.getpid(), threading.get_ident())
+            options.optimized_model_filepath = partial
+            # Hides the warning that the model is optimized for this processor, which is part of the cache key
+            options.log_severity_level = 3
+            try:
+                session = ort.InferenceSession(model, options, providers=providers)
+            except Exception:
+                # Some models cannot be saved once optimized, e.g., with nodes compiled by an execution provider
+                options = self.options()
+                session = ort.InferenceSession(model, options, providers=providers)
+            if os.path.exists(partial):
+                os.replace(partial, cached)
+        else:
+            session = ort.InferenceSession(model, options, providers=providers)
+        return BoundSession(session) if io_binding else session
+
+    def clear(self):
+        """Removes the optimized models from the cache"""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".onnx") or name.endswith(".part"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _cached_path(self, model, providers):
+        """Returns the path of the optimized model, which depends on the model and on how it is optimized"""
+        import onnxruntime as ort
+
+        digest = hashlib.sha256()
+        with open(model, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        # The optimizations of the 'all' level depend on the execution providers and on the processor
+        digest.update(repr((self.optimization_level, ort.__version__, platform.machine(),
+                            providers or ort.get_available_providers())).encode())
+        return os.path.join(self.cache_dir, digest.hexdigest() + ".onnx")
+
+
+class BoundSession(object):
+    """
+    Inference session that runs with IO binding and writes its outputs in preallocated buffers, which are allocated
+    for each shape of the inputs the first time it is seen, instead of allocating new outputs at each run.
+
+    The arrays returned by run() are the buffers, so they are overwritten by the next run with inputs of the same
+    shapes, and the shapes of the outputs must only depend on the shapes of the inputs. The other attributes are those
+    of the underlying onnxruntime.InferenceSession.
+    """
+
+    def __init__(self, session, max_shapes=8):
+        """
+        :param session: the onnxruntime.InferenceSession
+        :param max_shapes: maximum number of shapes of the inputs whose outputs are preallocated
+        """
+        self.session = session
+        self.max_shapes = max_shapes
+        self._binding = session.io_binding()
+        self._names = [output.name for output in session.get_outputs()]
+        self._outputs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, output_names, input_feed, run_options=None):
+        """
+        Runs the model, as onnxruntime.InferenceSession.run().
+
+        :param output_names: names of the returned outputs, or None for all of them
+        :param input_feed: dictionary with the numpy array of each input
+        :param run_options: onnxruntime.RunOptions of the run
+        :return: the outputs
+        :rtype: list
+        """
+        inputs = {name: np.ascontiguousarray(value) for name, value in input_feed.items()}
+        key = tuple(sorted((name, value.shape, value.dtype.str) for name, value in inputs.items()))
+        with self._lock:
+            binding = self._binding
+            binding.clear_binding_inputs()
+            binding.clear_binding_outputs()
+            for name, value in inputs.items():
+                binding.bind_cpu_input(name, value)
+            outputs = self._outputs.get(key)
+            if outputs is None:
+                for name in self._names:
+                    binding.bind_output(name, "cpu")
+            else:
+                for name, array in zip(self._names, outputs):
+                    binding.bind_output(name, "cpu", 0, array.dtype, array.shape, array.ctypes.data)
+            self.session.run_with_iobinding(binding, run_options)
+            if outputs is None:
+                outputs = binding.copy_outputs_to_cpu()
+                if len(self._outputs) < self.max_shapes:
+                    self._outputs[key] = outputs
+        if output_names is None:
+            return list(outputs)
+        return [outputs[self._names.index(name)] for name in output_names]
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+_default_manager = None
+
+
+def default_manager():
+    """Returns the SessionManager used by the learners, configured by the environment variables"""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = SessionManager()
+    return _default_manager
+
+
+def create_session(path, providers=None, io_binding=False):
+    """
+    Creates an inference session with the default SessionManager, see SessionManager.session().
+    """
+    return default_manager().session(path, providers, io_binding)
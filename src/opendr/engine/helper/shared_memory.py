@@ -0,0 +1,226 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import pickle
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# The segment starts with the state of the ring buffer (head, tail and number of used bytes), followed by the blocks.
+# Each block starts with its size and its number of references, a block without references is free.
+_POOL_HEADER = struct.Struct("<qqq")
+_BLOCK_HEADER = struct.Struct("<qq")
+_ALIGNMENT = 64
+
+# Pools that are open in this process, by name, so that the unpickled SharedData handles can find them
+_pools = {}
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedMemoryPool(object):
+    """Ring buffer of shared memory, used to pass Data (and Target) objects between processes without copying them
+
+    share() pickles an object with its NumPy arrays as out-of-band buffers, which are stored in a block of the pool,
+    and returns a small SharedData handle that can be sent to other processes (e.g., through a multiprocessing Queue)
+    instead of the object. Its receivers open the object as views of the shared memory and release the handle when
+    they are done with it. A block is recycled once all its references are released.
+
+    The pool has to be passed to the other processes when they are started (e.g., as an argument of
+    multiprocessing.Process), since its lock can not be sent through queues.
+    """
+
+    def __init__(self, size=256 * 1024 ** 2, name=None):
+        """
+        :param size: size of the pool in bytes, which bounds the total size of the objects shared at the same time
+        :param name: name of the shared memory segment, defaults to a unique name
+        """
+        size = _aligned(size)
+        self._memory = shared_memory.SharedMemory(name=name, create=True, size=_ALIGNMENT + size)
+        self._lock = multiprocessing.Lock()
+        self._owner = True
+        self.size = size
+        _POOL_HEADER.pack_into(self._memory.buf, 0, 0, 0, 0)
+        _pools[self.name] = self
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def __getstate__(self):
+        return {"name": self.name, "size": self.size, "lock": self._lock}
+
+    def __setstate__(self, state):
+        self._memory = shared_memory.SharedMemory(name=state["name"])
+        try:
+            # Only the creator of the segment removes it, not the processes that attach to it
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+        except Exception:
+            pass
+        self._lock = state["lock"]
+        self._owner = False
+        self.size = state["size"]
+        _pools[self.name] = self
+
+    def share(self, obj, references=1, timeout=1.0):
+        """
+        Stores an object in the pool.
+
+        :param obj: the object to share, e.g., an Image or a PointCloud
+        :param references: number of release() calls after which the block of the object is recycled, e.g., the
+        number of processes the handle is sent to
+        :param timeout: time in seconds to wait for enough free memory, after which a MemoryError is raised
+        :return: a handle to the shared object
+        :rtype: SharedData
+        """
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        buffers = [buffer.raw() for buffer in buffers]
+
+        positions, size = [], _BLOCK_HEADER.size
+        for buffer in buffers:
+            size = _aligned(size)
+            positions.append((size, buffer.nbytes))
+            size += buffer.nbytes
+        offset = self._allocate(_aligned(size), references, timeout)
+
+        memory = self._memory.buf
+        for buffer, (position, nbytes) in zip(buffers, positions):
+            memory[offset + position:offset + position + nbytes] = buffer
+        return SharedData(self.name, offset, data, positions)
+
+    def _allocate(self, size, references, timeout):
+        if size > self.size:
+            raise ValueError("Object of %d bytes does not fit in a pool of %d bytes" % (size, self.size))
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                offset = self._try_allocate(size, references)
+            if offset is not None:
+                return offset
+            if time.monotonic() > deadline:
+                raise MemoryError("No free block of %d bytes in the shared memory pool" % size)
+            time.sleep(0.0005)
+
+    def _try_allocate(self, size, references):
+        memory = self._memory.buf
+        head, tail, used = _POOL_HEADER.unpack_from(memory, 0)
+
+        # Recycle the released blocks at the tail of the ring
+        while used > 0:
+            block_size, block_references = _BLOCK_HEADER.unpack_from(memory, _ALIGNMENT + tail)
+            if block_references > 0:
+                break
+            tail = (tail + block_size) % self.size
+            used -= block_size
+        if used == 0:
+            head = tail = 0
+
+        offset = None
+        if head >= tail and (used == 0 or head != tail):
+            if self.size - head >= size:
+                offset = head
+            elif tail >= size:
+                # Skip the end of the ring with a free block and continue from its start
+                _BLOCK_HEADER.pack_into(memory, _ALIGNMENT + head, self.size - head, 0)
+                used += self.size - head
+                offset = 0
+        elif tail - head >= size:
+            offset = head
+
+        if offset is not None:
+            _BLOCK_HEADER.pack_into(memory, _ALIGNMENT + offset, size, references)
+            head = (offset + size) % self.size
+            used += size
+        _POOL_HEADER.pack_into(memory, 0, head, tail, used)
+        return None if offset is None else _ALIGNMENT + offset
+
+    def _add_references(self, offset, count):
+        with self._lock:
+            size, references = _BLOCK_HEADER.unpack_from(self._memory.buf, offset)
+            if references + count < 0:
+                raise ValueError("SharedData released more times than it was referenced")
+            _BLOCK_HEADER.pack_into(self._memory.buf, offset, size, references + count)
+
+    def used(self):
+        """Returns the number of bytes of the pool that are used by shared objects (including released ones that
+        are not recycled yet)"""
+        with self._lock:
+            return _POOL_HEADER.unpack_from(self._memory.buf, 0)[2]
+
+    def close(self):
+        """Detaches from the pool, and removes it if it was created by this process. The objects opened from the pool
+        must be deleted before."""
+        _pools.pop(self.name, None)
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SharedData(object):
+    """Handle of an object stored in a SharedMemoryPool, which can be pickled and sent to other processes"""
+
+    def __init__(self, pool_name, offset, data, buffers):
+        self.pool_name = pool_name
+        self.offset = offset
+        self.data = data
+        self.buffers = buffers
+
+    @property
+    def pool(self):
+        pool = _pools.get(self.pool_name)
+        if pool is None:
+            raise RuntimeError("SharedMemoryPool %s is not available in this process, it has to be passed to the "
+                               "process when it is started" % self.pool_name)
+        return pool
+
+    def open(self, copy=False):
+        """
+        Loads the shared object.
+
+        :param copy: if False, the arrays of the object are read-only views of the shared memory, which are valid
+        until the handle is released, otherwise they are copies
+        :return: the shared object
+        """
+        memory = self.pool._memory.buf[self.offset:]
+        buffers = [memory[position:position + nbytes] for position, nbytes in self.buffers]
+        if copy:
+            buffers = [bytearray(buffer) for buffer in buffers]
+        else:
+            buffers = [buffer.toreadonly() for buffer in buffers]
+        return pickle.loads(self.data, buffers=buffers)
+
+    def retain(self, count=1):
+        """Adds references to the shared object, e.g., before sending the handle to more processes"""
+        self.pool._add_references(self.offset, count)
+
+    def release(self):
+        """Releases a reference to the shared object, its memory is recycled once all references are released"""
+        self.pool._add_references(self.offset, -1)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
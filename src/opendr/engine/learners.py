@@ -13,6 +13,9 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from opendr.engine.data import ImageBatch
+from opendr.engine.helper.profiling import Profiler
 
 
 class BaseLearner(ABC):
@@ -29,11 +32,18 @@ class BaseLearner(ABC):
     - resetting the model's state if required (reset())
     """
 
+    # Whether infer() accepts an engine.data.ImageBatch and returns the result of each of its images in a list
+    supports_batching = False
+    # Whether fit() reports its validation metrics to the callbacks added with add_fit_callback()
+    supports_fit_callbacks = False
+
     def __init__(self, lr=0.001, iters=10, batch_size=64, optimizer='sgd', lr_schedule='',
                  backbone='default', network_head='', checkpoint_after_iter=0, checkpoint_load_iter=0,
                  temp_path='', device='cuda', threshold=0.0, scale=1.0):
 
         self._model = None  # Protected attribute; reference to the model object
+        self._profiler = None  # Protected attribute; records the stages of inference when profiling is enabled
+        self._fit_callbacks = []  # Protected attribute; called by fit() with the validation metrics
 
         # All parameters below are public attributes with appropriate getters/setters
         # Training parameters
@@ -100,6 +110,107 @@ class BaseLearner(ABC):
         """
         pass
 
+    def enable_profiling(self, max_samples=10000, synchronize=None):
+        """
+        Enables the recording of the duration of the stages of inference (preprocess, forward, postprocess and target
+        construction) of the learner. The recorded stages can be accessed through the profiler attribute.
+
+        :param max_samples: maximum number of records that are kept
+        :type max_samples: int, optional
+        :param synchronize: function called at the end of each stage before it is timed, e.g.,
+            torch.cuda.synchronize to include the asynchronous GPU work in the stage that launched it
+        :type synchronize: callable, optional
+        :return: the profiler of the learner
+        :rtype: engine.helper.profiling.Profiler
+        """
+        self._profiler = Profiler(max_samples, synchronize)
+        return self._profiler
+
+    def disable_profiling(self):
+        """
+        Disables the profiling of the learner and removes its records.
+        """
+        self._profiler = None
+
+    @property
+    def profiler(self):
+        """
+        Getter of _profiler field.
+        This returns the profiler of the learner, or None if profiling is not enabled.
+
+        :return: the profiler of the learner
+        :rtype: engine.helper.profiling.Profiler
+        """
+        # Learners that do not call the constructor of BaseLearner do not have the attribute
+        return getattr(self, "_profiler", None)
+
+    def infer_batch(self, inputs, **kwargs):
+        """
+        Performs inference on several inputs, e.g., the images of several cameras. Learners that support batching
+        process them in a single call of infer() with an ImageBatch, the others call infer() on each input.
+
+        :param inputs: inputs of infer(), e.g., engine.data.Image objects
+        :type inputs: list
+        :param kwargs: other arguments of infer()
+        :return: the result of infer() for each input
+        :rtype: list
+        """
+        if self.supports_batching:
+            return self.infer(ImageBatch(inputs), **kwargs)
+        return [self.infer(input, **kwargs) for input in inputs]
+
+    def add_fit_callback(self, callback):
+        """
+        Adds a callback that is called by fit() each time the model is evaluated on the validation dataset, e.g., at
+        the end of each epoch, for the learners whose supports_fit_callbacks attribute is True. The callback is called
+        as callback(learner, step, metrics), where step is the epoch or iteration at which the model is evaluated and
+        metrics are the validation metrics, in the format of the output of eval(). If it returns True, training is
+        stopped after this step, e.g., to stop a hyperparameter tuning trial whose metrics are not promising.
+
+        :param callback: the callback
+        :type callback: callable
+        """
+        # Learners that do not call the constructor of BaseLearner do not have the attribute
+        if getattr(self, "_fit_callbacks", None) is None:
+            self._fit_callbacks = []
+        self._fit_callbacks.append(callback)
+
+    def remove_fit_callback(self, callback):
+        """
+        Removes a callback added with add_fit_callback().
+
+        :param callback: the callback
+        :type callback: callable
+        """
+        self._fit_callbacks.remove(callback)
+
+    def _report_fit_metrics(self, step, metrics):
+        """
+        Calls the fit callbacks with the validation metrics of a step of fit().
+
+        :param step: epoch or iteration at which the model is evaluated
+        :type step: int
+        :param metrics: the validation metrics, in the format of the output of eval()
+        :type metrics: any
+        :return: whether a callback requested to stop training
+        :rtype: bool
+        """
+        stop = False
+        for callback in list(getattr(self, "_fit_callbacks", None) or []):
+            # All the callbacks are called, even if one of them already requested to stop
+            stop = bool(callback(self, step, metrics)) or stop
+        return stop
+
+    def _profile(self, stage):
+        """
+        Returns a context manager that records the duration of a stage of inference if profiling is enabled.
+
+        :param stage: name of the stage, e.g., 'preprocess', 'forward', 'postprocess' or 'target'
+        :type stage: str
+        """
+        profiler = self.profiler
+        return nullcontext() if profiler is None else profiler.stage(stage)
+
     @property
     def model(self):
         """
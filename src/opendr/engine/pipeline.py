@@ -0,0 +1,370 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from opendr.engine.helper.profiling import Profiler
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# Returned by StageQueue.get() once the queue is closed and empty
+_CLOSED = object()
+
+# State created by the setup function of a stage in each of its worker processes
+_process_state = None
+
+
+def _setup_process(setup):
+    global _process_state
+    _process_state = setup()
+
+
+def _call_in_process(function, data, has_setup):
+    return function(_process_state, data) if has_setup else function(data)
+
+
+class StageQueue(object):
+    """
+    Bounded queue between two stages of a Pipeline, whose policy decides what happens when it is full:
+    - 'block': put() waits for a free slot, which slows down the previous stage (backpressure)
+    - 'drop_oldest': the oldest item is dropped, so the next stage always processes the latest frame
+    - 'drop_newest': the new item is dropped
+    """
+
+    def __init__(self, maxsize=4, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError("Unknown queue policy '%s', choose from %s" % (policy, ", ".join(POLICIES)))
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, item, timeout=None):
+        """
+        Adds an item to the queue.
+
+        :param item: the item
+        :param timeout: maximum time in seconds that put() waits for a free slot with the 'block' policy, after which
+            a queue.Full exception is raised
+        :return: whether the item was added, i.e., it was not dropped
+        :rtype: bool
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot put items in a closed queue")
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                elif not self._condition.wait_for(lambda: len(self._items) < self.maxsize or self._closed, timeout):
+                    raise queue.Full
+                if self._closed:
+                    raise RuntimeError("Cannot put items in a closed queue")
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Removes the oldest item of the queue, waiting for one if it is empty.
+
+        :param timeout: maximum time in seconds to wait for an item, after which a queue.Empty exception is raised
+        :return: the item, or _CLOSED if the queue is closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            if not self._items:
+                return _CLOSED
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """Stops accepting items, the items that are already in the queue can still be taken"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+
+class Packet(object):
+    """Item processed by the stages of a Pipeline"""
+
+    def __init__(self, data, sequence, timestamp):
+        """
+        :param data: the input of the pipeline, replaced by the output of each stage
+        :param sequence: number of the packet, in the order of the inputs of the pipeline
+        :param timestamp: time at which the input was captured, from time.perf_counter()
+        """
+        self.data = data
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.error = None
+        self.failed_stage = None
+
+    @property
+    def latency(self):
+        """Time in seconds between the capture of the input and now"""
+        return time.perf_counter() - self.timestamp
+
+
+class Stage(object):
+    """
+    Stage of a Pipeline, which applies a function, e.g., the infer() method of a learner, to the output of the
+    previous stage.
+    """
+
+    def __init__(self, name, function, workers=1, queue_size=4, policy="block", input_type=None, output_type=None,
+                 setup=None, processes=False):
+        """
+        :param name: name of the stage, used in the metrics
+        :param function: function(data) that returns the output of the stage, or function(state, data) if setup is
+            given
+        :param workers: number of threads (or processes) that run the function concurrently, with several workers
+            the packets may leave the stage out of order
+        :param queue_size: size of the input queue of the stage
+        :param policy: policy of the input queue when it is full, one of 'block', 'drop_oldest' or 'drop_newest', see
+            StageQueue
+        :param input_type: type (or tuple of types) of the inputs of the stage, the packets of other types fail with a
+            TypeError
+        :param output_type: type (or tuple of types) of the outputs of the stage
+        :param setup: function that creates the state passed to function in each worker, e.g., a learner
+        :param processes: if True, the workers are processes instead of threads, so function, setup and the data must
+            be picklable, and setup creates the state in each process
+        """
+        if workers < 1:
+            raise ValueError("A stage needs at least one worker")
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.input_type = input_type
+        self.output_type = output_type
+        self.setup = setup
+        self.processes = processes
+        self.queue = StageQueue(queue_size, policy)
+        self.processed = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_learner(cls, learner, name=None, **kwargs):
+        """
+        Returns a stage that runs the inference of a learner. A learner is not thread-safe, so the stage has a single
+        worker thread.
+
+        :param learner: the learner
+        :param name: name of the stage, defaults to the name of the class of the learner
+        :param kwargs: other arguments of the constructor of Stage, except function, workers and processes
+        """
+        return cls(name or type(learner).__name__, learner.infer, **kwargs)
+
+    def _check(self, data, expected, direction):
+        if expected is not None and not isinstance(data, expected):
+            raise TypeError("The %s of stage '%s' is a %s instead of a %s" % (
+                direction, self.name, type(data).__name__, getattr(expected, "__name__", expected)))
+
+
+class Pipeline(object):
+    """
+    Runs a chain of stages (e.g., a detector and a tracker) on a stream of inputs (e.g., camera frames), with the
+    stages running concurrently in their own workers and connected by bounded queues. A slow stage then overlaps with
+    the fast ones instead of blocking them, and with the 'drop_oldest' policy it always processes the latest frame.
+
+    The inputs are given with put() and the outputs are taken with get() or results(), as Packet objects holding the
+    output of the last stage and the capture timestamp of the input. If a stage fails, the packet skips the next
+    stages and holds the exception (error) and the name of the stage (failed_stage).
+    The duration of each stage and the end-to-end latency ('pipeline') are recorded by the profiler attribute.
+    """
+
+    def __init__(self, stages, output_size=16, output_policy="drop_oldest", max_samples=10000):
+        """
+        :param stages: the stages, in order
+        :param output_size: size of the queue of the outputs
+        :param output_policy: policy of the queue of the outputs when it is full, see StageQueue
+        :param max_samples: maximum number of records kept by the profiler
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        if len({stage.name for stage in stages}) != len(stages):
+            raise ValueError("The names of the stages of a pipeline must be unique")
+        for previous, stage in zip(stages, stages[1:]):
+            if previous.output_type is not None and stage.input_type is not None and \
+                    not _is_subtype(previous.output_type, stage.input_type):
+                raise TypeError("The output of stage '%s' does not match the input of stage '%s'" %
+                                (previous.name, stage.name))
+        self.stages = list(stages)
+        self.output = StageQueue(output_size, output_policy)
+        self.profiler = Profiler(max_samples)
+        self._sequence = itertools.count()
+        self._threads = []
+        self._executors = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the workers of the stages"""
+        if self._threads:
+            raise RuntimeError("The pipeline is already started")
+        for index, stage in enumerate(self.stages):
+            output = self.stages[index + 1].queue if index + 1 < len(self.stages) else self.output
+            remaining = [stage.workers]
+            for worker in range(stage.workers):
+                executor = None
+                if stage.processes:
+                    initializer = None if stage.setup is None else _setup_process
+                    initargs = () if stage.setup is None else (stage.setup,)
+                    executor = ProcessPoolExecutor(1, initializer=initializer, initargs=initargs)
+                    self._executors.append(executor)
+                thread = threading.Thread(target=self._work, args=(stage, output, executor, remaining),
+                                          name="%s-%d" % (stage.name, worker), daemon=True)
+                self._threads.append(thread)
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def put(self, data, timestamp=None, timeout=None):
+        """
+        Adds an input to the pipeline, subject to the policy of the queue of the first stage.
+
+        :param data: the input, e.g., an engine.data.Image
+        :param timestamp: capture time of the input, from time.perf_counter(), defaults to now
+        :param timeout: maximum time in seconds to wait with the 'block' policy, after which a queue.Full exception is
+            raised
+        :return: whether the input was added, i.e., it was not dropped
+        :rtype: bool
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        return self.stages[0].queue.put(Packet(data, next(self._sequence), timestamp), timeout)
+
+    def get(self, timeout=None):
+        """
+        Returns the next output of the pipeline.
+
+        :param timeout: maximum time in seconds to wait, after which a queue.Empty exception is raised
+        :return: the next packet, or None if the pipeline is stopped and all its outputs were taken
+        :rtype: Packet
+        """
+        packet = self.output.get(timeout)
+        return None if packet is _CLOSED else packet
+
+    def results(self):
+        """Yields the outputs of the pipeline until it is stopped"""
+        while True:
+            packet = self.get()
+            if packet is None:
+                return
+            yield packet
+
+    def stop(self, wait=True):
+        """
+        Stops accepting inputs. The inputs that were added before are still processed, and the outputs can still be
+        taken.
+
+        :param wait: if True, waits for the workers to finish
+        """
+        self.stages[0].queue.close()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            for executor in self._executors:
+                executor.shutdown()
+
+    def metrics(self):
+        """
+        Returns the metrics of each stage and of the whole pipeline.
+
+        :return: a dictionary with, for each stage, the number of 'processed', 'dropped' (by its input queue) and
+            failed ('errors') packets, the number of packets in its input queue ('queued') and the statistics of its
+            duration ('latency', see Profiler.stats()), and for the key 'pipeline', the statistics of the end-to-end
+            latency and the number of outputs dropped by the output queue
+        :rtype: dict
+        """
+        stats = self.profiler.stats()
+        metrics = {}
+        for stage in self.stages:
+            metrics[stage.name] = {"processed": stage.processed, "dropped": stage.queue.dropped,
+                                   "errors": stage.errors, "queued": len(stage.queue),
+                                   "latency": stats.get(stage.name)}
+        metrics["pipeline"] = {"latency": stats.get("pipeline"), "dropped": self.output.dropped}
+        return metrics
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _work(self, stage, output, executor, remaining):
+        try:
+            state, setup_error = None, None
+            if stage.setup is not None and executor is None:
+                try:
+                    state = stage.setup()
+                except Exception as e:
+                    # The worker keeps taking the packets and fails them, so that the other stages do not wait for it
+                    setup_error = e
+            while True:
+                packet = stage.queue.get()
+                if packet is _CLOSED:
+                    break
+                if packet.error is None:
+                    try:
+                        if setup_error is not None:
+                            raise RuntimeError("The setup of stage '%s' failed" % stage.name) from setup_error
+                        with self.profiler.stage(stage.name):
+                            stage._check(packet.data, stage.input_type, "input")
+                            if executor is not None:
+                                data = executor.submit(_call_in_process, stage.function, packet.data,
+                                                       stage.setup is not None).result()
+                            elif stage.setup is not None:
+                                data = stage.function(state, packet.data)
+                            else:
+                                data = stage.function(packet.data)
+                            stage._check(data, stage.output_type, "output")
+                        packet.data = data
+                    except Exception as e:
+                        packet.error, packet.failed_stage = e, stage.name
+                        with stage._lock:
+                            stage.errors += 1
+                    with stage._lock:
+                        stage.processed += 1
+                if output is self.output:
+                    self.profiler.record("pipeline", packet.timestamp, time.perf_counter() - packet.timestamp)
+                output.put(packet)
+        finally:
+            # The last worker of the stage closes the queue of the next stage, once the others are done
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    output.close()
+
+
+def _is_subtype(output_type, input_type):
+    outputs = output_type if isinstance(output_type, tuple) else (output_type,)
+    return all(issubclass(output, input_type) for output in outputs)
@@ -0,0 +1,150 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Put in the queue by close() to stop the worker once the requests submitted before are processed
+_STOP = object()
+
+
+class BatchingExecutor(object):
+    """
+    Serves the inference of a learner to concurrent clients (threads or asyncio tasks), e.g., one per camera, by
+    coalescing their requests into batches.
+
+    A worker thread takes the pending requests, up to max_batch of them, waiting at most max_latency_ms after the
+    first one for the others, and runs them with a single call of learner.infer_batch(). For learners that support
+    batching (e.g., NanodetLearner or LightweightOpenPoseLearner), the batch is processed in a single forward pass,
+    the other learners process its requests one after the other. The results are returned to the clients as futures.
+
+    The learner is only used by the worker thread, so it must not be used directly while the executor is open.
+    """
+
+    def __init__(self, learner, max_batch=8, max_latency_ms=5.0, **kwargs):
+        """
+        :param learner: the learner that runs the inference
+        :param max_batch: maximum number of requests in a batch
+        :param max_latency_ms: maximum time in milliseconds that a request waits for other requests to be batched with
+        :param kwargs: other arguments of the infer() method of the learner, e.g., conf_threshold
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.learner = learner
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self.kwargs = kwargs
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="BatchingExecutor", daemon=True)
+        self._worker.start()
+
+    def submit(self, input):
+        """
+        Submits a request.
+
+        :param input: the input of infer(), e.g., an engine.data.Image
+        :return: a future of the result of infer() for the input
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit requests to a closed BatchingExecutor")
+            self._queue.put((input, future))
+        return future
+
+    def infer(self, input, timeout=None):
+        """
+        Submits a request and waits for its result.
+
+        :param input: the input of infer(), e.g., an engine.data.Image
+        :param timeout: maximum time in seconds to wait for the result
+        :return: the result of infer() for the input
+        """
+        return self.submit(input).result(timeout)
+
+    async def infer_async(self, input):
+        """
+        Submits a request and waits for its result in an asyncio event loop.
+
+        :param input: the input of infer(), e.g., an engine.data.Image
+        :return: the result of infer() for the input
+        """
+        return await asyncio.wrap_future(self.submit(input))
+
+    def close(self, wait=True):
+        """
+        Stops accepting requests. The requests submitted before are still processed.
+
+        :param wait: if True, waits until they are processed
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        if wait:
+            self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next_batch(self):
+        """Returns the next batch of requests, and whether the executor was closed"""
+        request = self._queue.get()
+        if request is _STOP:
+            return [], True
+        batch = [request]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                # The requests that are already pending are batched even if the deadline has passed
+                request = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._next_batch()
+            # Cancelled requests are dropped
+            batch = [(input, future) for input, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                results = self.learner.infer_batch([input for input, _ in batch], **self.kwargs)
+                if len(results) != len(batch):
+                    raise RuntimeError("infer_batch() returned %d results for %d inputs" % (len(results), len(batch)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
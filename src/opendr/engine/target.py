@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from abc import ABC
+from collections.abc import MutableMapping, MutableSequence
 import numpy as np
 from typing import Optional, Dict, Tuple, Any
 
@@ -326,11 +327,44 @@ class Pose(Target):
             raise ValueError('Only string and integers are supported for retrieving keypoints.')
 
 
+def _box_field(field):
+    """
+    Creates a property for a BoundingBox field. Boxes that belong to a BoundingBoxList read and write the
+    columns of the list, while standalone boxes keep the value in a private attribute.
+    """
+    attribute = "_" + field
+
+    def getter(self):
+        if self._owner is not None:
+            return self._owner._get_field(self._index, field)
+        return getattr(self, attribute)
+
+    def setter(self, value):
+        if self._owner is not None:
+            self._owner._set_field(self._index, field, value)
+        else:
+            setattr(self, attribute, value)
+
+    return property(getter, setter)
+
+
 class BoundingBox(Target):
     """
     This target is used for 2D Object Detection.
     A bounding box is described by the left-top corner and its width and height.
+    A BoundingBox that belongs to a BoundingBoxList is a view of the corresponding row of the list, i.e., reading
+    or writing its fields reads or writes the arrays of the list.
     """
+    _owner = None
+    _index = -1
+
+    name = _box_field("name")
+    left = _box_field("left")
+    top = _box_field("top")
+    width = _box_field("width")
+    height = _box_field("height")
+    confidence = _box_field("confidence")
+
     def __init__(
         self,
         name,
@@ -348,6 +382,36 @@ class BoundingBox(Target):
         self.height = height
         self.confidence = score
 
+    def _bind(self, owner, index):
+        """
+        Turns the box into a view of the index-th row of the owner BoundingBoxList.
+        """
+        if self._owner is not None and (self._owner is not owner or self._index != index):
+            self._owner._release(self._index, self)
+        self._owner = owner
+        self._index = index
+
+    @classmethod
+    def _new_view(cls):
+        """
+        Creates a box without fields, to be bound to a row of a BoundingBoxList.
+        """
+        view = cls.__new__(cls)
+        Target.__init__(view)
+        return view
+
+    def _unbind(self):
+        """
+        Copies the values of the row the box is viewing, so that the box can outlive its removal from the list.
+        """
+        if self._owner is None:
+            return
+        values = [getattr(self, field) for field in BoundingBoxList._fields]
+        self._owner = None
+        self._index = -1
+        for field, value in zip(BoundingBoxList._fields, values):
+            setattr(self, field, value)
+
     def mot(self, with_confidence=True, frame=-1):
 
         if with_confidence:
@@ -409,6 +473,15 @@ class CocoBoundingBox(BoundingBox):
         self.iscrowd = iscrowd
         self.area = area
 
+    @classmethod
+    def _new_view(cls):
+        # The COCO fields are not stored by the list, views get the defaults of the constructor
+        view = super()._new_view()
+        view.segmentation = []
+        view.iscrowd = 0
+        view.area = 0
+        return view
+
     def coco(self, with_confidence=True):
         result = {}
         result['bbox'] = [self.left, self.top, self.width, self.height]
@@ -430,20 +503,147 @@ class CocoBoundingBox(BoundingBox):
         return str(self.coco())
 
 
+class _BoxSequence(MutableSequence):
+    """
+    List-like view over the boxes of a box list, returned by the data property of the list.
+    """
+    def __init__(self, owner):
+        self._owner = owner
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._owner._view(i) for i in range(*idx.indices(len(self._owner)))]
+        return self._owner._view(idx)
+
+    def __setitem__(self, idx, box):
+        if isinstance(idx, slice):
+            boxes = list(self)
+            boxes[idx] = box
+            self._owner.data = boxes
+        else:
+            self._owner._replace(idx, box)
+
+    def __delitem__(self, idx):
+        count = len(self._owner)
+        removed = range(*idx.indices(count)) if isinstance(idx, slice) else [self._owner._normalize_index(idx)]
+        keep = np.ones(count, dtype=bool)
+        keep[list(removed)] = False
+        self._owner._select(np.flatnonzero(keep))
+
+    def __len__(self):
+        return len(self._owner)
+
+    def insert(self, idx, box):
+        count = len(self._owner)
+        self._owner._append(box)
+        if idx < 0:
+            idx = max(0, count + idx)
+        if idx < count:
+            self._owner._select(np.concatenate([np.arange(idx), [count], np.arange(idx, count)]))
+
+    def sort(self, key=None, reverse=False):
+        if key is None:
+            raise TypeError("BoundingBox objects can only be sorted using a key")
+        keys = [key(box) for box in self]
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        self._owner._select(np.asarray(order, dtype=np.int64))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, _BoxSequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class BoundingBoxList(Target):
     """
     This target is used for 2D Object Detection.
     A bounding box is described by the left-top corner and its width and height.
+    The boxes are stored column-wise, i.e., the left-top corners and sizes, the scores and the class names of all the
+    boxes are kept in NumPy arrays. The BoundingBox objects returned by the list are created lazily and they are views
+    of the corresponding rows, so that lists can be converted from and to NumPy arrays without creating per-box objects.
     """
+    _fields = ("name", "left", "top", "width", "height", "confidence")
+    _coordinates = {"left": 0, "top": 1, "width": 2, "height": 3}
+    _box_type = BoundingBox
+
     def __init__(
         self,
         boxes=None,
         image_id=-1,
     ):
         super().__init__()
+        self._count = 0
+        self._ltwh = np.zeros((0, 4), dtype=np.float64)
+        self._scores = np.zeros((0,), dtype=np.float64)
+        self._names = np.zeros((0,), dtype=object)
+        self._views = []
         self.data = [] if boxes is None else boxes
         self.image_id = image_id
-        self.__compute_confidence()
+
+    @staticmethod
+    def from_numpy(boxes, scores=None, classes=None, image_id=-1, box_type=BoundingBox):
+        """
+        Creates a BoundingBoxList from arrays, without creating a BoundingBox object per box.
+        :param boxes: array of shape (N, 4) with the [xmin, ymin, xmax, ymax] corners of the boxes, or array of
+            shape (N, 6) with [xmin, ymin, xmax, ymax, score, class] rows, as returned by to_numpy()
+        :type boxes: numpy.ndarray
+        :param scores: array of shape (N,) with the confidence of each box, defaults to 0 for all the boxes
+        :type scores: numpy.ndarray, optional
+        :param classes: array of shape (N,) with the class of each box, defaults to 0 for all the boxes
+        :type classes: numpy.ndarray, optional
+        :param image_id: id of the image the boxes belong to
+        :type image_id: int, optional
+        :param box_type: type of the boxes returned by the list, BoundingBox or a subclass such as CocoBoundingBox
+        :type box_type: type, optional
+        :return: the list of bounding boxes
+        :rtype: BoundingBoxList
+        """
+        boxes = np.asarray(boxes)
+        if boxes.size == 0:
+            boxes = boxes.reshape(0, 4)
+        if boxes.ndim != 2 or boxes.shape[1] not in (4, 6):
+            raise ValueError("Boxes should be an array of shape (N, 4) or (N, 6), got " + str(boxes.shape))
+        if boxes.shape[1] == 6:
+            if scores is None:
+                scores = boxes[:, 4]
+            if classes is None:
+                classes = boxes[:, 5]
+            boxes = boxes[:, :4]
+
+        count = boxes.shape[0]
+        scores = np.zeros(count) if scores is None else np.asarray(scores).reshape(-1)
+        classes = np.zeros(count, dtype=np.int64) if classes is None else np.asarray(classes).reshape(-1)
+        if scores.shape[0] != count or classes.shape[0] != count:
+            raise ValueError("Boxes, scores and classes should have the same length")
+
+        result = BoundingBoxList(image_id=image_id)
+        result._ltwh = np.empty((count, 4), dtype=np.float64)
+        result._ltwh[:, :2] = boxes[:, :2]
+        result._ltwh[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+        result._scores = scores.astype(np.float64)
+        result._names = classes.copy()
+        result._views = [None] * count
+        result._count = count
+        result._box_type = box_type
+        return result
+
+    def to_numpy(self):
+        """
+        Returns the boxes as an array of [xmin, ymin, xmax, ymax, score, class] rows.
+        The array is of float type, unless the class names are not numeric, in which case an object array is returned.
+        :return: array of shape (N, 6)
+        :rtype: numpy.ndarray
+        """
+        ltwh = self._ltwh[:self._count]
+        columns = [ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:], self._scores[:self._count, np.newaxis]]
+        try:
+            classes = self._names[:self._count].astype(np.float64)
+        except (TypeError, ValueError):
+            return np.concatenate(columns + [self._names[:self._count, np.newaxis]], axis=1, dtype=object)
+        return np.concatenate(columns + [classes[:, np.newaxis]], axis=1)
 
     @staticmethod
     def from_coco(boxes_coco, image_id=0):
@@ -479,28 +679,166 @@ class BoundingBoxList(Target):
 
     def mot(self, with_confidence=True):
 
-        result = np.array([
-            box.mot(with_confidence) for box in self.data
-        ])
+        if self._count == 0:
+            return np.array([])
+
+        columns = [np.full((self._count, 1), -1), self._ltwh[:self._count]]
+        if with_confidence:
+            columns.append(self._scores[:self._count, np.newaxis])
+        result = np.concatenate(columns, axis=1).astype(np.float32)
 
         return result
 
     def add_box(self, box: BoundingBox):
-        self.data.append(box)
-        self.__compute_confidence()
+        self._append(box)
+
+    @property
+    def data(self):
+        """
+        Getter of data.
+        :return: list-like view of the BoundingBox objects of the list
+        :rtype: MutableSequence
+        """
+        return _BoxSequence(self)
+
+    @data.setter
+    def data(self, boxes):
+        """
+        Setter for data. BoundingBoxList expects an iterable of BoundingBox objects.
+        :param: boxes to be stored in the list
+        """
+        boxes = list(boxes)
+        for view in self._views:
+            if view is not None:
+                view._unbind()
+        self._count = 0
+        self._views = []
+        self._reserve(len(boxes))
+        self._names = np.zeros(self._ltwh.shape[0], dtype=object)
+        for box in boxes:
+            self._append(box)
 
     @property
     def boxes(self):
         return self.data
 
-    def __compute_confidence(self):
-        self.confidence = sum([box.confidence for box in self.data], 0) / max(1, len(self.data))
+    @property
+    def confidence(self):
+        """
+        Getter of confidence, which is the average confidence of the boxes.
+        :return: the average confidence of the boxes, or 0 for an empty list
+        :rtype: float
+        """
+        if self._count == 0:
+            return 0
+        return float(self._scores[:self._count].mean())
+
+    def _reserve(self, capacity):
+        """
+        Grows the column arrays, so that they can hold at least capacity boxes. Capacity is doubled on growth to
+        keep appends amortized O(1).
+        """
+        if capacity <= self._ltwh.shape[0]:
+            return
+        capacity = max(capacity, 2 * self._ltwh.shape[0], 8)
+        ltwh = np.zeros((capacity, 4), dtype=np.float64)
+        scores = np.zeros(capacity, dtype=np.float64)
+        names = np.zeros(capacity, dtype=self._names.dtype)
+        ltwh[:self._count] = self._ltwh[:self._count]
+        scores[:self._count] = self._scores[:self._count]
+        names[:self._count] = self._names[:self._count]
+        self._ltwh, self._scores, self._names = ltwh, scores, names
+
+    def _append(self, box):
+        if not isinstance(box, BoundingBox):
+            raise ValueError("BoundingBoxList expects BoundingBox objects, got " + str(type(box)))
+        values = [getattr(box, field) for field in BoundingBoxList._fields]
+        self._reserve(self._count + 1)
+        self._count += 1
+        self._views.append(None)
+        for field, value in zip(BoundingBoxList._fields, values):
+            self._set_field(self._count - 1, field, value)
+        box._bind(self, self._count - 1)
+        self._views[self._count - 1] = box
+
+    def _replace(self, idx, box):
+        idx = self._normalize_index(idx)
+        if not isinstance(box, BoundingBox):
+            raise ValueError("BoundingBoxList expects BoundingBox objects, got " + str(type(box)))
+        values = [getattr(box, field) for field in BoundingBoxList._fields]
+        if self._views[idx] is not None:
+            self._views[idx]._unbind()
+        for field, value in zip(BoundingBoxList._fields, values):
+            self._set_field(idx, field, value)
+        box._bind(self, idx)
+        self._views[idx] = box
+
+    def _select(self, indices):
+        """
+        Keeps only the rows given by indices, in the given order. Views of removed rows are detached.
+        """
+        selected = set(indices.tolist())
+        for i, view in enumerate(self._views):
+            if view is not None and i not in selected:
+                view._unbind()
+        count = len(indices)
+        self._ltwh[:count] = self._ltwh[indices]
+        self._scores[:count] = self._scores[indices]
+        self._names[:count] = self._names[indices]
+        self._views = [self._views[i] for i in indices]
+        self._count = count
+        for i, view in enumerate(self._views):
+            if view is not None:
+                view._index = i
+
+    def _release(self, idx, view):
+        if self._views[idx] is view:
+            self._views[idx] = None
+
+    def _normalize_index(self, idx):
+        if idx < 0:
+            idx += self._count
+        if idx < 0 or idx >= self._count:
+            raise IndexError("BoundingBoxList index out of range")
+        return idx
+
+    def _view(self, idx):
+        idx = self._normalize_index(idx)
+        view = self._views[idx]
+        if view is None:
+            view = self._box_type._new_view()
+            view._bind(self, idx)
+            self._views[idx] = view
+        return view
+
+    def _get_field(self, idx, field):
+        if field == "confidence":
+            return self._scores[idx].item()
+        elif field == "name":
+            name = self._names[idx]
+            return name.item() if isinstance(name, np.generic) else name
+        return self._ltwh[idx, BoundingBoxList._coordinates[field]].item()
+
+    def _set_field(self, idx, field, value):
+        if field == "confidence":
+            self._scores[idx] = np.asarray(value, dtype=np.float64).reshape(())
+        elif field == "name":
+            if self._names.dtype != object:
+                try:
+                    fits = np.result_type(self._names.dtype, np.asarray(value).dtype) == self._names.dtype
+                except TypeError:
+                    fits = False
+                if not fits:
+                    self._names = self._names.astype(object)
+            self._names[idx] = value
+        else:
+            self._ltwh[idx, BoundingBoxList._coordinates[field]] = np.asarray(value, dtype=np.float64).reshape(())
 
     def __getitem__(self, idx):
-        return self.boxes[idx]
+        return self.data[idx]
 
     def __len__(self):
-        return len(self.data)
+        return self._count
 
     def __repr__(self):
         return "BoundingBoxList " + str(self)
@@ -645,7 +983,11 @@ class BoundingBox3D(Target):
     Additional fields are used to describe confidence (score), 2D projection of the box on camera image (bbox2d),
     truncation (truncated) and occlusion (occluded) levels, the name of an object (name) and
     observation angle of an object (alpha).
+    A BoundingBox3D that belongs to a BoundingBox3DList is a view of the corresponding row of the KITTI arrays of the
+    list, i.e., reading or writing its data reads or writes the arrays of the list.
     """
+    _owner = None
+    _index = -1
 
     def __init__(
             self,
@@ -672,6 +1014,77 @@ class BoundingBox3D(Target):
         }
         self.confidence = score
 
+    @property
+    def data(self):
+        """
+        Getter of data.
+        :return: dictionary with the fields of the box
+        :rtype: dict
+        """
+        if self._owner is not None:
+            return _KittiRow(self._owner, self._index)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        """
+        Setter for data.
+        :param: dictionary with the fields of the box
+        """
+        if self._owner is not None:
+            row = _KittiRow(self._owner, self._index)
+            for key, value in data.items():
+                row[key] = value
+        else:
+            self._data = data
+
+    @property
+    def confidence(self):
+        """
+        Getter of confidence.
+        :return: the confidence (score) of the box
+        :rtype: float
+        """
+        if self._owner is not None:
+            return self._owner._get_value(self._index, "score")
+        return self._confidence
+
+    @confidence.setter
+    def confidence(self, confidence):
+        """
+        Setter for confidence.
+        :param: the confidence (score) of the box
+        """
+        if self._owner is not None:
+            self._owner._set_value(self._index, "score", confidence)
+        else:
+            self._confidence = confidence
+
+    def _bind(self, owner, index):
+        """
+        Turns the box into a view of the index-th row of the owner list.
+        """
+        if self._owner is not None and (self._owner is not owner or self._index != index):
+            self._owner._release(self._index, self)
+        self._owner = owner
+        self._index = index
+
+    def _unbind(self):
+        """
+        Copies the values of the row the box is viewing, so that the box can outlive its removal from the list.
+        """
+        if self._owner is None:
+            return
+        data = {
+            key: np.array(value) if isinstance(value, np.ndarray) else value
+            for key, value in self.data.items()
+        }
+        confidence = self.confidence
+        self._owner = None
+        self._index = -1
+        self.data = data
+        self.confidence = confidence
+
     def kitti(self):
         result = {}
 
@@ -731,112 +1144,309 @@ class BoundingBox3D(Target):
         return str(self.kitti())
 
 
-class BoundingBox3DList(Target):
+class _KittiRow(MutableMapping):
     """
-    This target is used for 3D Object Detection. It contains a list of BoundingBox3D targets.
-    A bounding box is described by its location (x, y, z), dimensions (l, h, w) and rotation (along vertical (y) axis).
-    Additional fields are used to describe confidence (score), 2D projection of the box on camera image (bbox2d),
-    truncation (truncated) and occlusion (occluded) levels, the name of an object (name) and
-    observation angle of an object (alpha).
+    Dictionary-like view over one row of the KITTI arrays of a BoundingBox3DList or TrackingAnnotation3DList, used as
+    the data of the boxes that belong to the list.
     """
+    def __init__(self, owner, index):
+        self._owner = owner
+        self._index = index
 
-    def __init__(
-        self,
-        bounding_boxes_3d=None
-    ):
-        super().__init__()
-        self.data = [] if bounding_boxes_3d is None else bounding_boxes_3d
-        self.__compute_confidence()
+    def __getitem__(self, key):
+        return self._owner._get_value(self._index, self._owner._box_keys[key])
 
-    @staticmethod
-    def from_kitti(boxes_kitti):
+    def __setitem__(self, key, value):
+        self._owner._set_value(self._index, self._owner._box_keys[key], value)
 
-        count = len(boxes_kitti["name"])
+    def __delitem__(self, key):
+        raise TypeError("Fields of a box that belongs to a list cannot be deleted")
 
-        boxes3d = []
+    def __iter__(self):
+        return iter(self._owner._box_keys)
 
-        for i in range(count):
-            box3d = BoundingBox3D(
-                boxes_kitti["name"][i],
-                boxes_kitti["truncated"][i],
-                boxes_kitti["occluded"][i],
-                boxes_kitti["alpha"][i],
-                boxes_kitti["bbox"][i],
-                boxes_kitti["dimensions"][i],
-                boxes_kitti["location"][i],
-                boxes_kitti["rotation_y"][i],
-                boxes_kitti["score"][i],
-            )
+    def __len__(self):
+        return len(self._owner._box_keys)
 
-            boxes3d.append(box3d)
+    def __repr__(self):
+        return repr(dict(self))
 
-        return BoundingBox3DList(boxes3d)
 
-    def kitti(self):
+class _KittiBoxList(Target):
+    """
+    Base class of the 3D box lists. The boxes are stored as a dictionary of KITTI arrays, one row per box, so that
+    KITTI annotations are wrapped without copying and kitti() returns the arrays directly. Boxes returned by the list
+    are lazily created views of the rows.
+    Subclasses define the box type, the mapping of the box data keys to KITTI columns, and the shape and default type
+    of each column.
+    """
+    _box_type = None
+    _box_keys = {}
+    _column_shapes = {}
 
-        result = {
-            "name": [],
-            "truncated": [],
-            "occluded": [],
-            "alpha": [],
-            "bbox": [],
-            "dimensions": [],
-            "location": [],
-            "rotation_y": [],
-            "score": [],
+    def __init__(self, boxes=None):
+        super().__init__()
+        self._count = 0
+        self._arrays = {
+            column: np.zeros((0,) + shape, dtype=dtype) for column, (shape, dtype) in self._column_shapes.items()
         }
+        self._views = []
+        self.data = [] if boxes is None else boxes
 
-        if len(self.data) == 0:
-            return result
-        elif len(self.data) == 1:
-            return self.data[0].kitti()
-        else:
+    def _wrap(self, columns, count):
+        """
+        Uses the given KITTI arrays as the storage of the list, without copying them.
+        """
+        for column, (shape, dtype) in self._column_shapes.items():
+            if column in columns:
+                array = np.asarray(columns[column])
+                if array.shape[0] != count:
+                    raise ValueError("KITTI field '" + column + "' should have " + str(count) + " rows")
+                if array.size == 0:
+                    array = array.reshape((0,) + shape)
+                self._arrays[column] = array
+            else:
+                self._arrays[column] = np.zeros((count,) + shape, dtype=dtype)
+        self._views = [None] * count
+        self._count = count
 
-            for box in self.data:
-                result["name"].append(box.data["name"])
-                result["truncated"].append(box.data["truncated"])
-                result["occluded"].append(box.data["occluded"])
-                result["alpha"].append(box.data["alpha"])
-                result["bbox"].append(box.data["bbox2d"])
-                result["dimensions"].append(box.data["dimensions"])
-                result["location"].append(box.data["location"])
-                result["rotation_y"].append(box.data["rotation_y"])
-                result["score"].append(box.confidence)
-
-            result["name"] = np.array(result["name"])
-            result["truncated"] = np.array(result["truncated"])
-            result["occluded"] = np.array(result["occluded"])
-            result["alpha"] = np.array(result["alpha"])
-            result["bbox"] = np.array(result["bbox"])
-            result["dimensions"] = np.array(result["dimensions"])
-            result["location"] = np.array(result["location"])
-            result["rotation_y"] = np.array(result["rotation_y"])
-            result["score"] = np.array(result["score"])
-
-            num_ground_truths = len(result["name"])
-            num_objects = len([x for x in result["name"] if x != "DontCare"])
-            index = list(range(num_objects)) + [-1] * (num_ground_truths - num_objects)
-            result["index"] = np.array(index, dtype=np.int32)
-            result["group_ids"] = np.arange(num_ground_truths, dtype=np.int32)
+    def _columns(self):
+        return {column: array[:self._count] for column, array in self._arrays.items()}
 
-        return result
+    @property
+    def data(self):
+        """
+        Getter of data.
+        :return: list-like view of the boxes of the list
+        :rtype: MutableSequence
+        """
+        return _BoxSequence(self)
 
-    def add_box(self, box: BoundingBox3D):
-        self.data.append(box)
-        self.__compute_confidence()
+    @data.setter
+    def data(self, boxes):
+        """
+        Setter for data. The list expects an iterable of boxes.
+        :param: boxes to be stored in the list
+        """
+        boxes = list(boxes)
+        for view in self._views:
+            if view is not None:
+                view._unbind()
+        self._count = 0
+        self._views = []
+        self._reserve(len(boxes))
+        for box in boxes:
+            self._append(box)
 
     @property
     def boxes(self):
         return self.data
 
-    def __compute_confidence(self):
-        self.confidence = sum([box.confidence for box in self.data], 0) / max(1, len(self.data))
+    @property
+    def confidence(self):
+        """
+        Getter of confidence, which is the average score of the boxes.
+        :return: the average score of the boxes, or 0 for an empty list
+        :rtype: float
+        """
+        if self._count == 0:
+            return 0
+        return float(np.mean(self._arrays["score"][:self._count]))
+
+    def _reserve(self, capacity):
+        """
+        Grows the KITTI arrays, so that they can hold at least capacity boxes. Capacity is doubled on growth to
+        keep appends amortized O(1).
+        """
+        current = min(array.shape[0] for array in self._arrays.values())
+        if capacity <= current:
+            return
+        capacity = max(capacity, 2 * current, 8)
+        for column, array in self._arrays.items():
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self._count] = array[:self._count]
+            self._arrays[column] = grown
+
+    def _append(self, box):
+        if not isinstance(box, self._box_type):
+            raise ValueError(type(self).__name__ + " expects " + self._box_type.__name__ +
+                             " objects, got " + str(type(box)))
+        data = dict(box.data)
+        confidence = box.confidence
+        self._reserve(self._count + 1)
+        self._count += 1
+        self._views.append(None)
+        self._write(self._count - 1, data, confidence)
+        # Boxes with other fields than the ones of the list (e.g., tracking annotations added to a detection list)
+        # are copied instead of being turned into views
+        if data.keys() == self._box_keys.keys():
+            box._bind(self, self._count - 1)
+            self._views[self._count - 1] = box
+
+    def _replace(self, idx, box):
+        idx = self._normalize_index(idx)
+        if not isinstance(box, self._box_type):
+            raise ValueError(type(self).__name__ + " expects " + self._box_type.__name__ +
+                             " objects, got " + str(type(box)))
+        data = dict(box.data)
+        confidence = box.confidence
+        if self._views[idx] is not None:
+            self._views[idx]._unbind()
+            self._views[idx] = None
+        self._write(idx, data, confidence)
+        if data.keys() == self._box_keys.keys():
+            box._bind(self, idx)
+            self._views[idx] = box
+
+    def _write(self, idx, data, confidence):
+        """
+        Writes the data and confidence of a box to the idx-th row.
+        """
+        for key, column in self._box_keys.items():
+            self._set_value(idx, column, data[key])
+        self._set_value(idx, "score", confidence)
+
+    def _select(self, indices):
+        """
+        Keeps only the rows given by indices, in the given order. Views of removed rows are detached.
+        """
+        selected = set(indices.tolist())
+        for i, view in enumerate(self._views):
+            if view is not None and i not in selected:
+                view._unbind()
+        count = len(indices)
+        # The rows are gathered into new arrays, as the current ones may be the KITTI arrays of the caller
+        for column, array in self._arrays.items():
+            self._arrays[column] = array[indices]
+        self._views = [self._views[i] for i in indices]
+        self._count = count
+        for i, view in enumerate(self._views):
+            if view is not None:
+                view._index = i
+
+    def _release(self, idx, view):
+        if self._views[idx] is view:
+            self._views[idx] = None
+
+    def _normalize_index(self, idx):
+        if idx < 0:
+            idx += self._count
+        if idx < 0 or idx >= self._count:
+            raise IndexError(type(self).__name__ + " index out of range")
+        return idx
+
+    def _view(self, idx):
+        idx = self._normalize_index(idx)
+        view = self._views[idx]
+        if view is None:
+            view = self._box_type.__new__(self._box_type)
+            Target.__init__(view)
+            view._bind(self, idx)
+            self._views[idx] = view
+        return view
+
+    def _get_value(self, idx, column):
+        return self._arrays[column][idx]
+
+    def _set_value(self, idx, column, value):
+        array = self._arrays[column]
+        value = np.asarray(value)
+        try:
+            dtype = np.result_type(array.dtype, value.dtype)
+        except TypeError:
+            dtype = np.dtype(object)
+        if dtype != array.dtype:
+            array = self._arrays[column] = array.astype(dtype)
+        array[idx] = value
 
     def __getitem__(self, idx):
-        return self.boxes[idx]
+        return self.data[idx]
 
     def __len__(self):
-        return len(self.data)
+        return self._count
+
+
+_KITTI_BOX_KEYS = {
+    "name": "name",
+    "truncated": "truncated",
+    "occluded": "occluded",
+    "alpha": "alpha",
+    "bbox2d": "bbox",
+    "dimensions": "dimensions",
+    "location": "location",
+    "rotation_y": "rotation_y",
+}
+
+_KITTI_COLUMN_SHAPES = {
+    "name": ((), np.dtype("<U1")),
+    "truncated": ((), np.float64),
+    "occluded": ((), np.int64),
+    "alpha": ((), np.float64),
+    "bbox": ((4,), np.float64),
+    "dimensions": ((3,), np.float64),
+    "location": ((3,), np.float64),
+    "rotation_y": ((), np.float64),
+    "score": ((), np.float64),
+}
+
+
+class BoundingBox3DList(_KittiBoxList):
+    """
+    This target is used for 3D Object Detection. It contains a list of BoundingBox3D targets.
+    A bounding box is described by its location (x, y, z), dimensions (l, h, w) and rotation (along vertical (y) axis).
+    Additional fields are used to describe confidence (score), 2D projection of the box on camera image (bbox2d),
+    truncation (truncated) and occlusion (occluded) levels, the name of an object (name) and
+    observation angle of an object (alpha).
+    The boxes are stored as KITTI arrays: from_kitti() wraps the given arrays and kitti() returns them without copying.
+    """
+    _box_type = BoundingBox3D
+    _box_keys = _KITTI_BOX_KEYS
+    _column_shapes = _KITTI_COLUMN_SHAPES
+
+    def __init__(
+        self,
+        bounding_boxes_3d=None
+    ):
+        super().__init__(bounding_boxes_3d)
+
+    @staticmethod
+    def from_kitti(boxes_kitti):
+        """
+        Creates a BoundingBox3DList that uses the arrays of a KITTI annotation dictionary as its storage.
+        Missing scores default to 0.
+        :param boxes_kitti: KITTI annotation with name, truncated, occluded, alpha, bbox, dimensions, location,
+            rotation_y and score arrays
+        :type boxes_kitti: dict
+        :return: the list of boxes
+        :rtype: BoundingBox3DList
+        """
+        result = BoundingBox3DList()
+        result._wrap(boxes_kitti, len(boxes_kitti["name"]))
+        return result
+
+    def kitti(self):
+        """
+        Returns the boxes in KITTI format. The returned arrays are the storage of the list, not copies.
+        :return: KITTI annotation dictionary, including the index and group_ids fields
+        :rtype: dict
+        """
+        result = self._columns()
+
+        names = result["name"]
+        num_ground_truths = self._count
+        if names.dtype.kind in "USO":
+            num_objects = int(np.count_nonzero(names != "DontCare"))
+        else:
+            num_objects = num_ground_truths
+        index = np.full(num_ground_truths, -1, dtype=np.int32)
+        index[:num_objects] = np.arange(num_objects, dtype=np.int32)
+        result["index"] = index
+        result["group_ids"] = np.arange(num_ground_truths, dtype=np.int32)
+
+        return result
+
+    def add_box(self, box: BoundingBox3D):
+        self._append(box)
 
     def __repr__(self):
         return "BoundingBox3DList " + str(self)
@@ -868,6 +1478,7 @@ class TrackingAnnotation3D(BoundingBox3D):
         score=0,
         frame=-1,
     ):
+        Target.__init__(self)
         self.data = {
             "name": name,
             "truncated": truncated,
@@ -924,7 +1535,7 @@ class TrackingAnnotation3D(BoundingBox3D):
         return str(self.kitti(True))
 
 
-class TrackingAnnotation3DList(Target):
+class TrackingAnnotation3DList(_KittiBoxList):
     """
     This target is used for 3D Object Tracking. It contains a list of TrackingAnnotation3D targets.
     A tracking bounding box is described by frame, id, its location (x, y, z),
@@ -932,118 +1543,65 @@ class TrackingAnnotation3DList(Target):
     Additional fields are used to describe confidence (score), 2D projection of the box on camera image (bbox2d),
     truncation (truncated) and occlusion (occluded) levels, the name of an object (name) and
     observation angle of an object (alpha).
+    The boxes are stored as KITTI arrays: from_kitti() wraps the given arrays and kitti() returns them without copying.
     """
+    _box_type = TrackingAnnotation3D
+    _box_keys = dict(_KITTI_BOX_KEYS, id="id", frame="frame")
+    _column_shapes = dict(_KITTI_COLUMN_SHAPES, id=((), np.int64), frame=((), np.int64))
+
     def __init__(
         self,
         annotations_3d=None
     ):
-        super().__init__()
-        self.data = [] if annotations_3d is None else annotations_3d
-        self.__compute_confidence()
+        super().__init__(annotations_3d)
 
     @staticmethod
     def from_kitti(boxes_kitti, ids, frames=None):
-
+        """
+        Creates a TrackingAnnotation3DList that uses the arrays of a KITTI annotation dictionary as its storage.
+        Missing scores default to 0.
+        :param boxes_kitti: KITTI annotation with name, truncated, occluded, alpha, bbox, dimensions, location,
+            rotation_y and score arrays
+        :type boxes_kitti: dict
+        :param ids: the tracking id of each box
+        :type ids: numpy.ndarray
+        :param frames: the frame of each box, defaults to -1 for all the boxes
+        :type frames: numpy.ndarray, optional
+        :return: the list of annotations
+        :rtype: TrackingAnnotation3DList
+        """
         count = len(boxes_kitti["name"])
 
         if frames is None:
-            frames = [-1] * count
-
-        tracking_boxes_3d = []
+            frames = np.full(count, -1, dtype=np.int64)
 
-        for i in range(count):
-            box3d = TrackingAnnotation3D(
-                boxes_kitti["name"][i],
-                boxes_kitti["truncated"][i],
-                boxes_kitti["occluded"][i],
-                boxes_kitti["alpha"][i],
-                boxes_kitti["bbox"][i],
-                boxes_kitti["dimensions"][i],
-                boxes_kitti["location"][i],
-                boxes_kitti["rotation_y"][i],
-                ids[count],
-                boxes_kitti["score"][i],
-                frames[count],
-            )
-
-            tracking_boxes_3d.append(box3d)
-
-        return TrackingAnnotation3DList(tracking_boxes_3d)
+        result = TrackingAnnotation3DList()
+        result._wrap(dict(boxes_kitti, id=ids, frame=frames), count)
+        return result
 
     def kitti(self, with_tracking_info=True):
+        """
+        Returns the annotations in KITTI format. The returned arrays are the storage of the list, not copies.
+        :param with_tracking_info: whether to include the id and frame fields
+        :type with_tracking_info: bool, optional
+        :return: KITTI annotation dictionary
+        :rtype: dict
+        """
+        result = self._columns()
 
-        result = {
-            "name": [],
-            "truncated": [],
-            "occluded": [],
-            "alpha": [],
-            "bbox": [],
-            "dimensions": [],
-            "location": [],
-            "rotation_y": [],
-            "score": [],
-        }
-
-        if with_tracking_info:
-            result["id"] = []
-            result["frame"] = []
-
-        if len(self.data) == 0:
-            return result
-        elif len(self.data) == 1:
-            return self.data[0].kitti()
-        else:
-
-            for box in self.data:
-                result["name"].append(box.data["name"])
-                result["truncated"].append(box.data["truncated"])
-                result["occluded"].append(box.data["occluded"])
-                result["alpha"].append(box.data["alpha"])
-                result["bbox"].append(box.data["bbox2d"])
-                result["dimensions"].append(box.data["dimensions"])
-                result["location"].append(box.data["location"])
-                result["rotation_y"].append(box.data["rotation_y"])
-                result["score"].append(box.confidence)
-
-                if with_tracking_info:
-                    result["id"].append(box.data["id"])
-                    result["frame"].append(box.data["frame"])
-
-            result["name"] = np.array(result["name"])
-            result["truncated"] = np.array(result["truncated"])
-            result["occluded"] = np.array(result["occluded"])
-            result["alpha"] = np.array(result["alpha"])
-            result["bbox"] = np.array(result["bbox"])
-            result["dimensions"] = np.array(result["dimensions"])
-            result["location"] = np.array(result["location"])
-            result["rotation_y"] = np.array(result["rotation_y"])
-            result["score"] = np.array(result["score"])
-
-            if with_tracking_info:
-                result["id"] = np.array(result["id"])
-                result["frame"] = np.array(result["frame"])
+        if not with_tracking_info:
+            del result["id"]
+            del result["frame"]
 
         return result
 
-    @property
-    def boxes(self):
-        return self.data
-
     def add_annotation(self, annotation: TrackingAnnotation3D):
-        self.data.append(annotation)
-        self.__compute_confidence()
+        self._append(annotation)
 
     def bounding_box_3d_list(self):
-        return BoundingBox3DList([box.bounding_box_3d() for box in self.data])
-
-    def __compute_confidence(self):
-        self.confidence = sum([box.confidence for box in self.data], 0) / max(1, len(self.data))
-
-    def __getitem__(self, idx):
-        return self.boxes[idx]
-
-    def __len__(self):
-        return len(self.data)
+        return BoundingBox3DList.from_kitti(
+            {key: np.array(value) for key, value in self.kitti(with_tracking_info=False).items()}
+        )
 
     def __repr__(self):
         return "TrackingAnnotation3DList " + str(self)
@@ -0,0 +1,708 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from opendr.engine.target import BoundingBox3DList, BoundingBoxList, Category, Pose, TrackingAnnotation, \
+    TrackingAnnotationList
+
+# A log starts with a header holding its magic, version and kind, followed by chunks. Each chunk starts with a header
+# holding its magic, number of rows, first and last frames, number of columns and length, followed by the descriptors
+# of its columns (name, dtype, shape of a row and offset of the data from the start of the chunk) and by their data,
+# which starts at file offsets aligned to _ALIGNMENT so that the columns can be viewed in place. A chunk without rows
+# or columns records the last frame of the log, so that the frames without rows at its end are kept when it is reopened.
+_LOG_MAGIC = b"ODRT"
+_LOG_VERSION = 1
+_LOG_HEADER = struct.Struct("<4sI24s")
+_CHUNK_MAGIC = b"ODRK"
+_CHUNK_HEADER = struct.Struct("<4sIQqqQ")
+_COLUMN = struct.Struct("<16s16sI3IQQ")
+_ALIGNMENT = 64
+_MAX_ROW_DIMS = 3
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _names_column(names):
+    """Returns the column of the class names, which are stored as numbers if they are numeric, as UTF-8 otherwise"""
+    names = np.asarray(names)
+    if names.dtype.kind in "biu":
+        return names.astype(np.int64)
+    try:
+        numbers = names.astype(np.float64)
+    except (TypeError, ValueError):
+        return np.char.encode(names.astype(str), "utf-8")
+    # Class ids are often stored as floats, e.g., by BoundingBoxList.to_numpy()
+    if np.array_equal(numbers, np.round(numbers)):
+        return numbers.astype(np.int64)
+    return numbers.astype(np.float32)
+
+
+def _decoded(column):
+    """Returns a column as stored, except for the strings, which are decoded"""
+    if column.dtype.kind == "S":
+        return np.char.decode(column, "utf-8")
+    return column
+
+
+def _item(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class _BoundingBoxCodec(object):
+    kind = "bounding_boxes"
+    target_type = BoundingBoxList
+
+    def encode(self, target):
+        boxes = target.to_numpy()
+        return {
+            "ltwh": np.concatenate([boxes[:, :2], boxes[:, 2:4] - boxes[:, :2]], axis=1).astype(np.float32),
+            "score": boxes[:, 4].astype(np.float32),
+            "name": _names_column(boxes[:, 5]),
+        }
+
+    def decode(self, columns, frame):
+        ltwh = columns["ltwh"].astype(np.float64)
+        corners = np.concatenate([ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:]], axis=1)
+        return BoundingBoxList.from_numpy(corners, columns["score"], _decoded(columns["name"]), image_id=frame)
+
+    def empty(self, frame):
+        return BoundingBoxList(image_id=frame)
+
+
+class _TrackingAnnotationCodec(object):
+    kind = "tracking_annotations"
+    target_type = TrackingAnnotationList
+
+    def encode(self, target):
+        annotations = target.data
+        return {
+            "id": np.array([annotation.id for annotation in annotations], dtype=np.int64),
+            "ltwh": np.array([[annotation.left, annotation.top, annotation.width, annotation.height]
+                              for annotation in annotations], dtype=np.float32).reshape(-1, 4),
+            "score": np.array([annotation.confidence for annotation in annotations], dtype=np.float32),
+            "name": _names_column([annotation.name for annotation in annotations]),
+        }
+
+    def decode(self, columns, frame):
+        return TrackingAnnotationList([
+            TrackingAnnotation(_item(name), *ltwh.tolist(), int(id), float(score), frame)
+            for id, ltwh, score, name in zip(columns["id"], columns["ltwh"], columns["score"],
+                                             _decoded(columns["name"]))
+        ])
+
+    def empty(self, frame):
+        return TrackingAnnotationList()
+
+
+class _PoseCodec(object):
+    kind = "poses"
+    target_type = Pose
+
+    def encode(self, target):
+        return {
+            "id": np.array([-1 if pose.id is None else pose.id for pose in target], dtype=np.int64),
+            "keypoints": np.array([np.asarray(pose.data) for pose in target],
+                                  dtype=np.float32).reshape(len(target), -1, 2),
+            "score": np.array([pose.confidence for pose in target], dtype=np.float32),
+        }
+
+    def decode(self, columns, frame):
+        poses = []
+        for id, keypoints, score in zip(columns["id"], columns["keypoints"], columns["score"]):
+            pose = Pose(np.array(keypoints), float(score))
+            pose.id = None if id < 0 else int(id)
+            poses.append(pose)
+        return poses
+
+    def empty(self, frame):
+        return []
+
+
+class _BoundingBox3DCodec(object):
+    kind = "bounding_boxes_3d"
+    target_type = BoundingBox3DList
+    float_columns = ("truncated", "alpha", "bbox", "dimensions", "location", "rotation_y", "score")
+
+    def encode(self, target):
+        kitti = target.kitti()
+        columns = {"name": _names_column(kitti["name"]), "occluded": np.asarray(kitti["occluded"], dtype=np.int64)}
+        for column in self.float_columns:
+            columns[column] = np.asarray(kitti[column], dtype=np.float32)
+        return columns
+
+    def decode(self, columns, frame):
+        kitti = {column: columns[column].astype(np.float64) for column in self.float_columns}
+        kitti["name"] = _decoded(columns["name"])
+        kitti["occluded"] = np.array(columns["occluded"])
+        return BoundingBox3DList.from_kitti(kitti)
+
+    def empty(self, frame):
+        return BoundingBox3DList()
+
+
+class _CategoryCodec(object):
+    kind = "categories"
+    target_type = Category
+
+    def encode(self, target):
+        predictions = np.array([category.data for category in target], dtype=np.int64)
+        scores = np.full(len(target), np.nan, dtype=np.float32)
+        for i, category in enumerate(target):
+            if category.confidence is not None:
+                confidence = np.asarray(category.confidence, dtype=np.float64).reshape(-1)
+                # The confidence of the predicted class is kept if the confidence holds the probabilities of all the
+                # classes
+                index = 0 if confidence.size == 1 else min(predictions[i], confidence.size - 1)
+                scores[i] = confidence[index]
+        descriptions = np.array([category.description or "" for category in target], dtype=str)
+        return {
+            "prediction": predictions,
+            "score": scores,
+            "description": np.char.encode(descriptions, "utf-8"),
+        }
+
+    def decode(self, columns, frame):
+        return [
+            Category(int(prediction), description or None, None if np.isnan(score) else float(score))
+            for prediction, score, description in zip(columns["prediction"], columns["score"],
+                                                      _decoded(columns["description"]))
+        ]
+
+    def empty(self, frame):
+        return []
+
+
+_CODECS = {
+    codec.kind: codec
+    for codec in (_BoundingBoxCodec(), _TrackingAnnotationCodec(), _PoseCodec(), _BoundingBox3DCodec(),
+                  _CategoryCodec())
+}
+KINDS = tuple(_CODECS)
+
+
+def _kind_of(target):
+    """Returns the kind of a target, or None for an empty list"""
+    if isinstance(target, (list, tuple)):
+        if not target:
+            return None
+        target = target[0]
+    for kind, codec in _CODECS.items():
+        if isinstance(target, codec.target_type):
+            return kind
+    raise ValueError("Targets of type %s cannot be logged, the supported types are BoundingBoxList, "
+                     "TrackingAnnotationList, Pose, BoundingBox3DList and Category" % type(target).__name__)
+
+
+def _scan(buffer, size):
+    """
+    Returns the chunks of a log, as (offset, rows, first frame, last frame, columns) tuples, and the end of the last
+    complete chunk. A chunk that was partially written, e.g., by a process that was killed, ends the log.
+    """
+    chunks = []
+    offset = _LOG_HEADER.size
+    while offset + _CHUNK_HEADER.size <= size:
+        magic, count, rows, first, last, length = _CHUNK_HEADER.unpack_from(buffer, offset)
+        if magic != _CHUNK_MAGIC or offset + _CHUNK_HEADER.size + length > size:
+            break
+        columns = {}
+        for index in range(count):
+            name, dtype, ndim, *dims, position, nbytes = _COLUMN.unpack_from(
+                buffer, offset + _CHUNK_HEADER.size + index * _COLUMN.size)
+            columns[name.rstrip(b"\0").decode()] = (np.dtype(dtype.rstrip(b"\0").decode()), tuple(dims[:ndim]),
+                                                    offset + position)
+        chunks.append((offset, rows, first, last, columns))
+        offset += _CHUNK_HEADER.size + length
+    return chunks, offset
+
+
+def _read_header(buffer):
+    magic, version, kind = _LOG_HEADER.unpack_from(buffer, 0)
+    if magic != _LOG_MAGIC:
+        raise ValueError("Not a target log")
+    if version != _LOG_VERSION:
+        raise ValueError("Unsupported target log version %d" % version)
+    return kind.rstrip(b"\0").decode()
+
+
+class TargetLogWriter(object):
+    """
+    Writes the targets of a stream, e.g., the detections of each frame of a camera, to an append-only binary log.
+
+    The targets are converted to columns (e.g., the boxes, scores and classes of the detections), which are buffered
+    and written in chunks of chunk_size rows with the frame index of each row, so that logging a frame costs a few
+    array copies instead of formatting text per object. A log holds a single kind of targets, see KINDS.
+
+    A log that already exists is appended to. If the process writing it was killed, its last chunk may be partial, in
+    which case it is dropped, so the rows that were not flushed are lost.
+    """
+
+    def __init__(self, path, kind=None, chunk_size=4096):
+        """
+        :param path: path of the log
+        :param kind: kind of the targets, one of KINDS, defaults to the kind of the first target written
+        :param chunk_size: number of buffered rows that are written as a chunk
+        """
+        if kind is not None and kind not in _CODECS:
+            raise ValueError("Unknown kind '%s', choose from %s" % (kind, ", ".join(KINDS)))
+        self.path = Path(path)
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.next_frame = 0
+        self._recorded_frame = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._file = None
+        if self.path.exists() and self.path.stat().st_size > 0:
+            self._open_existing()
+
+    def _open_existing(self):
+        self._file = open(self.path, "r+b")
+        size = os.fstat(self._file.fileno()).st_size
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            kind = _read_header(buffer)
+            chunks, end = _scan(buffer, size)
+        if self.kind is not None and kind != self.kind:
+            raise ValueError("The log holds %s, not %s" % (kind, self.kind))
+        self.kind = kind
+        if chunks:
+            self.next_frame = max(last for _, _, _, last, _ in chunks) + 1
+        self._recorded_frame = self.next_frame
+        # Drops the partial chunk
+        self._file.truncate(end)
+        self._file.seek(end)
+
+    def _open_new(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._file.write(_LOG_HEADER.pack(_LOG_MAGIC, _LOG_VERSION, self.kind.encode()))
+
+    def write(self, target, frame=None):
+        """
+        Logs the target of a frame.
+
+        :param target: a BoundingBoxList, TrackingAnnotationList or BoundingBox3DList, or a Pose or Category, or a
+            list of poses or categories
+        :param frame: index of the frame, defaults to the index of the previous frame plus one
+        """
+        kind = _kind_of(target)
+        if kind is None and self.kind is None:
+            raise ValueError("The kind of the log cannot be inferred from an empty list, pass it to the writer")
+        if kind is not None and self.kind is not None and kind != self.kind:
+            raise ValueError("Cannot write %s to a log of %s" % (kind, self.kind))
+        self.kind = self.kind or kind
+        if isinstance(target, (Pose, Category)):
+            target = [target]
+        if frame is None:
+            frame = self.next_frame
+        self.next_frame = max(self.next_frame, frame + 1)
+        if kind is None:
+            return
+        columns = _CODECS[self.kind].encode(target)
+        columns["frame"] = np.full(len(next(iter(columns.values()))), frame, dtype=np.int64)
+        self._add(columns)
+
+    def write_columns(self, columns):
+        """
+        Logs rows given as columns, i.e., a dictionary with a 'frame' array and the arrays of the other columns of
+        the kind of the log, see TargetLogReader.columns(). This is the bulk version of write().
+
+        :param columns: the columns, whose first dimension is the number of rows
+        :type columns: dict
+        """
+        if self.kind is None:
+            raise ValueError("The kind of the log cannot be inferred from columns, pass it to the writer")
+        expected = set(TargetLogReader.column_names(self.kind))
+        if set(columns) != expected:
+            raise ValueError("The columns of %s are %s" % (self.kind, ", ".join(sorted(expected))))
+        columns = {name: np.asarray(array) for name, array in columns.items()}
+        self._add(columns)
+
+    def write_mot(self, mot):
+        """
+        Logs MOT rows, i.e., (frame, id, left, top, width, height[, confidence, ...]) rows, to a log of tracking
+        annotations or bounding boxes. The ids are ignored for bounding boxes, and the confidence defaults to 1.
+
+        :param mot: path of a MOT text file, or array of MOT rows
+        """
+        if self.kind is None:
+            self.kind = "tracking_annotations"
+        if self.kind not in ("tracking_annotations", "bounding_boxes"):
+            raise ValueError("MOT rows cannot be written to a log of " + self.kind)
+        if isinstance(mot, (str, Path)):
+            mot = np.loadtxt(mot, delimiter=",", ndmin=2)
+        mot = np.asarray(mot, dtype=np.float64)
+        if mot.size == 0:
+            mot = mot.reshape(0, 7)
+        columns = {
+            "frame": mot[:, 0].astype(np.int64),
+            "ltwh": mot[:, 2:6].astype(np.float32),
+            "score": mot[:, 6].astype(np.float32) if mot.shape[1] > 6 else np.ones(len(mot), dtype=np.float32),
+            "name": np.zeros(len(mot), dtype=np.int64),
+        }
+        if self.kind == "tracking_annotations":
+            columns["id"] = mot[:, 1].astype(np.int64)
+        self.write_columns(columns)
+
+    def write_coco(self, coco):
+        """
+        Logs COCO annotations or results to a log of bounding boxes, with the image id of each annotation as its frame.
+
+        :param coco: path of a COCO json file, COCO dictionary with an 'annotations' list, or list of annotations
+        """
+        if self.kind is None:
+            self.kind = "bounding_boxes"
+        if self.kind != "bounding_boxes":
+            raise ValueError("COCO annotations cannot be written to a log of " + self.kind)
+        if isinstance(coco, (str, Path)):
+            with open(coco) as f:
+                coco = json.load(f)
+        if isinstance(coco, dict):
+            coco = coco["annotations"]
+        self.write_columns({
+            "frame": np.array([annotation["image_id"] for annotation in coco], dtype=np.int64),
+            "ltwh": np.array([annotation["bbox"] for annotation in coco], dtype=np.float32).reshape(-1, 4),
+            "score": np.array([annotation.get("score", 1) for annotation in coco], dtype=np.float32),
+            "name": _names_column([annotation["category_id"] for annotation in coco]),
+        })
+
+    def write_kitti(self, directory):
+        """
+        Logs the KITTI label files of a directory to a log of 3D bounding boxes. The name of each file is the index of
+        its frame, e.g., 000042.txt.
+
+        :param directory: the directory of the label files
+        """
+        if self.kind is None:
+            self.kind = "bounding_boxes_3d"
+        if self.kind != "bounding_boxes_3d":
+            raise ValueError("KITTI labels cannot be written to a log of " + self.kind)
+        files = sorted(Path(directory).glob("*.txt"), key=lambda file: int(file.stem))
+        frames, rows = [], []
+        for file in files:
+            lines = [line.split() for line in file.read_text().splitlines() if line.strip()]
+            frames.extend([int(file.stem)] * len(lines))
+            # Rows without a score are ground truth annotations
+            rows.extend(line if len(line) > 15 else line + ["0"] for line in lines)
+        rows = np.array(rows, dtype=str).reshape(-1, 16)
+        values = rows[:, 1:].astype(np.float64)
+        self.write_columns({
+            "frame": np.array(frames, dtype=np.int64),
+            "name": _names_column(rows[:, 0]),
+            "truncated": values[:, 0].astype(np.float32),
+            "occluded": values[:, 1].astype(np.int64),
+            "alpha": values[:, 2].astype(np.float32),
+            "bbox": values[:, 3:7].astype(np.float32),
+            # The files hold the (height, width, length) dimensions, which are stored as (length, height, width) as
+            # in the KITTI annotations of the learners
+            "dimensions": values[:, [9, 7, 8]].astype(np.float32),
+            "location": values[:, 10:13].astype(np.float32),
+            "rotation_y": values[:, 13].astype(np.float32),
+            "score": values[:, 14].astype(np.float32),
+        })
+
+    def _add(self, columns):
+        rows = len(columns["frame"])
+        if rows == 0:
+            return
+        self.next_frame = max(self.next_frame, int(columns["frame"].max()) + 1)
+        self._pending.append(columns)
+        self._pending_rows += rows
+        if self._pending_rows >= self.chunk_size:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        if not self._pending:
+            return
+        if self._file is None:
+            self._open_new()
+        names = ["frame"] + [name for name in self._pending[0] if name != "frame"]
+        columns = {}
+        for name in names:
+            arrays = [pending[name] for pending in self._pending]
+            try:
+                columns[name] = np.ascontiguousarray(np.concatenate(arrays))
+            except TypeError:
+                # Class names that are numbers in some frames and strings in others
+                columns[name] = np.char.encode(np.concatenate([_decoded(array).astype(str) for array in arrays]),
+                                               "utf-8")
+        frames = columns["frame"]
+        self._pending = []
+        self._pending_rows = 0
+
+        start = self._file.tell()
+        position = _aligned(start + _CHUNK_HEADER.size + len(names) * _COLUMN.size) - start
+        descriptors, blocks = [], []
+        for name in names:
+            array = columns[name]
+            if array.ndim - 1 > _MAX_ROW_DIMS:
+                raise ValueError("Column '%s' has too many dimensions" % name)
+            dims = list(array.shape[1:]) + [0] * (_MAX_ROW_DIMS - array.ndim + 1)
+            descriptors.append(_COLUMN.pack(name.encode(), array.dtype.str.encode(), array.ndim - 1, *dims,
+                                            position, array.nbytes))
+            blocks.append((position, array))
+            position = _aligned(start + position + array.nbytes) - start
+        length = position - _CHUNK_HEADER.size
+        self._file.write(_CHUNK_HEADER.pack(_CHUNK_MAGIC, len(names), len(frames), int(frames.min()),
+                                            int(frames.max()), length))
+        self._recorded_frame = max(self._recorded_frame, int(frames.max()) + 1)
+        self._file.write(b"".join(descriptors))
+        for position, array in blocks:
+            self._file.seek(start + position)
+            self._file.write(array.tobytes())
+        # Pads the last column, so that the chunk has its full length even if it is the last one of the file
+        self._file.seek(start + _CHUNK_HEADER.size + length)
+        self._file.truncate()
+
+    def flush(self):
+        """Writes the buffered rows to the log"""
+        if self.kind is not None and self._file is None:
+            self._open_new()
+        self._write_chunk()
+        if self._file is not None and self.next_frame > self._recorded_frame:
+            # Records the frames without rows at the end of the log
+            self._file.write(_CHUNK_HEADER.pack(_CHUNK_MAGIC, 0, 0, self.next_frame - 1, self.next_frame - 1, 0))
+            self._recorded_frame = self.next_frame
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Writes the buffered rows and closes the log"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TargetLogReader(object):
+    """
+    Reads a log written by TargetLogWriter. The log is memory-mapped and its columns are viewed in place, so that
+    reading a frame only touches the chunks that hold it, and the columns of the whole log can be converted to MOT,
+    COCO or KITTI text with array operations.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of the log
+        """
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._buffer = None
+        self.refresh()
+
+    @staticmethod
+    def column_names(kind):
+        """Returns the names of the columns of a kind of targets, including 'frame'"""
+        if kind not in _CODECS:
+            raise ValueError("Unknown kind '%s', choose from %s" % (kind, ", ".join(KINDS)))
+        return ("frame",) + {
+            "bounding_boxes": ("ltwh", "score", "name"),
+            "tracking_annotations": ("id", "ltwh", "score", "name"),
+            "poses": ("id", "keypoints", "score"),
+            "bounding_boxes_3d": ("name", "occluded") + _BoundingBox3DCodec.float_columns,
+            "categories": ("prediction", "score", "description"),
+        }[kind]
+
+    def refresh(self):
+        """Maps the chunks that were written since the log was opened, e.g., by a writer that is still running"""
+        self._close_buffer()
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.kind = _read_header(self._buffer)
+        self._codec = _CODECS[self.kind]
+        # The chunks without rows only record the frame counter of the writer
+        self._chunks = [chunk for chunk in _scan(self._buffer, len(self._buffer))[0] if chunk[1] > 0]
+
+    def _column(self, chunk, name):
+        _, rows, _, _, columns = chunk
+        dtype, shape, offset = columns[name]
+        return np.frombuffer(self._buffer, dtype, rows * int(np.prod(shape, dtype=np.int64)), offset).reshape(
+            (rows,) + shape)
+
+    def __len__(self):
+        """Returns the number of rows, e.g., of boxes"""
+        return sum(rows for _, rows, _, _, _ in self._chunks)
+
+    @property
+    def frames(self):
+        """The sorted indices of the frames with rows"""
+        if not self._chunks:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([self._column(chunk, "frame") for chunk in self._chunks]))
+
+    def columns(self, names=None):
+        """
+        Returns columns of the whole log. The strings are decoded.
+
+        :param names: names of the columns, defaults to all of them, see column_names()
+        :return: dictionary with the array of each column
+        :rtype: dict
+        """
+        names = self.column_names(self.kind) if names is None else names
+        result = {}
+        for name in names:
+            arrays = [_decoded(self._column(chunk, name)) for chunk in self._chunks]
+            if not arrays:
+                result[name] = np.zeros(0)
+                continue
+            try:
+                result[name] = np.concatenate(arrays)
+            except (TypeError, ValueError):
+                result[name] = np.concatenate([array.astype(str) for array in arrays])
+        return result
+
+    def _frame_columns(self, frame):
+        selected = {name: [] for name in self.column_names(self.kind)}
+        for chunk in self._chunks:
+            if chunk[2] <= frame <= chunk[3]:
+                rows = np.flatnonzero(self._column(chunk, "frame") == frame)
+                for name in selected:
+                    selected[name].append(self._column(chunk, name)[rows])
+        return {name: np.concatenate(arrays) if len(arrays) > 1 else arrays[0] if arrays else None
+                for name, arrays in selected.items()}
+
+    def frame(self, frame):
+        """
+        Returns the target of a frame, which is empty for a frame without rows.
+
+        :param frame: index of the frame
+        :return: a BoundingBoxList, TrackingAnnotationList or BoundingBox3DList, or a list of poses or categories
+        """
+        columns = self._frame_columns(frame)
+        if columns["frame"] is None:
+            return self._codec.empty(frame)
+        return self._codec.decode(columns, frame)
+
+    def __iter__(self):
+        """Yields the (frame, target) pairs of the frames with rows, in the order of the frames"""
+        if any(chunk[2] <= previous[3] for previous, chunk in zip(self._chunks, self._chunks[1:])):
+            # The frames were not written in order
+            for frame in self.frames:
+                yield int(frame), self.frame(int(frame))
+            return
+        # Each frame is in a single chunk, whose rows are grouped by frame
+        for chunk in self._chunks:
+            frames = self._column(chunk, "frame")
+            order = np.argsort(frames, kind="stable")
+            unique, starts = np.unique(frames[order], return_index=True)
+            columns = {name: self._column(chunk, name)[order] for name in self.column_names(self.kind)}
+            ends = np.append(starts[1:], len(order))
+            for frame, start, end in zip(unique.tolist(), starts.tolist(), ends.tolist()):
+                yield frame, self._codec.decode({name: array[start:end] for name, array in columns.items()}, frame)
+
+    def to_mot(self, path=None):
+        """
+        Converts a log of tracking annotations or bounding boxes to MOT rows, i.e., (frame, id, left, top, width,
+        height, confidence, -1, -1, -1) rows, with a -1 id for bounding boxes.
+
+        :param path: if given, the rows are written to this MOT text file
+        :return: the MOT rows
+        :rtype: numpy.ndarray
+        """
+        if self.kind not in ("tracking_annotations", "bounding_boxes"):
+            raise ValueError("A log of %s cannot be converted to MOT" % self.kind)
+        columns = self.columns(["frame", "ltwh", "score"])
+        ids = self.columns(["id"])["id"] if self.kind == "tracking_annotations" else np.full(len(self), -1)
+        mot = np.full((len(self), 10), -1, dtype=np.float64)
+        mot[:, 0] = columns["frame"]
+        mot[:, 1] = ids
+        mot[:, 2:6] = columns["ltwh"]
+        mot[:, 6] = columns["score"]
+        if path is not None:
+            np.savetxt(path, mot, fmt=["%d", "%d", "%.2f", "%.2f", "%.2f", "%.2f", "%.4f", "%d", "%d", "%d"],
+                       delimiter=",")
+        return mot
+
+    def to_coco(self, path=None):
+        """
+        Converts a log of bounding boxes to COCO results, with the frame of each box as its image id.
+
+        :param path: if given, the results are written to this json file
+        :return: the results, as a list of dictionaries
+        :rtype: list
+        """
+        if self.kind != "bounding_boxes":
+            raise ValueError("A log of %s cannot be converted to COCO" % self.kind)
+        columns = self.columns()
+        ltwh = columns["ltwh"].astype(np.float64)
+        results = [
+            {"image_id": frame, "category_id": name, "bbox": box, "area": area, "score": score}
+            for frame, name, box, area, score in zip(columns["frame"].tolist(), columns["name"].tolist(),
+                                                     ltwh.tolist(), (ltwh[:, 2] * ltwh[:, 3]).tolist(),
+                                                     columns["score"].astype(np.float64).tolist())
+        ]
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(results, f)
+        return results
+
+    def to_kitti(self, directory):
+        """
+        Converts a log of 3D bounding boxes to KITTI label files, one per frame with rows, named after the index of
+        the frame, e.g., 000042.txt.
+
+        :param directory: the directory of the label files
+        """
+        if self.kind != "bounding_boxes_3d":
+            raise ValueError("A log of %s cannot be converted to KITTI" % self.kind)
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        columns = self.columns()
+        values = np.concatenate([
+            columns["alpha"][:, None], columns["bbox"],
+            # KITTI files hold the (height, width, length) dimensions
+            columns["dimensions"][:, [1, 2, 0]], columns["location"], columns["rotation_y"][:, None],
+            columns["score"][:, None],
+        ], axis=1).astype(np.float64)
+        fields = [columns["name"].astype(str).tolist(), np.char.mod("%.2f", columns["truncated"]).tolist(),
+                  np.char.mod("%d", columns["occluded"]).tolist()] + \
+            [np.char.mod("%.4f", values[:, i]).tolist() for i in range(values.shape[1])]
+        lines = np.array([" ".join(line) for line in zip(*fields)], dtype=str)
+        order = np.argsort(columns["frame"], kind="stable")
+        frames, starts = np.unique(columns["frame"][order], return_index=True)
+        for frame, rows in zip(frames.tolist(), np.split(order, starts[1:])):
+            (directory / ("%06d.txt" % frame)).write_text("\n".join(lines[rows].tolist()) + "\n")
+
+    def _close_buffer(self):
+        if self._buffer is not None:
+            try:
+                self._buffer.close()
+            except BufferError:
+                # Arrays still view the mapping, which is closed once they are collected
+                pass
+            self._buffer = None
+
+    def close(self):
+        """Closes the log"""
+        self._close_buffer()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,13 +1,12 @@
-from opendr.perception.activity_recognition.x3d.x3d_learner import X3DLearner
-from opendr.perception.activity_recognition.cox3d.cox3d_learner import CoX3DLearner
-from opendr.perception.activity_recognition.continual_transformer_encoder.continual_transformer_encoder_learner import (
-    CoTransEncLearner,
-)
+from opendr.engine.helper.lazy import lazy_attributes
 
-from opendr.perception.activity_recognition.datasets.kinetics import (
-    KineticsDataset,
-    CLASSES,
-)
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    "X3DLearner": ".x3d.x3d_learner",
+    "CoX3DLearner": ".cox3d.cox3d_learner",
+    "CoTransEncLearner": ".continual_transformer_encoder.continual_transformer_encoder_learner",
+    "KineticsDataset": ".datasets.kinetics",
+    "CLASSES": ".datasets.kinetics",
+})
 
 __all__ = [
     "X3DLearner",
@@ -20,7 +20,6 @@ import pickle
 from pathlib import Path
 from opendr.engine.learners import Learner
 from opendr.engine.helper.io import bump_version
-import onnxruntime as ort
 from collections import OrderedDict
 
 from opendr.engine.data import Timeseries, Vector
@@ -643,6 +642,10 @@ class CoTransEncLearner(Learner):
         Args:
             path (Union[str, Path]): Path to ONNX model folder
         """
+        import onnxruntime as ort
+
+        from opendr.engine.helper.sessions import create_session
+
         assert (
             int(getattr(ort, "__version__", "0.0.0").split(".")[1]) >= 11
         ), "ONNX inference of the Continual Transformer Encoder requires onnxruntime >= 1.11.0."
@@ -651,7 +654,7 @@ class CoTransEncLearner(Learner):
         state_path = path.parent / "cotransenc_state.pickle"
 
         logger.info(f"Loading ONNX runtime inference session from {str(onnx_path)}")
-        self._ort_session = ort.InferenceSession(str(onnx_path))
+        self._ort_session = create_session(str(onnx_path))
 
         logger.info(f"Loading ONNX state from {str(state_path)}")
         with open(state_path, "rb") as f:
@@ -25,7 +25,6 @@ from opendr.perception.activity_recognition.x3d.x3d_learner import X3DLearner
 from pathlib import Path
 from logging import getLogger
 from typing import Union, List
-import onnxruntime as ort
 
 
 logger = getLogger(__name__)
@@ -148,12 +147,15 @@ class CoX3DLearner(X3DLearner):
         S = self.model_hparams["image_size"]
         return torch.randn(1, C, S, S).to(device=self.device)
 
-    def infer(self, batch: Union[data.Image, List[data.Image], torch.Tensor]) -> List[Category]:
+    def infer(
+        self, batch: Union[data.Image, List[data.Image], data.ImageBatch, torch.Tensor]
+    ) -> List[Category]:
         """Run inference on a batch of data
 
         Args:
             batch (torch.Tensor): Image or batch of images.
                 The image should have shape (3, H, W). If a batch is supplied, its shape should be (B, 3, H, W).
+                An ImageBatch is used directly, without stacking its images.
 
         Returns:
             List[target.Category]: List of output categories
@@ -163,6 +165,8 @@ class CoX3DLearner(X3DLearner):
             batch = [batch]
         if type(batch) is list:
             batch = torch.stack([torch.tensor(v.data) for v in batch])
+        elif isinstance(batch, data.ImageBatch):
+            batch = torch.tensor(batch.data)
 
         batch = batch.to(device=self.device, dtype=torch.float)
 
@@ -250,7 +254,8 @@ class CoX3DLearner(X3DLearner):
         state_path = path.parent / f"cox3d_{self.backbone}_state.pickle"
 
         logger.info(f"Loading ONNX runtime inference session from {str(onnx_path)}")
-        self._ort_session = ort.InferenceSession(str(onnx_path))
+        from opendr.engine.helper.sessions import create_session
+        self._ort_session = create_session(str(onnx_path))
 
         logger.info(f"Loading ONNX state from {str(state_path)}")
         with open(state_path, "rb") as f:
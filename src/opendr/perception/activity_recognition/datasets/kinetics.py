@@ -30,7 +30,7 @@ from opendr.perception.activity_recognition.datasets.utils.transforms import (
     standard_video_transforms,
 )
 from opendr.engine.constants import OPENDR_SERVER_URL
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 try:
     import av
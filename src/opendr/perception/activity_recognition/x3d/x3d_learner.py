@@ -21,7 +21,6 @@ from pathlib import Path
 from opendr.engine.learners import Learner
 from opendr.engine.helper.io import bump_version
 from torch import onnx
-import onnxruntime as ort
 from opendr.engine.data import Video
 from opendr.engine.datasets import Dataset
 from opendr.engine.target import Category
@@ -29,7 +28,7 @@ from opendr.engine.target import Category
 from opendr.perception.activity_recognition.x3d.algorithm.x3d import X3D
 import pytorch_lightning as pl
 
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from logging import getLogger
 from typing import Any, Iterable, Union, Dict, List
 
@@ -546,7 +545,8 @@ class X3DLearner(Learner):
             path (Union[str, Path]): Path to ONNX model
         """
         logger.info(f"Loading ONNX runtime inference session from {str(path)}")
-        self._ort_session = ort.InferenceSession(str(path))
+        from opendr.engine.helper.sessions import create_session
+        self._ort_session = create_session(str(path), io_binding=True)
 
 
 def _experiment_logger():
@@ -20,10 +20,9 @@ import shutil
 import ntpath
 import os
 import json
-import onnxruntime as ort
 import numpy as np
 import torch.nn.functional as F
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from sklearn.metrics import precision_score, recall_score, f1_score
 import cv2
 
@@ -310,7 +309,8 @@ class BinaryHighResolutionLearner(Learner):
             if verbose:
                 print("Loaded Pytorch model.")
         else:
-            self.ort_session = ort.InferenceSession(os.path.join(path, metadata['model_paths'][0]))
+            from opendr.engine.helper.sessions import create_session
+            self.ort_session = create_session(os.path.join(path, metadata['model_paths'][0]), io_binding=True)
 
             if verbose:
                 print("Loaded ONNX model.")
@@ -333,7 +333,8 @@ class BinaryHighResolutionLearner(Learner):
             # Create temp directory
             os.makedirs(self.temp_path, exist_ok=True)
             self.__convert_to_onnx(os.path.join(self.temp_path, "onnx_model_temp.onnx"), do_constant_folding)
-        self.ort_session = ort.InferenceSession(os.path.join(self.temp_path, "onnx_model_temp.onnx"))
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(os.path.join(self.temp_path, "onnx_model_temp.onnx"), io_binding=True)
 
     def __convert_to_onnx(self, output_name, do_constant_folding=False, verbose=False):
         """
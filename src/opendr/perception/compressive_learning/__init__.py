@@ -1,4 +1,9 @@
-from opendr.perception.compressive_learning.multilinear_compressive_learning.multilinear_compressive_learner import (
-    MultilinearCompressiveLearner, get_builtin_backbones, PRETRAINED_COMPRESSED_SHAPE)
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'MultilinearCompressiveLearner': '.multilinear_compressive_learning.multilinear_compressive_learner',
+    'get_builtin_backbones': '.multilinear_compressive_learning.multilinear_compressive_learner',
+    'PRETRAINED_COMPRESSED_SHAPE': '.multilinear_compressive_learning.multilinear_compressive_learner',
+})
 
 __all__ = ['MultilinearCompressiveLearner', 'get_builtin_backbones', 'PRETRAINED_COMPRESSED_SHAPE']
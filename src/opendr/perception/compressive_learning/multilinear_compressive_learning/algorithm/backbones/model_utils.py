@@ -14,7 +14,7 @@
 
 import os
 import pickle
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 
 def get_cifar_pretrained_weights(model_name):
@@ -22,9 +22,8 @@ import string
 import time
 import os
 import json
-from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
@@ -240,6 +239,7 @@ class MultilinearCompressiveLearner(Learner):
             if not os.path.exists(logging_path):
                 os.makedirs(logging_path)
 
+            from torch.utils.tensorboard import SummaryWriter
             tensorboard_logger = SummaryWriter(logging_path)
         else:
             tensorboard_logger = None
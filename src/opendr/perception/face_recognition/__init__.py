@@ -1,3 +1,7 @@
-from opendr.perception.face_recognition.face_recognition_learner import FaceRecognitionLearner
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'FaceRecognitionLearner': '.face_recognition_learner',
+})
 
 __all__ = ['FaceRecognitionLearner']
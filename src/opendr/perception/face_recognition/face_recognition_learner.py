@@ -39,20 +39,19 @@ import torch.nn as nn
 import torch.optim as optim
 import torchvision.transforms as transforms
 import torchvision.datasets as datasets
-from torch.utils.tensorboard import SummaryWriter
 from PIL import Image as PILImage
 import numpy as np
 import pickle
 import cv2
-import onnxruntime as ort
 from tqdm import tqdm
 import os
 import json
 import shutil
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
 
 from opendr.engine.learners import Learner
-from opendr.engine.data import Image
+from opendr.engine.data import Image, ImageBatch
 from opendr.engine.target import Category
 from opendr.engine.constants import OPENDR_SERVER_URL
 
@@ -127,6 +126,7 @@ class FaceRecognitionLearner(Learner):
         self.pairs = None
         self.ort_backbone_session = None  # ONNX runtime inference session for backbone
         self.ort_head_session = None  # ONNX runtime inference session for head
+        self.quantization = None  # Report of the INT8 quantization of the ONNX backbone, see optimize()
         self.temp_path = temp_path
 
     def __create_model(self, num_class=0):
@@ -203,6 +203,7 @@ class FaceRecognitionLearner(Learner):
         # Tensorboard logging
         if logging_path != '':
             self.logging = True
+            from torch.utils.tensorboard import SummaryWriter
             self.writer = SummaryWriter(logging_path)
         else:
             self.logging = False
@@ -450,90 +451,99 @@ class FaceRecognitionLearner(Learner):
         """
         This method is used to perform face recognition on an image.
 
-        :param img: image to run inference on
-        :rtype img: engine.data.Image class object
+        :param img: image to run inference on, or a batch of images to run inference on in a single forward pass
+        :rtype img: engine.data.Image or engine.data.ImageBatch class object
         :return: Returns an engine.target.Category object, which holds an ID and the distance between
                  the embedding of the input image and the closest embedding existing in the reference database.
-        :rtype: engine.target.Category object
+                 For a batch, one engine.target.Category object is returned per image.
+        :rtype: engine.target.Category object or list of engine.target.Category objects
         """
-        if not isinstance(img, Image):
-            img = Image(img)
-        img = img.convert("channels_last", "bgr")
+        if isinstance(img, ImageBatch):
+            imgs = [PILImage.fromarray(np.transpose(image, (1, 2, 0))) for image in img.numpy(copy=False)]
+        else:
+            if not isinstance(img, Image):
+                img = Image(img)
+            imgs = [PILImage.fromarray(img.convert("channels_last", "rgb", copy=False))]
         if self._model is None and self.ort_backbone_session is None:
             raise UserWarning('A model should be loaded first')
-        transform = transforms.Compose([
-            transforms.Resize([int(128 * self.input_size[0] / 112), int(128 * self.input_size[0] / 112)]),
-            transforms.CenterCrop([self.input_size[0], self.input_size[1]]),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=self.rgb_mean, std=self.rgb_std)]
-        )
+        transform = self.__infer_transform()
         if self.mode == 'backbone_only':
-            distance = self.threshold
-            if distance == 0:
-                distance = 10
-            person = None
             self.backbone_model.eval()
             with torch.no_grad():
-                img = PILImage.fromarray(
-                    cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-                img = transform(img)
-                img = img.unsqueeze(0)
-                img = img.to(self.device)
-                if self.ort_backbone_session is not None:
-                    features = self.ort_backbone_session.run(None, {'data': np.array(img.cpu())})
-                    features = torch.tensor(features[0])
-                else:
-                    self.backbone_model.eval()
-                    features = self.backbone_model(img)
-                features = l2_norm(features)
+                features = self.__extract_features(imgs, transform)
             if self.database is None:
                 raise UserWarning('A reference for comparison should be created first. Try calling fit_reference()')
-            for key in self.database:
-                diff = np.subtract(features.cpu().numpy(), self.database[key][1].cpu().numpy())
-                dist = np.sum(np.square(diff), axis=1)
-                if np.isnan(dist):
-                    dist = 10
-                if dist < distance:
-                    distance = dist
-                    person = key
-            if type(distance) != float:
-                confidence = 1 - (distance.item() / self.threshold)
-            else:
-                confidence = 1 - (distance / self.threshold)
-            if person is not None:
-                person = Category(person, self.database[person][0], confidence)
-                return person
-            else:
-                person = Category(-1, 'Not found', 0.0)
-                return person
-
+            persons = [self.__find_person(features[i:i + 1]) for i in range(features.shape[0])]
         elif self.network_head == 'classifier':
             self.backbone_model.eval()
             self.network_head_model.eval()
             with torch.no_grad():
-                img = transform(PILImage.fromarray(
-                    cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-                )
-                img = img.unsqueeze(0)
-                img = img.to(self.device)
-                if self.ort_backbone_session is not None:
-                    features = self.ort_backbone_session.run(None, {'data': np.array(img.cpu())})
-                    features = torch.tensor(features[0])
-                else:
-                    self.backbone_model.eval()
-                    features = self.backbone_model(img)
-                features = l2_norm(features)
+                features = self.__extract_features(imgs, transform)
                 if self.ort_head_session is not None:
                     outs = self.ort_head_session.run(None, {'features': np.array(features.cpu())})
-                    return self.classes[outs.index(max(outs))]
+                    if not isinstance(img, ImageBatch):
+                        return self.classes[outs.index(max(outs))]
+                    persons = [Category(self.classes[predicted]) for predicted in np.argmax(outs[0], axis=1)]
                 else:
                     outs = self.network_head_model(features)
                     _, predicted = torch.max(outs.data, 1)
-                    person = Category(self.classes[predicted.item()])
-                    return person
+                    persons = [Category(self.classes[p]) for p in predicted.tolist()]
         else:
             raise UserWarning('Infer should be called either with backbone_only mode or with a classifier head')
 
+        if isinstance(img, ImageBatch):
+            return persons
+        return persons[0]
+
+    def __infer_transform(self):
+        return transforms.Compose([
+            transforms.Resize([int(128 * self.input_size[0] / 112), int(128 * self.input_size[0] / 112)]),
+            transforms.CenterCrop([self.input_size[0], self.input_size[1]]),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=self.rgb_mean, std=self.rgb_std)]
+        )
+
+    def __extract_features(self, imgs, transform):
+        """
+        Computes the l2-normalized embeddings of a list of PIL images in a single forward pass of the backbone.
+        """
+        img = torch.stack([transform(image) for image in imgs])
+        img = img.to(self.device)
+        if self.ort_backbone_session is not None:
+            features = self.ort_backbone_session.run(None, {'data': np.array(img.cpu())})
+            features = torch.tensor(features[0])
+        else:
+            self.backbone_model.eval()
+            features = self.backbone_model(img)
+        return l2_norm(features)
+
+    def __find_person(self, features):
+        """
+        Returns the person of the reference database whose embedding is the closest to the given (1, D) embedding.
+        """
+        distance = self.threshold
+        if distance == 0:
+            distance = 10
+        person = None
+        for key in self.database:
+            diff = np.subtract(features.cpu().numpy(), self.database[key][1].cpu().numpy())
+            dist = np.sum(np.square(diff), axis=1)
+            if np.isnan(dist):
+                dist = 10
+            if dist < distance:
+                distance = dist
+                person = key
+        if type(distance) != float:
+            confidence = 1 - (distance.item() / self.threshold)
+        else:
+            confidence = 1 - (distance / self.threshold)
+        if person is not None:
+            person = Category(person, self.database[person][0], confidence)
+            return person
+        else:
+            person = Category(-1, 'Not found', 0.0)
+            return person
+
     def eval(self, dataset=None, num_pairs=1000, silent=False, verbose=True):
         """
         This method is used to evaluate a trained model on an evaluation dataset.
@@ -731,6 +741,20 @@ class FaceRecognitionLearner(Learner):
                                  'optimizer_info': {}
                                  }
             torch.save(self.backbone_model.state_dict(), os.path.join(path, 'backbone_' + self.backbone + '.pth'))
+        elif self.quantization is not None:
+            # The float backbone is saved alongside the INT8 backbone
+            backbone_metadata = {'model_paths': os.path.join(path, 'onnx_' + self.backbone +
+                                                             '_backbone_model_int8.onnx'),
+                                 'framework': 'pytorch',
+                                 'format': 'onnx',
+                                 'has_data': False,
+                                 'inference_params': {'threshold': self.threshold},
+                                 'optimized': True,
+                                 'optimizer_info': self.quantization
+                                 }
+            shutil.copy2(os.path.join(self.temp_path, 'onnx_' + self.backbone + '_backbone_model_int8.onnx'),
+                         backbone_metadata['model_paths'])
+            torch.save(self.backbone_model.state_dict(), os.path.join(path, 'backbone_' + self.backbone + '.pth'))
         else:
             backbone_metadata = {'model_paths': os.path.join(path, 'onnx_' + self.backbone + '_backbone_model.onnx'),
                                  'framework': 'pytorch',
@@ -795,7 +819,17 @@ class FaceRecognitionLearner(Learner):
             self.threshold = metadata['inference_params']['threshold']
         else:
             raise UserWarning('No backbone_' + self.backbone + '.json found. Please have a check')
-        if metadata['optimized']:
+        if metadata['optimized'] and metadata['optimizer_info'].get('target') == 'cpu-int8':
+            if os.path.exists(os.path.join(path, 'onnx_' + self.backbone + '_backbone_model_int8.onnx')):
+                self.quantization = metadata['optimizer_info']
+                self.__create_model(num_class=0)
+                self.backbone_model.load_state_dict(torch.load(
+                    os.path.join(path, 'backbone_' + self.backbone + '.pth'), map_location=torch.device(self.device)))
+                self._model = {self.backbone_model, self.network_head_model}
+                self.__load_from_onnx(path)
+            else:
+                raise UserWarning('No onnx_' + self.backbone + '_backbone_model_int8.onnx found. Please have a check')
+        elif metadata['optimized']:
             if os.path.exists(os.path.join(path, 'onnx_' + self.backbone + '_backbone_model.onnx')):
                 self.__load_from_onnx(path)
             else:
@@ -832,11 +866,15 @@ class FaceRecognitionLearner(Learner):
                 raise UserWarning('No head_' + self.network_head + '.pth found. Please have a check')
 
     def __load_from_onnx(self, path):
-        path_backbone = os.path.join(path, 'onnx_' + self.backbone + '_backbone_model.onnx')
-        self.ort_backbone_session = ort.InferenceSession(path_backbone)
+        if self.quantization is not None:
+            path_backbone = os.path.join(path, 'onnx_' + self.backbone + '_backbone_model_int8.onnx')
+        else:
+            path_backbone = os.path.join(path, 'onnx_' + self.backbone + '_backbone_model.onnx')
+        from opendr.engine.helper.sessions import create_session
+        self.ort_backbone_session = create_session(path_backbone, io_binding=True)
         if self.mode == 'full' and self.network_head == 'classifier':
             path_head = os.path.join(path, 'onnx_' + self.network_head + '_head_model.onnx')
-            self.ort_head_session = ort.InferenceSession(path_head)
+            self.ort_head_session = create_session(path_head)
 
     def __convert_to_onnx(self, verbose=False):
         if 'cuda' in self.device:
@@ -859,17 +897,45 @@ class FaceRecognitionLearner(Learner):
             torch.onnx.export(self.network_head_model, inp, output_name, verbose=verbose, enable_onnx_checker=True,
                               input_names=input_names, output_names=output_names)
 
-    def optimize(self, do_constant_folding=False):
+    def optimize(self, do_constant_folding=False, target='onnx', calibration_dataset=None, calibration_samples=100):
         """
         Optimize method converts the model to ONNX format and saves the
         model in the parent directory defined by self.temp_path. The ONNX model is then loaded.
+        With the 'cpu-int8' target, the ONNX backbone is quantized to INT8 for CPU inference, with post-training static
+        quantization calibrated on the face images of calibration_dataset, and the quantized backbone is loaded
+        instead.
         :param do_constant_folding: whether to optimize constants, defaults to 'False'
         :type do_constant_folding: bool, optional
+        :param target: 'onnx' for a float ONNX model, or 'cpu-int8' for an INT8 ONNX backbone, defaults to 'onnx'
+        :type target: str, optional
+        :param calibration_dataset: dataset whose face images (or (image, target) tuples) calibrate the quantization,
+            required for the 'cpu-int8' target
+        :type calibration_dataset: engine.datasets.DatasetIterator, optional
+        :param calibration_samples: maximum number of images used for the calibration, defaults to 100
+        :type calibration_samples: int, optional
+        :return: for the 'cpu-int8' target, the report of the quantization, with the difference between the embeddings
+            of the float and INT8 backbones on the calibration images, see engine.helper.quantization.quantize_int8()
+        :rtype: dict
         """
+        check_target(target, calibration_dataset)
         if not os.path.exists(self.temp_path):
             os.makedirs(self.temp_path)
         self.__convert_to_onnx()
+        self.quantization = None
+        if target == 'cpu-int8':
+            transform = self.__infer_transform()
+
+            def preprocess(img):
+                if not isinstance(img, Image):
+                    img = Image(img)
+                return transform(PILImage.fromarray(img.convert("channels_last", "rgb", copy=False))).unsqueeze(0)
+
+            inputs = calibration_inputs(calibration_dataset, preprocess, calibration_samples)
+            self.quantization = quantize_int8(
+                os.path.join(self.temp_path, 'onnx_' + self.backbone + '_backbone_model.onnx'),
+                os.path.join(self.temp_path, 'onnx_' + self.backbone + '_backbone_model_int8.onnx'), inputs)
         self.__load_from_onnx(self.temp_path)
+        return self.quantization
 
     def reset(self):
         pass
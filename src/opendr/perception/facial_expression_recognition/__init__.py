@@ -1,22 +1,17 @@
-from opendr.perception.facial_expression_recognition. \
-    landmark_based_facial_expression_recognition.progressive_spatio_temporal_bln_learner \
-    import ProgressiveSpatioTemporalBLNLearner
-from opendr.perception.facial_expression_recognition. \
-    landmark_based_facial_expression_recognition.algorithm.datasets.CASIA_CK_data_gen \
-    import CK_CLASSES, CASIA_CLASSES
-from opendr.perception.facial_expression_recognition. \
-    landmark_based_facial_expression_recognition.algorithm.datasets.landmark_extractor import landmark_extractor
-from opendr.perception.facial_expression_recognition. \
-    landmark_based_facial_expression_recognition.algorithm.datasets.gen_facial_muscles_data import gen_muscle_data
-from opendr.perception.facial_expression_recognition. \
-    landmark_based_facial_expression_recognition.algorithm.datasets.AFEW_data_gen import data_normalization
+from opendr.engine.helper.lazy import lazy_attributes
 
-from opendr.perception.facial_expression_recognition.image_based_facial_emotion_estimation.facial_emotion_learner \
-    import FacialEmotionLearner
-from opendr.perception.facial_expression_recognition.image_based_facial_emotion_estimation.algorithm.utils \
-    import datasets
-from opendr.perception.facial_expression_recognition.image_based_facial_emotion_estimation.algorithm.utils \
-    import image_processing
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'ProgressiveSpatioTemporalBLNLearner':
+        '.landmark_based_facial_expression_recognition.progressive_spatio_temporal_bln_learner',
+    'CK_CLASSES': '.landmark_based_facial_expression_recognition.algorithm.datasets.CASIA_CK_data_gen',
+    'CASIA_CLASSES': '.landmark_based_facial_expression_recognition.algorithm.datasets.CASIA_CK_data_gen',
+    'landmark_extractor': '.landmark_based_facial_expression_recognition.algorithm.datasets.landmark_extractor',
+    'gen_muscle_data': '.landmark_based_facial_expression_recognition.algorithm.datasets.gen_facial_muscles_data',
+    'data_normalization': '.landmark_based_facial_expression_recognition.algorithm.datasets.AFEW_data_gen',
+    'FacialEmotionLearner': '.image_based_facial_emotion_estimation.facial_emotion_learner',
+    'image_processing': '.image_based_facial_emotion_estimation.algorithm.utils',
+    'datasets': '.image_based_facial_emotion_estimation.algorithm.utils',
+})
 
 __all__ = ['ProgressiveSpatioTemporalBLNLearner', 'CK_CLASSES', 'CASIA_CLASSES', 'landmark_extractor',
            'gen_muscle_data', 'data_normalization', 'FacialEmotionLearner', 'image_processing', 'datasets']
@@ -30,13 +30,13 @@ import zipfile
 import torch
 import os
 from os import path, makedirs
-import onnxruntime
 import shutil
 import json
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
+from opendr.engine.data import ImageBatch
 from opendr.engine.target import Category
 from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.perception.facial_expression_recognition.image_based_facial_emotion_estimation.algorithm.model.esr_9 \
@@ -618,12 +618,14 @@ class FacialEmotionLearner(Learner):
         """
         This method is used to perform inference on a batch of images
 
-        :param input_batch: a batch of images
+        :param input_batch: a batch of images, given as a list of images, an ImageBatch or an array
         :return: dimensional and categorical emotion results.
         """
 
         if type(input_batch) is list:
             input_batch = torch.stack([torch.tensor(v.data) for v in input_batch])
+        elif isinstance(input_batch, ImageBatch):
+            input_batch = torch.tensor(input_batch.data)
         else:
             input_batch = torch.tensor(input_batch)
         cpu_device = torch.device('cpu')
@@ -703,7 +705,8 @@ class FacialEmotionLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.ort_session = onnxruntime.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(path)
 
     def reset(self):
         """This method is not used in this implementation."""
@@ -1,3 +1,7 @@
-from opendr.perception.fall_detection.fall_detector_learner import FallDetectorLearner
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'FallDetectorLearner': '.fall_detector_learner',
+})
 
 __all__ = ['FallDetectorLearner']
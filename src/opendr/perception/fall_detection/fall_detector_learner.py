@@ -14,7 +14,7 @@
 
 import os
 from csv import reader
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from tqdm import tqdm
 from numpy import arctan2, linalg, rad2deg, ndarray
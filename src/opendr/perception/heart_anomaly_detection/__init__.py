@@ -1,8 +1,9 @@
-from opendr.perception.heart_anomaly_detection.attention_neural_bag_of_feature.\
-    attention_neural_bag_of_feature_learner import AttentionNeuralBagOfFeatureLearner
-from opendr.perception.heart_anomaly_detection.gated_recurrent_unit.gated_recurrent_unit_learner import (
-    GatedRecurrentUnitLearner,
-    get_AF_dataset
-)
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AttentionNeuralBagOfFeatureLearner': '.attention_neural_bag_of_feature.attention_neural_bag_of_feature_learner',
+    'GatedRecurrentUnitLearner': '.gated_recurrent_unit.gated_recurrent_unit_learner',
+    'get_AF_dataset': '.gated_recurrent_unit.gated_recurrent_unit_learner',
+})
 
 __all__ = ['AttentionNeuralBagOfFeatureLearner', 'GatedRecurrentUnitLearner', 'get_AF_dataset']
@@ -15,7 +15,7 @@
 import pickle
 import numpy as np
 import torch
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import os
 
 # OepnDR imports
@@ -22,10 +22,9 @@ import string
 import time
 import os
 import json
-from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
@@ -218,6 +217,7 @@ class GatedRecurrentUnitLearner(Learner):
             if not os.path.exists(logging_path):
                 os.makedirs(logging_path)
 
+            from torch.utils.tensorboard import SummaryWriter
             tensorboard_logger = SummaryWriter(logging_path)
         else:
             tensorboard_logger = None
@@ -17,8 +17,7 @@ import torch
 from torch.utils.data import DataLoader
 import os
 import json
-from torch.utils.tensorboard import SummaryWriter
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import librosa
 
 # OpenDR engine imports
@@ -188,6 +187,7 @@ class AudiovisualEmotionLearner(Learner):
 
         if not os.path.exists(logging_path):
             os.makedirs(logging_path)
+        from torch.utils.tensorboard import SummaryWriter
         tensorboard_logger = SummaryWriter(logging_path)
         self.model = self.model.to(self.device)
         metrics = trainer.train(self.model, train_loader, val_loader, self.lr, self.momentum, self.dampening,
@@ -17,7 +17,7 @@ import numpy as np
 import imageio
 import os
 from opendr.engine.datasets import DatasetIterator
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import zipfile
 import torchvision.transforms as transforms
 
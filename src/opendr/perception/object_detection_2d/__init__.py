@@ -1,23 +1,26 @@
-from opendr.perception.object_detection_2d.centernet.centernet_learner import CenterNetDetectorLearner
-from opendr.perception.object_detection_2d.detr.detr_learner import DetrLearner
-from opendr.perception.object_detection_2d.gem.gem_learner import GemLearner
-from opendr.perception.object_detection_2d.retinaface.retinaface_learner import RetinaFaceLearner
-from opendr.perception.object_detection_2d.ssd.ssd_learner import SingleShotDetectorLearner
-from opendr.perception.object_detection_2d.yolov3.yolov3_learner import YOLOv3DetectorLearner
-from opendr.perception.object_detection_2d.yolov5.yolov5_learner import YOLOv5DetectorLearner
-from opendr.perception.object_detection_2d.nanodet.nanodet_learner import NanodetLearner
+from opendr.engine.helper.lazy import lazy_attributes
 
-from opendr.perception.object_detection_2d.datasets.wider_person import WiderPersonDataset
-from opendr.perception.object_detection_2d.datasets.wider_face import WiderFaceDataset
-from opendr.perception.object_detection_2d.datasets import transforms
-
-from opendr.perception.object_detection_2d.utils.vis_utils import draw_bounding_boxes
-
-from opendr.perception.object_detection_2d.nms.cluster_nms.cluster_nms import ClusterNMS
-from opendr.perception.object_detection_2d.nms.fast_nms.fast_nms import FastNMS
-from opendr.perception.object_detection_2d.nms.soft_nms.soft_nms import SoftNMS
-from opendr.perception.object_detection_2d.nms.seq2seq_nms.seq2seq_nms_learner import Seq2SeqNMSLearner
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'CenterNetDetectorLearner': '.centernet.centernet_learner',
+    'DetrLearner': '.detr.detr_learner',
+    'GemLearner': '.gem.gem_learner',
+    'RetinaFaceLearner': '.retinaface.retinaface_learner',
+    'SingleShotDetectorLearner': '.ssd.ssd_learner',
+    'YOLOv3DetectorLearner': '.yolov3.yolov3_learner',
+    'NanodetLearner': '.nanodet.nanodet_learner',
+    'WiderPersonDataset': '.datasets.wider_person',
+    'WiderFaceDataset': '.datasets.wider_face',
+    'transforms': '.datasets',
+    'draw_bounding_boxes': '.utils.vis_utils',
+    'ClusterNMS': '.nms.cluster_nms.cluster_nms',
+    'FastNMS': '.nms.fast_nms.fast_nms',
+    'SoftNMS': '.nms.soft_nms.soft_nms',
+    'CPUNMS': '.nms.utils.nms_cpu',
+    'Seq2SeqNMSLearner': '.nms.seq2seq_nms.seq2seq_nms_learner',
+    'YOLOv5DetectorLearner': '.yolov5.yolov5_learner',
+})
 
 __all__ = ['CenterNetDetectorLearner', 'DetrLearner', 'GemLearner', 'RetinaFaceLearner', 'SingleShotDetectorLearner',
            'YOLOv3DetectorLearner', 'NanodetLearner', 'WiderPersonDataset', 'WiderFaceDataset', 'transforms',
-           'draw_bounding_boxes', 'ClusterNMS', 'FastNMS', 'SoftNMS', 'Seq2SeqNMSLearner', 'YOLOv5DetectorLearner']
+           'draw_bounding_boxes', 'ClusterNMS', 'FastNMS', 'SoftNMS', 'CPUNMS', 'Seq2SeqNMSLearner',
+           'YOLOv5DetectorLearner']
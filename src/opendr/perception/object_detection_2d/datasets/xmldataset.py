@@ -80,8 +80,7 @@ class XMLBasedDataset(DetectionDataset):
     def __getitem__(self, item):
         image_name = self.image_paths[item]
         image_path = os.path.join(self.abs_images_dir, image_name)
-        img_np = cv2.imread(image_path)
-        img = Image(img_np)
+        img = Image.open(image_path)
 
         if self.preload_anno:
             label = self.bboxes[item]
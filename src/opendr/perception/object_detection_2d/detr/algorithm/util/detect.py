@@ -23,57 +23,79 @@ import numpy as np
 from PIL import Image
 from panopticapi.utils import rgb2id
 import io
+from contextlib import nullcontext
 from imantics import Mask
 
 
+def _no_profile(stage):
+    return nullcontext()
+
+
 @torch.no_grad()
-def detect(im, transform, model, postprocessor, device, threshold, ort_session, masks):
+def detect(im, transform, model, postprocessor, device, threshold, ort_session, masks, profile=None, convert=None):
+    return detect_batch([im], transform, model, postprocessor, device, threshold, ort_session, masks, profile,
+                        convert)[0]
+
 
+@torch.no_grad()
+def detect_batch(ims, transform, model, postprocessor, device, threshold, ort_session, masks, profile=None,
+                 convert=None):
+    """
+    Runs the model on a list of images of the same size in a single forward pass and returns the
+    (scores, boxes, segmentations) of each image. If given, profile(stage) returns a context manager
+    that records the duration of each stage, and convert(im) converts each input to a PIL image as part
+    of the preprocessing.
+    """
     dev = torch.device(device)
+    profile = profile or _no_profile
 
-    # mean-std normalize the input image (batch-size: 1)
-    img = transform(im).unsqueeze(0)
-    if ort_session is not None:
-        # propagate through the onnx model
-        outputs = ort_session.run(['pred_logits', 'pred_boxes'], {'data': np.array(img)})
+    with profile("preprocess"):
+        if convert is not None:
+            ims = [convert(im) for im in ims]
+        # mean-std normalize the input images
+        img = torch.stack([transform(im) for im in ims])
+    with profile("forward"):
+        if ort_session is not None:
+            # propagate through the onnx model, which is exported with a batch size of one
+            outputs = [ort_session.run(['pred_logits', 'pred_boxes'], {'data': np.array(img[i:i + 1])})
+                       for i in range(len(ims))]
 
-        pred_logits = torch.tensor(outputs[0], device=dev)
-        pred_boxes = torch.tensor(outputs[1], device=dev)
+            pred_logits = torch.tensor(np.concatenate([output[0] for output in outputs]), device=dev)
+            pred_boxes = torch.tensor(np.concatenate([output[1] for output in outputs]), device=dev)
+            masks = False
+        else:
+            # propagate through the pytorch model
+            img = img.to(dev)
+            model.eval()
+            outputs = model(img)
 
-        # keep only predictions with threshold confidence
-        probas = pred_logits.softmax(-1)[0, :, :-1]
-        keep = probas.max(-1).values > threshold
+            pred_logits = outputs['pred_logits']
+            pred_boxes = outputs['pred_boxes']
 
-        # convert boxes from [0; 1] to image scales
-        bboxes_scaled = rescale_bboxes(pred_boxes[0, keep], im.size, device)
+    with profile("postprocess"):
+        if masks:
+            results = postprocessor(outputs, torch.as_tensor([[im.size[1], im.size[0]] for im in ims]))
 
-        segmentations = []
-        return probas[keep], bboxes_scaled, segmentations
-    else:
-        # propagate through the pytorch model
-        img = img.to(dev)
-        model.eval()
-        outputs = model(img)
+        detections = []
+        for i, im in enumerate(ims):
+            # keep only predictions with threshold confidence
+            probas = pred_logits[i].softmax(-1)[:, :-1]
+            keep = probas.max(-1).values > threshold
 
-        # keep only predictions with threshold confidence
-        probas = outputs['pred_logits'].softmax(-1)[0, :, :-1]
-        keep = probas.max(-1).values > threshold
+            # convert boxes from [0; 1] to image scales
+            bboxes_scaled = rescale_bboxes(pred_boxes[i, keep], im.size, device)
 
-        # convert boxes from [0; 1] to image scales
-        bboxes_scaled = rescale_bboxes(outputs['pred_boxes'][0, keep], im.size, device)
+            segmentations = []
+            if masks:
+                # The segmentation is stored in a special-format png
+                panoptic_seg = Image.open(io.BytesIO(results[i]['png_string']))
+                panoptic_seg = np.array(panoptic_seg, dtype=np.uint8).copy()
+                # We retrieve the ids corresponding to each mask
+                panoptic_seg_id = rgb2id(panoptic_seg)
 
-        segmentations = []
-        if masks:
-            w, h = im.size
-            result = postprocessor(outputs, torch.as_tensor([h, w]).unsqueeze(0))[0]
-            # The segmentation is stored in a special-format png
-            panoptic_seg = Image.open(io.BytesIO(result['png_string']))
-            panoptic_seg = np.array(panoptic_seg, dtype=np.uint8).copy()
-            # We retrieve the ids corresponding to each mask
-            panoptic_seg_id = rgb2id(panoptic_seg)
-
-            for i in range(panoptic_seg_id.max()+1):
-                mask = (panoptic_seg_id == i).astype(np.uint8)
-                polygons = Mask(mask).polygons()
-                segmentations.append(polygons.segmentation[0])
-        return probas[keep], bboxes_scaled, segmentations
+                for j in range(panoptic_seg_id.max()+1):
+                    mask = (panoptic_seg_id == j).astype(np.uint8)
+                    polygons = Mask(mask).polygons()
+                    segmentations.append(polygons.segmentation[0])
+            detections.append((probas[keep], bboxes_scaled, segmentations))
+    return detections
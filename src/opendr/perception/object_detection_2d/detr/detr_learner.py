@@ -24,25 +24,23 @@ import torch
 import ntpath
 import contextlib
 from torch.utils.data import DataLoader, DistributedSampler
-from torch.utils.tensorboard import SummaryWriter
 from pathlib import Path
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
-from opendr.perception.object_detection_2d.detr.algorithm.util.detect import detect
+from opendr.perception.object_detection_2d.detr.algorithm.util.detect import detect, detect_batch
 from opendr.perception.object_detection_2d.detr.algorithm.datasets import build_dataset, get_coco_api_from_dataset
 from opendr.perception.object_detection_2d.detr.algorithm.datasets.coco import map_bounding_box_list_to_coco
 from opendr.perception.object_detection_2d.detr.algorithm.engine import evaluate, train_one_epoch
 from opendr.perception.object_detection_2d.detr.algorithm.models import build_model, build_criterion, build_postprocessors
 
 from opendr.engine.constants import OPENDR_SERVER_URL
-from opendr.engine.data import Image
+from opendr.engine.data import Image, ImageBatch
 from opendr.engine.learners import Learner
 from opendr.engine.datasets import ExternalDataset, DatasetIterator, MappedDatasetIterator
 from opendr.engine.target import CocoBoundingBox, BoundingBoxList
 
 import torchvision.transforms as T
 import numpy as np
-import onnxruntime as ort
 from opendr.perception.object_detection_2d.detr.algorithm.util import misc as utils
 from PIL import Image as im
 
@@ -50,6 +48,9 @@ torch.hub._validate_not_a_forked_repo = lambda a, b, c: True  # workaround for r
 
 
 class DetrLearner(Learner):
+    supports_batching = True
+    supports_fit_callbacks = True
+
     def __init__(
             self,
             model_config_path=os.path.join(
@@ -235,7 +236,8 @@ class DetrLearner(Learner):
         model_path = os.path.join(path, metadata['model_paths'][0])
 
         if metadata['optimized']:
-            self.ort_session = ort.InferenceSession(model_path)
+            from opendr.engine.helper.sessions import create_session
+            self.ort_session = create_session(model_path)
             print("Loaded ONNX model.")
         else:
             self.__create_model()
@@ -334,6 +336,7 @@ class DetrLearner(Learner):
             logging = True
             if not os.path.exists(logging_path):
                 os.mkdir(logging_path)
+            from torch.utils.tensorboard import SummaryWriter
             writer = SummaryWriter(logging_path)
         else:
             logging = False
@@ -469,6 +472,11 @@ class DetrLearner(Learner):
                             k = k + '_mean'
                         writer.add_scalar(f'test_{k}', v, self.epoch + 1)
 
+            if val_dataset is not None and self._report_fit_metrics(self.epoch, test_stats):
+                if not silent:
+                    print("Training stopped by a fit callback after epoch {}".format(self.epoch))
+                break
+
         total_time = time.time() - start_time
         total_time_str = str(datetime.timedelta(seconds=int(total_time)))
 
@@ -566,38 +574,75 @@ class DetrLearner(Learner):
 
         Parameters
         ----------
-        image : engine.data.Image class object
-            Image to run inference on.
+        image : engine.data.Image or engine.data.ImageBatch class object
+            Image to run inference on, or batch of images to run inference on
+            in a single forward pass.
 
         Returns
         -------
-        engine.target.BoundingBoxList
+        engine.target.BoundingBoxList or list of engine.target.BoundingBoxList
             The engine.target.BoundingBoxList contains bounding boxes that are
             described by the left-top corner and its width and height, or
-            returns an empty list if no detections were made.
+            returns an empty list if no detections were made. For a batch, one
+            engine.target.BoundingBoxList is returned per image, in the
+            coordinates of the original image.
 
+        """
+        with self._profile("infer"):
+            # The inputs are converted to PIL images within the preprocessing stage of detect_batch, so that each
+            # call records a single preprocessing span
+            if isinstance(image, ImageBatch):
+                detections = detect_batch(list(image.numpy(copy=False)), self.infer_transform, self.model,
+                                          self.postprocessors, self.device,
+                                          self.threshold, self.ort_session,
+                                          self.args.masks, self._profile,
+                                          convert=lambda img: im.fromarray(np.transpose(img, (1, 2, 0))))
+                with self._profile("target"):
+                    return [self.__bounding_box_list(scores, boxes, segmentations, image, i)
+                            for i, (scores, boxes, segmentations) in enumerate(detections)]
+
+            scores, boxes, segmentations = detect(image, self.infer_transform, self.model,
+                                                  self.postprocessors, self.device,
+                                                  self.threshold, self.ort_session,
+                                                  self.args.masks, self._profile,
+                                                  convert=self.__pil_image)
+            with self._profile("target"):
+                return self.__bounding_box_list(scores, boxes, segmentations)
+
+    @staticmethod
+    def __pil_image(image):
+        """
+        Converts an image to an RGB PIL image.
         """
         if not isinstance(image, Image):
             image = Image(image)
-        img = im.fromarray(image.convert("channels_last", "rgb"))
-
-        scores, boxes, segmentations = detect(img, self.infer_transform, self.model,
-                                              self.postprocessors, self.device,
-                                              self.threshold, self.ort_session,
-                                              self.args.masks)
+        return im.fromarray(image.convert("channels_last", "rgb", copy=False))
 
-        boxlist = []
-        if len(segmentations) == len(scores):
+    @staticmethod
+    def __bounding_box_list(scores, boxes, segmentations, batch=None, index=None):
+        """
+        Converts the detections of an image to an engine.target.BoundingBoxList, mapping them back to the original
+        image if the image was letterboxed into an engine.data.ImageBatch.
+        """
+        boxes = boxes.detach().cpu().numpy()
+        if batch is not None:
+            boxes = batch.to_original(boxes, index)
+            # Each segmentation is a polygon given as a flat [x0, y0, x1, y1, ...] list
+            segmentations = [batch.to_original(segmentation, index).tolist() for segmentation in segmentations]
+
+        if len(segmentations) == len(scores) and len(scores) > 0:
+            boxlist = []
             for p, (xmin, ymin, xmax, ymax), segmentation in zip(scores.tolist(), boxes.tolist(), segmentations):
                 cl = np.argmax(p)
                 box = CocoBoundingBox(cl, xmin, ymin, xmax-xmin, ymax-ymin, score=p[cl], segmentation=segmentation)
                 boxlist.append(box)
-        else:
-            for p, (xmin, ymin, xmax, ymax) in zip(scores.tolist(), boxes.tolist()):
-                cl = np.argmax(p)
-                box = CocoBoundingBox(cl, xmin, ymin, xmax-xmin, ymax-ymin, score=p[cl])
-                boxlist.append(box)
-        return BoundingBoxList(boxlist)
+            return BoundingBoxList(boxlist)
+
+        scores = scores.detach().cpu().numpy()
+        classes = np.argmax(scores, axis=1)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, scores[np.arange(classes.shape[0]), classes], classes,
+                                                    box_type=CocoBoundingBox)
+        return bounding_boxes
 
     def optimize(self, do_constant_folding=False):
         """
@@ -653,7 +698,8 @@ class DetrLearner(Learner):
 
         print("Exported onnx model")
 
-        self.ort_session = ort.InferenceSession(
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(
             os.path.join(self.temp_path, "onnx_model_temp.onnx")
             )
         return True
@@ -22,8 +22,7 @@ import warnings
 import torch
 import ntpath
 from torch.utils.data import DataLoader
-from torch.utils.tensorboard import SummaryWriter
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from opendr.perception.object_detection_2d.detr.algorithm.datasets import get_coco_api_from_dataset
 from opendr.perception.object_detection_2d.detr.algorithm.datasets.coco import map_bounding_box_list_to_coco
@@ -352,6 +351,7 @@ class GemLearner(Learner):
             logging = True
             if not os.path.exists(logging_path):
                 os.mkdir(logging_path)
+            from torch.utils.tensorboard import SummaryWriter
             writer = SummaryWriter(logging_path)
         else:
             logging = False
@@ -687,18 +687,20 @@ class GemLearner(Learner):
         normed_weight1 = weight1 / (weight1 + weight2)
         normed_weight2 = weight2 / (weight1 + weight2)
 
-        boxlist = []
-        if len(segmentations) == len(scores):
+        if len(segmentations) == len(scores) and len(scores) > 0:
+            boxlist = []
             for p, (xmin, ymin, xmax, ymax), segmentation in zip(scores.tolist(), boxes.tolist(), segmentations):
                 cl = np.argmax(p)
                 box = CocoBoundingBox(cl, xmin, ymin, xmax - xmin, ymax - ymin, score=p[cl], segmentation=segmentation)
                 boxlist.append(box)
-        else:
-            for p, (xmin, ymin, xmax, ymax) in zip(scores.tolist(), boxes.tolist()):
-                cl = np.argmax(p)
-                box = CocoBoundingBox(cl, xmin, ymin, xmax - xmin, ymax - ymin, score=p[cl])
-                boxlist.append(box)
-        return BoundingBoxList(boxlist), normed_weight1, normed_weight2
+            return BoundingBoxList(boxlist), normed_weight1, normed_weight2
+
+        scores = scores.detach().cpu().numpy()
+        classes = np.argmax(scores, axis=1)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes.detach().cpu().numpy(),
+                                                    scores[np.arange(classes.shape[0]), classes], classes,
+                                                    box_type=CocoBoundingBox)
+        return bounding_boxes, normed_weight1, normed_weight2
 
     def optimize(self):
         """This method is not used in this implementation."""
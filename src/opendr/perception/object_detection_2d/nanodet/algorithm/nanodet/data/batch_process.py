@@ -43,7 +43,7 @@ def divisible_padding(
     """
     Helper function which uses only pytorch api for scripting and tracing.
     Args:
-        img_tensor (torch.Tensor):
+        img_tensor (torch.Tensor): an image, or a batch of images
         divisible (int):
         pad_value (float): value to pad
 
@@ -61,4 +61,7 @@ def divisible_padding(
 
     padding_size = [0, img_widths - img_tensor.shape[-1], 0, img_heights - img_tensor.shape[-2]]
     batch_img = F.pad(img_tensor, padding_size, value=pad_value)
+    if batch_img.dim() == 4:
+        # already a batch of images
+        return batch_img
     return batch_img.unsqueeze(0)
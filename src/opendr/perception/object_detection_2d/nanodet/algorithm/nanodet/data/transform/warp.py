@@ -165,6 +165,28 @@ def scriptable_warp_boxes(boxes, M, width, height):
         return boxes
 
 
+def scriptable_warp_boxes_batch(boxes, M, width, height):
+    """
+    Warp boxes function of scriptable_warp_boxes() for boxes with different transforms, e.g., of the images of a batch,
+    given as (n, 3, 3) matrices and (n,) widths and heights.
+    """
+    n = boxes.shape[0]
+    # warp points
+    xy = torch.ones((n, 4, 3), dtype=torch.float32, device=boxes.device)
+    xy[:, :, :2] = boxes[:, [0, 1, 2, 3, 0, 3, 2, 1]].reshape(n, 4, 2)  # x1y1, x2y2, x1y2, x2y1
+    xy = torch.bmm(xy, torch.transpose(M, 1, 2).float())  # transform
+    x = xy[:, :, 0] / xy[:, :, 2]  # rescale
+    y = xy[:, :, 1] / xy[:, :, 2]
+    # create new boxes and clip them
+    zeros = torch.zeros_like(x[:, 0])
+    width = width.to(x)
+    height = height.to(x)
+    return torch.stack((torch.minimum(torch.maximum(x.min(1).values, zeros), width),
+                        torch.minimum(torch.maximum(y.min(1).values, zeros), height),
+                        torch.minimum(torch.maximum(x.max(1).values, zeros), width),
+                        torch.minimum(torch.maximum(y.max(1).values, zeros), height)), dim=1)
+
+
 def warp_boxes(boxes, M, width, height):
     n = len(boxes)
     if n:
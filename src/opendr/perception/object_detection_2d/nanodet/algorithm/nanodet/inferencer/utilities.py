@@ -17,7 +17,8 @@
 import torch
 import torch.nn as nn
 
-from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.data.batch_process import divisible_padding
+from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.data.batch_process import divisible_padding, \
+    stack_batch_img
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.data.transform import Pipeline
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.arch import build_model
 
@@ -51,8 +52,9 @@ class Predictor(nn.Module):
         return True
 
     def script_model(self, img, height, width, warp_matrix):
+        # The scripted model processes a batch of images, see preprocessing_batch()
         preds = self.traced_model(img, height, width, warp_matrix)
-        scripted_model = self.postprocessing(preds, img, height, width, warp_matrix)
+        scripted_model = self.postprocessing_batch(preds, img, height, width, warp_matrix)
         return scripted_model
 
     def forward(self, img, height=torch.tensor(0), width=torch.tensor(0), warp_matrix=torch.tensor(0)):
@@ -82,9 +84,34 @@ class Predictor(nn.Module):
 
         return _input, _height, _width, _warp_matrix
 
+    def preprocessing_batch(self, imgs):
+        """
+        Preprocesses several images into a batch that is forwarded at once, with the height, width and warp matrix of
+        each image stacked in (B,), (B,) and (B, 3, 3) tensors.
+        """
+        inputs, heights, widths, warp_matrices = [], [], [], []
+        for img in imgs:
+            _input, _height, _width, _warp_matrix = self.preprocessing(img)
+            inputs.append(_input)
+            heights.append(_height)
+            widths.append(_width)
+            warp_matrices.append(_warp_matrix)
+        _input = stack_batch_img(inputs, divisible=32)
+        return _input, torch.stack(heights), torch.stack(widths), torch.stack(warp_matrices)
+
     def postprocessing(self, preds, input, height, width, warp_matrix):
         meta = {"height": height, "width": width, 'img': input, 'warp_matrix': warp_matrix}
         meta["img"] = divisible_padding(meta["img"], divisible=torch.tensor(32))
         res = self.model.head.post_process(preds, meta, conf_thresh=self.conf_thresh, iou_thresh=self.iou_thresh,
                                            nms_max_num=self.nms_max_num)
         return res
+
+    def postprocessing_batch(self, preds, input, height, width, warp_matrix):
+        """
+        Postprocesses the predictions of a batch of images at once, and returns the image index, box, score and label
+        of the detections as a single (K, 7) tensor, see post_process_batch() of the heads.
+        """
+        meta = {"height": height, "width": width, 'img': input, 'warp_matrix': warp_matrix}
+        meta["img"] = divisible_padding(meta["img"], divisible=torch.tensor(32))
+        return self.model.head.post_process_batch(preds, meta, conf_thresh=self.conf_thresh,
+                                                  iou_thresh=self.iou_thresh, nms_max_num=self.nms_max_num)
@@ -9,14 +9,15 @@ from typing import List, Tuple, Dict
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.util\
     import bbox2distance, distance2bbox, multi_apply
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.data.transform.warp \
-    import warp_boxes, scriptable_warp_boxes
+    import warp_boxes, scriptable_warp_boxes, scriptable_warp_boxes_batch
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.loss.gfocal_loss \
     import DistributionFocalLoss, QualityFocalLoss
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.loss.iou_loss import GIoULoss
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.module.conv \
     import ConvModule, DepthwiseConvModule
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.module.init_weights import normal_init
-from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.module.nms import multiclass_nms
+from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.module.nms import multiclass_nms, \
+    batched_multiclass_nms
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.head.assigner.dsl_assigner \
     import DynamicSoftLabelAssigner
 from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.model.head.gfl_head import Integral, reduce_mean
@@ -402,6 +403,37 @@ class NanoDetPlusHead(nn.Module):
 
         return det_result
 
+    def post_process_batch(self, preds, meta: Dict[str, Tensor], conf_thresh: float = 0.05, iou_thresh: float = 0.6,
+                           nms_max_num: int = 100):
+        """Prediction results postprocessing of a batch of images at once.
+        Decode the bboxes of all the images, run NMS on them together and
+        rescale them to the original size of each image.
+        Args:
+            preds (Tensor): Prediction output of the batch.
+            meta (dict): Meta info, with the warp matrices (num_imgs, 3, 3),
+                widths (num_imgs,) and heights (num_imgs,) of the images.
+            conf_thresh (float): Determines the confidence threshold.
+            iou_thresh (float): Determines the iou threshold.
+            nms_max_num (int): Determines the maximum number of bounding boxes of each image that will be retained
+                following the nms.
+        Returns:
+            Tensor: shape (k, 7), the image index, bbox, score and label of
+                the detections, grouped by image.
+        """
+        cls_scores, bbox_preds = preds.split(
+            [self.num_classes, 4 * (self.reg_max + 1)], dim=-1
+        )
+        scores, bboxes = self.decode_bboxes(cls_scores, bbox_preds, meta["img"])
+        dets = batched_multiclass_nms(bboxes, scores, score_thr=conf_thresh,
+                                      nms_cfg=dict(iou_threshold=iou_thresh), max_num=nms_max_num)
+        img_inds = dets[:, 0].long()
+        warp_matrix = torch.linalg.inv(meta["warp_matrix"].to(dets.device))[img_inds]
+        dets[:, 1:5] = scriptable_warp_boxes_batch(
+            dets[:, 1:5], warp_matrix,
+            meta["width"].to(dets.device)[img_inds], meta["height"].to(dets.device)[img_inds]
+        )
+        return dets
+
     def _eval_post_process(self, preds, meta):
         cls_scores, bbox_preds = preds.split(
             [self.num_classes, 4 * (self.reg_max + 1)], dim=-1
@@ -465,27 +497,8 @@ class NanoDetPlusHead(nn.Module):
         Returns:
             results_list (list[tuple]): List of detection bboxes and labels.
         """
-        device = cls_preds.device
         b = cls_preds.shape[0]
-        input_height, input_width = input_img.shape[2:]
-        input_shape = (input_height, input_width)
-
-        featmap_sizes = [
-            (int(math.ceil(input_height / stride)), int(math.ceil(input_width / stride)))
-            for stride in self.strides
-        ]
-        # get grid cells of one image
-        mlvl_center_priors = []
-        for i, stride in enumerate(self.strides):
-            proiors = self.get_single_level_center_priors(
-                b, featmap_sizes[i], stride, torch.float32, device
-            )
-            mlvl_center_priors.append(proiors)
-
-        center_priors = torch.cat(mlvl_center_priors, dim=1)
-        dis_preds = self.distribution_project(reg_preds) * center_priors[..., 2, None]
-        bboxes = distance2bbox(center_priors[..., :2], dis_preds, max_shape=input_shape)
-        cls_preds = cls_preds.sigmoid()
+        cls_preds, bboxes = self.decode_bboxes(cls_preds, reg_preds, input_img)
         # add a dummy background class at the end of all labels
         if torch.jit.is_scripting() or mode == "infer":
             # for faster inference and jit scripting in most common cases we do not try to go through for statement
@@ -513,6 +526,39 @@ class NanoDetPlusHead(nn.Module):
             result_list.append(results)
         return result_list
 
+    def decode_bboxes(self, cls_preds, reg_preds, input_img):
+        """Decode the outputs of a batch to scores and bboxes, before NMS.
+        Args:
+            cls_preds (Tensor): Shape (num_imgs, num_points, num_classes).
+            reg_preds (Tensor): Shape (num_imgs, num_points, 4 * (regmax + 1)).
+            input_img (Tensor): Input image to net.
+        Returns:
+            tuple[Tensor]: scores of shape (num_imgs, num_points, num_classes)
+                and bboxes of shape (num_imgs, num_points, 4).
+        """
+        device = cls_preds.device
+        b = cls_preds.shape[0]
+        input_height, input_width = input_img.shape[2:]
+        input_shape = (input_height, input_width)
+
+        featmap_sizes = [
+            (int(math.ceil(input_height / stride)), int(math.ceil(input_width / stride)))
+            for stride in self.strides
+        ]
+        # get grid cells of one image
+        mlvl_center_priors = []
+        for i, stride in enumerate(self.strides):
+            proiors = self.get_single_level_center_priors(
+                b, featmap_sizes[i], stride, torch.float32, device
+            )
+            mlvl_center_priors.append(proiors)
+
+        center_priors = torch.cat(mlvl_center_priors, dim=1)
+        dis_preds = self.distribution_project(reg_preds) * center_priors[..., 2, None]
+        bboxes = distance2bbox(center_priors[..., :2], dis_preds, max_shape=input_shape)
+        cls_preds = cls_preds.sigmoid()
+        return cls_preds, bboxes
+
     def get_single_level_center_priors(
             self,
             batch_size: int,
@@ -70,6 +70,59 @@ def multiclass_nms(
     return dets, labels[keep]
 
 
+def batched_multiclass_nms(
+    multi_bboxes,
+    multi_scores,
+    score_thr: float,
+    nms_cfg: Dict[str, float],
+    max_num: int = -1
+):
+    """NMS for the multi-class bboxes of a batch of images at once. The
+    bboxes of each image and class only suppress each other, as with
+    multiclass_nms() on each image, but NMS runs once for the whole batch.
+
+    Args:
+        multi_bboxes (Tensor): shape (b, n, 4)
+        multi_scores (Tensor): shape (b, n, #class), without a background
+            class.
+        score_thr (float): bbox threshold, bboxes with scores lower than it
+            will not be considered.
+        nms_cfg (dictionary): dictionary of the type and threshold of IoU
+        max_num (int): if there are more than max_num bboxes of an image
+            after NMS, only its top max_num will be kept.
+
+    Returns:
+        Tensor: shape (k, 7), the image index, bbox, score and 0-based label
+            of the kept bboxes, grouped by image and sorted by decreasing
+            score in each image.
+    """
+    num_imgs = multi_scores.size(0)
+    num_classes = multi_scores.size(2)
+    inds = torch.nonzero(multi_scores > score_thr)
+    if inds.numel() == 0:
+        return multi_bboxes.new_zeros((0, 7))
+    img_inds = inds[:, 0]
+    labels = inds[:, 2]
+    bboxes = multi_bboxes[img_inds, inds[:, 1]]
+    scores = multi_scores[img_inds, inds[:, 1], labels]
+
+    dets, keep = batched_nms(bboxes, scores, img_inds * num_classes + labels, nms_cfg)
+    img_inds = img_inds[keep]
+    labels = labels[keep]
+
+    if max_num > 0:
+        # rank of each bbox among those of its image, as dets are sorted by decreasing score
+        img_range = torch.arange(num_imgs, device=img_inds.device)
+        ranks = torch.cumsum((img_inds[:, None] == img_range[None]).long(), dim=0)
+        top = ranks.gather(1, img_inds[:, None]).squeeze(1) <= max_num
+        dets = dets[top]
+        img_inds = img_inds[top]
+        labels = labels[top]
+
+    order = torch.argsort(img_inds * dets.shape[0] + torch.arange(dets.shape[0], device=dets.device))
+    return torch.cat([img_inds[:, None].to(dets), dets, labels[:, None].to(dets)], dim=1)[order]
+
+
 def batched_nms(boxes, scores, idxs, nms_cfg: Dict[str, float], class_agnostic: bool = False):
     """Performs non-maximum suppression in a batched fashion.
     Modified from https://github.com/pytorch/vision/blob
@@ -37,13 +37,16 @@ class TrainingTask(LightningModule):
     Args:
         cfg: Training configurations
         evaluator: Evaluator for evaluating the model performance.
+        fit_callback: Called with the epoch and the evaluation results at the
+            end of each validation epoch, training stops if it returns True.
     """
 
-    def __init__(self, cfg, model, evaluator=None):
+    def __init__(self, cfg, model, evaluator=None, fit_callback=None):
         super(TrainingTask, self).__init__()
         self.cfg = cfg
         self.model = model
         self.evaluator = evaluator
+        self.fit_callback = fit_callback
         self.save_flag = -10
         self.log_style = "NanoDet"
         self.weight_averager = None
@@ -195,6 +198,8 @@ class TrainingTask(LightningModule):
                 )
             if self.logger:
                 self.logger.log_metrics(eval_results, self.current_epoch + 1)
+            if self.fit_callback is not None and self.fit_callback(self.current_epoch, eval_results):
+                self.trainer.should_stop = True
         else:
             if self.logger:
                 self.logger.info("Skip val on rank {}".format(self.local_rank))
@@ -14,10 +14,12 @@
 
 import os
 import datetime
+import shutil
 import json
 import warnings
 from pathlib import Path
 
+import numpy as np
 import pytorch_lightning as pl
 import torch
 from pytorch_lightning.callbacks import ProgressBar
@@ -37,14 +39,14 @@ from opendr.perception.object_detection_2d.nanodet.algorithm.nanodet.util import
     mkdir,
 )
 
-from opendr.engine.data import Image
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.data import Image, ImageBatch
+from opendr.engine.target import BoundingBoxList
 from opendr.engine.constants import OPENDR_SERVER_URL
 
 from opendr.engine.learners import Learner
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
 
-import onnxruntime as ort
 
 _MODEL_NAMES = {"EfficientNet_Lite0_320", "EfficientNet_Lite1_416", "EfficientNet_Lite2_512",
                 "RepVGG_A0_416", "t", "g", "m", "m_416", "m_0.5x", "m_1.5x", "m_1.5x_416",
@@ -52,6 +54,9 @@ _MODEL_NAMES = {"EfficientNet_Lite0_320", "EfficientNet_Lite1_416", "EfficientNe
 
 
 class NanodetLearner(Learner):
+    supports_batching = True
+    supports_fit_callbacks = True
+
     def __init__(self, model_to_use="m", iters=None, lr=None, batch_size=None, checkpoint_after_iter=None,
                  checkpoint_load_iter=None, temp_path='', device='cuda', weight_decay=None, warmup_steps=None,
                  warmup_ratio=None, lr_schedule_T_max=None, lr_schedule_eta_min=None, grad_clip=None):
@@ -87,6 +92,11 @@ class NanodetLearner(Learner):
         self.ort_session = None
         self.jit_model = None
         self.predictor = None
+        # Report and path of the INT8 quantized ONNX model, see optimize()
+        self.quantization = None
+        self._int8_path = None
+        # Whether the loaded JIT or ONNX model takes a batch of images, as those exported by optimize(), see infer()
+        self._batched_export = False
 
         self.pipeline = None
         self.model = build_model(self.cfg.model)
@@ -191,6 +201,9 @@ class NanodetLearner(Learner):
 
         if self.ort_session:
             self._save_onnx(path, verbose=verbose)
+            if self.quantization is not None:
+                # The INT8 model is saved alongside the float ONNX model
+                self.__add_int8(path, self._int8_path, self.quantization)
             return
         if self.jit_model:
             self._save_jit(path, verbose=verbose)
@@ -232,8 +245,12 @@ class NanodetLearner(Learner):
             metadata = json.load(f)
 
         if metadata['optimized']:
+            self._batched_export = metadata["inference_params"].get("batched", False)
             if metadata['format'] == "onnx":
                 self._load_onnx(os.path.join(path, metadata["model_paths"][0]), verbose=verbose)
+                if metadata["optimizer_info"].get("target") == "cpu-int8":
+                    self.quantization = metadata["optimizer_info"]
+                    self._int8_path = os.path.join(path, metadata["model_paths"][0])
                 print("Loaded ONNX model.")
             else:
                 self._load_jit(os.path.join(path, metadata["model_paths"][0]), verbose=verbose)
@@ -356,11 +373,12 @@ class NanodetLearner(Learner):
 
     def __dummy_input(self):
         width, height = self.cfg.data.val.input_size
+        # The exported models take a batch of images, with the height, width and warp matrix of each image
         dummy_input = (
-            torch.randn((3, width, height), device=self.device, dtype=torch.float32),
-            torch.tensor(width, device="cpu", dtype=torch.int64),
-            torch.tensor(height, device="cpu", dtype=torch.int64),
-            torch.eye(3, device="cpu", dtype=torch.float32),
+            torch.randn((1, 3, height, width), device=self.device, dtype=torch.float32),
+            torch.tensor([height], device="cpu", dtype=torch.int64),
+            torch.tensor([width], device="cpu", dtype=torch.int64),
+            torch.eye(3, device="cpu", dtype=torch.float32).unsqueeze(0),
         )
         return dummy_input
 
@@ -385,14 +403,18 @@ class NanodetLearner(Learner):
             opset_version=11,
             input_names=['data'],
             output_names=['output'],
-            dynamic_axes={'data': {1: 'width',
-                                   2: 'height'}}
+            dynamic_axes={'data': {0: 'batch',
+                                   2: 'height',
+                                   3: 'width'},
+                          'output': {0: 'batch',
+                                     1: 'points'}}
         )
 
         metadata = {"model_paths": ["nanodet_{}.onnx".format(self.cfg.check_point_name)], "framework": "pytorch",
                     "format": "onnx", "has_data": False, "optimized": True, "optimizer_info": {},
                     "inference_params": {"input_size": self.cfg.data.val.input_size, "classes": self.classes,
-                                         "conf_threshold": conf_threshold, "iou_threshold": iou_threshold}}
+                                         "conf_threshold": conf_threshold, "iou_threshold": iou_threshold,
+                                         "batched": True}}
 
         with open(os.path.join(onnx_path, "nanodet_{}.json".format(self.cfg.check_point_name)),
                   'w', encoding='utf-8') as f:
@@ -420,11 +442,44 @@ class NanodetLearner(Learner):
             if verbose:
                 print("ONNX simplified failed.")
 
+    def _save_int8(self, export_path, calibration_dataset, calibration_samples=100, verbose=True, conf_threshold=0.35,
+                   iou_threshold=0.6, nms_max_num=100):
+        self._save_onnx(export_path, verbose=verbose, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
+                        nms_max_num=nms_max_num)
+
+        if verbose:
+            print("Calibrating the INT8 quantization...")
+        export_path = os.path.join(export_path, "nanodet_{}".format(self.cfg.check_point_name))
+        inputs = calibration_inputs(calibration_dataset, self.__calibration_input, calibration_samples)
+        report = quantize_int8(export_path + ".onnx", export_path + "_int8.onnx", inputs, verbose=verbose)
+        self.__add_int8(os.path.dirname(export_path), export_path + "_int8.onnx", report)
+
+    def __calibration_input(self, img):
+        if not isinstance(img, Image):
+            img = Image(img)
+        _input, *_ = self.predictor.preprocessing(img.opencv(copy=False))
+        return _input.unsqueeze(0).cpu().detach().numpy()
+
+    def __add_int8(self, path, int8_path, report):
+        """
+        Adds an INT8 model to the float ONNX model saved in path, which remains available as the second model.
+        """
+        name = "nanodet_{}".format(self.cfg.check_point_name)
+        if os.path.abspath(int8_path) != os.path.abspath(os.path.join(path, name + "_int8.onnx")):
+            shutil.copy2(int8_path, os.path.join(path, name + "_int8.onnx"))
+        with open(os.path.join(path, name + ".json"), encoding='utf-8') as f:
+            metadata = json.load(f)
+        metadata["model_paths"] = [name + "_int8.onnx", name + ".onnx"]
+        metadata["optimizer_info"] = report
+        with open(os.path.join(path, name + ".json"), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=4)
+
     def _load_onnx(self, onnx_path, verbose=True):
         if verbose:
             print("Loading ONNX runtime inference session from {}".format(onnx_path))
 
-        self.ort_session = ort.InferenceSession(onnx_path)
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(onnx_path, io_binding=True)
 
     def _save_jit(self, jit_path, verbose=True, conf_threshold=0.35, iou_threshold=0.6,
                   nms_max_num=100):
@@ -445,7 +500,8 @@ class NanodetLearner(Learner):
             metadata = {"model_paths": ["nanodet_{}.pth".format(self.cfg.check_point_name)], "framework": "pytorch",
                         "format": "pth", "has_data": False, "optimized": True, "optimizer_info": {},
                         "inference_params": {"input_size": self.cfg.data.val.input_size, "classes": self.classes,
-                                             "conf_threshold": conf_threshold, "iou_threshold": iou_threshold}}
+                                             "conf_threshold": conf_threshold, "iou_threshold": iou_threshold,
+                                             "batched": True}}
             model_traced.save(export_path)
 
             with open(os.path.join(jit_path, "nanodet_{}.json".format(self.cfg.check_point_name)),
@@ -462,15 +518,18 @@ class NanodetLearner(Learner):
         self.jit_model = torch.jit.load(jit_path, map_location=self.device)
 
     def optimize(self, export_path, verbose=True, optimization="jit", conf_threshold=0.35, iou_threshold=0.6,
-                 nms_max_num=100):
+                 nms_max_num=100, calibration_dataset=None, calibration_samples=100):
         """
         Method for optimizing the model with ONNX or JIT.
+        With the 'cpu-int8' optimization, the ONNX model is also quantized to INT8 for CPU inference, with post-training
+        static quantization calibrated on the images of calibration_dataset. The INT8 model is saved alongside the
+        float ONNX model and loaded, and the report of its quantization is kept in self.quantization.
         :param export_path: The file path to the folder where the optimized model will be saved. If a model already
         exists at this path, it will be overwritten.
         :type export_path: str
         :param verbose: if set to True, additional information is printed to STDOUT
         :type verbose: bool, optional
-        :param optimization: the kind of optimization you want to perform [jit, onnx]
+        :param optimization: the kind of optimization you want to perform [jit, onnx, cpu-int8]
         :type optimization: str
         :param conf_threshold: confidence threshold
         :type conf_threshold: float, optional
@@ -478,10 +537,24 @@ class NanodetLearner(Learner):
         :type iou_threshold: float, optional
         :param nms_max_num: determines the maximum number of bounding boxes that will be retained following the nms.
         :type nms_max_num: int
+        :param calibration_dataset: dataset whose images (or (image, target) tuples) calibrate the quantization,
+            required for the 'cpu-int8' optimization
+        :type calibration_dataset: engine.datasets.DatasetIterator, optional
+        :param calibration_samples: maximum number of images used for the calibration
+        :type calibration_samples: int, optional
+        :return: for the 'cpu-int8' optimization, the report of the quantization, with the difference between the
+            outputs of the float and INT8 models on the calibration images, see
+            engine.helper.quantization.quantize_int8()
+        :rtype: dict
         """
 
         optimization = optimization.lower()
-        if not os.path.exists(export_path):
+        check_target(optimization, calibration_dataset, ("jit", "onnx", "cpu-int8"))
+        int8_path = os.path.join(export_path, "nanodet_{}_int8.onnx".format(self.cfg.check_point_name))
+        if optimization == "cpu-int8" and not os.path.exists(int8_path):
+            self._save_int8(export_path, calibration_dataset, calibration_samples, verbose=verbose,
+                            conf_threshold=conf_threshold, iou_threshold=iou_threshold, nms_max_num=nms_max_num)
+        elif not os.path.exists(export_path):
             if optimization == "jit":
                 self._save_jit(export_path, verbose=verbose, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
                                nms_max_num=nms_max_num)
@@ -492,10 +565,17 @@ class NanodetLearner(Learner):
                 assert NotImplementedError
         with open(os.path.join(export_path, "nanodet_{}.json".format(self.cfg.check_point_name))) as f:
             metadata = json.load(f)
+        self._batched_export = metadata["inference_params"].get("batched", False)
         if optimization == "jit":
             self._load_jit(os.path.join(export_path, metadata["model_paths"][0]), verbose)
         elif optimization == "onnx":
-            self._load_onnx(os.path.join(export_path, metadata["model_paths"][0]), verbose)
+            self._load_onnx(os.path.join(export_path, metadata["model_paths"][-1]), verbose)
+            self.quantization = None
+        elif optimization == "cpu-int8":
+            self._load_onnx(int8_path, verbose)
+            self.quantization = metadata["optimizer_info"]
+            self._int8_path = int8_path
+            return self.quantization
         else:
             assert NotImplementedError
 
@@ -572,7 +652,7 @@ class NanodetLearner(Learner):
             self.logger.info("Creating task...")
         elif verbose:
             print("Creating task...")
-        self.task = TrainingTask(self.cfg, self.model, evaluator)
+        self.task = TrainingTask(self.cfg, self.model, evaluator, fit_callback=self._report_fit_metrics)
 
         gpu_ids = None
         accelerator = None
@@ -669,51 +749,127 @@ class NanodetLearner(Learner):
     def infer(self, input, conf_threshold=0.35, iou_threshold=0.6, nms_max_num=100):
         """
         Performs inference
-        :param input: input image to perform inference on
-        :type input: opendr.data.Image
+        :param input: input image to perform inference on, or a batch of images (a list of images or an ImageBatch)
+            to perform inference on in a single forward pass
+        :type input: opendr.data.Image, list of opendr.data.Image or opendr.data.ImageBatch
         :param conf_threshold: confidence threshold
         :type conf_threshold: float, optional
         :param iou_threshold: iou threshold
         :type iou_threshold: float, optional
-        :param nms_max_num: determines the maximum number of bounding boxes that will be retained following the nms.
+        :param nms_max_num: determines the maximum number of bounding boxes of each image that will be retained
+            following the nms.
         :type nms_max_num: int
-        :return: list of bounding boxes of last image of input or last frame of the video
-        :rtype: opendr.engine.target.BoundingBoxList
+        :return: list of bounding boxes of last image of input or last frame of the video, or one list of bounding
+            boxes per image for a batch
+        :rtype: opendr.engine.target.BoundingBoxList or list of opendr.engine.target.BoundingBoxList
         """
         if not self.predictor:
             self.predictor = Predictor(self.cfg, self.model, device=self.device, conf_thresh=conf_threshold,
                                        iou_thresh=iou_threshold, nms_max_num=nms_max_num)
 
-        if not isinstance(input, Image):
-            input = Image(input)
-        _input = input.opencv()
+        with self._profile("infer"):
+            results = self.__infer_images(input)
+            return results if isinstance(input, (list, tuple, ImageBatch)) else results[0]
+
+    @staticmethod
+    def __opencv_images(input):
+        """
+        Converts the input of infer() to a list of HWC/BGR images.
+        """
+        if isinstance(input, ImageBatch):
+            return [np.ascontiguousarray(np.transpose(img[::-1], (1, 2, 0))) for img in input.numpy(copy=False)]
+        images = input if isinstance(input, (list, tuple)) else [input]
+        return [(img if isinstance(img, Image) else Image(img)).opencv(copy=False) for img in images]
 
-        _input, *metadata = self.predictor.preprocessing(_input)
+    def __infer_images(self, input):
+        """
+        Runs the detector on the images of the input of infer() in a single forward pass and returns one
+        BoundingBoxList per image, in the coordinates of the original images if they were letterboxed into an
+        ImageBatch.
+        Each image is warped to the input size of the model with its own warp matrix, and the detections of all the
+        images are postprocessed at once and copied to host in a single (K, 7) array.
+        """
+        batch = input if isinstance(input, ImageBatch) else None
+        if (self.ort_session or self.jit_model) and not self._batched_export:
+            # Models exported before batching was supported process a single image
+            with self._profile("preprocess"):
+                inputs = [self.predictor.preprocessing(img) for img in self.__opencv_images(input)]
+            results = [self.__infer_single(*_input) for _input in inputs]
+            with self._profile("target"):
+                return [self.__bounding_boxes(res, batch, i) for i, res in enumerate(results)]
+
+        # The conversion of the input is part of the preprocessing, so that each frame records a single span
+        with self._profile("preprocess"):
+            images = self.__opencv_images(input)
+            _input, *metadata = self.predictor.preprocessing_batch(images)
 
         if self.ort_session:
             if self.jit_model:
                 warnings.warn(
                     "Warning: Both JIT and ONNX models are initialized, inference will run in ONNX mode by default.\n"
                     "To run in JIT please delete the self.ort_session like: detector.ort_session = None.")
-            preds = self.ort_session.run(['output'], {'data': _input.cpu().detach().numpy()})
-            res = self.predictor.postprocessing(torch.from_numpy(preds[0]), _input, *metadata)
+            with self._profile("forward"):
+                preds = self.ort_session.run(['output'], {'data': _input.cpu().detach().numpy()})
+            with self._profile("postprocess"):
+                dets = self.predictor.postprocessing_batch(torch.from_numpy(preds[0]), _input, *metadata)
         elif self.jit_model:
-            res = self.jit_model(_input, *metadata)
+            # The exported model includes the postprocessing
+            with self._profile("forward"):
+                dets = self.jit_model(_input, *metadata)
         else:
-            preds = self.predictor(_input, *metadata)
-            res = self.predictor.postprocessing(preds, _input, *metadata)
-
-        bounding_boxes = []
-        for label in res:
-            for box in label:
-                box = box.to("cpu")
-                bbox = BoundingBox(left=box[0], top=box[1],
-                                   width=box[2] - box[0],
-                                   height=box[3] - box[1],
-                                   name=box[5],
-                                   score=box[4])
-                bounding_boxes.append(bbox)
-        bounding_boxes = BoundingBoxList(bounding_boxes)
-        bounding_boxes.data.sort(key=lambda v: v.confidence)
+            with self._profile("forward"):
+                preds = self.predictor(_input)
+            with self._profile("postprocess"):
+                dets = self.predictor.postprocessing_batch(preds, _input, *metadata)
+
+        with self._profile("target"):
+            # The detections are grouped by image
+            dets = dets.cpu().numpy()
+            bounds = np.searchsorted(dets[:, 0], np.arange(len(images) + 1), side="left")
+            return [self.__bounding_box_list(dets[bounds[i]:bounds[i + 1], 1:], batch, i)
+                    for i in range(len(images))]
+
+    def __infer_single(self, _input, *metadata):
+        """
+        Runs a model exported before batching was supported on a preprocessed image and returns one
+        [x0, y0, x1, y1, score, label] tensor per detected class.
+        """
+        if self.ort_session:
+            if self.jit_model:
+                warnings.warn(
+                    "Warning: Both JIT and ONNX models are initialized, inference will run in ONNX mode by default.\n"
+                    "To run in JIT please delete the self.ort_session like: detector.ort_session = None.")
+            with self._profile("forward"):
+                preds = self.ort_session.run(['output'], {'data': _input.cpu().detach().numpy()})
+            with self._profile("postprocess"):
+                res = self.predictor.postprocessing(torch.from_numpy(preds[0]), _input, *metadata)
+        else:
+            # The exported model includes the postprocessing
+            with self._profile("forward"):
+                res = self.jit_model(_input, *metadata)
+        return res
+
+    @staticmethod
+    def __bounding_boxes(res, batch=None, index=None):
+        """
+        Converts the per class detections of an image to a BoundingBoxList, mapping them back to the original image
+        if the image was letterboxed into an ImageBatch.
+        """
+        # res holds one [x0, y0, x1, y1, score, label] tensor per detected class, copy them to host at once
+        if len(res) > 0:
+            dets = torch.cat(res, dim=0).cpu().numpy()
+        else:
+            dets = np.zeros((0, 6), dtype=np.float32)
+        return NanodetLearner.__bounding_box_list(dets, batch, index)
+
+    @staticmethod
+    def __bounding_box_list(dets, batch=None, index=None):
+        """
+        Converts the [x0, y0, x1, y1, score, label] detections of an image to a BoundingBoxList, mapping them back to
+        the original image if the image was letterboxed into an ImageBatch.
+        """
+        dets = dets[np.argsort(dets[:, 4], kind="stable")]
+        boxes = dets[:, :4] if batch is None else batch.to_original(dets[:, :4], index)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, dets[:, 4], dets[:, 5].astype(np.int64))
 
         return bounding_boxes
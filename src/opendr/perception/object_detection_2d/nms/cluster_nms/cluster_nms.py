@@ -28,14 +28,20 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from opendr.perception.object_detection_2d.nms.utils import NMSCustom
+from opendr.perception.object_detection_2d.nms.utils.nms_cpu import batched_nms, to_bounding_boxes
 from opendr.perception.object_detection_2d.nms.utils.nms_utils import jaccard, diou, distance
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 import numpy as np
 import torch
 
+# Methods of the CPU engine for the types of Cluster-NMS whose kept detections are those of greedy NMS
+_ENGINE_METHODS = {'default': 'cluster', 'diou': 'cluster_diou'}
+
 
 class ClusterNMS(NMSCustom):
-    def __init__(self, nms_type='default', cross_class=True, device='cuda', iou_thres=0.45, top_k=400, post_k=100):
+    def __init__(self, nms_type='default', cross_class=True, device=None, iou_thres=0.45, top_k=400, post_k=100):
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.device = device
         self.nms_types = ['default', 'diou', 'spm', 'spm_dist', 'spm_dist_weighted']
         if nms_type not in self.nms_types:
@@ -67,6 +73,9 @@ class ClusterNMS(NMSCustom):
 
     def run_nms(self, boxes=None, scores=None, img=None, threshold=0.2):
 
+        if self.device == 'cpu' and self.nms_type in _ENGINE_METHODS:
+            return self.run_nms_batch(boxes=[boxes], scores=[scores], threshold=threshold)[0]
+
         if isinstance(boxes, np.ndarray):
             boxes = torch.tensor(boxes, device=self.device)
         elif torch.is_tensor(boxes):
@@ -129,17 +138,19 @@ class ClusterNMS(NMSCustom):
         scores = scores[keep_ids].cpu().numpy()
         classes = classes[keep_ids].cpu().numpy()
         boxes = boxes[keep_ids].cpu().numpy()
-        bounding_boxes = BoundingBoxList([])
-        for idx, box in enumerate(boxes):
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=classes[idx],
-                               score=scores[idx])
-            bounding_boxes.data.append(bbox)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, scores, classes)
 
         return bounding_boxes, [boxes, classes, scores]
 
+    def run_nms_batch(self, boxes=None, scores=None, threshold=0.2):
+        if self.device != 'cpu' or self.nms_type not in _ENGINE_METHODS:
+            return super(ClusterNMS, self).run_nms_batch(boxes=boxes, scores=scores, threshold=threshold)
+        # On the CPU, the compiled kernels avoid dispatching many small torch operations
+        results = batched_nms(boxes, scores, method=_ENGINE_METHODS[self.nms_type], iou_thres=self.iou_thres,
+                              top_k=self.top_k, post_k=self.post_k, cross_class=self.cross_class,
+                              threshold=threshold)
+        return [to_bounding_boxes(detections) for detections in results]
+
 
 def cc_cluster_nms_default(boxes=None, scores=None, iou_thres=0.45, top_k=400, post_k=200):
     # Collapse all the classes into 1
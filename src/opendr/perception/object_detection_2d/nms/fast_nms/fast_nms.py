@@ -28,14 +28,17 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from opendr.perception.object_detection_2d.nms.utils import NMSCustom
+from opendr.perception.object_detection_2d.nms.utils.nms_cpu import batched_nms, to_bounding_boxes
 from opendr.perception.object_detection_2d.nms.utils.nms_utils import jaccard
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 import torch
 import numpy as np
 
 
 class FastNMS(NMSCustom):
-    def __init__(self, cross_class=False, device='cuda', iou_thres=0.45, top_k=400, post_k=100):
+    def __init__(self, cross_class=False, device=None, iou_thres=0.45, top_k=400, post_k=100):
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.device = device
         self.iou_thres = iou_thres
         self.top_k = top_k
@@ -56,6 +59,9 @@ class FastNMS(NMSCustom):
 
     def run_nms(self, boxes=None, scores=None, threshold=0.2, img=None):
 
+        if self.device == 'cpu':
+            return self.run_nms_batch(boxes=[boxes], scores=[scores], threshold=threshold)[0]
+
         if isinstance(boxes, np.ndarray):
             boxes = torch.tensor(boxes, device=self.device)
         elif torch.is_tensor(boxes):
@@ -84,17 +90,18 @@ class FastNMS(NMSCustom):
         scores = scores[keep_ids].cpu().numpy()
         classes = classes[keep_ids].cpu().numpy()
         boxes = boxes[keep_ids].cpu().numpy()
-        bounding_boxes = BoundingBoxList([])
-        for idx, box in enumerate(boxes):
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=classes[idx],
-                               score=scores[idx])
-            bounding_boxes.data.append(bbox)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, scores, classes)
 
         return bounding_boxes, [boxes, classes, scores]
 
+    def run_nms_batch(self, boxes=None, scores=None, threshold=0.2):
+        if self.device != 'cpu':
+            return super(FastNMS, self).run_nms_batch(boxes=boxes, scores=scores, threshold=threshold)
+        # On the CPU, the compiled kernels avoid dispatching many small torch operations
+        results = batched_nms(boxes, scores, method='fast', iou_thres=self.iou_thres, top_k=self.top_k,
+                              post_k=self.post_k, cross_class=self.cross_class, threshold=threshold)
+        return [to_bounding_boxes(detections) for detections in results]
+
 
 def fast_nms(boxes=None, scores=None, iou_thres=0.45, top_k=400, post_k=200):
     scores, idx = scores.sort(1, descending=True)
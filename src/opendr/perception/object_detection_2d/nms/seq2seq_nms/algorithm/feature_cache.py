@@ -0,0 +1,85 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from opendr.engine.helper.cache import ShardedCache, fingerprint
+
+
+class FeatureCache(object):
+    """
+    Stores the inputs of Seq2SeqNMSLearner that are computed for each image of a split of a Dataset_NMS, in the
+    memory-mapped shards of a ShardedCache, so that fit() and eval() read them instead of recomputing them at each
+    epoch:
+    - the metadata of the split, i.e., what fit() and eval() use of the dataset, so that the dataset is only loaded to
+      compute the records that are missing
+    - 'train' records, with the detections sorted by score and the FMoD maps of augmented versions of the image
+    - 'eval' records, with the detections given to the model and their FMoD descriptors
+
+    The records are keyed by the dataset, the split and the configuration of the features, so that records computed
+    with another configuration are not used.
+    """
+
+    def __init__(self, path, dataset, split, use_ssd, max_size=None):
+        """
+        :param path: directory of the cache
+        :param dataset: name of the dataset, e.g., 'PETS'
+        :param split: split of the dataset
+        :param use_ssd: whether the detections of the dataset are those of SSD
+        :param max_size: maximum size of the cache in bytes, defaults to no limit
+        """
+        self.cache = ShardedCache(path, max_size=max_size)
+        self.prefix = (dataset, split, 'ssd' if use_ssd else 'default')
+
+    def metadata(self):
+        """Returns the metadata of the split, or None if it is not stored"""
+        return self.cache.get(ShardedCache.key(*self.prefix, 'metadata'))
+
+    def put_metadata(self, metadata):
+        self.cache.put(ShardedCache.key(*self.prefix, 'metadata'), metadata)
+
+    def get(self, kind, config, index):
+        """Returns the record of a sample computed with a configuration, or None if it is not stored"""
+        return self.cache.get(ShardedCache.key(*self.prefix, kind, fingerprint(config), index))
+
+    def put(self, kind, config, index, record):
+        self.cache.put(ShardedCache.key(*self.prefix, kind, fingerprint(config), index), record)
+
+
+def dataset_metadata(dataset_nms):
+    """
+    Returns what Seq2SeqNMSLearner uses of a Dataset_NMS besides the detections and the images: its classes, the COCO
+    annotations and the id, filename, resolution and numbers of detections and ground truth boxes of each sample.
+    """
+    num_classes = len(dataset_nms.classes)
+    return {
+        'path': dataset_nms.path,
+        'classes': dataset_nms.classes,
+        'class_ids': dataset_nms.class_ids,
+        'annotation_file': dataset_nms.annotation_file,
+        'ids': [sample['id'] for sample in dataset_nms.src_data],
+        'filenames': [sample['filename'] for sample in dataset_nms.src_data],
+        'resolutions': [list(sample['resolution']) for sample in dataset_nms.src_data],
+        'dt_counts': np.array([[len(sample['dt_boxes'][c]) for c in range(num_classes)]
+                               for sample in dataset_nms.src_data]).reshape(-1, num_classes),
+        'gt_counts': np.array([[len(sample['gt_boxes'][c]) for c in range(num_classes)]
+                               for sample in dataset_nms.src_data]).reshape(-1, num_classes),
+    }
+
+
+def compact_map(fmod_map):
+    """Returns an FMoD map as a uint8 array if it only holds integer values up to 255 (e.g., binary maps)"""
+    fmod_map = fmod_map.cpu().numpy()
+    compact = fmod_map.astype(np.uint8)
+    return compact if np.array_equal(compact, fmod_map) else fmod_map
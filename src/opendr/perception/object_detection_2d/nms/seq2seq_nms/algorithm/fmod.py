@@ -119,7 +119,7 @@ class FMoD:
         if "cuda" in self.device:
             self.map = self.map.to(self.device)
 
-    def extract_FMoD_feats(self, boxes):
+    def extract_FMoD_feats(self, boxes, normalize=True):
         num_rois = boxes.shape[0]
         map_gpu = self.map / 255.0
         map_gpu = map_gpu.unsqueeze(0).unsqueeze(0)
@@ -142,11 +142,23 @@ class FMoD:
             descs.append(self.get_descriptor(pooled_regions_pyr))
 
         descs = torch.cat(descs, dim=1)
+        if normalize:
+            descs = self.normalize(descs)
+        return descs
+
+    def normalize(self, descs):
         if self.mean is not None and self.std is not None:
             descs = (descs - self.mean) / self.std
             descs = torch.clamp(descs, -50, 50)
         return descs
 
+    def set_maps(self, fmod_map, resc):
+        """Sets the map of an image and its scale, as computed by extract_maps(), e.g., from a cache"""
+        self.map = fmod_map.float()
+        if "cuda" in self.device:
+            self.map = self.map.to(self.device)
+        self.resc = resc
+
     def release_maps(self):
         self.map = None
 
@@ -14,22 +14,23 @@
 
 from opendr.engine.learners import Learner
 from opendr.engine.constants import OPENDR_SERVER_URL
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 from opendr.engine.data import Image
 from opendr.perception.object_detection_2d.nms.seq2seq_nms.algorithm.seq2seq_model import Seq2SeqNet
 from opendr.perception.object_detection_2d.nms.utils import NMSCustom
 from opendr.perception.object_detection_2d.nms.utils.nms_dataset import Dataset_NMS
 from opendr.perception.object_detection_2d.nms.seq2seq_nms.algorithm.fmod import FMoD
+from opendr.perception.object_detection_2d.nms.seq2seq_nms.algorithm.feature_cache import FeatureCache, \
+    compact_map, dataset_metadata
 from opendr.perception.object_detection_2d.nms.utils.nms_utils import drop_dets, det_matching, \
-    run_coco_eval, filter_iou_boxes, bb_intersection_over_union, compute_class_weights, apply_torchNMS
+    run_coco_eval, filter_iou_boxes, bb_intersection_over_union, class_weights_from_counts, apply_torchNMS
 import torch
 import torch.nn.functional as F
 import pickle
 import numpy as np
 import os
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import torch.nn as nn
-from tensorboardX import SummaryWriter
 import torch.optim as optim
 from tqdm import tqdm
 import collections
@@ -103,16 +104,19 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
 
     def fit(self, dataset, logging_path='', logging_flush_secs=30, silent=True,
             verbose=True, nms_gt_iou=0.5, max_dt_boxes=400, datasets_folder='./datasets',
-            use_ssd=False, lr_step=True):
+            use_ssd=False, lr_step=True, cache_dir=None, fmod_augmentations=4):
 
-        dataset_nms = Dataset_NMS(path=datasets_folder, dataset_name=dataset, split='train', use_ssd=use_ssd,
-                                  device=self.device)
+        cache = None
+        if cache_dir is not None:
+            cache = FeatureCache(cache_dir, dataset=dataset, split='train', use_ssd=use_ssd)
+        dataset_nms, metadata = self._load_split(dataset, 'train', datasets_folder, use_ssd, cache)
         if self.classes is None:
-            self.classes = dataset_nms.classes
-            self.class_ids = dataset_nms.class_ids
+            self.classes = metadata['classes']
+            self.class_ids = metadata['class_ids']
 
         if logging_path != '' and logging_path is not None:
             logging = True
+            from tensorboardX import SummaryWriter
             file_writer = SummaryWriter(logging_path, flush_secs=logging_flush_secs)
         else:
             logging = False
@@ -149,7 +153,7 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
             if self.epochs > 3:
                 drop_after_epoch.append(int(self.epochs * 0.7))
 
-        train_ids = np.arange(len(dataset_nms.src_data))
+        train_ids = np.arange(len(metadata['ids']))
         total_loss_iter = 0
         total_loss_epoch = 0
         optimizer = optim.Adam(self.model.parameters(), lr=self.lr, betas=(0.9, 0.99), eps=1e-9)  # HERE
@@ -158,7 +162,11 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
             scheduler = optim.lr_scheduler.MultiStepLR(optimizer, milestones=drop_after_epoch, gamma=0.1)
 
         num_iter = 0
-        training_weights = compute_class_weights(pos_weights=[0.9, 0.1], max_dets=max_dt_boxes, dataset_nms=dataset_nms)
+        training_weights = class_weights_from_counts(pos_weights=[0.9, 0.1], max_dets=max_dt_boxes,
+                                                     dt_counts=metadata['dt_counts'], gt_counts=metadata['gt_counts'])
+        # Without a cache, the FMoD maps of an image are computed with a new augmentation at each epoch
+        augmentations = fmod_augmentations if cache is not None else 1
+        train_config = self._train_config(augmentations)
         # Single class NMS only.
         class_index = 1
         training_dict = {"cross_entropy_loss": []}
@@ -181,34 +189,25 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
                                                                                     total_loss_iter/self.log_after))
                     total_loss_iter = 0
 
-                image_fln = dataset_nms.src_data[sample_id]['filename']
-                if len(dataset_nms.src_data[sample_id]['dt_boxes'][class_index]) > 0:
-                    dt_boxes = torch.tensor(
-                        dataset_nms.src_data[sample_id]['dt_boxes'][class_index][:, 0:4]).float()
-                    dt_scores = torch.tensor(dataset_nms.src_data[sample_id]['dt_boxes'][class_index][:, 4]).float()
-                    dt_scores, dt_scores_ids = torch.sort(dt_scores, descending=True)
-                    dt_boxes = dt_boxes[dt_scores_ids]
-                else:
+                image_path = os.path.join(datasets_folder, dataset, metadata['filenames'][sample_id])
+                record = self._cached_record(cache, 'train', train_config, sample_id,
+                                             lambda: self._train_record(dataset_nms().src_data[sample_id],
+                                                                        image_path, augmentations))
+                if len(record['boxes']) == 0:
                     if not silent:
                         pbar.update(1)
                     num_iter = num_iter + 1
                     continue
-                gt_boxes = torch.tensor([]).float()
-                if len(dataset_nms.src_data[sample_id]['gt_boxes'][class_index]) > 0:
-                    gt_boxes = torch.tensor(dataset_nms.src_data[sample_id]['gt_boxes'][class_index]).float()
-                image_path = os.path.join(datasets_folder, dataset, image_fln)
-                img_res = dataset_nms.src_data[sample_id]['resolution'][::-1]
+                dt_boxes = torch.from_numpy(record['boxes'])
+                dt_scores = torch.from_numpy(record['scores'])
+                gt_boxes = torch.from_numpy(record['gt_boxes'])
+                img_res = metadata['resolutions'][sample_id][::-1]
 
                 if "cuda" in self.device:
                     dt_boxes = dt_boxes.to(self.device)
                     dt_scores = dt_scores.to(self.device)
                     gt_boxes = gt_boxes.to(self.device)
 
-                val_ids = torch.logical_and((dt_boxes[:, 2] - dt_boxes[:, 0]) > 4,
-                                            (dt_boxes[:, 3] - dt_boxes[:, 1]) > 4)
-                dt_boxes = dt_boxes[val_ids, :]
-                dt_scores = dt_scores[val_ids]
-
                 dt_boxes, dt_scores = drop_dets(dt_boxes, dt_scores)
                 if dt_boxes.shape[0] < 1:
                     if not silent:
@@ -223,9 +222,8 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
                 dt_scores = dt_scores[:max_dt_boxes]
                 app_feats = None
                 if self.app_feats == 'fmod':
-                    img = Image.open(image_path)
-                    img = img.convert(format='channels_last', channel_order='bgr')
-                    self.fMoD.extract_maps(img=img, augm=True)
+                    fmod_maps = record['maps']
+                    self.fMoD.set_maps(torch.from_numpy(fmod_maps[epoch % len(fmod_maps)]), record['resc'])
                     app_feats = self.fMoD.extract_FMoD_feats(dt_boxes)
                     app_feats = torch.unsqueeze(app_feats, dim=1)
                 elif self.app_feats == 'zeros':
@@ -288,16 +286,18 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
         return training_dict
 
     def eval(self, dataset, split='test', verbose=True, max_dt_boxes=400, threshold=0.0,
-             datasets_folder='./datasets', use_ssd=False):
+             datasets_folder='./datasets', use_ssd=False, cache_dir=None):
 
-        dataset_nms = Dataset_NMS(path=datasets_folder, dataset_name=dataset, split=split, use_ssd=use_ssd,
-                                  device=self.device)
+        cache = None
+        if cache_dir is not None:
+            cache = FeatureCache(cache_dir, dataset=dataset, split=split, use_ssd=use_ssd)
+        dataset_nms, metadata = self._load_split(dataset, split, datasets_folder, use_ssd, cache)
 
         if self.classes is None:
-            self.classes = dataset_nms.classes
-            self.class_ids = dataset_nms.class_ids
+            self.classes = metadata['classes']
+            self.class_ids = metadata['class_ids']
 
-        annotations_filename = dataset_nms.annotation_file
+        annotations_filename = metadata['annotation_file']
 
         eval_folder = self.temp_path
         if not os.path.isdir(os.path.join(self.temp_path)):
@@ -318,49 +318,38 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
         if "cuda" in self.device:
             self.model = self.model.to(self.device)
 
-        train_ids = np.arange(len(dataset_nms.src_data))
+        train_ids = np.arange(len(metadata['ids']))
+        eval_config = self._eval_config(max_dt_boxes)
         nms_results = []
         pbar_eval = None
         if verbose:
             pbarDesc = "Evaluation progress"
             pbar_eval = tqdm(desc=pbarDesc, total=len(train_ids))
         for sample_id in train_ids:
-            image_fln = dataset_nms.src_data[sample_id]['filename']
-
-            image_path = os.path.join(datasets_folder, dataset, image_fln)
-            img_res = dataset_nms.src_data[sample_id]['resolution'][::-1]
+            image_path = os.path.join(datasets_folder, dataset, metadata['filenames'][sample_id])
+            img_res = metadata['resolutions'][sample_id][::-1]
             # Single class NMS only.
             class_index = 1
-            if len(dataset_nms.src_data[sample_id]['dt_boxes'][class_index]) > 0:
-                dt_boxes = torch.tensor(dataset_nms.src_data[sample_id]['dt_boxes'][class_index][:, 0:4]).float()
-                dt_scores = torch.tensor(dataset_nms.src_data[sample_id]['dt_boxes'][class_index][:, 4]).float()
-                dt_scores, dt_scores_ids = torch.sort(dt_scores, descending=True)
-                dt_boxes = dt_boxes[dt_scores_ids]
-            else:
-                pbar_eval.update(1)
+            record = self._cached_record(cache, 'eval', eval_config, sample_id,
+                                         lambda: self._eval_record(dataset_nms().src_data[sample_id], image_path,
+                                                                   max_dt_boxes))
+            if record['boxes'] is None:
+                if pbar_eval is not None:
+                    pbar_eval.update(1)
                 continue
+            dt_boxes = torch.from_numpy(record['boxes'])
+            dt_scores = torch.from_numpy(record['scores'])
 
             if "cuda" in self.device:
                 dt_boxes = dt_boxes.to(self.device)
                 dt_scores = dt_scores.to(self.device)
 
-            val_ids = torch.logical_and((dt_boxes[:, 2] - dt_boxes[:, 0]) > 4,
-                                        (dt_boxes[:, 3] - dt_boxes[:, 1]) > 4)
-            dt_boxes = dt_boxes[val_ids, :]
-            dt_scores = dt_scores[val_ids]
-
-            if self.iou_filtering is not None and 1.0 > self.iou_filtering > 0:
-                dt_boxes, dt_scores = apply_torchNMS(boxes=dt_boxes, scores=dt_scores, iou_thres=self.iou_filtering)
-
-            dt_boxes = dt_boxes[:max_dt_boxes]
-            dt_scores = dt_scores[:max_dt_boxes]
             app_feats = None
             if self.app_feats == 'fmod':
-                img = Image.open(image_path)
-                img = img.convert(format='channels_last', channel_order='bgr')
-                self.fMoD.extract_maps(img=img, augm=False)
-                app_feats = self.fMoD.extract_FMoD_feats(dt_boxes)
-                app_feats = torch.unsqueeze(app_feats, dim=1)
+                app_feats = torch.from_numpy(record['app_feats'])
+                if "cuda" in self.device:
+                    app_feats = app_feats.to(self.device)
+                app_feats = torch.unsqueeze(self.fMoD.normalize(app_feats), dim=1)
             elif self.app_feats == 'zeros':
                 app_feats = torch.zeros([dt_boxes.shape[0], 1, self.app_input_dim])
                 if "cuda" in self.device:
@@ -381,18 +370,20 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
                 bboxes = bboxes[ids.numpy().squeeze(-1), :]
             for j in range(len(preds)):
                 nms_results.append({
-                    'image_id': dataset_nms.src_data[sample_id]['id'],
+                    'image_id': metadata['ids'][sample_id],
                     'bbox': [bboxes[j][0], bboxes[j][1], bboxes[j][2] - bboxes[j][0], bboxes[j][3] - bboxes[j][1]],
                     'category_id': class_index,
                     'score': np.float64(preds[j])
                 })
-            pbar_eval.update(1)
-        pbar_eval.close()
+            if pbar_eval is not None:
+                pbar_eval.update(1)
+        if pbar_eval is not None:
+            pbar_eval.close()
         if verbose:
             print('Writing results json to {}'.format(output_file))
         with open(output_file, 'w') as fid:
             json.dump(nms_results, fid, indent=2)
-        eval_result = run_coco_eval(gt_file_path=os.path.join(dataset_nms.path, 'annotations', annotations_filename),
+        eval_result = run_coco_eval(gt_file_path=os.path.join(metadata['path'], 'annotations', annotations_filename),
                                     dt_file_path=output_file, only_classes=[1],
                                     verbose=verbose, max_dets=[max_dt_boxes])
         os.remove(output_file)
@@ -406,6 +397,144 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
                 print('\n')
         return eval_result
 
+    def preprocess(self, dataset, cache_dir, split='train', datasets_folder='./datasets', use_ssd=False,
+                   max_dt_boxes=400, fmod_augmentations=4, verbose=True):
+        """
+        Fills the cache of fit() (split='train') or eval() (any other split) in advance, so that their first epoch
+        or run does not compute the records of the images.
+        """
+        cache = FeatureCache(cache_dir, dataset=dataset, split=split, use_ssd=use_ssd)
+        dataset_nms, metadata = self._load_split(dataset, split, datasets_folder, use_ssd, cache)
+        if split == 'train':
+            kind, config = 'train', self._train_config(fmod_augmentations)
+        else:
+            kind, config = 'eval', self._eval_config(max_dt_boxes)
+        pbar = None
+        if verbose:
+            pbar = tqdm(desc="Preprocessing progress", total=len(metadata['ids']))
+        for sample_id in range(len(metadata['ids'])):
+            if cache.get(kind, config, sample_id) is None:
+                sample = dataset_nms().src_data[sample_id]
+                image_path = os.path.join(datasets_folder, dataset, metadata['filenames'][sample_id])
+                if kind == 'train':
+                    record = self._train_record(sample, image_path, fmod_augmentations)
+                else:
+                    record = self._eval_record(sample, image_path, max_dt_boxes)
+                cache.put(kind, config, sample_id, record)
+            if pbar is not None:
+                pbar.update(1)
+        if pbar is not None:
+            pbar.close()
+
+    def _load_split(self, dataset, split, datasets_folder, use_ssd, cache=None):
+        """
+        Returns a function that loads the Dataset_NMS of a split once, and the metadata of the split, which is read
+        from the cache when it is stored, so that the dataset is only loaded to compute missing records.
+        """
+        loaded = []
+
+        def dataset_nms():
+            if len(loaded) == 0:
+                loaded.append(Dataset_NMS(path=datasets_folder, dataset_name=dataset, split=split, use_ssd=use_ssd,
+                                          device=self.device))
+            return loaded[0]
+
+        metadata = cache.metadata() if cache is not None else None
+        if metadata is None:
+            metadata = dataset_metadata(dataset_nms())
+            if cache is not None:
+                cache.put_metadata(metadata)
+        return dataset_nms, metadata
+
+    def _train_config(self, augmentations):
+        config = {'app_feats': self.app_feats}
+        if self.app_feats == 'fmod':
+            config.update({'map_type': self.fMoD.map_type, 'map_bin': self.fMoD.map_bin,
+                           'resize_dim': self.fMoD.resize_dim, 'augmentations': augmentations})
+        return config
+
+    def _eval_config(self, max_dt_boxes):
+        config = {'app_feats': self.app_feats, 'iou_filtering': self.iou_filtering, 'max_dt_boxes': max_dt_boxes}
+        if self.app_feats == 'fmod':
+            config.update({'map_type': self.fMoD.map_type, 'map_bin': self.fMoD.map_bin,
+                           'resize_dim': self.fMoD.resize_dim, 'roi_pooling_dim': self.fMoD.roi_pooling_dim,
+                           'pyramid_depth': self.fMoD.pyramid_depth})
+        return config
+
+    @staticmethod
+    def _cached_record(cache, kind, config, index, compute):
+        """Returns the record of a sample from the cache, computing and storing it if it is missing"""
+        if cache is None:
+            return compute()
+        record = cache.get(kind, config, index)
+        if record is None:
+            record = compute()
+            cache.put(kind, config, index, record)
+        return record
+
+    @staticmethod
+    def _sorted_dets(sample, class_index):
+        """Returns the detections of a class of a sample sorted by score, without those smaller than 4 pixels"""
+        dt_boxes = torch.tensor(sample['dt_boxes'][class_index][:, 0:4]).float()
+        dt_scores = torch.tensor(sample['dt_boxes'][class_index][:, 4]).float()
+        dt_scores, dt_scores_ids = torch.sort(dt_scores, descending=True)
+        dt_boxes = dt_boxes[dt_scores_ids]
+        val_ids = torch.logical_and((dt_boxes[:, 2] - dt_boxes[:, 0]) > 4,
+                                    (dt_boxes[:, 3] - dt_boxes[:, 1]) > 4)
+        return dt_boxes[val_ids, :], dt_scores[val_ids]
+
+    def _train_record(self, sample, image_path, augmentations):
+        """
+        Returns the inputs of fit() for a sample: its sorted detections, its ground truth boxes and, for FMoD
+        features, the maps of augmented versions of its image.
+        """
+        # Single class NMS only.
+        class_index = 1
+        record = {'boxes': np.zeros([0, 4], dtype=np.float32), 'scores': np.zeros([0], dtype=np.float32)}
+        if len(sample['dt_boxes'][class_index]) == 0:
+            return record
+        dt_boxes, dt_scores = self._sorted_dets(sample, class_index)
+        record['boxes'] = dt_boxes.numpy()
+        record['scores'] = dt_scores.numpy()
+        record['gt_boxes'] = np.zeros([0], dtype=np.float32)
+        if len(sample['gt_boxes'][class_index]) > 0:
+            record['gt_boxes'] = np.asarray(sample['gt_boxes'][class_index], dtype=np.float32)
+        if self.app_feats == 'fmod' and len(dt_boxes) > 0:
+            img = Image.open(image_path)
+            img = img.convert(format='channels_last', channel_order='bgr')
+            maps = []
+            for _ in range(augmentations):
+                self.fMoD.extract_maps(img=img, augm=True)
+                maps.append(compact_map(self.fMoD.map))
+            record['maps'] = np.stack(maps)
+            record['resc'] = self.fMoD.resc
+        return record
+
+    def _eval_record(self, sample, image_path, max_dt_boxes):
+        """
+        Returns the inputs of eval() for a sample: the detections given to the model and, for FMoD features, their
+        descriptors before normalization. Samples without detections have no boxes.
+        """
+        # Single class NMS only.
+        class_index = 1
+        if len(sample['dt_boxes'][class_index]) == 0:
+            return {'boxes': None}
+        dt_boxes, dt_scores = self._sorted_dets(sample, class_index)
+        if "cuda" in self.device:
+            dt_boxes = dt_boxes.to(self.device)
+            dt_scores = dt_scores.to(self.device)
+        if self.iou_filtering is not None and 1.0 > self.iou_filtering > 0:
+            dt_boxes, dt_scores = apply_torchNMS(boxes=dt_boxes, scores=dt_scores, iou_thres=self.iou_filtering)
+        dt_boxes = dt_boxes[:max_dt_boxes]
+        dt_scores = dt_scores[:max_dt_boxes]
+        record = {'boxes': dt_boxes.cpu().numpy(), 'scores': dt_scores.cpu().numpy()}
+        if self.app_feats == 'fmod':
+            img = Image.open(image_path)
+            img = img.convert(format='channels_last', channel_order='bgr')
+            self.fMoD.extract_maps(img=img, augm=False)
+            record['app_feats'] = self.fMoD.extract_FMoD_feats(dt_boxes, normalize=False).cpu().numpy()
+        return record
+
     def save(self, path, verbose=False, optimizer=None, scheduler=None, current_epoch=None, max_dt_boxes=400):
         fname = path.split('/')[-1]
         dir_name = path.replace('/' + fname, '')
@@ -663,13 +792,7 @@ class Seq2SeqNMSLearner(Learner, NMSCustom):
         preds = preds[mask].cpu().detach().numpy()
         boxes = boxes[mask, :].cpu().numpy()
 
-        for idx, box in enumerate(boxes):
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=0,
-                               score=preds[idx])
-            bounding_boxes.data.append(bbox)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, preds.reshape(-1), np.zeros(boxes.shape[0], dtype=np.int64))
         return bounding_boxes, [boxes, np.zeros(scores.shape[0]), preds]
 
     def optimize(self, **kwargs):
@@ -35,14 +35,13 @@
 # SOFTWARE.
 
 from opendr.perception.object_detection_2d.nms.utils import NMSCustom
-from opendr.perception.object_detection_2d.nms.utils.nms_utils import jaccard
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.perception.object_detection_2d.nms.utils.nms_cpu import batched_nms, to_bounding_boxes
 import torch
 import numpy as np
 
 
 class SoftNMS(NMSCustom):
-    def __init__(self, nms_type='linear', device='cuda', nms_thres=None, top_k=400, post_k=100):
+    def __init__(self, nms_type='linear', device=None, nms_thres=None, top_k=400, post_k=100, cross_class=True):
         self.nms_types = ['linear', 'gaussian']
         if nms_type not in self.nms_types:
             raise ValueError('Type: ' + nms_type + ' of Soft-NMS is not supported.')
@@ -53,10 +52,13 @@ class SoftNMS(NMSCustom):
                 nms_thres = 0.3
             elif nms_type == 'gaussian':
                 nms_thres = 0.5
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.device = device
         self.nms_thres = nms_thres
         self.top_k = top_k
         self.post_k = post_k
+        self.cross_class = cross_class
 
     def nms_thres(self, nms_thres=0.45):
         self.nms_thres = nms_thres
@@ -73,57 +75,131 @@ class SoftNMS(NMSCustom):
         else:
             self.nms_type = nms_type
 
-    def run_nms(self, boxes=None, scores=None, threshold=0.2, img=None):
+    def set_cross_class(self, cross_class=True):
+        self.cross_class = cross_class
 
-        if isinstance(boxes, np.ndarray):
-            boxes = torch.tensor(boxes, device=self.device)
-        elif torch.is_tensor(boxes):
-            if self.device == 'cpu':
-                boxes = boxes.cpu()
-            elif self.device == 'cuda':
-                boxes = boxes.cuda()
-
-        if isinstance(scores, np.ndarray):
-            scores = torch.tensor(scores, device=self.device)
-        elif torch.is_tensor(scores):
-            if self.device == 'cpu':
-                scores = scores.cpu()
-            elif self.device == 'cuda':
-                scores = scores.cuda()
-
-        scores, classes = scores.max(dim=1)
-        _, idx = scores.sort(0, descending=True)
-        idx = idx[:self.top_k]
-        boxes = boxes[idx]
-        scores = scores[idx]
-        classes = classes[idx]
-
-        dets = torch.cat((boxes, scores.unsqueeze(-1)), dim=1)
-
-        i = 0
-        while dets.shape[0] > 0:
-            scores[i] = dets[0, 4]
-            iou = jaccard(dets[:1, :-1], dets[1:, :-1]).triu_(diagonal=0).squeeze(0)
-            weight = torch.ones_like(iou)
-            if self.nms_type == 'linear':
-                weight[iou > self.nms_thres] -= iou[iou > self.nms_thres]
-            elif self.nms_type == 'gaussian':
-                weight = np.exp(-(iou * iou) / self.nms_thres)
-
-            dets[1:, 4] *= weight
-            dets = dets[1:, :]
-            i = i + 1
-        keep_ids = torch.where(scores > threshold)
-        scores = scores[keep_ids].cpu().numpy()
-        classes = classes[keep_ids].cpu().numpy()
-        boxes = boxes[keep_ids].cpu().numpy()
-        bounding_boxes = BoundingBoxList([])
-        for idx, box in enumerate(boxes):
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=classes[idx],
-                               score=scores[idx])
-            bounding_boxes.data.append(bbox)
-
-        return bounding_boxes, [boxes, classes, scores]
+    def run_nms(self, boxes=None, scores=None, threshold=0.2, img=None):
+        """
+        Runs Soft-NMS on the detections of an image.
+
+        :param boxes: boxes of the detections, as (N, 4) [x1, y1, x2, y2] arrays or tensors
+        :param scores: scores of each class for the detections, as (N, C) arrays or tensors
+        :param threshold: minimum score of the kept detections, after their scores are decayed
+        :param img: image of the detections, which is not used
+        :return: the kept detections, and a list with their boxes, classes and scores as numpy arrays
+        """
+        return self.run_nms_batch(boxes=[boxes], scores=[scores], threshold=threshold)[0]
+
+    def run_nms_batch(self, boxes=None, scores=None, threshold=0.2):
+        """
+        Runs Soft-NMS on the detections of several images at once.
+
+        :param boxes: boxes of the detections of each image, as a (B, N, 4) array or tensor, or a list of (N, 4)
+            arrays or tensors whose numbers of detections may differ
+        :param scores: scores of each class for the detections of each image, as a (B, N, C) array or tensor, or a
+            list of (N, C) arrays or tensors
+        :param threshold: minimum score of the kept detections, after their scores are decayed
+        :return: the result of run_nms() for each image
+        :rtype: list
+        """
+        if self.device == 'cpu':
+            # On the CPU, the compiled kernels avoid dispatching many small torch operations
+            results = batched_nms(boxes, scores, method='soft_' + self.nms_type, iou_thres=self.nms_thres,
+                                  sigma=self.nms_thres, top_k=self.top_k,
+                                  post_k=None if self.cross_class else self.post_k, cross_class=self.cross_class,
+                                  threshold=threshold)
+            return [to_bounding_boxes(detections) for detections in results]
+
+        if not isinstance(boxes, (list, tuple)):
+            # Batched (B, N, 4) boxes
+            boxes, scores = [boxes], [scores]
+        boxes, scores, num_dets = _pad_batch(boxes, scores, self.device)
+        if self.cross_class:
+            # The boxes have the class of their maximum score, and suppress the boxes of all the classes
+            scores, classes = scores.max(dim=2)
+        else:
+            # Each class has its own sorted detections, which only suppress those of the same class
+            num_classes = scores.shape[2]
+            boxes = boxes[:, None].expand(-1, num_classes, -1, -1)
+            scores = scores.transpose(1, 2)
+            classes = torch.arange(num_classes, device=scores.device)[:, None].expand_as(scores)
+
+        scores, idx = scores.sort(dim=-1, descending=True)
+        idx = idx[..., :self.top_k]
+        scores = scores[..., :self.top_k]
+        classes = classes.gather(-1, idx)
+        boxes = boxes.gather(-2, idx[..., None].expand(*idx.shape, 4))
+        scores = scores * soft_nms_decay(_pairwise_iou(boxes), self.nms_type, self.nms_thres)
+
+        results = []
+        for index in range(len(num_dets)):
+            keep_ids = torch.where(scores[index] > threshold)
+            image_scores = scores[index][keep_ids].cpu().numpy()
+            image_classes = classes[index][keep_ids].cpu().numpy()
+            image_boxes = boxes[index][keep_ids].cpu().numpy()
+            if not self.cross_class:
+                order = np.argsort(-image_scores, kind='stable')[:self.post_k]
+                image_scores, image_classes, image_boxes = \
+                    image_scores[order], image_classes[order], image_boxes[order]
+            results.append(to_bounding_boxes([image_boxes, image_classes, image_scores]))
+        return results
+
+
+def soft_nms_decay(ious, nms_type='linear', nms_thres=0.3):
+    """
+    Returns the factors by which Soft-NMS decays the scores of detections sorted by decreasing score, where each
+    detection is decayed by all the detections with a higher score, from their IoU matrix.
+
+    :param ious: IoU of the detections, as a (..., K, K) tensor
+    :param nms_type: 'linear', which decays the scores by 1 - IoU for IoUs above nms_thres, or 'gaussian', which
+        decays them by exp(-IoU^2 / nms_thres)
+    :param nms_thres: IoU threshold of the linear decay, or variance of the gaussian decay
+    :return: the decay factors, as a (..., K) tensor
+    """
+    num_dets = ious.shape[-1]
+    if nms_type == 'linear':
+        weights = torch.where(ious > nms_thres, 1 - ious, torch.ones_like(ious))
+    else:
+        weights = torch.exp(-(ious * ious) / nms_thres)
+    # Only the detections with a higher score, i.e., above the diagonal, decay a detection
+    upper = torch.ones(num_dets, num_dets, dtype=torch.bool, device=ious.device).triu_(diagonal=1)
+    weights = torch.where(upper, weights, torch.ones_like(weights))
+    return weights.prod(dim=-2)
+
+
+def _pad_batch(boxes, scores, device):
+    """
+    Stacks the detections of the images in (B, N, 4) boxes and (B, N, C) scores, padding the images with less
+    detections with empty boxes whose scores are -inf, and returns them with the number of detections of each image.
+    """
+    boxes = [torch.as_tensor(b).to(device) for b in boxes]
+    scores = [torch.as_tensor(s).to(device) for s in scores]
+    if boxes[0].ndim == 3:
+        boxes, scores = boxes[0], scores[0]
+        return boxes, scores, [boxes.shape[1]] * boxes.shape[0]
+
+    num_dets = [len(b) for b in boxes]
+    max_dets = max(num_dets)
+    if all(n == max_dets for n in num_dets):
+        return torch.stack(boxes), torch.stack(scores), num_dets
+    padded_boxes = boxes[0].new_zeros((len(boxes), max_dets, 4))
+    padded_scores = scores[0].new_full((len(scores), max_dets, scores[0].shape[1]), -np.inf)
+    for index, (image_boxes, image_scores) in enumerate(zip(boxes, scores)):
+        padded_boxes[index, :len(image_boxes)] = image_boxes
+        padded_scores[index, :len(image_scores)] = image_scores
+    return padded_boxes, padded_scores, num_dets
+
+
+def _pairwise_iou(boxes):
+    """
+    Returns the (..., K, K) IoU matrix of (..., K, 4) boxes, as jaccard(). The coordinates are processed separately,
+    which is faster than on the (..., K, K, 2) tensors of jaccard().
+    """
+    width = torch.minimum(boxes[..., :, None, 2], boxes[..., None, :, 2]) - \
+        torch.maximum(boxes[..., :, None, 0], boxes[..., None, :, 0])
+    height = torch.minimum(boxes[..., :, None, 3], boxes[..., None, :, 3]) - \
+        torch.maximum(boxes[..., :, None, 1], boxes[..., None, :, 1])
+    inter = width.clamp(min=0) * height.clamp(min=0)
+    areas = (boxes[..., 2] - boxes[..., 0]) * (boxes[..., 3] - boxes[..., 1])
+    union = areas[..., :, None] + areas[..., None, :] - inter
+    return inter / union
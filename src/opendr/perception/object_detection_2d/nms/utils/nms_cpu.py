@@ -0,0 +1,226 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numba
+import numpy as np
+import torch
+
+from opendr.engine.target import BoundingBoxList
+from opendr.perception.object_detection_2d.nms.utils.nms_custom import NMSCustom
+
+# NMS methods of the CPU engine:
+# - 'standard': greedy NMS, which keeps the detections that do not overlap a kept detection with a higher score
+# - 'cluster': Cluster-NMS, whose kept detections are those of greedy NMS
+# - 'cluster_diou': Cluster-NMS with DIoU instead of IoU, whose kept detections are those of greedy DIoU-NMS
+# - 'fast': Fast NMS, which removes the detections that overlap any detection with a higher score
+# - 'soft_linear' and 'soft_gaussian': Soft-NMS, which decays the scores of the detections by those of all the
+#   detections with a higher score, as SoftNMS
+METHODS = ('standard', 'cluster', 'cluster_diou', 'fast', 'soft_linear', 'soft_gaussian')
+_STANDARD, _CLUSTER, _CLUSTER_DIOU, _FAST, _SOFT_LINEAR, _SOFT_GAUSSIAN = range(len(METHODS))
+
+
+@numba.njit(cache=True, error_model='numpy')
+def _overlap(boxes, i, j, use_diou):
+    """Returns the IoU of two boxes, or their DIoU as nms_utils.diou()"""
+    width = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+    height = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+    inter = max(width, 0.0) * max(height, 0.0)
+    area_i = (boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1])
+    area_j = (boxes[j, 2] - boxes[j, 0]) * (boxes[j, 3] - boxes[j, 1])
+    overlap = inter / (area_i + area_j - inter)
+    if use_diou:
+        dx = (boxes[j, 2] + boxes[j, 0] - boxes[i, 2] - boxes[i, 0]) / 2
+        dy = (boxes[j, 3] + boxes[j, 1] - boxes[i, 3] - boxes[i, 1]) / 2
+        diagonal_x = max(boxes[i, 2], boxes[j, 2]) - min(boxes[i, 0], boxes[j, 0])
+        diagonal_y = max(boxes[i, 3], boxes[j, 3]) - min(boxes[i, 1], boxes[j, 1])
+        overlap -= ((dx * dx + dy * dy) / (diagonal_x * diagonal_x + diagonal_y * diagonal_y + 1e-7)) ** 0.9
+    return overlap
+
+
+@numba.njit(cache=True, error_model='numpy')
+def _suppress(boxes, scores, method, iou_thres, sigma):
+    """
+    Runs NMS on detections sorted by decreasing score, and returns their new scores and whether they are kept
+    """
+    num_dets = scores.shape[0]
+    new_scores = scores.copy()
+    keep = np.ones(num_dets, dtype=np.bool_)
+    if method == _FAST:
+        for j in range(num_dets):
+            for i in range(j):
+                if _overlap(boxes, i, j, False) > iou_thres:
+                    keep[j] = False
+                    break
+    elif method == _SOFT_LINEAR or method == _SOFT_GAUSSIAN:
+        for j in range(num_dets):
+            weight = 1.0
+            for i in range(j):
+                iou = _overlap(boxes, i, j, False)
+                if method == _SOFT_GAUSSIAN:
+                    weight *= np.exp(-(iou * iou) / sigma)
+                elif iou > iou_thres:
+                    weight *= 1 - iou
+            new_scores[j] *= weight
+    else:
+        use_diou = method == _CLUSTER_DIOU
+        for i in range(num_dets):
+            if not keep[i]:
+                continue
+            for j in range(i + 1, num_dets):
+                if keep[j] and _overlap(boxes, i, j, use_diou) > iou_thres:
+                    keep[j] = False
+    return new_scores, keep
+
+
+@numba.njit(cache=True, error_model='numpy')
+def _nms_image(boxes, scores, method, iou_thres, sigma, top_k, cross_class):
+    """
+    Runs NMS on the (N, 4) boxes and (N, C) scores of an image, on the top_k detections of each class, or on the
+    top_k detections with the highest maximum score if cross_class.
+
+    :return: the indices of the kept boxes, their classes and their scores, grouped by class and sorted by decreasing
+        initial score in each class
+    """
+    num_dets, num_classes = scores.shape
+    num_groups = 1 if cross_class else num_classes
+    group_size = min(top_k, num_dets)
+    indices = np.empty(num_groups * group_size, dtype=np.int64)
+    classes = np.empty(num_groups * group_size, dtype=np.int64)
+    kept_scores = np.empty(num_groups * group_size, dtype=scores.dtype)
+    det_classes = np.empty(num_dets, dtype=np.int64)
+    group_scores = np.empty(num_dets, dtype=scores.dtype)
+    count = 0
+    for group in range(num_groups):
+        for det in range(num_dets):
+            if cross_class:
+                # The detections have the class of their maximum score
+                best = 0
+                for c in range(1, num_classes):
+                    if scores[det, c] > scores[det, best]:
+                        best = c
+                det_classes[det] = best
+            else:
+                det_classes[det] = group
+            group_scores[det] = scores[det, det_classes[det]]
+        order = np.argsort(-group_scores, kind='mergesort')[:group_size]
+        new_scores, keep = _suppress(boxes[order], group_scores[order], method, iou_thres, sigma)
+        for k in range(group_size):
+            if keep[k]:
+                indices[count] = order[k]
+                classes[count] = det_classes[order[k]]
+                kept_scores[count] = new_scores[k]
+                count += 1
+    return indices[:count], classes[:count], kept_scores[:count]
+
+
+def batched_nms(boxes, scores, method='standard', iou_thres=0.45, sigma=0.5, top_k=400, post_k=100, cross_class=True,
+                threshold=0.0):
+    """
+    Runs NMS on the CPU on the detections of several images, with one call of a compiled kernel per image, which
+    avoids the overhead of dispatching many small torch operations.
+
+    :param boxes: boxes of the detections of each image, as a (B, N, 4) array, or a list of (N, 4) arrays or tensors
+        whose numbers of detections may differ
+    :param scores: scores of each class for the detections of each image, as a (B, N, C) array, or a list of (N, C) or
+        (N,) arrays or tensors
+    :param method: NMS method, one of METHODS
+    :param iou_thres: IoU (or DIoU) above which a detection is suppressed, or above which its score is decayed by
+        linear Soft-NMS
+    :param sigma: variance of the decay of gaussian Soft-NMS
+    :param top_k: number of detections of each class (or of the image if cross_class) with the highest scores that
+        are processed
+    :param post_k: number of kept detections of each image with the highest scores that are returned, or None to
+        return all of them, grouped by class and sorted by decreasing score before NMS
+    :param cross_class: whether the detections have the class of their maximum score and suppress the detections of
+        all the classes, otherwise the detections of each class only suppress those of the same class
+    :param threshold: minimum score of the returned detections
+    :return: the boxes, classes and scores of the kept detections of each image, as numpy arrays
+    :rtype: list
+    """
+    if method not in METHODS:
+        raise ValueError("Unknown NMS method '%s', choose from %s" % (method, ", ".join(METHODS)))
+    results = []
+    for image_boxes, image_scores in zip(boxes, scores):
+        image_boxes, image_scores = _to_numpy(image_boxes), _to_numpy(image_scores)
+        if image_scores.ndim == 1:
+            image_scores = image_scores[:, None]
+        if image_boxes.dtype != image_scores.dtype:
+            image_boxes = image_boxes.astype(image_scores.dtype)
+        indices, classes, kept_scores = _nms_image(image_boxes, image_scores, METHODS.index(method), iou_thres,
+                                                   sigma, top_k, cross_class)
+        if post_k is not None:
+            order = np.argsort(-kept_scores, kind='stable')[:post_k]
+            indices, classes, kept_scores = indices[order], classes[order], kept_scores[order]
+        mask = kept_scores > threshold
+        results.append([image_boxes[indices[mask]], classes[mask], kept_scores[mask]])
+    return results
+
+
+def _to_numpy(array):
+    """Returns a contiguous floating point numpy array, without copying CPU tensors and arrays when possible"""
+    if torch.is_tensor(array):
+        array = array.detach().cpu().numpy()
+    array = np.ascontiguousarray(array)
+    if not np.issubdtype(array.dtype, np.floating):
+        array = array.astype(np.float32)
+    return array
+
+
+class CPUNMS(NMSCustom):
+    """
+    NMS that runs on the CPU with the compiled kernels of batched_nms(), for the custom_nms argument of the infer()
+    method of the detectors, e.g., SingleShotDetectorLearner.
+    """
+    def __init__(self, nms_type='standard', cross_class=True, iou_thres=0.45, sigma=0.5, top_k=400, post_k=100):
+        super(CPUNMS, self).__init__(device='cpu')
+        self.nms_types = list(METHODS)
+        self.set_type(nms_type)
+        self.cross_class = cross_class
+        self.iou_thres = iou_thres
+        self.sigma = sigma
+        self.top_k = top_k
+        self.post_k = post_k
+
+    def set_type(self, nms_type='standard'):
+        if nms_type not in self.nms_types:
+            raise ValueError('Type: ' + nms_type + ' of NMS is not supported.')
+        else:
+            self.nms_type = nms_type
+
+    def set_iou_thres(self, iou_thres=0.45):
+        self.iou_thres = iou_thres
+
+    def set_top_k(self, top_k=400):
+        self.top_k = top_k
+
+    def set_post_k(self, post_k=100):
+        self.post_k = post_k
+
+    def set_cross_class(self, cross_class=True):
+        self.cross_class = cross_class
+
+    def run_nms(self, boxes=None, scores=None, threshold=0.2, img=None):
+        return self.run_nms_batch(boxes=[boxes], scores=[scores], threshold=threshold)[0]
+
+    def run_nms_batch(self, boxes=None, scores=None, threshold=0.2):
+        results = batched_nms(boxes, scores, method=self.nms_type, iou_thres=self.iou_thres, sigma=self.sigma,
+                              top_k=self.top_k, post_k=self.post_k, cross_class=self.cross_class,
+                              threshold=threshold)
+        return [to_bounding_boxes(detections) for detections in results]
+
+
+def to_bounding_boxes(detections):
+    """Returns the result of run_nms() for the boxes, classes and scores of the detections of an image"""
+    boxes, classes, scores = detections
+    return BoundingBoxList.from_numpy(boxes, scores, classes), [boxes, classes, scores]
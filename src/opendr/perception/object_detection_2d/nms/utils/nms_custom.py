@@ -22,3 +22,17 @@ class NMSCustom(ABC):
     @abstractmethod
     def run_nms(self, boxes=None, scores=None, threshold=0.2, img=None, device='cpu'):
         pass
+
+    def run_nms_batch(self, boxes=None, scores=None, threshold=0.2):
+        """
+        Runs NMS on the detections of several images, with the result of run_nms() for each image. The NMS methods
+        that can process several images at once override it.
+
+        :param boxes: boxes of the detections of each image
+        :param scores: scores of each class for the detections of each image
+        :param threshold: minimum score of the kept detections
+        :return: the result of run_nms() for each image
+        :rtype: list
+        """
+        return [self.run_nms(boxes=image_boxes, scores=image_scores, threshold=threshold)
+                for image_boxes, image_scores in zip(boxes, scores)]
@@ -18,7 +18,7 @@ from opendr.perception.object_detection_2d.datasets.transforms import BoundingBo
 from opendr.engine.constants import OPENDR_SERVER_URL
 from pycocotools.coco import COCO
 import os
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import ssl
 import time
 from zipfile import ZipFile
@@ -260,18 +260,30 @@ def bb_intersection_over_union(boxAs=None, boxBs=None):
 
 
 def compute_class_weights(pos_weights, max_dets=400, dataset_nms=None):
-    num_pos = np.ones([len(dataset_nms.classes), 1])
-    num_bg = np.ones([len(dataset_nms.classes), 1])
-    weights = np.zeros([len(dataset_nms.classes), 2])
+    num_classes = len(dataset_nms.classes)
+    dt_counts = np.zeros([len(dataset_nms.src_data), num_classes])
+    gt_counts = np.zeros([len(dataset_nms.src_data), num_classes])
     for i in range(len(dataset_nms.src_data)):
-        for cls_index in range(len(dataset_nms.classes)):
-            num_pos[cls_index] = num_pos[cls_index] + \
-                                 min(max_dets, len(dataset_nms.src_data[i]['gt_boxes'][cls_index]))
-            num_bg[cls_index] = num_bg[cls_index] + max(0, min(max_dets,
-                                                               len(dataset_nms.src_data[i]['dt_boxes'][cls_index])) -
-                                                        min(max_dets,
-                                                            len(dataset_nms.src_data[i]['gt_boxes'][cls_index])))
-    for class_index in range(len(dataset_nms.classes)):
+        for cls_index in range(num_classes):
+            dt_counts[i, cls_index] = len(dataset_nms.src_data[i]['dt_boxes'][cls_index])
+            gt_counts[i, cls_index] = len(dataset_nms.src_data[i]['gt_boxes'][cls_index])
+    return class_weights_from_counts(pos_weights, max_dets, dt_counts, gt_counts)
+
+
+def class_weights_from_counts(pos_weights, max_dets, dt_counts, gt_counts):
+    """
+    Computes the weights of compute_class_weights() from the numbers of detections and ground truth boxes of each
+    class, as (num_samples, num_classes) arrays.
+    """
+    num_classes = dt_counts.shape[1]
+    num_pos = np.ones(num_classes)
+    num_bg = np.ones(num_classes)
+    weights = np.zeros([num_classes, 2])
+    for cls_index in range(num_classes):
+        num_pos[cls_index] = num_pos[cls_index] + np.minimum(max_dets, gt_counts[:, cls_index]).sum()
+        num_bg[cls_index] = num_bg[cls_index] + np.maximum(0, np.minimum(max_dets, dt_counts[:, cls_index]) -
+                                                           np.minimum(max_dets, gt_counts[:, cls_index])).sum()
+    for class_index in range(num_classes):
         weights[class_index, 0] = (1 - pos_weights[class_index]) * (num_pos[class_index] +
                                                                     num_bg[class_index]) / num_bg[class_index]
         weights[class_index, 1] = pos_weights[class_index] * (num_pos[class_index] +
@@ -42,12 +42,12 @@ from collections import defaultdict
 import numpy as np
 import mxnet as mx
 from mxnet.module import Module
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
 from opendr.engine.data import Image
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 from opendr.engine.constants import OPENDR_SERVER_URL
 
 from opendr.perception.object_detection_2d.retinaface.algorithm.models.retinaface import RetinaFace
@@ -645,7 +645,7 @@ class RetinaFaceLearner(Learner):
 
         if not isinstance(img, Image):
             img = Image(img)
-        _img = img.convert("channels_last", "rgb")
+        _img = img.convert("channels_last", "rgb", copy=False)
 
         im_shape = _img.shape
         target_size = scales[0]
@@ -662,17 +662,9 @@ class RetinaFaceLearner(Learner):
 
         faces, landmarks = self.detector.detect(_img, threshold, scales=scales, do_flip=flip)
         faces = np.hstack([faces, np.zeros((faces.shape[0], 1))])
-        bboxes = BoundingBoxList([])
-        for face in faces:
-            if face.shape[0] > 4:
-                mask = int(face[5] > mask_thresh)
-            # faces in xywhc format, convert to BoundingBoxs
-            bbox = BoundingBox(left=face[0], top=face[1],
-                               width=face[2] - face[0],
-                               height=face[3] - face[1],
-                               name=mask, score=face[4])
-
-            bboxes.data.append(bbox)
+        # faces in [x0, y0, x1, y1, score, mask] format, convert to BoundingBoxList
+        masks = (faces[:, 5] > mask_thresh).astype(np.int64)
+        bboxes = BoundingBoxList.from_numpy(faces[:, :4], faces[:, 4], masks)
 
         # return faces, landmarks
         return bboxes
@@ -19,7 +19,7 @@ import json
 import numpy as np
 import warnings
 from tqdm import tqdm
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # gluoncv ssd imports
 from gluoncv.data.transforms import presets
@@ -36,7 +36,7 @@ from gluoncv.utils.metrics.coco_detection import COCODetectionMetric
 # OpenDR engine imports
 from opendr.engine.learners import Learner
 from opendr.engine.data import Image
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 from opendr.engine.datasets import ExternalDataset
 from opendr.engine.constants import OPENDR_SERVER_URL
 
@@ -52,6 +52,7 @@ gutils.random.seed(0)
 
 
 class SingleShotDetectorLearner(Learner):
+    supports_fit_callbacks = True
     supported_backbones = {"vgg16_atrous": [512, 300],
                            "resnet50_v1": [512],
                            "mobilenet1.0": [512],
@@ -429,11 +430,13 @@ class SingleShotDetectorLearner(Learner):
             toc = time.time()
 
             # perform evaluation during training
+            stop = False
             if epoch % self.val_after == self.val_after - 1 and val_dataset is not None:
                 if verbose:
                     print("Model evaluation at epoch {}".format(epoch))
                 eval_dict = self.eval(val_dataset)
                 training_dict["val_map"].append(eval_dict["map"])
+                stop = self._report_fit_metrics(epoch, eval_dict)
 
             # checkpoint saving
             if self.checkpoint_after_iter > 0 and epoch % self.checkpoint_after_iter == self.checkpoint_after_iter - 1:
@@ -451,6 +454,10 @@ class SingleShotDetectorLearner(Learner):
             print('[Epoch {}] Training cost: {:.3f}, {}={:.3f}, {}={:.3f}'.format(
                 epoch, toc - tic, name1, loss1, name2, loss2
             ))
+            if stop:
+                if verbose:
+                    print("Training stopped by a fit callback after epoch {}".format(epoch))
+                break
 
         return training_dict
 
@@ -639,14 +646,7 @@ class SingleShotDetectorLearner(Learner):
         if custom_nms is not None:
             bounding_boxes, _ = custom_nms.run_nms(boxes=boxes, scores=scores, threshold=threshold, img=_img)
         else:
-            bounding_boxes = BoundingBoxList([])
-            for idx, box in enumerate(boxes):
-                bbox = BoundingBox(left=box[0], top=box[1],
-                                   width=box[2] - box[0],
-                                   height=box[3] - box[1],
-                                   name=class_IDs[idx, :],
-                                   score=scores[idx, :])
-                bounding_boxes.data.append(bbox)
+            bounding_boxes = BoundingBoxList.from_numpy(boxes, scores[:, 0], class_IDs[:, 0].astype(np.int64))
 
         return bounding_boxes
 
@@ -19,7 +19,7 @@ import json
 import numpy as np
 import warnings
 from tqdm import tqdm
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # gluoncv ssd imports
 from gluoncv.data.transforms import presets
@@ -38,7 +38,7 @@ from gluoncv.data import MixupDetection, RandomTransformDataLoader
 from opendr.engine.learners import Learner
 from opendr.engine.datasets import ExternalDataset
 from opendr.engine.data import Image
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 from opendr.engine.constants import OPENDR_SERVER_URL
 
 # algorithm imports
@@ -470,14 +470,7 @@ class YOLOv3DetectorLearner(Learner):
         boxes[:, [0, 2]] *= width
         boxes[:, [1, 3]] *= height
 
-        bounding_boxes = BoundingBoxList([])
-        for idx, box in enumerate(boxes):
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=class_IDs[idx, :],
-                               score=scores[idx, :])
-            bounding_boxes.data.append(bbox)
+        bounding_boxes = BoundingBoxList.from_numpy(boxes, scores[:, 0], class_IDs[:, 0].astype(np.int64))
         return bounding_boxes
 
     def save(self, path, verbose=False):
@@ -15,9 +15,10 @@
 # OpenDR engine imports
 from opendr.engine.learners import Learner
 from opendr.engine.data import Image
-from opendr.engine.target import BoundingBox, BoundingBoxList
+from opendr.engine.target import BoundingBoxList
 
 # yolov5 imports
+import numpy as np
 import torch
 torch.hub._validate_not_a_forked_repo = lambda a, b, c: True  # workaround for rate limit bug
 
@@ -52,15 +53,8 @@ class YOLOv5DetectorLearner(Learner):
 
         results = self.model(img, size=size)
 
-        bounding_boxes = BoundingBoxList([])
-        for idx, box in enumerate(results.xyxy[0]):
-            box = box.cpu().numpy()
-            bbox = BoundingBox(left=box[0], top=box[1],
-                               width=box[2] - box[0],
-                               height=box[3] - box[1],
-                               name=box[5],
-                               score=box[4])
-            bounding_boxes.data.append(bbox)
+        dets = results.xyxy[0].cpu().numpy()
+        bounding_boxes = BoundingBoxList.from_numpy(dets[:, :4], dets[:, 4], dets[:, 5].astype(np.int64))
         return bounding_boxes
 
     def fit(self):
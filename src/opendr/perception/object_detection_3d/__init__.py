@@ -1,5 +1,9 @@
-from opendr.perception.object_detection_3d.voxel_object_detection_3d.voxel_object_detection_3d_learner import \
-    VoxelObjectDetection3DLearner
-from opendr.perception.object_detection_3d.datasets.kitti import KittiDataset, LabeledPointCloudsDatasetIterator
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'VoxelObjectDetection3DLearner': '.voxel_object_detection_3d.voxel_object_detection_3d_learner',
+    'KittiDataset': '.datasets.kitti',
+    'LabeledPointCloudsDatasetIterator': '.datasets.kitti',
+})
 
 __all__ = ['VoxelObjectDetection3DLearner', 'KittiDataset', 'LabeledPointCloudsDatasetIterator']
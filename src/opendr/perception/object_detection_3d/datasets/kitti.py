@@ -19,7 +19,7 @@ import os
 import numpy as np
 from skimage import io
 from distutils.dir_util import copy_tree
-from opendr.engine.datasets import ExternalDataset, DatasetIterator
+from opendr.engine.datasets import ExternalDataset, DatasetIterator, PointCloudsDatasetIterator
 from opendr.engine.data import PointCloudWithCalibration
 from opendr.engine.target import BoundingBox3DList
 from opendr.perception.object_detection_3d.datasets.create_data_kitti import (
@@ -31,7 +31,7 @@ from opendr.perception.object_detection_3d.voxel_object_detection_3d.second_dete
     get_label_anno,
     _extend_matrix,
 )
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 import time
 from zipfile import ZipFile
 from opendr.engine.constants import OPENDR_SERVER_URL
@@ -177,7 +177,7 @@ class KittiDataset(ExternalDataset):
 
 class LabeledPointCloudsDatasetIterator(DatasetIterator):
     def __init__(
-        self, lidar_path, label_path, calib_path, image_path=None, num_point_features=4
+        self, lidar_path, label_path, calib_path, image_path=None, num_point_features=4, mmap=False, prefetch=0
     ):
         super().__init__()
 
@@ -187,24 +187,24 @@ class LabeledPointCloudsDatasetIterator(DatasetIterator):
         self.image_path = image_path
         self.num_point_features = num_point_features
 
-        self.lidar_files = sorted(os.listdir(self.lidar_path))
+        # lidar_path can also be a packed point cloud file, see PointCloudsDatasetIterator.pack
+        self.point_clouds = PointCloudsDatasetIterator(
+            self.lidar_path, num_point_features, mmap=mmap, prefetch=prefetch
+        )
+        self.lidar_files = self.point_clouds.files
         self.label_files = sorted(os.listdir(self.label_path))
         self.calib_files = sorted(os.listdir(self.calib_path))
         self.image_files = sorted(os.listdir(self.image_path)) if self.image_path is not None else None
 
-        if len(self.lidar_files) != len(self.label_files) or len(
-            self.lidar_files
+        if len(self.point_clouds) != len(self.label_files) or len(
+            self.point_clouds
         ) != len(self.calib_files):
             raise ValueError(
                 "Number of files in lidar, label and calib files is not identical"
             )
 
     def __getitem__(self, idx):
-        points = np.fromfile(
-            os.path.join(self.lidar_path, self.lidar_files[idx]),
-            dtype=np.float32,
-            count=-1,
-        ).reshape([-1, self.num_point_features])
+        points = self.point_clouds[idx].data
         calib = parse_calib(
             os.path.join(self.calib_path, self.calib_files[idx])
         )
@@ -225,7 +225,7 @@ class LabeledPointCloudsDatasetIterator(DatasetIterator):
         return result
 
     def __len__(self):
-        return len(self.lidar_files)
+        return len(self.point_clouds)
 
 
 def parse_calib(
@@ -18,7 +18,6 @@ import torch
 import ntpath
 import shutil
 import pathlib
-import onnxruntime as ort
 from opendr.engine.learners import Learner
 from opendr.engine.datasets import (
     DatasetIterator,
@@ -57,7 +56,7 @@ from opendr.perception.object_detection_3d.voxel_object_detection_3d.second_dete
 )
 from opendr.engine.target import BoundingBox3DList
 from opendr.engine.constants import OPENDR_SERVER_URL
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from urllib.error import URLError
 import warnings
 from numba import errors
@@ -606,7 +605,8 @@ class VoxelObjectDetection3DLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.model.rpn_ort_session = ort.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.model.rpn_ort_session = create_session(path, io_binding=True)
 
         # The comments below are the alternative way to use the onnx model, it might be useful in the future
         # depending on how ONNX saving/loading will be implemented across the toolkit.
@@ -18,7 +18,7 @@ import cv2
 import time
 import numpy as np
 from zipfile import ZipFile
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.engine.data import Image
 from opendr.engine.target import Category
@@ -25,7 +25,7 @@ import copy
 import numpy as np
 import torch
 from collections import OrderedDict
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from zipfile import ZipFile
 from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.engine.data import Image, ImageWithDetections
@@ -203,7 +203,7 @@ class RawMotDatasetIterator(DatasetIterator):
         img_path = self.img_files[ds][files_index - start_index]
         label_path = self.label_files[ds][files_index - start_index]
 
-        imgs, labels, img_path, (input_h, input_w) = self.get_data(
+        img, labels, img_path, (input_h, input_w) = self.get_data(
             img_path, label_path
         )
 
@@ -212,18 +212,19 @@ class RawMotDatasetIterator(DatasetIterator):
                 labels[i, 1] += self.tid_start_index[ds]
 
         return (
-            Image(imgs), TrackingAnnotationList.from_mot(labels)
+            img, TrackingAnnotationList.from_mot(labels)
         )
 
     def get_data(self, img_path, label_path):
         height = self.height
         width = self.width
-        img = cv2.imread(img_path)  # BGR
-        if img is None:
+        try:
+            img = Image.open(img_path)  # Converted to CHW/RGB on first use
+        except ValueError:
             raise ValueError("File corrupt {}".format(img_path))
 
-        h, w, _ = img.shape
-        shape = img.shape[:2]
+        h, w, _ = img.opencv(copy=False).shape
+        shape = (h, w)
         ratio = min(float(height) / shape[0], float(width) / shape[1])
         new_shape = (
             round(shape[1] * ratio),
@@ -262,8 +263,6 @@ class RawMotDatasetIterator(DatasetIterator):
             labels[:, 4] /= width
             labels[:, 5] /= height
 
-        img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))  # BGR to RGB
-
         return img, labels, img_path, (h, w)
 
     def __len__(self):
@@ -18,7 +18,6 @@ import json
 import torch
 import ntpath
 import shutil
-import onnxruntime as ort
 from PIL import Image as PilImage
 from torchvision.transforms import transforms as T
 from opendr.engine.learners import Learner
@@ -30,7 +29,8 @@ from opendr.perception.object_tracking_2d.fair_mot.algorithm.run import evaluate
 from opendr.perception.object_tracking_2d.deep_sort.algorithm.deep_sort_tracker import DeepSortTracker
 from opendr.engine.data import Image, ImageWithDetections
 from opendr.engine.constants import OPENDR_SERVER_URL
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
 
 
 class ObjectTracking2DDeepSortLearner(Learner):
@@ -79,6 +79,7 @@ class ObjectTracking2DDeepSortLearner(Learner):
 
         self.infers_count = 0
         self.infers_time = 0
+        self.quantization = None  # Report of the INT8 quantization of the ONNX model, see optimize()
 
     def save(self, path, verbose=False):
         """
@@ -86,7 +87,8 @@ class ObjectTracking2DDeepSortLearner(Learner):
         Provided with the path, absolute or relative, including a *folder* name, it creates a directory with the name
         of the *folder* provided and saves the model inside with a proper format and a .json file with metadata.
         If self.optimize was ran previously, it saves the optimized ONNX model in a similar fashion, by copying it
-        from the self.temp_path it was saved previously during conversion.
+        from the self.temp_path it was saved previously during conversion. An INT8 model is saved alongside the float
+        PyTorch model, with the report of its quantization.
         :param path: for the model to be saved, including the folder name
         :type path: str
         :param verbose: whether to print success message or not, defaults to 'False'
@@ -125,6 +127,24 @@ class ObjectTracking2DDeepSortLearner(Learner):
             }, os.path.join(path_no_folder_name, folder_name_no_ext, model_metadata["model_paths"][0]))
             if verbose:
                 print("Saved Pytorch model.")
+        elif self.quantization is not None:
+            model_metadata["model_paths"] = [
+                folder_name_no_ext + "_int8.onnx",
+                folder_name_no_ext + ".pth",
+            ]
+            model_metadata["optimized"] = True
+            model_metadata["format"] = "onnx"
+            model_metadata["optimizer_info"] = self.quantization
+
+            shutil.copy2(
+                os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"),
+                os.path.join(path_no_folder_name, folder_name_no_ext, model_metadata["model_paths"][0])
+            )
+            torch.save({
+                'state_dict': self.tracker.deepsort.extractor.net.state_dict()
+            }, os.path.join(path_no_folder_name, folder_name_no_ext, model_metadata["model_paths"][1]))
+            if verbose:
+                print("Saved INT8 ONNX model and Pytorch model.")
         else:
             model_metadata["model_paths"] = [
                 folder_name_no_ext + ".onnx"
@@ -165,7 +185,11 @@ class ObjectTracking2DDeepSortLearner(Learner):
             if verbose:
                 print("Loaded Pytorch model.")
         else:
-            self.__load_rpn_from_onnx(os.path.join(path, metadata["model_paths"][0]))
+            self.__load_from_onnx(os.path.join(path, metadata["model_paths"][0]))
+            if metadata["optimizer_info"].get("target") == "cpu-int8":
+                # The float model is saved alongside the INT8 model
+                self.quantization = metadata["optimizer_info"]
+                self.__load_from_pth(self.tracker.deepsort.extractor.net, os.path.join(path, metadata["model_paths"][1]))
             if verbose:
                 print("Loaded ONNX model.")
 
@@ -286,7 +310,8 @@ class ObjectTracking2DDeepSortLearner(Learner):
 
             t0 = time.time()
 
-            result = self.tracker.infer(image, frame_id, swap_left_top=swap_left_top)
+            with self._profile("infer"):
+                result = self.tracker.infer(image, frame_id, swap_left_top=swap_left_top)
             results.append(result)
 
             t0 = time.time() - t0
@@ -298,13 +323,29 @@ class ObjectTracking2DDeepSortLearner(Learner):
 
         return results
 
-    def optimize(self, do_constant_folding=False, img_size=(64, 128)):
+    def optimize(self, do_constant_folding=False, img_size=(64, 128), target="onnx", calibration_dataset=None,
+                 calibration_samples=100):
         """
         Optimize method converts the model to ONNX format and saves the
         model in the parent directory defined by self.temp_path. The ONNX model is then loaded.
+        With the 'cpu-int8' target, the ONNX model is quantized to INT8 for CPU inference, with post-training static
+        quantization calibrated on the crops of the detections of calibration_dataset, and the quantized model is
+        loaded instead.
         :param do_constant_folding: whether to optimize constants, defaults to 'False'
         :type do_constant_folding: bool, optional
+        :param target: 'onnx' for a float ONNX model, or 'cpu-int8' for an INT8 ONNX model, defaults to 'onnx'
+        :type target: str, optional
+        :param calibration_dataset: dataset of engine.data.ImageWithDetections (e.g., the frames of a video with their
+            detections), or of engine.data.Image crops of persons, which calibrates the quantization, required for the
+            'cpu-int8' target
+        :type calibration_dataset: engine.datasets.DatasetIterator, optional
+        :param calibration_samples: maximum number of images used for the calibration, defaults to 100
+        :type calibration_samples: int, optional
+        :return: for the 'cpu-int8' target, the report of the quantization, with the difference between the outputs
+            of the float and INT8 models on the calibration crops, see engine.helper.quantization.quantize_int8()
+        :rtype: dict
         """
+        check_target(target, calibration_dataset)
 
         if self.tracker.deepsort.extractor.net is None:
             raise UserWarning("No model is loaded, cannot optimize. Load or train a model first.")
@@ -331,8 +372,38 @@ class ObjectTracking2DDeepSortLearner(Learner):
                 os.path.join(self.temp_path, "onnx_model_temp.onnx"), do_constant_folding
             )
 
+        if target == "cpu-int8":
+            inputs = calibration_inputs(calibration_dataset, self.__calibration_input, calibration_samples)
+            self.quantization = quantize_int8(
+                os.path.join(self.temp_path, "onnx_model_temp.onnx"),
+                os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"), inputs
+            )
+            self.__load_from_onnx(os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"))
+            return self.quantization
+
         self.__load_from_onnx(os.path.join(self.temp_path, "onnx_model_temp.onnx"))
 
+    def __calibration_input(self, image):
+        """
+        Returns the crops of the detections of an ImageWithDetections (or an Image crop), preprocessed as the batch of
+        inputs of the re-identification model, or None if it has no detection.
+        """
+        frame = image.numpy().transpose(1, 2, 0)
+        if not isinstance(image, ImageWithDetections):
+            return self.tracker.deepsort.extractor._preprocess([frame]).numpy()
+
+        # The boxes are dilated and cropped as in DeepSortTracker.infer() and DeepSort.update()
+        deepsort = self.tracker.deepsort
+        deepsort.width, deepsort.height = frame.shape[:2]
+        crops = []
+        for box in image.boundingBoxList:
+            x1, y1, x2, y2 = deepsort._tlwh_to_xyxy((box.left, box.top, box.width, box.height * 1.2))
+            if x2 > x1 and y2 > y1:
+                crops.append(frame[x1:x2, y1:y2])
+        if not crops:
+            return None
+        return deepsort.extractor._preprocess(crops).numpy()
+
     @staticmethod
     def download(model_name, path, server_url=None):
 
@@ -397,7 +468,8 @@ class ObjectTracking2DDeepSortLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.tracker.deepsort.extractor.net.ort_session = ort.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.tracker.deepsort.extractor.net.ort_session = create_session(path)
 
         # The comments below are the alternative way to use the onnx model, it might be useful in the future
         # depending on how ONNX saving/loading will be implemented across the toolkit.
@@ -19,7 +19,6 @@ import torch
 import ntpath
 import shutil
 import numpy as np
-import onnxruntime as ort
 from torchvision.transforms import transforms as T
 from opendr.engine.learners import Learner
 from opendr.engine.datasets import DatasetIterator, ExternalDataset, MappedDatasetIterator
@@ -33,7 +32,7 @@ from opendr.perception.object_tracking_2d.fair_mot.algorithm.lib.tracker.multitr
 from opendr.engine.data import Image
 from opendr.engine.target import TrackingAnnotation, TrackingAnnotationList
 from opendr.engine.constants import OPENDR_SERVER_URL
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 
 class ObjectTracking2DFairMotLearner(Learner):
@@ -534,7 +533,8 @@ class ObjectTracking2DFairMotLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.model.rpn_ort_session = ort.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.model.rpn_ort_session = create_session(path)
 
         # The comments below are the alternative way to use the onnx model, it might be useful in the future
         # depending on how ONNX saving/loading will be implemented across the toolkit.
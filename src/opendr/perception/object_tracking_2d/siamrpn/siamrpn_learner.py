@@ -20,7 +20,7 @@ import numpy as np
 from multiprocessing import Pool
 import cv2
 from tqdm import tqdm
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # gluoncv imports
 import mxnet as mx
@@ -1,6 +1,8 @@
-from opendr.perception.object_tracking_3d.ab3dmot.object_tracking_3d_ab3dmot_learner import (
-    ObjectTracking3DAb3dmotLearner
-)
-from opendr.perception.object_tracking_3d.datasets.kitti_tracking import KittiTrackingDatasetIterator
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'ObjectTracking3DAb3dmotLearner': '.ab3dmot.object_tracking_3d_ab3dmot_learner',
+    'KittiTrackingDatasetIterator': '.datasets.kitti_tracking',
+})
 
 __all__ = ['ObjectTracking3DAb3dmotLearner', 'KittiTrackingDatasetIterator']
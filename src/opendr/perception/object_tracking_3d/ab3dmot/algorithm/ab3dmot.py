@@ -59,10 +59,13 @@ class AB3DMOT():
                 box = tracklet.predict().reshape(-1)[:self.measurement_dimensions]
                 predictions[i] = [*box]
 
-            detection_corners = [
-                convert_3dbox_to_8corner(np.array([*box.location, box.rotation_y, *box.dimensions]))
-                for box in detections.boxes
-            ]
+            detections_kitti = detections.kitti()
+            detection_states = np.concatenate([
+                detections_kitti["location"],
+                detections_kitti["rotation_y"].reshape(-1, 1),
+                detections_kitti["dimensions"],
+            ], axis=1)
+            detection_corners = [convert_3dbox_to_8corner(state) for state in detection_states]
 
             if len(predictions) > 0:
                 prediction_corners = [
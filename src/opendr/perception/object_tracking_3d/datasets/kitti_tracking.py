@@ -20,7 +20,7 @@
 import os
 import time
 from zipfile import ZipFile
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.engine.target import (
     BoundingBox3D,
@@ -29,7 +29,7 @@ from opendr.engine.target import (
     TrackingAnnotation3DList,
 )
 from opendr.engine.data import PointCloudWithCalibration
-from opendr.engine.datasets import DatasetIterator
+from opendr.engine.datasets import DatasetIterator, PointCloudsDatasetIterator
 import numpy as np
 from skimage import io
 
@@ -161,6 +161,8 @@ class LabeledTrackingPointCloudsDatasetIterator(DatasetIterator):
         image_path=None,
         labels_format="tracking",  # detection, tracking
         num_point_features=4,
+        mmap=False,
+        prefetch=0,
     ):
         super().__init__()
 
@@ -170,7 +172,11 @@ class LabeledTrackingPointCloudsDatasetIterator(DatasetIterator):
         self.image_path = image_path
         self.num_point_features = num_point_features
 
-        self.lidar_files = sorted(os.listdir(self.lidar_path))
+        # lidar_path can also be a packed point cloud file, see PointCloudsDatasetIterator.pack
+        self.point_clouds = PointCloudsDatasetIterator(
+            self.lidar_path, num_point_features, mmap=mmap, prefetch=prefetch
+        )
+        self.lidar_files = self.point_clouds.files
         # self.label_files = sorted(os.listdir(self.label_path))
         # self.calib_files = sorted(os.listdir(self.calib_path))
         self.image_files = (
@@ -185,11 +191,7 @@ class LabeledTrackingPointCloudsDatasetIterator(DatasetIterator):
         self.calib = parse_calib(self.calib_path)
 
     def __getitem__(self, idx):
-        points = np.fromfile(
-            os.path.join(self.lidar_path, self.lidar_files[idx]),
-            dtype=np.float32,
-            count=-1,
-        ).reshape([-1, self.num_point_features])
+        points = self.point_clouds[idx].data
         target = self.labels[idx] if len(self.labels) > idx else TrackingAnnotation3DList([])
 
         image_shape = (
@@ -213,7 +215,7 @@ class LabeledTrackingPointCloudsDatasetIterator(DatasetIterator):
         return result
 
     def __len__(self):
-        return len(self.lidar_files)
+        return len(self.point_clouds)
 
 
 def load_tracking_file(
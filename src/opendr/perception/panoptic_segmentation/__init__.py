@@ -1,7 +1,12 @@
-from opendr.perception.panoptic_segmentation.datasets import CityscapesDataset, KittiDataset,\
-    SemanticKittiDataset
-from opendr.perception.panoptic_segmentation.efficient_ps import EfficientPsLearner
-from opendr.perception.panoptic_segmentation.efficient_lps import EfficientLpsLearner
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'CityscapesDataset': '.datasets',
+    'KittiDataset': '.datasets',
+    'EfficientPsLearner': '.efficient_ps',
+    'SemanticKittiDataset': '.datasets',
+    'EfficientLpsLearner': '.efficient_lps',
+})
 
 __all__ = ['CityscapesDataset', 'KittiDataset', 'EfficientPsLearner',
            'SemanticKittiDataset', 'EfficientLpsLearner']
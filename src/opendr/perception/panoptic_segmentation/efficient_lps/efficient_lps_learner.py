@@ -26,7 +26,7 @@ import time
 import torch
 from tqdm import tqdm
 from typing import Optional, List, Dict, Any, Union, Tuple
-import urllib
+from opendr.engine.helper.artifacts import urlretrieve
 import warnings
 
 from mmcv import Config
@@ -669,7 +669,7 @@ class EfficientLpsLearner(Learner):
         else:
             with tqdm(unit="B", unit_scale=True, unit_divisor=1024, miniters=1, desc=f"Downloading {filename}")\
                  as pbar:
-                urllib.request.urlretrieve(url, filename, pbar_hook(pbar))
+                urlretrieve(url, filename, pbar_hook(pbar))
         if prepare_data and mode == "test_data":
             print(f"Extracting {filename}")
             try:
@@ -18,7 +18,7 @@ import os
 import shutil
 import sys
 import time
-import urllib
+from opendr.engine.helper.artifacts import urlretrieve
 import warnings
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Union, Tuple
@@ -487,7 +487,7 @@ class EfficientPsLearner(Learner):
         else:
             with tqdm(unit='B', unit_scale=True, unit_divisor=1024, miniters=1, desc=f'Downloading {filename}') \
                     as pbar:
-                urllib.request.urlretrieve(url, filename, pbar_hook(pbar))
+                urlretrieve(url, filename, pbar_hook(pbar))
         return filename
 
     @staticmethod
@@ -1,8 +1,10 @@
-from opendr.perception.pose_estimation.lightweight_open_pose.lightweight_open_pose_learner import \
-    LightweightOpenPoseLearner
-from opendr.perception.pose_estimation.hr_pose_estimation.high_resolution_learner import \
-    HighResolutionPoseEstimationLearner
+from opendr.engine.helper.lazy import lazy_attributes
 
-from opendr.perception.pose_estimation.lightweight_open_pose.utilities import draw, get_bbox
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'LightweightOpenPoseLearner': '.lightweight_open_pose.lightweight_open_pose_learner',
+    'draw': '.lightweight_open_pose.utilities',
+    'get_bbox': '.lightweight_open_pose.utilities',
+    'HighResolutionPoseEstimationLearner': '.hr_pose_estimation.high_resolution_learner',
+})
 
 __all__ = ['LightweightOpenPoseLearner', 'draw', 'get_bbox', 'HighResolutionPoseEstimationLearner']
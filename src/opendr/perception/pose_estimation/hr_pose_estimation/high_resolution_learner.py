@@ -22,7 +22,7 @@ import json
 import numpy as np
 from tqdm import tqdm
 
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.data import Image
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import onnxruntime as ort
 import os
 import ntpath
 import shutil
@@ -24,13 +23,13 @@ from tqdm import tqdm
 from torch.utils.data import DataLoader
 import torch.optim as optim
 from torch.nn import DataParallel
-from tensorboardX import SummaryWriter
 from torchvision import transforms
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
 
 from opendr.engine.learners import Learner
 from opendr.engine.datasets import ExternalDataset, DatasetIterator
-from opendr.engine.data import Image
+from opendr.engine.data import Image, ImageBatch
 from opendr.engine.target import Pose
 from opendr.engine.constants import OPENDR_SERVER_URL
 
@@ -63,6 +62,9 @@ cv2.ocl.setUseOpenCL(False)  # To prevent freeze of DataLoader
 
 
 class LightweightOpenPoseLearner(Learner):
+    supports_batching = True
+    supports_fit_callbacks = True
+
     def __init__(self, lr=4e-5, epochs=280, batch_size=80, device='cuda', backbone='mobilenet',
                  lr_schedule='', temp_path='temp', checkpoint_after_iter=5000, checkpoint_load_iter=0,
                  val_after=5000, log_after=100, mobilenet_use_stride=True, mobilenetv2_width=1.0, shufflenet_groups=3,
@@ -118,6 +120,7 @@ class LightweightOpenPoseLearner(Learner):
         self.previous_poses = []
 
         self.ort_session = None  # ONNX runtime inference session
+        self.quantization = None  # Report of the INT8 quantization of the ONNX model, see optimize()
         self.model_train_state = True
 
         if self.device == "cpu":
@@ -180,6 +183,7 @@ class LightweightOpenPoseLearner(Learner):
         # Tensorboard logging
         if logging_path != '' and logging_path is not None:
             logging = True
+            from tensorboardX import SummaryWriter
             file_writer = SummaryWriter(logging_path, flush_secs=logging_flush_secs)
         else:
             logging = False
@@ -294,6 +298,7 @@ class LightweightOpenPoseLearner(Learner):
         eval_results_list = []
         paf_losses = []
         heatmap_losses = []
+        stop = False
         for epochId in range(current_epoch, self.epochs):
             total_losses = [0, 0] * (self.num_refinement_stages + 1)  # heatmaps loss, paf loss per stage
             batch_per_iter_idx = 0
@@ -433,12 +438,19 @@ class LightweightOpenPoseLearner(Learner):
                                                scalar_value=np.mean([avg_precision, avg_recall]),
                                                global_step=num_iter)
                         file_writer.flush()  # manually flush eval results to disk
+                    stop = self._report_fit_metrics(num_iter, eval_results)
                 if not silent:
                     pbar.update(1)
                 batch_index += 1
+                if stop:
+                    break
             if not silent:
                 pbar.close()
             scheduler.step()
+            if stop:
+                if not silent:
+                    print("Training stopped by a fit callback after iteration {}".format(num_iter))
+                break
         if logging:
             file_writer.close()
         # Return a dict of lists of PAF and Heatmap losses per stage and a list of all evaluation results dictionaries
@@ -576,24 +588,57 @@ class LightweightOpenPoseLearner(Learner):
         """
         This method is used to perform pose estimation on an image.
 
-        :param img: image to run inference on
-        :type img: engine.data.Image
+        :param img: image to run inference on, or a batch of images to run inference on in a single forward pass
+        :type img: engine.data.Image or engine.data.ImageBatch
         :param upsample_ratio: Defines the amount of upsampling to be performed on the heatmaps and PAFs when resizing,
             defaults to 4
         :type upsample_ratio: int, optional
-        :param track: If True, infer propagates poses ids from previous frame results to track poses, defaults to 'True'
+        :param track: If True, infer propagates poses ids from previous frame results to track poses, defaults to 'True'.
+            Tracking is not performed for batches, since their images are not consecutive frames of the same stream
         :type track: bool, optional
         :param smooth: If True, smoothing is performed on pose keypoints between frames, defaults to 'True'
         :type smooth: bool, optional
         :return: Returns a list of engine.target.Pose objects, where each holds a pose, or returns an empty list if no
-            detections were made.
-        :rtype: list of engine.target.Pose objects
+            detections were made. For a batch, one such list is returned per image.
+        :rtype: list of engine.target.Pose objects, or list of lists of engine.target.Pose objects for a batch
+        """
+        with self._profile("infer"):
+            if isinstance(img, ImageBatch):
+                return self.__infer_batch(img, upsample_ratio, smooth)
+            return self.__infer_single(img, upsample_ratio, track, smooth)
+
+    def __infer_single(self, img, upsample_ratio, track, smooth):
+        """
+        Performs pose estimation on a single image.
+        """
+        with self._profile("preprocess"):
+            tensor_img, scale, pad = self.__preprocess(img)
+
+        with self._profile("forward"):
+            stage2_heatmaps, stage2_pafs = self.__forward(tensor_img)
+
+        with self._profile("postprocess"):
+            all_keypoints, pose_entries = self.__extract_poses(stage2_heatmaps[0], stage2_pafs[0], upsample_ratio)
+            all_keypoints[:, 0] = (all_keypoints[:, 0] * self.stride / upsample_ratio - pad[1]) / scale
+            all_keypoints[:, 1] = (all_keypoints[:, 1] * self.stride / upsample_ratio - pad[0]) / scale
+
+        with self._profile("target"):
+            current_poses = self.__create_poses(all_keypoints, pose_entries, smooth)
+
+            if track:
+                track_poses(self.previous_poses, current_poses, smooth=smooth)
+                self.previous_poses = current_poses
+        return current_poses
+
+    def __preprocess(self, img):
+        """
+        Resizes, normalizes and pads an image, and returns it as a (1, C, H, W) tensor with its scale and padding.
         """
         if not isinstance(img, Image):
             img = Image(img)
 
         # Bring image into the appropriate format for the implementation
-        img = img.convert(format='channels_last', channel_order='bgr')
+        img = img.convert(format='channels_last', channel_order='bgr', copy=False)
 
         height, width, _ = img.shape
         scale = self.base_height / height
@@ -604,6 +649,47 @@ class LightweightOpenPoseLearner(Learner):
         padded_img, pad = pad_width(scaled_img, self.stride, self.pad_value, min_dims)
 
         tensor_img = torch.from_numpy(padded_img).permute(2, 0, 1).unsqueeze(0).float()
+        return tensor_img, scale, pad
+
+    def __infer_batch(self, batch, upsample_ratio, smooth):
+        """
+        Performs pose estimation on all the images of an engine.data.ImageBatch in a single forward pass.
+        """
+        with self._profile("preprocess"):
+            # All the images of a batch share the same size, so they share the same scale and padding as well
+            scale = self.base_height / batch.size[0]
+
+            padded_imgs = []
+            for img in batch.numpy(copy=False):
+                # CHW/RGB to HWC/BGR, as expected by the model
+                img = np.ascontiguousarray(np.transpose(img[::-1], (1, 2, 0)))
+                scaled_img = cv2.resize(img, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+                scaled_img = normalize(scaled_img, self.img_mean, self.img_scale)
+                min_dims = [self.base_height, max(scaled_img.shape[1], self.base_height)]
+                padded_img, pad = pad_width(scaled_img, self.stride, self.pad_value, min_dims)
+                padded_imgs.append(padded_img)
+
+            tensor_imgs = torch.from_numpy(np.stack(padded_imgs)).permute(0, 3, 1, 2).float()
+
+        with self._profile("forward"):
+            stage2_heatmaps, stage2_pafs = self.__forward(tensor_imgs)
+
+        results = []
+        for i in range(len(batch)):
+            with self._profile("postprocess"):
+                all_keypoints, pose_entries = self.__extract_poses(stage2_heatmaps[i], stage2_pafs[i],
+                                                                   upsample_ratio)
+                all_keypoints[:, 0] = (all_keypoints[:, 0] * self.stride / upsample_ratio - pad[1]) / scale
+                all_keypoints[:, 1] = (all_keypoints[:, 1] * self.stride / upsample_ratio - pad[0]) / scale
+                all_keypoints[:, :2] = batch.to_original(all_keypoints[:, :2], i)
+            with self._profile("target"):
+                results.append(self.__create_poses(all_keypoints, pose_entries, smooth))
+        return results
+
+    def __forward(self, tensor_img):
+        """
+        Runs the model on a (N, C, H, W) tensor and returns the heatmaps and PAFs of its last stage.
+        """
         if "cuda" in self.device:
             tensor_img = tensor_img.to(self.device)
             if self.half:
@@ -622,13 +708,19 @@ class LightweightOpenPoseLearner(Learner):
             stages_output = self.model(tensor_img)
             stage2_heatmaps = stages_output[-2]
             stage2_pafs = stages_output[-1]
+        return stage2_heatmaps, stage2_pafs
 
-        heatmaps = np.transpose(stage2_heatmaps.squeeze().cpu().data.numpy(), (1, 2, 0))
+    def __extract_poses(self, stage2_heatmaps, stage2_pafs, upsample_ratio):
+        """
+        Extracts the keypoints of an image from its heatmaps and PAFs and groups them into poses. The coordinates of
+        the keypoints are returned in the upsampled heatmap space.
+        """
+        heatmaps = np.transpose(stage2_heatmaps.cpu().data.numpy(), (1, 2, 0))
         if self.half:
             heatmaps = np.float32(heatmaps)
         heatmaps = cv2.resize(heatmaps, (0, 0), fx=upsample_ratio, fy=upsample_ratio, interpolation=cv2.INTER_CUBIC)
 
-        pafs = np.transpose(stage2_pafs.squeeze().cpu().data.numpy(), (1, 2, 0))
+        pafs = np.transpose(stage2_pafs.cpu().data.numpy(), (1, 2, 0))
         if self.half:
             pafs = np.float32(pafs)
         pafs = cv2.resize(pafs, (0, 0), fx=upsample_ratio, fy=upsample_ratio, interpolation=cv2.INTER_CUBIC)
@@ -641,9 +733,14 @@ class LightweightOpenPoseLearner(Learner):
                                                      total_keypoints_num)
 
         pose_entries, all_keypoints = group_keypoints(all_keypoints_by_type, pafs)
-        for kpt_id in range(all_keypoints.shape[0]):
-            all_keypoints[kpt_id, 0] = (all_keypoints[kpt_id, 0] * self.stride / upsample_ratio - pad[1]) / scale
-            all_keypoints[kpt_id, 1] = (all_keypoints[kpt_id, 1] * self.stride / upsample_ratio - pad[0]) / scale
+        # Each keypoint is stored as (x, y, score, id), an image without keypoints yields an empty array
+        return all_keypoints.reshape(-1, 4), pose_entries
+
+    def __create_poses(self, all_keypoints, pose_entries, smooth):
+        """
+        Creates the engine.target.Pose objects of an image from its grouped keypoints.
+        """
+        num_keypoints = 18
         current_poses = []
         for n in range(len(pose_entries)):
             if len(pose_entries[n]) == 0:
@@ -658,10 +755,6 @@ class LightweightOpenPoseLearner(Learner):
             else:
                 pose = Pose(pose_keypoints, pose_entries[n][18])
             current_poses.append(pose)
-
-        if track:
-            track_poses(self.previous_poses, current_poses, smooth=smooth)
-            self.previous_poses = current_poses
         return current_poses
 
     def save(self, path, verbose=False):
@@ -671,7 +764,8 @@ class LightweightOpenPoseLearner(Learner):
         of the *folder* provided and saves the model inside with a proper format and a .json file with metadata.
 
         If self.optimize was run previously, it saves the optimized ONNX model in a similar fashion, by copying it
-        from the self.temp_path it was saved previously during conversion.
+        from the self.temp_path it was saved previously during conversion. An INT8 model is saved alongside the float
+        PyTorch model, with the report of its quantization.
 
         :param path: for the model to be saved, including the folder name
         :type path: str
@@ -707,6 +801,18 @@ class LightweightOpenPoseLearner(Learner):
             torch.save(custom_dict, os.path.join(full_path_to_model_folder, model_metadata["model_paths"][0]))
             if verbose:
                 print("Saved Pytorch model.")
+        elif self.quantization is not None:
+            model_metadata["model_paths"] = [folder_name_no_ext + "_int8.onnx", folder_name_no_ext + ".pth"]
+            model_metadata["optimized"] = True
+            model_metadata["format"] = "onnx"
+            model_metadata["optimizer_info"] = self.quantization
+            # Copy already quantized model from temp path
+            shutil.copy2(os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"),
+                         os.path.join(full_path_to_model_folder, model_metadata["model_paths"][0]))
+            custom_dict = {'state_dict': self.model.state_dict()}
+            torch.save(custom_dict, os.path.join(full_path_to_model_folder, model_metadata["model_paths"][1]))
+            if verbose:
+                print("Saved INT8 ONNX model and Pytorch model.")
         else:
             model_metadata["model_paths"] = [os.path.join(folder_name_no_ext + ".onnx")]
             model_metadata["optimized"] = True
@@ -778,6 +884,10 @@ class LightweightOpenPoseLearner(Learner):
                 print("Loaded Pytorch model.")
         else:
             self.__load_from_onnx(os.path.join(path, metadata['model_paths'][0]))
+            if metadata["optimizer_info"].get("target") == "cpu-int8":
+                # The float model is saved alongside the INT8 model
+                self.quantization = metadata["optimizer_info"]
+                self.__load_from_pth(os.path.join(path, metadata['model_paths'][1]))
             if verbose:
                 print("Loaded ONNX model.")
 
@@ -804,7 +914,8 @@ class LightweightOpenPoseLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.ort_session = ort.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(path, io_binding=True)
 
         # The comments below are the alternative way to use the onnx model, it might be useful in the future
         # depending on how ONNX saving/loading will be implemented across the toolkit.
@@ -861,14 +972,28 @@ class LightweightOpenPoseLearner(Learner):
                           do_constant_folding=do_constant_folding, input_names=input_names, output_names=output_names,
                           dynamic_axes={"data": {3: "width"}})
 
-    def optimize(self, do_constant_folding=False):
+    def optimize(self, do_constant_folding=False, target="onnx", calibration_dataset=None, calibration_samples=100):
         """
         Optimize method converts the model to ONNX format and saves the
         model in the parent directory defined by self.temp_path. The ONNX model is then loaded.
 
+        With the 'cpu-int8' target, the ONNX model is quantized to INT8 for CPU inference, with post-training static
+        quantization calibrated on the images of calibration_dataset, and the quantized model is loaded instead.
+
         :param do_constant_folding: whether to optimize constants, defaults to 'False'
         :type do_constant_folding: bool, optional
+        :param target: 'onnx' for a float ONNX model, or 'cpu-int8' for an INT8 ONNX model, defaults to 'onnx'
+        :type target: str, optional
+        :param calibration_dataset: dataset whose images (or (image, target) tuples) calibrate the quantization,
+            required for the 'cpu-int8' target
+        :type calibration_dataset: engine.datasets.DatasetIterator, optional
+        :param calibration_samples: maximum number of images used for the calibration, defaults to 100
+        :type calibration_samples: int, optional
+        :return: for the 'cpu-int8' target, the report of the quantization, with the difference between the outputs
+            of the float and INT8 models on the calibration images, see engine.helper.quantization.quantize_int8()
+        :rtype: dict
         """
+        check_target(target, calibration_dataset)
         if self.model is None:
             raise UserWarning("No model is loaded, cannot optimize. Load or train a model first.")
         if self.ort_session is not None:
@@ -881,6 +1006,14 @@ class LightweightOpenPoseLearner(Learner):
             os.makedirs(self.temp_path, exist_ok=True)
             self.__convert_to_onnx(os.path.join(self.temp_path, "onnx_model_temp.onnx"), do_constant_folding)
 
+        if target == "cpu-int8":
+            inputs = calibration_inputs(calibration_dataset, lambda img: self.__preprocess(img)[0].numpy(),
+                                        calibration_samples)
+            self.quantization = quantize_int8(os.path.join(self.temp_path, "onnx_model_temp.onnx"),
+                                              os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"), inputs)
+            self.__load_from_onnx(os.path.join(self.temp_path, "onnx_model_temp_int8.onnx"))
+            return self.quantization
+
         self.__load_from_onnx(os.path.join(self.temp_path, "onnx_model_temp.onnx"))
 
     def reset(self):
@@ -1021,7 +1154,7 @@ class LightweightOpenPoseLearner(Learner):
             img = Image(img)
 
         # Bring image into the appropriate format for the implementation
-        img = img.convert(format='channels_last', channel_order='bgr')
+        img = img.convert(format='channels_last', channel_order='bgr', copy=False)
 
         img_mean = self.img_mean  # Defaults to (128, 128, 128)
         img_scale = self.img_scale  # Defaults to 1 / 256
@@ -1,4 +1,8 @@
-from opendr.perception.semantic_segmentation.bisenet.bisenet_learner import BisenetLearner
-from opendr.perception.semantic_segmentation.bisenet.CamVid import CamVidDataset
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'BisenetLearner': '.bisenet.bisenet_learner',
+    'CamVidDataset': '.bisenet.CamVid',
+})
 
 __all__ = ['BisenetLearner', 'CamVidDataset']
@@ -21,7 +21,7 @@ import numpy as np
 from imgaug import augmenters as iaa
 import random
 import zipfile
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.perception.semantic_segmentation.bisenet.algorithm.utils import get_label_info, RandomCrop, one_hot_it_v11
 from opendr.engine.datasets import ExternalDataset, DatasetIterator
 from opendr.engine.constants import OPENDR_SERVER_URL
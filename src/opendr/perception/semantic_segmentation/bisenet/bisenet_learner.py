@@ -21,12 +21,12 @@ import tqdm
 import numpy as np
 from imgaug import augmenters as iaa
 from PIL import Image as PILImage
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.perception.semantic_segmentation.bisenet.algorithm.model.build_BiSeNet import BiSeNet
 from opendr.perception.semantic_segmentation.bisenet.algorithm.utils import reverse_one_hot, compute_global_accuracy, \
     fast_hist, per_class_iu
 from opendr.engine.learners import Learner
-from opendr.engine.data import Image
+from opendr.engine.data import Image, ImageBatch
 from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.engine.target import Heatmap
 
@@ -170,8 +170,12 @@ class BisenetLearner(Learner):
         """
         This method is used to perform semantic segmentation on an image.
         It returns a heatmap of the given image.
+        If an engine.data.ImageBatch is given, all its images are segmented in a single forward pass and one heatmap
+        is returned per image.
 
         """
+        if isinstance(img, ImageBatch):
+            return self.__infer_batch(img)
 
         if not isinstance(img, Image):
             img = Image(img)
@@ -198,6 +202,39 @@ class BisenetLearner(Learner):
 
         return heatmap
 
+    def __infer_batch(self, batch):
+        """
+        Performs semantic segmentation on all the images of an engine.data.ImageBatch in a single forward pass.
+        """
+        resize = iaa.Scale({'height': self.crop_height, 'width': self.crop_width})
+        resize_det = resize.to_deterministic()
+        images = resize_det.augment_images([np.ascontiguousarray(np.transpose(image, (1, 2, 0)))
+                                            for image in batch.numpy(copy=False)])
+        images = torch.from_numpy(np.stack(images)).permute(0, 3, 1, 2).float().div(255)
+        mean = torch.tensor((0.485, 0.456, 0.406)).view(1, 3, 1, 1)
+        std = torch.tensor((0.229, 0.224, 0.225)).view(1, 3, 1, 1)
+        images = (images - mean) / std
+        # predict
+        if self.model is None:
+            raise UserWarning("No model is loaded, cannot run inference. Load a model first using load().")
+        self.model.eval()
+        predict = self.model(images).argmax(dim=1).cpu().numpy()
+
+        heatmaps = []
+        height, width = batch.size
+        for i, prediction in enumerate(predict):
+            # Drop the letterbox padding of the image, so that the heatmap covers the same area as for a single image
+            (top, left), scale, (original_height, original_width) = batch.pads[i], batch.scales[i], \
+                batch.original_sizes[i]
+            rows = (top + (np.arange(self.crop_height) + 0.5) * original_height * scale / self.crop_height) * \
+                self.crop_height / height
+            cols = (left + (np.arange(self.crop_width) + 0.5) * original_width * scale / self.crop_width) * \
+                self.crop_width / width
+            rows = np.clip(rows.astype(np.int64), 0, self.crop_height - 1)
+            cols = np.clip(cols.astype(np.int64), 0, self.crop_width - 1)
+            heatmaps.append(Heatmap(prediction[np.ix_(rows, cols)]))
+        return heatmaps
+
     def download(self, path=None, mode="pretrained", verbose=True,
                  url=OPENDR_SERVER_URL + "perception/semantic_segmentation/bisenet/"):
         """
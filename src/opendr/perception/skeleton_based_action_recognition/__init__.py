@@ -1,16 +1,12 @@
-from opendr.perception.skeleton_based_action_recognition.continual_stgcn_learner import CoSTGCNLearner
-from opendr.perception.skeleton_based_action_recognition.spatio_temporal_gcn_learner import (
-    SpatioTemporalGCNLearner,
-)
-from opendr.perception.skeleton_based_action_recognition.progressive_spatio_temporal_gcn_learner import (
-    ProgressiveSpatioTemporalGCNLearner,
-)
-from opendr.perception.skeleton_based_action_recognition.algorithm.datasets.ntu_gendata import (
-    NTU60_CLASSES,
-)
-from opendr.perception.skeleton_based_action_recognition.algorithm.datasets.kinetics_gendata import (
-    KINETICS400_CLASSES,
-)
+from opendr.engine.helper.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    "CoSTGCNLearner": ".continual_stgcn_learner",
+    "SpatioTemporalGCNLearner": ".spatio_temporal_gcn_learner",
+    "ProgressiveSpatioTemporalGCNLearner": ".progressive_spatio_temporal_gcn_learner",
+    "NTU60_CLASSES": ".algorithm.datasets.ntu_gendata",
+    "KINETICS400_CLASSES": ".algorithm.datasets.kinetics_gendata",
+})
 
 __all__ = [
     "CoSTGCNLearner",
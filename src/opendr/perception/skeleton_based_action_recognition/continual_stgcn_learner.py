@@ -17,7 +17,6 @@ import json
 import os
 import pickle
 import torch
-import onnxruntime as ort
 import pytorch_lightning as pl
 import torch.nn.functional as F
 
@@ -32,7 +31,7 @@ from opendr.engine.constants import OPENDR_SERVER_URL
 from opendr.engine.datasets import ExternalDataset, DatasetIterator
 from opendr.perception.skeleton_based_action_recognition.algorithm.datasets.ntu_gendata import NTU60_CLASSES
 from opendr.perception.skeleton_based_action_recognition.algorithm.datasets.kinetics_gendata import KINETICS400_CLASSES
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from logging import getLogger
 from typing import Any, Union, Dict, List
@@ -721,7 +720,8 @@ class CoSTGCNLearner(Learner):
         state_path = path.parent / f"{self.backbone}_state.pickle"
 
         logger.info(f"Loading ONNX runtime inference session from {str(onnx_path)}")
-        self._ort_session = ort.InferenceSession(str(onnx_path))
+        from opendr.engine.helper.sessions import create_session
+        self._ort_session = create_session(str(onnx_path))
 
         logger.info(f"Loading ONNX state from {str(state_path)}")
         with open(state_path, "rb") as f:
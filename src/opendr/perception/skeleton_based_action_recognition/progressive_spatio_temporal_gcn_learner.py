@@ -22,16 +22,14 @@ import shutil
 import time
 from collections import OrderedDict
 from torch.utils.data import DataLoader
-import onnxruntime
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from tensorboardX import SummaryWriter
 from torch.autograd import Variable
 from tqdm import tqdm
 import json
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
@@ -148,6 +146,7 @@ class ProgressiveSpatioTemporalGCNLearner(Learner):
         if self.logging_path != '' and self.logging_path is not None:
             self.logging = True
             self.tensorboard_logging_path = os.path.join(self.logging_path, self.experiment_name + '_tensorboard')
+            from tensorboardX import SummaryWriter
             if self.model_train_state:
                 self.train_writer = SummaryWriter(os.path.join(self.tensorboard_logging_path, 'train'), 'train')
                 self.val_writer = SummaryWriter(os.path.join(self.tensorboard_logging_path, 'val'), 'val')
@@ -779,7 +778,8 @@ class ProgressiveSpatioTemporalGCNLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.ort_session = onnxruntime.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(path)
 
     def multi_stream_eval(self, dataset, scores, data_filename='val_joints.npy',
                           labels_filename='val_labels.pkl', skeleton_data_type='joint',
@@ -22,16 +22,15 @@ import shutil
 import time
 from collections import OrderedDict
 from torch.utils.data import DataLoader
-import onnxruntime
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from tensorboardX import SummaryWriter
 from torch.autograd import Variable
 from tqdm import tqdm
 import json
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
 
 # OpenDR engine imports
 from opendr.engine.learners import Learner
@@ -50,6 +49,8 @@ from opendr.perception.skeleton_based_action_recognition.algorithm.datasets.kine
 
 
 class SpatioTemporalGCNLearner(Learner):
+    supports_fit_callbacks = True
+
     def __init__(self, lr=1e-1, batch_size=128, optimizer_name='sgd', lr_schedule='',
                  checkpoint_after_iter=0, checkpoint_load_iter=0, temp_path='temp',
                  device='cuda', num_workers=32, epochs=50, experiment_name='stgcn_nturgbd',
@@ -77,6 +78,7 @@ class SpatioTemporalGCNLearner(Learner):
         self.checkpoint_load_iter = checkpoint_load_iter
         self.model_train_state = True
         self.ort_session = None
+        self.quantization = None  # Report of the INT8 quantization of the ONNX model, see optimize()
         self.dataset_name = dataset_name
         self.num_class = num_class
         self.num_point = num_point
@@ -155,6 +157,7 @@ class SpatioTemporalGCNLearner(Learner):
         if self.logging_path != '' and self.logging_path is not None:
             self.logging = True
             self.tensorboard_logging_path = os.path.join(self.logging_path, self.experiment_name + '_tensorboard')
+            from tensorboardX import SummaryWriter
             if self.model_train_state:
                 self.train_writer = SummaryWriter(os.path.join(self.tensorboard_logging_path, 'train'), 'train')
                 self.val_writer = SummaryWriter(os.path.join(self.tensorboard_logging_path, 'val'), 'val')
@@ -302,6 +305,9 @@ class SpatioTemporalGCNLearner(Learner):
                                      val_data_filename=val_data_filename, val_labels_filename=val_labels_filename)
             eval_results_list.append(eval_results)
             scheduler.step()
+            if self._report_fit_metrics(epoch, eval_results):
+                self.__print_log('Training stopped by a fit callback after epoch {}'.format(epoch + 1))
+                break
         if verbose:
             print('best accuracy: ', self.best_acc, ' model_name: ', self.experiment_name)
         return {"train_loss": np.mean(loss_value), "eval_results": eval_results_list,
@@ -514,7 +520,8 @@ class SpatioTemporalGCNLearner(Learner):
         else:
             SkeletonSeq_batch = Variable(SkeletonSeq_batch.float(), requires_grad=False)
         if self.ort_session is not None:
-            output = self.ort_session.run(None, {'data': np.array(SkeletonSeq_batch.cpu())})
+            output = self.ort_session.run(None, {'onnx_input': np.array(SkeletonSeq_batch.cpu())})
+            output = torch.tensor(output[0])
         else:
             if self.model is None:
                 raise UserWarning("No model is loaded, cannot run inference. Load a model first using load().")
@@ -536,13 +543,27 @@ class SpatioTemporalGCNLearner(Learner):
 
         return category
 
-    def optimize(self, do_constant_folding=True):
+    def optimize(self, do_constant_folding=True, target='onnx', calibration_dataset=None, calibration_samples=100):
         """
         Optimize method converts the model to ONNX format and saves the
         model in the parent directory defined by self.temp_path. The ONNX model is then loaded.
+        With the 'cpu-int8' target, the ONNX model is quantized to INT8 for CPU inference, with post-training static
+        quantization calibrated on the skeleton sequences of calibration_dataset, and the quantized model is loaded
+        instead.
         :param do_constant_folding: whether to optimize constants, defaults to 'False'
         :type do_constant_folding: bool, optional
+        :param target: 'onnx' for a float ONNX model, or 'cpu-int8' for an INT8 ONNX model, defaults to 'onnx'
+        :type target: str, optional
+        :param calibration_dataset: dataset whose skeleton sequences (or (sequence, target) tuples) calibrate the
+            quantization, required for the 'cpu-int8' target
+        :type calibration_dataset: engine.datasets.DatasetIterator, optional
+        :param calibration_samples: maximum number of sequences used for the calibration, defaults to 100
+        :type calibration_samples: int, optional
+        :return: for the 'cpu-int8' target, the report of the quantization, with the difference between the outputs
+            of the float and INT8 models on the calibration sequences, see engine.helper.quantization.quantize_int8()
+        :rtype: dict
         """
+        check_target(target, calibration_dataset)
         if self.model is None:
             raise UserWarning("No model is loaded, cannot optimize. Load or train a model first.")
         if self.ort_session is not None:
@@ -556,6 +577,19 @@ class SpatioTemporalGCNLearner(Learner):
             self.__convert_to_onnx(os.path.join(self.parent_dir, self.experiment_name, "onnx_model.onnx"),
                                    do_constant_folding, verbose=False)
 
+        if target == 'cpu-int8':
+            def preprocess(sequence):
+                if not isinstance(sequence, SkeletonSequence):
+                    sequence = SkeletonSequence(sequence)
+                return sequence.numpy()
+
+            inputs = calibration_inputs(calibration_dataset, preprocess, calibration_samples)
+            self.quantization = quantize_int8(os.path.join(self.parent_dir, self.experiment_name, "onnx_model.onnx"),
+                                              os.path.join(self.parent_dir, self.experiment_name,
+                                                           "onnx_model_int8.onnx"), inputs)
+            self.__load_from_onnx(os.path.join(self.parent_dir, self.experiment_name, "onnx_model_int8.onnx"))
+            return self.quantization
+
         self.__load_from_onnx(os.path.join(self.parent_dir, self.experiment_name, "onnx_model.onnx"))
 
     def __convert_to_onnx(self, output_name, do_constant_folding=False, verbose=False):
@@ -612,7 +646,8 @@ class SpatioTemporalGCNLearner(Learner):
         This method is used to save a trained model.
         Provided with the path and model_name, it saves the model there with a proper format and a .json file
         with metadata. If self.optimize was ran previously, it saves the optimized ONNX model in a similar fashion,
-        by copying it from the self.temp_path it was saved previously during conversion.
+        by copying it from the self.temp_path it was saved previously during conversion. An INT8 model is saved
+        alongside the float PyTorch model, with the report of its quantization.
         :param path: for the model to be saved
         :type path: str
         :param model_name: the name of the file to be saved
@@ -641,6 +676,20 @@ class SpatioTemporalGCNLearner(Learner):
             torch.save(weights, checkpoint_path)
             if verbose:
                 print("Saved Pytorch model.")
+        elif self.quantization is not None:
+            model_metadata["model_paths"] = [os.path.join(path, model_name + '_int8.onnx'),
+                                             os.path.join(path, model_name + '.pt')]
+            model_metadata["optimized"] = True
+            model_metadata["format"] = "onnx"
+            model_metadata["optimizer_info"] = self.quantization
+            # Copy already quantized model from temp path
+            shutil.copy2(os.path.join(self.parent_dir, self.experiment_name, "onnx_model_int8.onnx"),
+                         model_metadata["model_paths"][0])
+            state_dict = self.model.state_dict()
+            weights = OrderedDict([[k.split('module.')[-1], v.cpu()] for k, v in state_dict.items()])
+            torch.save(weights, model_metadata["model_paths"][1])
+            if verbose:
+                print("Saved INT8 ONNX model and Pytorch model.")
         else:
             checkpoint_name = model_name + '.onnx'
             checkpoint_path = os.path.join(path, checkpoint_name)
@@ -675,6 +724,13 @@ class SpatioTemporalGCNLearner(Learner):
             self.__load_from_pt(os.path.join(path, model_name + '.pt'))
             if verbose:
                 print("Loaded Pytorch model.")
+        elif metadata["optimizer_info"].get("target") == "cpu-int8":
+            # The float model is saved alongside the INT8 model
+            self.quantization = metadata["optimizer_info"]
+            self.__load_from_pt(os.path.join(path, model_name + '.pt'))
+            self.__load_from_onnx(os.path.join(path, model_name + '_int8.onnx'))
+            if verbose:
+                print("Loaded INT8 ONNX model.")
         else:
             self.__load_from_onnx(os.path.join(path, model_name + '.onnx'))
             if verbose:
@@ -728,7 +784,8 @@ class SpatioTemporalGCNLearner(Learner):
         :param path: path to ONNX model
         :type path: str
         """
-        self.ort_session = onnxruntime.InferenceSession(path)
+        from opendr.engine.helper.sessions import create_session
+        self.ort_session = create_session(path)
 
     def multi_stream_eval(self, dataset, scores, data_filename='val_joints.npy',
                           labels_filename='val_labels.pkl', skeleton_data_type='joint',
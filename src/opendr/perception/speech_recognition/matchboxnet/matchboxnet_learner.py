@@ -15,7 +15,7 @@
 import json
 import logging
 import os
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from urllib.error import URLError
 
 import numpy as np
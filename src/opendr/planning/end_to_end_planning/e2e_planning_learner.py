@@ -15,7 +15,7 @@ import numpy as np
 import gym
 import os
 from pathlib import Path
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 
 from stable_baselines3 import PPO
 from stable_baselines3.common.monitor import Monitor
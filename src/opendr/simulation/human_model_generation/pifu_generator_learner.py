@@ -22,7 +22,7 @@ from opendr.engine.data import Image
 from opendr.engine.constants import OPENDR_SERVER_URL
 import torch
 import json
-from urllib.request import urlretrieve
+from opendr.engine.helper.artifacts import urlretrieve
 from opendr.simulation.human_model_generation.utilities.PIFu.pifu_funcs import config_vanilla_parameters, config_nets
 if os.getenv('DISPLAY') is not None:
     from opendr.simulation.human_model_generation.utilities.config_utils import config_studio
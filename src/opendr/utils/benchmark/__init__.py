@@ -0,0 +1,10 @@
+from opendr.utils.benchmark.learners import BENCHMARKS, LearnerBenchmark
+from opendr.utils.benchmark.benchmark import compare_to_baseline, random_weights, run_benchmark, run_benchmarks, \
+    run_import_benchmarks
+from opendr.utils.benchmark.nms import NMS_METHODS, format_nms_table, run_nms_benchmark, scenes_from_dataset, \
+    synthetic_scenes
+
+
+__all__ = ['BENCHMARKS', 'LearnerBenchmark', 'compare_to_baseline', 'random_weights', 'run_benchmark',
+           'run_benchmarks', 'run_import_benchmarks', 'NMS_METHODS', 'format_nms_table', 'run_nms_benchmark',
+           'scenes_from_dataset', 'synthetic_scenes']
@@ -0,0 +1,125 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import sys
+
+from opendr.utils.benchmark import BENCHMARKS, NMS_METHODS, compare_to_baseline, format_nms_table, \
+    run_benchmarks, run_import_benchmarks, run_nms_benchmark, scenes_from_dataset, synthetic_scenes
+
+
+def resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m opendr.utils.benchmark",
+                                     description="Benchmark the CPU inference of the OpenDR learners")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, defaults to all of them: %s, or modules to "
+                        "import with --imports, or NMS methods with --nms: %s" %
+                        (", ".join(BENCHMARKS), ", ".join(NMS_METHODS)))
+    parser.add_argument("--resolution", type=resolution, help="resolution of the synthetic images, e.g., 640x480")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--runs", type=int, help="number of timed inferences (default 50), or of timed passes over "
+                        "the scenes with --nms (default 3)")
+    parser.add_argument("--warmup", type=int, default=5, help="number of inferences before the timed ones")
+    parser.add_argument("--threads", type=int, help="number of threads used by PyTorch")
+    parser.add_argument("--output", help="JSON file to write the results to, defaults to stdout")
+    parser.add_argument("--baseline", help="JSON file with the results to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative increase over the baseline that is reported as a regression")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.01,
+                        help="absolute decrease of an accuracy metric under the baseline that is reported as a "
+                        "regression")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results to the baseline file instead of comparing them")
+    parser.add_argument("--imports", action="store_true",
+                        help="benchmark the import time of modules, defaults to the opendr.perception packages and "
+                        "the modules of the learners")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run the benchmarks in this process instead of one new process per benchmark")
+
+    nms = parser.add_argument_group("NMS benchmark", "benchmark the speed and the quality of the NMS methods on "
+                                    "synthetic crowded scenes, or on the detections of a dataset of Seq2Seq-NMS")
+    nms.add_argument("--nms", action="store_true", help="benchmark the NMS methods instead of the learners")
+    nms.add_argument("--dataset", help="dataset whose detections are replayed, e.g., PETS, COCO or TEST_MODULE, "
+                     "defaults to synthetic scenes")
+    nms.add_argument("--split", default="test", help="split of the dataset")
+    nms.add_argument("--datasets-folder", default="./datasets", help="folder of the dataset")
+    nms.add_argument("--scenes", type=int, default=20, help="number of synthetic scenes")
+    nms.add_argument("--objects", type=int, default=30, help="number of objects of each synthetic scene")
+    nms.add_argument("--boxes-per-object", type=int, default=10, help="number of detections of each object")
+    nms.add_argument("--overlap", type=float, default=0.5,
+                     help="overlap of the objects, from 0 (touching) to 1 (same center)")
+    nms.add_argument("--classes", type=int, default=1, help="number of classes of the synthetic scenes")
+    nms.add_argument("--iou-thres", type=float, default=0.45)
+    nms.add_argument("--top-k", type=int, default=400)
+    nms.add_argument("--post-k", type=int, default=100)
+    nms.add_argument("--cross-class", action="store_true",
+                     help="the detections suppress those of all the classes instead of those of their class")
+    nms.add_argument("--reference", default="torchvision", help="method whose kept detections are compared to "
+                     "those of the others")
+    nms.add_argument("--seq2seq-path", help="Seq2Seq-NMS model, defaults to the pretrained one, which is downloaded")
+    nms.add_argument("--table", action="store_true", help="print a table of the results to stderr")
+    args = parser.parse_args(args)
+
+    if args.imports:
+        results = run_import_benchmarks(args.names or None, verbose=True)
+    elif args.nms:
+        annotation_file = None
+        if args.dataset is None:
+            scenes = synthetic_scenes(args.scenes, args.objects, args.boxes_per_object, args.overlap, args.classes,
+                                      resolution=args.resolution or (640, 480))
+        else:
+            from opendr.perception.object_detection_2d.nms.utils.nms_dataset import Dataset_NMS
+
+            dataset = Dataset_NMS(path=args.datasets_folder, dataset_name=args.dataset, split=args.split,
+                                  use_ssd=False, device="cpu")
+            scenes, annotation_file = scenes_from_dataset(dataset)
+        results = run_nms_benchmark(scenes, args.names or None, args.iou_thres, args.top_k, args.post_k,
+                                    args.cross_class, runs=args.runs or 3, warmup=args.warmup, threads=args.threads,
+                                    reference=args.reference, annotation_file=annotation_file,
+                                    seq2seq_path=args.seq2seq_path, verbose=True)
+        if args.table:
+            print(format_nms_table(results), file=sys.stderr)
+    else:
+        results = run_benchmarks(args.names, args.resolution, args.batch_size, args.runs or 50, args.warmup,
+                                 args.threads, isolated=not args.in_process, verbose=not args.in_process)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            file.write(output)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.accuracy_tolerance)
+    for name, metric, reference, value in regressions:
+        print("Regression in %s: %s is %s (baseline %s)" % (name, metric, value, reference), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
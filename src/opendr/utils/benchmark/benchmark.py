@@ -0,0 +1,285 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import json
+import os
+import pkgutil
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from opendr.utils.benchmark.learners import BENCHMARKS
+
+# Metrics compared to the baseline, all of them are better when lower
+COMPARED_METRICS = ("latency_p50", "latency_p95", "peak_rss_mb", "import_time", "startup_time")
+
+# Accuracy metrics compared to the baseline, e.g., of the NMS benchmark, all of them are better when higher
+ACCURACY_METRICS = ("agreement", "ap", "ap50", "ar")
+
+# Frameworks reported by the import benchmarks when they are imported by a module
+FRAMEWORKS = ("torch", "torchvision", "mxnet", "gluoncv", "tensorflow", "onnxruntime", "tensorboardX", "detectron2",
+              "mmcv", "pytorch_lightning")
+
+# Imports a module in a new process and prints its import time and the frameworks it imported
+_IMPORT_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_time": elapsed, "frameworks": [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+@contextmanager
+def random_weights():
+    """
+    Context manager in which the pretrained weights that models load while they are created (e.g., ImageNet
+    backbones) are neither downloaded nor loaded, so that the models keep their random initialization.
+    """
+    import torch
+    import torch.hub
+
+    original_load_url = torch.hub.load_state_dict_from_url
+    original_load_state_dict = torch.nn.Module.load_state_dict
+
+    class RandomStateDict(dict):
+        pass
+
+    def load_url(*args, **kwargs):
+        return RandomStateDict()
+
+    def load_state_dict(module, state_dict, *args, **kwargs):
+        if isinstance(state_dict, RandomStateDict):
+            return torch.nn.modules.module._IncompatibleKeys([], [])
+        return original_load_state_dict(module, state_dict, *args, **kwargs)
+
+    # The function is also imported by name in other modules (e.g., torchvision and torch.utils.model_zoo)
+    patched = [(module, name) for module in list(sys.modules.values()) if module is not None
+               for name in ("load_state_dict_from_url", "load_url")
+               if getattr(module, name, None) is original_load_url]
+    for module, name in patched:
+        setattr(module, name, load_url)
+    torch.nn.Module.load_state_dict = load_state_dict
+    try:
+        yield
+    finally:
+        for module, name in patched:
+            setattr(module, name, original_load_url)
+        torch.nn.Module.load_state_dict = original_load_state_dict
+
+
+def run_benchmark(name, resolution=None, batch_size=1, runs=50, warmup=5, threads=None):
+    """
+    Benchmarks the inference of a learner on CPU, in the current process.
+
+    :param name: name of the benchmark, one of the keys of BENCHMARKS
+    :type name: str
+    :param resolution: (width, height) of the synthetic images, defaults to the resolution of the benchmark
+    :type resolution: tuple, optional
+    :param batch_size: number of samples per call of infer, for the learners that support batches
+    :type batch_size: int, optional
+    :param runs: number of timed calls of infer
+    :type runs: int, optional
+    :param warmup: number of calls of infer before the timed ones
+    :type warmup: int, optional
+    :param threads: number of threads used by PyTorch, defaults to its default
+    :type threads: int, optional
+    :return: the results of the benchmark, with times in seconds
+    :rtype: dict
+    """
+    spec = BENCHMARKS[name]
+    resolution = tuple(resolution or spec.resolution)
+
+    start = time.perf_counter()
+    for module in spec.modules:
+        importlib.import_module(module)
+    import_time = time.perf_counter() - start
+
+    if threads is not None:
+        import torch
+        torch.set_num_threads(threads)
+
+    start = time.perf_counter()
+    with random_weights():
+        learner = spec.create()
+    startup_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    sample = spec.sample(learner, resolution, batch_size, rng)
+    for _ in range(warmup):
+        spec.infer(learner, sample)
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        spec.infer(learner, sample)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.asarray(latencies)
+    batch_size = batch_size if spec.batched else 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "name": name,
+        "resolution": list(resolution),
+        "batch_size": batch_size,
+        "runs": runs,
+        "latency_mean": float(latencies.mean()),
+        "latency_p50": float(p50),
+        "latency_p95": float(p95),
+        "latency_p99": float(p99),
+        "throughput": float(batch_size * runs / latencies.sum()),
+        "peak_rss_mb": _peak_rss_mb(),
+        "import_time": import_time,
+        "startup_time": startup_time,
+    }
+
+
+def run_benchmarks(names=None, resolution=None, batch_size=1, runs=50, warmup=5, threads=None, isolated=True,
+                   verbose=False):
+    """
+    Benchmarks the inference of several learners on CPU.
+
+    :param names: names of the benchmarks, defaults to all of them
+    :type names: list, optional
+    :param isolated: if True, each benchmark runs in a new process, so that its import time and peak memory are not
+        affected by the other benchmarks, and a failure (e.g., a missing dependency) does not stop the others
+    :type isolated: bool, optional
+    :param verbose: if True, the progress is printed to stderr
+    :type verbose: bool, optional
+    :return: a dictionary with the results of each benchmark, or its error if it failed
+    :rtype: dict
+
+    The other arguments are the ones of run_benchmark().
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError("Unknown benchmark '%s', choose from %s" % (name, ", ".join(BENCHMARKS)))
+        if verbose:
+            print("Benchmarking %s" % name, file=sys.stderr)
+
+        if not isolated:
+            try:
+                results[name] = run_benchmark(name, resolution, batch_size, runs, warmup, threads)
+            except Exception as e:
+                results[name] = {"name": name, "error": "%s: %s" % (type(e).__name__, e)}
+            continue
+
+        command = [sys.executable, "-m", "opendr.utils.benchmark", name, "--in-process",
+                   "--batch-size", str(batch_size), "--runs", str(runs), "--warmup", str(warmup)]
+        if resolution is not None:
+            command += ["--resolution", "%dx%d" % tuple(resolution)]
+        if threads is not None:
+            command += ["--threads", str(threads)]
+        # Hide the GPUs, the benchmarks measure the CPU inference
+        env = dict(os.environ, CUDA_VISIBLE_DEVICES="")
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                                 universal_newlines=True)
+        try:
+            results[name] = json.loads(process.stdout)[name]
+        except (ValueError, KeyError):
+            error = process.stderr.strip().splitlines()
+            results[name] = {"name": name, "error": error[-1] if error else "exit code %d" % process.returncode}
+    return results
+
+
+def _perception_packages():
+    import opendr.perception
+
+    return ["opendr.perception." + module.name for module in pkgutil.iter_modules(opendr.perception.__path__)
+            if module.ispkg]
+
+
+def run_import_benchmarks(modules=None, repeats=3, verbose=False):
+    """
+    Benchmarks the time to import modules, each in a new process.
+
+    :param modules: names of the modules, defaults to the opendr.perception packages and the modules of the learners of
+        the inference benchmarks
+    :type modules: list, optional
+    :param repeats: number of times each module is imported, the fastest one is reported
+    :type repeats: int, optional
+    :param verbose: if True, the progress is printed to stderr
+    :type verbose: bool, optional
+    :return: a dictionary with the import time (in seconds) of each module and the frameworks it imported, or its
+        error if it failed
+    :rtype: dict
+    """
+    if modules is None:
+        modules = _perception_packages() + [module for spec in BENCHMARKS.values() for module in spec.modules]
+
+    results = {}
+    for module in modules:
+        if verbose:
+            print("Importing %s" % module, file=sys.stderr)
+        times = []
+        for _ in range(repeats):
+            process = subprocess.run([sys.executable, "-c", _IMPORT_SCRIPT, module] + list(FRAMEWORKS),
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            if process.returncode != 0:
+                error = process.stderr.strip().splitlines()
+                results[module] = {"name": module, "error": error[-1] if error else "exit code %d" % process.returncode}
+                break
+            times.append(json.loads(process.stdout))
+        else:
+            fastest = min(times, key=lambda result: result["import_time"])
+            results[module] = dict(fastest, name=module)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.1, accuracy_tolerance=0.01):
+    """
+    Compares the results of benchmarks to a baseline.
+
+    :param results: results of run_benchmarks(), run_import_benchmarks() or run_nms_benchmark()
+    :type results: dict
+    :param baseline: results of the same function used as reference
+    :type baseline: dict
+    :param tolerance: relative increase of a metric over its baseline that is considered a regression
+    :type tolerance: float, optional
+    :param accuracy_tolerance: absolute decrease of an accuracy metric under its baseline that is considered a
+        regression
+    :type accuracy_tolerance: float, optional
+    :return: the regressions, as a list of (benchmark name, metric, baseline value, value) tuples
+    :rtype: list
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None or "error" in reference:
+            continue
+        if "error" in result:
+            regressions.append((name, "error", None, result["error"]))
+            continue
+        configuration = (result.get("resolution"), result.get("batch_size"))
+        if (reference.get("resolution"), reference.get("batch_size")) != configuration:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric in reference and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append((name, metric, reference[metric], result[metric]))
+        for metric in ACCURACY_METRICS:
+            if metric in reference and result[metric] < reference[metric] - accuracy_tolerance:
+                regressions.append((name, metric, reference[metric], result[metric]))
+    return regressions
@@ -0,0 +1,269 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# The learners and the engine are only imported by the functions of the benchmarks, so that the import time of each
+# learner is measured in a new process that did not import them yet.
+
+import os
+
+
+class LearnerBenchmark(object):
+    """
+    Describes how to benchmark the inference of a learner on CPU, with random weights and synthetic inputs.
+    """
+
+    def __init__(self, modules, create, sample, infer=None, resolution=(640, 480), batched=False):
+        """
+        :param modules: modules imported by the learner, whose import time is measured
+        :param create: function that returns the learner with random weights
+        :param sample: function(learner, resolution, batch_size, rng) that returns a synthetic input of infer
+        :param infer: function(learner, sample) that runs the inference, defaults to learner.infer(sample)
+        :param resolution: default (width, height) of the synthetic images
+        :param batched: whether sample returns batch_size samples, otherwise it returns a single one
+        """
+        self.modules = modules
+        self.create = create
+        self.sample = sample
+        self.infer = infer or (lambda learner, sample: learner.infer(sample))
+        self.resolution = resolution
+        self.batched = batched
+
+
+def _image(resolution, rng):
+    from opendr.engine.data import Image
+
+    width, height = resolution
+    return Image(rng.integers(0, 256, (height, width, 3), dtype="uint8"))
+
+
+def _images(learner, resolution, batch_size, rng):
+    """Returns an Image, or an ImageBatch if batch_size is larger than 1"""
+    from opendr.engine.data import ImageBatch
+
+    if batch_size == 1:
+        return _image(resolution, rng)
+    return ImageBatch([_image(resolution, rng) for _ in range(batch_size)])
+
+
+def _single_image(learner, resolution, batch_size, rng):
+    return _image(resolution, rng)
+
+
+def _tensor(shape, rng):
+    import torch
+
+    return torch.from_numpy(rng.standard_normal(shape, dtype="float32"))
+
+
+def _nanodet():
+    from opendr.perception.object_detection_2d.nanodet.nanodet_learner import NanodetLearner
+
+    return NanodetLearner(model_to_use="plus_m_416", device="cpu")
+
+
+def _ssd():
+    from gluoncv import model_zoo
+    from opendr.perception.object_detection_2d.ssd.ssd_learner import SingleShotDetectorLearner
+
+    learner = SingleShotDetectorLearner(device="cpu")
+    learner.classes = ["person"]
+    learner.model = model_zoo.get_model("ssd_%d_%s_custom" % (learner.img_size, learner.backbone),
+                                        classes=learner.classes, pretrained=False, pretrained_base=False)
+    learner.model.initialize(ctx=learner.ctx)
+    return learner
+
+
+def _detr():
+    from opendr.perception.object_detection_2d.detr.algorithm.models import build_model
+    from opendr.perception.object_detection_2d.detr.detr_learner import DetrLearner
+
+    learner = DetrLearner(device="cpu")
+    learner.model, _, learner.postprocessors = build_model(learner.args)
+    learner.model.eval()
+    return learner
+
+
+def _lightweight_open_pose():
+    from opendr.perception.pose_estimation.lightweight_open_pose.lightweight_open_pose_learner import \
+        LightweightOpenPoseLearner
+
+    learner = LightweightOpenPoseLearner(device="cpu")
+    learner.init_model()
+    return learner
+
+
+def _high_resolution_pose():
+    from opendr.perception.pose_estimation.hr_pose_estimation.high_resolution_learner import \
+        HighResolutionPoseEstimationLearner
+
+    learner = HighResolutionPoseEstimationLearner(device="cpu")
+    learner.init_model()
+    return learner
+
+
+def _x3d():
+    from opendr.perception.activity_recognition.x3d.x3d_learner import X3DLearner
+
+    learner = X3DLearner(device="cpu", backbone="xs")
+    learner.init_model()
+    return learner
+
+
+def _x3d_clips(learner, resolution, batch_size, rng):
+    # The clips have the size of the model, which depends on its backbone
+    size = learner.model_hparams["image_size"]
+    return _tensor((batch_size, 3, learner.model_hparams["frames_per_clip"], size, size), rng)
+
+
+def _cox3d():
+    from opendr.perception.activity_recognition.cox3d.cox3d_learner import CoX3DLearner
+
+    learner = CoX3DLearner(device="cpu", backbone="xs")
+    learner.init_model()
+    return learner
+
+
+def _cox3d_frames(learner, resolution, batch_size, rng):
+    size = learner.model_hparams["image_size"]
+    return _tensor((batch_size, 3, size, size), rng)
+
+
+def _stgcn():
+    from opendr.perception.skeleton_based_action_recognition.spatio_temporal_gcn_learner import \
+        SpatioTemporalGCNLearner
+
+    learner = SpatioTemporalGCNLearner(device="cpu", dataset_name="nturgbd_cv", method_name="stgcn",
+                                       num_class=60, num_point=25, num_person=2, in_channels=3, graph_type="ntu")
+    learner.init_model()
+    return learner
+
+
+def _skeletons(learner, resolution, batch_size, rng):
+    from opendr.engine.data import SkeletonSequence
+
+    return SkeletonSequence(rng.random((batch_size, learner.in_channels, learner.num_frames, learner.num_point,
+                                        learner.num_person), dtype="float32"))
+
+
+def _voxel_3d():
+    import opendr.perception.object_detection_3d.voxel_object_detection_3d as voxel
+    from opendr.perception.object_detection_3d.voxel_object_detection_3d.voxel_object_detection_3d_learner import \
+        VoxelObjectDetection3DLearner
+
+    config = os.path.join(os.path.dirname(voxel.__file__), "second_detector", "configs", "pointpillars", "car",
+                          "xyres_16.proto")
+    return VoxelObjectDetection3DLearner(model_config_path=config, device="cpu")
+
+
+def _point_clouds(learner, resolution, batch_size, rng, points=20000):
+    from opendr.engine.data import PointCloud
+
+    # Points in the field of view of a KITTI LiDAR, with (x, y, z, reflectance)
+    low, high = (0, -40, -3, 0), (70, 40, 1, 1)
+    clouds = [PointCloud(rng.uniform(low, high, (points, 4)).astype("float32")) for _ in range(batch_size)]
+    return clouds[0] if batch_size == 1 else clouds
+
+
+def _ab3dmot():
+    from opendr.perception.object_tracking_3d.ab3dmot.object_tracking_3d_ab3dmot_learner import \
+        ObjectTracking3DAb3dmotLearner
+
+    return ObjectTracking3DAb3dmotLearner()
+
+
+def _boxes_3d(learner, resolution, batch_size, rng, count=20):
+    from opendr.engine.target import BoundingBox3D, BoundingBox3DList
+
+    return BoundingBox3DList([
+        BoundingBox3D(name="Car", truncated=0, occluded=0, alpha=0, bbox2d=[0, 0, 0, 0],
+                      dimensions=rng.uniform((3, 1.5, 1.4), (5, 2, 1.8)), location=rng.uniform((-20, -1, 5), (20, 1, 50)),
+                      rotation_y=rng.uniform(-3.14, 3.14), score=rng.uniform(0.5, 1))
+        for _ in range(count)
+    ])
+
+
+def _deep_sort():
+    from opendr.perception.object_tracking_2d.deep_sort.object_tracking_2d_deep_sort_learner import \
+        ObjectTracking2DDeepSortLearner
+
+    return ObjectTracking2DDeepSortLearner(device="cpu")
+
+
+def _image_with_detections(learner, resolution, batch_size, rng, count=10):
+    from opendr.engine.data import ImageWithDetections
+    from opendr.engine.target import BoundingBox, BoundingBoxList
+
+    width, height = resolution
+    boxes = []
+    for _ in range(count):
+        w, h = rng.uniform(0.05, 0.2) * width, rng.uniform(0.2, 0.5) * height
+        boxes.append(BoundingBox(name=0, left=rng.uniform(0, width - w), top=rng.uniform(0, height - h),
+                                 width=w, height=h, score=rng.uniform(0.5, 1)))
+    image = _image(resolution, rng)
+    return ImageWithDetections(image.numpy(), BoundingBoxList(boxes))
+
+
+def _face_recognition():
+    import torch
+    from opendr.perception.face_recognition.algorithm.backbone.model_mobilenet import MobileFaceNet
+    from opendr.perception.face_recognition.face_recognition_learner import FaceRecognitionLearner
+
+    learner = FaceRecognitionLearner(backbone="mobilefacenet", mode="backbone_only", device="cpu")
+    learner.backbone_model = MobileFaceNet()
+    learner.model = {learner.backbone_model, learner.network_head_model}
+    # A reference database of 100 persons with random features
+    learner.database = {i: [str(i), torch.nn.functional.normalize(torch.randn(1, learner.embedding_size))]
+                        for i in range(100)}
+    return learner
+
+
+def _bisenet():
+    from opendr.perception.semantic_segmentation.bisenet.bisenet_learner import BisenetLearner
+
+    learner = BisenetLearner(device="cpu")
+    learner.build_model()
+    return learner
+
+
+BENCHMARKS = {
+    "nanodet": LearnerBenchmark(("opendr.perception.object_detection_2d.nanodet.nanodet_learner",),
+                                _nanodet, _images, batched=True),
+    "ssd": LearnerBenchmark(("opendr.perception.object_detection_2d.ssd.ssd_learner",), _ssd, _single_image),
+    "detr": LearnerBenchmark(("opendr.perception.object_detection_2d.detr.detr_learner",),
+                             _detr, _images, batched=True),
+    "lightweight_open_pose": LearnerBenchmark(
+        ("opendr.perception.pose_estimation.lightweight_open_pose.lightweight_open_pose_learner",),
+        _lightweight_open_pose, _images, batched=True),
+    "high_resolution_pose": LearnerBenchmark(
+        ("opendr.perception.pose_estimation.hr_pose_estimation.high_resolution_learner",),
+        _high_resolution_pose, _single_image),
+    "x3d": LearnerBenchmark(("opendr.perception.activity_recognition.x3d.x3d_learner",),
+                            _x3d, _x3d_clips, batched=True),
+    "cox3d": LearnerBenchmark(("opendr.perception.activity_recognition.cox3d.cox3d_learner",),
+                              _cox3d, _cox3d_frames, batched=True),
+    "stgcn": LearnerBenchmark(("opendr.perception.skeleton_based_action_recognition.spatio_temporal_gcn_learner",),
+                              _stgcn, _skeletons, batched=True),
+    "voxel_object_detection_3d": LearnerBenchmark(
+        ("opendr.perception.object_detection_3d.voxel_object_detection_3d.voxel_object_detection_3d_learner",),
+        _voxel_3d, _point_clouds, batched=True),
+    "ab3dmot": LearnerBenchmark(("opendr.perception.object_tracking_3d.ab3dmot.object_tracking_3d_ab3dmot_learner",),
+                                _ab3dmot, _boxes_3d),
+    "deep_sort": LearnerBenchmark(
+        ("opendr.perception.object_tracking_2d.deep_sort.object_tracking_2d_deep_sort_learner",),
+        _deep_sort, _image_with_detections),
+    "face_recognition": LearnerBenchmark(("opendr.perception.face_recognition.face_recognition_learner",),
+                                         _face_recognition, _images, resolution=(112, 112), batched=True),
+    "bisenet": LearnerBenchmark(("opendr.perception.semantic_segmentation.bisenet.bisenet_learner",),
+                                _bisenet, _images, batched=True),
+}
@@ -0,0 +1,395 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# As in learners.py, the NMS implementations are only imported by the functions of the benchmark.
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# NMS methods of the benchmark, all of them run on CPU:
+# - 'fast', 'cluster', 'cluster_diou' and 'cluster_spm': FastNMS and the types of ClusterNMS
+# - 'soft_linear' and 'soft_gaussian': SoftNMS, with its default thresholds
+# - 'torchvision': greedy NMS of torchvision, as nms_utils.apply_torchNMS(), for each class
+# - 'seq2seq': Seq2SeqNMSLearner, which only supports a single class
+NMS_METHODS = ("fast", "cluster", "cluster_diou", "cluster_spm", "soft_linear", "soft_gaussian", "torchvision",
+               "seq2seq")
+
+# Columns of format_nms_table(), with the scale of the values
+_TABLE_COLUMNS = (("latency_p50", "p50 (ms)", 1e3), ("latency_p95", "p95 (ms)", 1e3), ("kept", "kept", 1),
+                  ("agreement", "agreement", 1), ("ap", "AP", 1), ("ap50", "AP50", 1), ("ar", "AR", 1))
+
+
+def _box_iou(boxes_a, boxes_b):
+    """Returns the IoU of each box of boxes_a with the box of boxes_b at the same index"""
+    width = np.clip(np.minimum(boxes_a[:, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, 0], boxes_b[:, 0]), 0, None)
+    height = np.clip(np.minimum(boxes_a[:, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, 1], boxes_b[:, 1]), 0, None)
+    inter = width * height
+    areas_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    areas_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return inter / (areas_a + areas_b - inter)
+
+
+def synthetic_scenes(num_scenes=20, num_objects=30, boxes_per_object=10, overlap=0.5, num_classes=1,
+                     false_positives=20, box_noise=0.1, resolution=(640, 480), seed=0):
+    """
+    Generates crowded scenes with the detections of a detector before NMS: each object is detected by several boxes
+    around it, whose scores increase with their IoU with the object, and false positives are detected at random.
+
+    :param num_scenes: number of scenes
+    :param num_objects: number of objects of each scene
+    :param boxes_per_object: number of detections of each object
+    :param overlap: how much the objects overlap, from 0 (each object touches another one) to 1 (the objects have the
+        same center)
+    :param num_classes: number of classes of the objects and of the scores of the detections
+    :param false_positives: number of detections of each scene that do not match an object
+    :param box_noise: standard deviation of the coordinates of the detections, relatively to the size of the object
+    :param resolution: (width, height) of the scenes
+    :param seed: seed of the random generator
+    :return: the scenes, as dictionaries with the 'id', 'resolution', (N, 4) 'boxes' and (N, num_classes) 'scores' of
+        the detections, and the (M, 4) 'gt_boxes' and (M,) 'gt_classes' of the objects
+    :rtype: list
+    """
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    scenes = []
+    for scene_id in range(num_scenes):
+        sizes = rng.uniform(0.05, 0.15, (num_objects, 1)) * width * np.stack(
+            [np.ones(num_objects), rng.uniform(0.5, 2.0, num_objects)], axis=1)
+        centers = np.empty((num_objects, 2))
+        centers[0] = rng.uniform(0, 1, 2) * resolution
+        for i in range(1, num_objects):
+            # Each object is placed next to a previous one
+            neighbor = rng.integers(i)
+            angle = rng.uniform(0, 2 * np.pi)
+            distance = (1 - overlap) * (sizes[i] + sizes[neighbor]) / 2
+            centers[i] = np.clip(centers[neighbor] + distance * [np.cos(angle), np.sin(angle)], 0, resolution)
+        gt_boxes = np.concatenate([centers - sizes / 2, centers + sizes / 2], axis=1)
+        gt_boxes = np.clip(gt_boxes, 0, [width, height, width, height]).astype(np.float32)
+        gt_classes = rng.integers(num_classes, size=num_objects)
+
+        objects = np.repeat(np.arange(num_objects), boxes_per_object)
+        object_sizes = np.tile(gt_boxes[objects, 2:] - gt_boxes[objects, :2], 2)
+        boxes = gt_boxes[objects] + rng.normal(0, box_noise, (len(objects), 4)) * object_sizes
+        ious = np.nan_to_num(_box_iou(boxes, gt_boxes[objects]))
+        true_scores = np.clip(ious * rng.uniform(0.6, 1.0, len(objects)), 0.01, 1)
+        scores = rng.uniform(0, 0.1, (len(objects), num_classes)) * true_scores[:, None]
+        scores[np.arange(len(objects)), gt_classes[objects]] = true_scores
+
+        corners = rng.uniform(0, 1, (false_positives, 2)) * resolution
+        fp_sizes = rng.uniform(0.05, 0.15, (false_positives, 2)) * width
+        boxes = np.concatenate([boxes, np.concatenate([corners, corners + fp_sizes], axis=1)])
+        scores = np.concatenate([scores, rng.uniform(0, 0.4, (false_positives, num_classes))])
+        boxes[:, 2:] = np.maximum(boxes[:, 2:], boxes[:, :2] + 1)
+
+        order = rng.permutation(len(boxes))
+        scenes.append({
+            'id': scene_id,
+            'resolution': [width, height],
+            'boxes': boxes[order].astype(np.float32),
+            'scores': scores[order].astype(np.float32),
+            'gt_boxes': gt_boxes,
+            'gt_classes': gt_classes,
+        })
+    return scenes
+
+
+def scenes_from_dataset(dataset):
+    """
+    Returns the scenes of the detections saved in a dataset of Seq2Seq-NMS, whose NMS is replayed by the benchmark.
+
+    :param dataset: the dataset
+    :type dataset: opendr.perception.object_detection_2d.nms.utils.nms_dataset.Dataset_NMS
+    :return: the scenes, as synthetic_scenes(), with the 'image' path of each scene, and the path of the COCO
+        annotations of the dataset
+    :rtype: tuple
+    """
+    scenes = []
+    # The datasets of Seq2Seq-NMS have a single class, with index 1
+    for sample in dataset.src_data:
+        detections = np.asarray(sample['dt_boxes'][1], dtype=np.float32).reshape(-1, 5)
+        gt_boxes = np.asarray(sample['gt_boxes'][1], dtype=np.float32).reshape(-1, 4)
+        scenes.append({
+            'id': sample['id'],
+            'resolution': list(sample['resolution']),
+            'boxes': detections[:, :4],
+            'scores': detections[:, 4:],
+            'gt_boxes': gt_boxes,
+            'gt_classes': np.zeros(len(gt_boxes), dtype=np.int64),
+            'image': os.path.join(dataset.path, sample['filename']),
+        })
+    return scenes, os.path.join(dataset.path, 'annotations', dataset.annotation_file)
+
+
+def _create_method(name, iou_thres, top_k, post_k, cross_class, seq2seq_path, temp_dir):
+    """Returns a function(boxes, scores, img, threshold) that returns the boxes, classes and scores kept by an NMS"""
+    import torch
+
+    if name not in NMS_METHODS:
+        raise ValueError("Unknown NMS method '%s', choose from %s" % (name, ", ".join(NMS_METHODS)))
+
+    if name == "torchvision":
+        import torchvision
+
+        def torchvision_nms(boxes, scores, img, threshold):
+            boxes, scores = torch.from_numpy(boxes), torch.from_numpy(scores)
+            if cross_class:
+                scores, classes = scores.max(dim=1)
+            else:
+                classes = torch.arange(scores.shape[1]).repeat(len(boxes))
+                boxes, scores = boxes.repeat_interleave(scores.shape[1], dim=0), scores.reshape(-1)
+            if cross_class:
+                groups = [torch.arange(len(scores))]
+            else:
+                groups = [torch.nonzero(classes == c)[:, 0] for c in classes.unique()]
+            kept = []
+            for indices in groups:
+                # The top_k detections of each class (or of the scene if cross_class) with the highest scores
+                indices = indices[scores[indices].argsort(descending=True)[:top_k]]
+                kept.append(indices[torchvision.ops.nms(boxes[indices], scores[indices], iou_thres)])
+            kept = torch.cat(kept) if kept else torch.zeros(0, dtype=torch.long)
+            kept = kept[scores[kept].argsort(descending=True)[:post_k]]
+            kept = kept[scores[kept] > threshold]
+            return boxes[kept].numpy(), classes[kept].numpy(), scores[kept].numpy()
+        return torchvision_nms
+
+    if name == "seq2seq":
+        from opendr.perception.object_detection_2d.nms.seq2seq_nms.seq2seq_nms_learner import Seq2SeqNMSLearner
+
+        nms = Seq2SeqNMSLearner(device="cpu", temp_path=temp_dir)
+        if seq2seq_path is None:
+            nms.download(path=temp_dir, model_name="seq2seq_pets_jpd_fmod")
+            seq2seq_path = os.path.join(temp_dir, "seq2seq_pets_jpd_fmod")
+        nms.load(seq2seq_path)
+
+        def seq2seq_nms(boxes, scores, img, threshold):
+            result = nms.run_nms(boxes=boxes, scores=scores, top_k=top_k, img=img, threshold=threshold)
+            if not isinstance(result, tuple):
+                # No detection
+                return np.zeros((0, 4), np.float32), np.zeros(0, np.int64), np.zeros(0, np.float32)
+            kept_boxes, _, kept_scores = result[1]
+            kept_scores = kept_scores.reshape(-1)
+            order = np.argsort(-kept_scores, kind="stable")[:post_k]
+            return kept_boxes[order], np.zeros(len(order), np.int64), kept_scores[order]
+        return seq2seq_nms
+
+    if name.startswith("soft"):
+        from opendr.perception.object_detection_2d.nms.soft_nms.soft_nms import SoftNMS
+
+        nms = SoftNMS(nms_type=name[len("soft_"):], device="cpu", top_k=top_k, post_k=post_k,
+                      cross_class=cross_class)
+    elif name == "fast":
+        from opendr.perception.object_detection_2d.nms.fast_nms.fast_nms import FastNMS
+
+        nms = FastNMS(cross_class=cross_class, device="cpu", iou_thres=iou_thres, top_k=top_k, post_k=post_k)
+    else:
+        from opendr.perception.object_detection_2d.nms.cluster_nms.cluster_nms import ClusterNMS
+
+        nms_type = {"cluster": "default", "cluster_diou": "diou", "cluster_spm": "spm"}[name]
+        nms = ClusterNMS(nms_type=nms_type, cross_class=cross_class, device="cpu", iou_thres=iou_thres, top_k=top_k,
+                         post_k=post_k)
+
+    def custom_nms(boxes, scores, img, threshold):
+        _, (kept_boxes, kept_classes, kept_scores) = nms.run_nms(boxes=boxes, scores=scores, threshold=threshold,
+                                                                 img=img)
+        return np.asarray(kept_boxes), np.asarray(kept_classes), np.asarray(kept_scores)
+    return custom_nms
+
+
+def _agreement(detections, reference):
+    """
+    Returns the fraction of the detections kept by an NMS or by the reference NMS that are kept by both, i.e., that
+    have the same box and class
+    """
+    kept = {tuple(box) + (int(c),) for box, c in zip(detections[0].astype(np.float32), detections[1])}
+    reference = {tuple(box) + (int(c),) for box, c in zip(reference[0].astype(np.float32), reference[1])}
+    union = kept | reference
+    return len(kept & reference) / len(union) if union else 1.0
+
+
+def _write_coco_annotations(scenes, path, category_ids):
+    images, annotations = [], []
+    for scene in scenes:
+        width, height = scene['resolution']
+        images.append({'id': scene['id'], 'width': width, 'height': height})
+        for box, c in zip(scene['gt_boxes'], scene['gt_classes']):
+            x, y, box_width, box_height = [float(box[0]), float(box[1]), float(box[2] - box[0]),
+                                           float(box[3] - box[1])]
+            annotations.append({'id': len(annotations) + 1, 'image_id': scene['id'],
+                                'category_id': category_ids[int(c)], 'bbox': [x, y, box_width, box_height],
+                                'area': box_width * box_height, 'iscrowd': 0})
+    with open(path, 'w') as file:
+        json.dump({'images': images, 'annotations': annotations,
+                   'categories': [{'id': category_id} for category_id in category_ids]}, file)
+
+
+def _coco_metrics(scenes, outputs, annotation_file, category_ids, max_dets, temp_dir):
+    """Returns the AP, AP50 and AR of the detections kept by an NMS, with nms_utils.run_coco_eval()"""
+    from opendr.perception.object_detection_2d.nms.utils.nms_utils import run_coco_eval
+
+    results = []
+    for scene, (boxes, classes, scores) in zip(scenes, outputs):
+        for box, c, score in zip(boxes, classes, scores):
+            results.append({'image_id': scene['id'], 'category_id': category_ids[int(c)],
+                            'bbox': [float(box[0]), float(box[1]), float(box[2] - box[0]), float(box[3] - box[1])],
+                            'score': float(score)})
+    if not results:
+        return {'ap': 0.0, 'ap50': 0.0, 'ar': 0.0}
+    detections_file = os.path.join(temp_dir, 'detections.json')
+    with open(detections_file, 'w') as file:
+        json.dump(results, file)
+    stats = run_coco_eval(dt_file_path=detections_file, gt_file_path=annotation_file, only_classes=category_ids,
+                          max_dets=[max_dets])[0][0]
+    return {'ap': float(stats[0][0]), 'ap50': float(stats[1][0]), 'ar': float(stats[3][0])}
+
+
+def run_nms_benchmark(scenes, methods=None, iou_thres=0.45, top_k=400, post_k=100, cross_class=False,
+                      threshold=0.05, runs=3, warmup=5, threads=None, reference="torchvision", annotation_file=None,
+                      category_ids=None, seq2seq_path=None, verbose=False):
+    """
+    Benchmarks the speed and the quality of the NMS methods on CPU, on the detections of scenes.
+
+    :param scenes: scenes of synthetic_scenes() or scenes_from_dataset()
+    :type scenes: list
+    :param methods: names of the NMS methods, defaults to all of NMS_METHODS
+    :type methods: list, optional
+    :param iou_thres: IoU threshold of the methods, except Soft-NMS and Seq2Seq-NMS
+    :type iou_thres: float, optional
+    :param top_k: number of detections (of each class, unless cross_class) with the highest scores that are processed
+    :type top_k: int, optional
+    :param post_k: maximum number of detections of each scene that are kept
+    :type post_k: int, optional
+    :param cross_class: whether the detections suppress those of all the classes, otherwise only those of their class
+    :type cross_class: bool, optional
+    :param threshold: minimum score of the kept detections
+    :type threshold: float, optional
+    :param runs: number of timed passes over the scenes
+    :type runs: int, optional
+    :param warmup: number of scenes processed by each method before the timed passes, e.g., to compile its kernels
+    :type warmup: int, optional
+    :param threads: number of threads used by PyTorch, defaults to its default
+    :type threads: int, optional
+    :param reference: name of the method whose kept detections are compared to those of the others
+    :type reference: str, optional
+    :param annotation_file: COCO annotations of the scenes, defaults to a file written from their 'gt_boxes'
+    :type annotation_file: str, optional
+    :param category_ids: COCO category of each class, defaults to the class index plus one
+    :type category_ids: list, optional
+    :param seq2seq_path: path of the Seq2Seq-NMS model, defaults to its pretrained model, which is downloaded
+    :type seq2seq_path: str, optional
+    :param verbose: if True, the progress is printed to stderr
+    :type verbose: bool, optional
+    :return: a dictionary with the results of each method, with latencies in seconds per scene, the mean number of
+        'kept' detections per scene, their 'agreement' with the reference, and their 'ap', 'ap50' and 'ar' on the
+        annotations, or its error if it failed
+    :rtype: dict
+    """
+    import torch
+    from opendr.engine.data import Image
+
+    methods = list(methods or NMS_METHODS)
+    for name in methods + [reference]:
+        if name not in NMS_METHODS:
+            raise ValueError("Unknown NMS method '%s', choose from %s" % (name, ", ".join(NMS_METHODS)))
+    if threads is not None:
+        torch.set_num_threads(threads)
+    if category_ids is None:
+        num_classes = max([scene['scores'].shape[1] for scene in scenes] + [1])
+        category_ids = list(range(1, num_classes + 1))
+
+    images = []
+    for scene in scenes:
+        path = scene.get('image')
+        if path is not None and os.path.exists(path):
+            images.append(Image.open(path))
+        else:
+            width, height = scene['resolution']
+            images.append(Image(np.zeros((height, width, 3), dtype=np.uint8)))
+
+    results, outputs = {}, {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if annotation_file is None:
+            annotation_file = os.path.join(temp_dir, 'annotations.json')
+            _write_coco_annotations(scenes, annotation_file, category_ids)
+
+        for name in methods + ([reference] if reference not in methods else []):
+            if verbose:
+                print("Benchmarking %s" % name, file=sys.stderr)
+            try:
+                nms = _create_method(name, iou_thres, top_k, post_k, cross_class, seq2seq_path, temp_dir)
+                for scene, img in list(zip(scenes, images))[:warmup]:
+                    nms(scene['boxes'], scene['scores'], img, threshold)
+                latencies = []
+                for _ in range(runs):
+                    method_outputs = []
+                    for scene, img in zip(scenes, images):
+                        start = time.perf_counter()
+                        method_outputs.append(nms(scene['boxes'], scene['scores'], img, threshold))
+                        latencies.append(time.perf_counter() - start)
+                outputs[name] = method_outputs
+                if name not in methods:
+                    continue
+                latencies = np.asarray(latencies)
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                results[name] = {
+                    "name": name,
+                    "scenes": len(scenes),
+                    "runs": runs,
+                    "latency_mean": float(latencies.mean()),
+                    "latency_p50": float(p50),
+                    "latency_p95": float(p95),
+                    "latency_p99": float(p99),
+                    "throughput": float(len(latencies) / latencies.sum()),
+                    "kept": float(np.mean([len(scores) for _, _, scores in method_outputs])),
+                }
+                results[name].update(_coco_metrics(scenes, method_outputs, annotation_file, category_ids, post_k,
+                                                   temp_dir))
+            except Exception as e:
+                if name in methods:
+                    results[name] = {"name": name, "error": "%s: %s" % (type(e).__name__, e)}
+
+    for name, result in results.items():
+        if "error" not in result and reference in outputs:
+            result["agreement"] = float(np.mean([_agreement(detections, reference_detections) for
+                                                 detections, reference_detections in
+                                                 zip(outputs[name], outputs[reference])]))
+    return results
+
+
+def format_nms_table(results):
+    """
+    Returns the results of run_nms_benchmark() as a text table, with the latencies in milliseconds.
+
+    :rtype: str
+    """
+    rows = [["method"] + [title for _, title, _ in _TABLE_COLUMNS]]
+    for name, result in results.items():
+        if "error" in result:
+            rows.append([name, result["error"]])
+            continue
+        rows.append([name] + ["%.3f" % (result[key] * scale) if key in result else "-"
+                              for key, _, scale in _TABLE_COLUMNS])
+    widths = [max(len(row[i]) for row in rows if len(row) > i and len(row) == len(rows[0]))
+              for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        if len(row) != len(rows[0]):
+            lines.append("%s  %s" % (row[0].ljust(widths[0]), row[1]))
+        else:
+            lines.append("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    return "\n".join(lines)
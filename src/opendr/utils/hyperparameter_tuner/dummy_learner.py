@@ -21,6 +21,8 @@ class DummyLearner(Learner):
     """
     Dummy implementation of the Learner class. It is created for testing the hyperparameter tuner.
     """
+    supports_fit_callbacks = True
+
     def __init__(self, lr=0.001, epochs=1, optimizer='SGD', out_features=12):
         # Pass the shared parameters on super's constructor so they can get initialized as class attributes
         super(DummyLearner, self).__init__(lr=lr, optimizer=optimizer)
@@ -32,11 +34,14 @@ class DummyLearner(Learner):
         loss_function = nn.MSELoss()
         x, y = self._get_data()
         for epoch in range(self.n_epochs):
+            self.model.train()
             prediction = self.model(x)
             loss = loss_function(prediction.view(-1), y)
             self.torch_optimizer.zero_grad()
             loss.backward()
             self.torch_optimizer.step()
+            if val_dataset is not None and self._report_fit_metrics(epoch, self.eval(val_dataset)):
+                break
 
     def eval(self, dataset):
         loss_function = nn.MSELoss()
@@ -13,7 +13,13 @@
 # limitations under the License.
 
 import inspect
+import multiprocessing
+import os
+import pickle
+import time
+from multiprocessing.connection import wait
 import optuna
+from optuna.pruners import BasePruner
 from optuna.study.study import Study
 from optuna.trial import Trial
 from abc import ABCMeta
@@ -33,6 +39,11 @@ class HyperparameterTuner(object):
             self,
             learner_class: Union[Type[Learner], Type[LearnerRL], Type[LearnerActive]],
             study: Optional[Study] = None,
+            storage: Optional[str] = None,
+            study_name: Optional[str] = None,
+            heartbeat_interval: Optional[int] = 60,
+            max_retries: Optional[int] = 3,
+            pruner: Optional[Union[str, BasePruner]] = None,
     ) -> None:
         """Constructor of the HyperparameterTuner.
 
@@ -51,11 +62,44 @@ class HyperparameterTuner(object):
         If not provided, a Study object will be created with the default parameters, which can be found here:
         https://optuna.readthedocs.io/en/stable/reference/generated/optuna.study.create_study.html#optuna.study.create_study
         :type study: Optional[Study]
+        :param storage: URL of a database in which the study is stored, e.g., 'sqlite:///tuner.db' for a local SQLite
+        file, or a PostgreSQL or MySQL URL for a study shared by several nodes. The study is created if it does not
+        exist, and loaded otherwise, so that the trials persist between runs and several tuners, e.g., one per node,
+        can optimize the same study. It is required to run trials in worker processes, see optimize(). It cannot be
+        combined with the study argument.
+        :type storage: Optional[str]
+        :param study_name: Name of the study in the storage.
+        :type study_name: Optional[str]
+        :param heartbeat_interval: Interval in seconds at which the running trials of a study with a storage record a
+        heartbeat. The trials without heartbeat for twice this interval, e.g., whose process crashed or whose node
+        went down, are marked as failed and retried with the same hyperparameters by the next trial that starts.
+        :type heartbeat_interval: Optional[int]
+        :param max_retries: Maximum number of times a failed trial is retried, or None for no limit.
+        :type max_retries: Optional[int]
+        :param pruner: Pruner of the study, which stops the trials whose intermediate objective values are not
+        promising, one of 'median' (optuna.pruners.MedianPruner), 'asha' (optuna.pruners.SuccessiveHalvingPruner) or
+        'hyperband' (optuna.pruners.HyperbandPruner), or an Optuna pruner. The intermediate values are reported after
+        each validation of the learner during fit() for the learners that support fit callbacks, and after each
+        iteration otherwise, see optimize(). If not provided, the default pruner of optuna.create_study() is used. It
+        cannot be combined with the study argument.
+        :type pruner: Optional[Union[str, BasePruner]]
         """
+        if study is not None and storage is not None:
+            raise ValueError("Either a study or a storage can be provided, not both.")
+        if study is not None and pruner is not None:
+            raise ValueError("The pruner cannot be provided with a study, it should be set in the study.")
+        pruner = _create_pruner(pruner)
+        self._storage_arguments = None
+        if storage is not None:
+            self._storage_arguments = (storage, heartbeat_interval, max_retries)
+            study = optuna.create_study(
+                study_name=study_name, storage=_create_storage(*self._storage_arguments), pruner=pruner,
+                load_if_exists=True,
+            )
         # If the user does not provide a Optuna Study, a default one is created
         if study is None:
             print('No Study object is provided, a default one will be created using optuna.create_study().')
-            study = optuna.create_study()
+            study = optuna.create_study(pruner=pruner)
         self._study = study
 
         assert type(learner_class) is ABCMeta, "The learner_class should be an uninitialized class object."
@@ -67,6 +111,8 @@ class HyperparameterTuner(object):
         self.iters_is_optimized = False
         self.hyperparameters = self._learner_class.get_hyperparameters()
         self._objective_function = self._learner_class.get_objective_function()
+        self._learner_objective_function = self._objective_function
+        self._intermediate_objective_function = None
 
         # Check if learner class has an implementation of get_hyperparameters()
         if self.hyperparameters is None:
@@ -102,11 +148,15 @@ class HyperparameterTuner(object):
             fit_arguments: Optional[Dict[str, Any]]=None,
             eval_arguments: Optional[Dict[str, Any]]=None,
             objective_function: Optional[Callable]=None,
+            intermediate_objective_function: Optional[Callable]=None,
             n_trials: Optional[int]=None,
             timeout: Optional[float]=None,
             n_jobs: Optional[int]=1,
             show_progress_bar: Optional[bool]=False,
             verbose: Optional[bool]=False,
+            n_workers: Optional[int]=0,
+            devices: Optional[List[str]]=None,
+            threads_per_worker: Optional[int]=None,
     ) -> Dict[str, Any]:
         """Hyperparameter tuning using Optuna.
 
@@ -188,6 +238,13 @@ class HyperparameterTuner(object):
         from the learner_class.get_objective_function() method. If this method is not implemented in the learner_class
         and the objective_function is not specified, hyperparameter tuning cannot be performed and an error is raised.
         :type objective_function: Callable
+        :param intermediate_objective_function: Function that maps the validation metrics that the learner reports
+        during fit() to the intermediate objective values on which the trials are pruned, for the learners that support
+        fit callbacks (see Learner.add_fit_callback()). For these learners, fit() is called once per trial, and the
+        intermediate values are reported each time the model is evaluated on the val_dataset of the fit_arguments, so
+        that a pruned trial stops training after the current epoch. If not specified, the objective_function is used,
+        since the validation metrics are in the format of the output of the eval method for most learners.
+        :type intermediate_objective_function: Callable
         :param n_trials: "The number of trials. If this argument is set to None, there is no limitation on the number of
         trials. If timeout is also set to None, the study continues to create trials until it receives a termination
         signal such as Ctrl+C or SIGTERM." taken from
@@ -208,6 +265,20 @@ class HyperparameterTuner(object):
         :type show_progress_bar: bool
         :param verbose: Set verbosity level.
         :type verbose: bool
+        :param n_workers: Number of worker processes. If positive, each trial runs in a new process, so that it is
+        isolated from the other trials (e.g., a crash or a memory leak of a trial does not affect the others), and
+        n_workers trials run in parallel. The tuner must be created with a storage, through which the processes share
+        the study. In this mode, n_jobs and show_progress_bar are ignored, and the learner_class, the arguments and the
+        objective_function must be picklable, e.g., the objective_function cannot be a lambda. If 0, the trials run in
+        the current process.
+        :type n_workers: int
+        :param devices: Devices of the worker processes, e.g., ['cuda:0', 'cuda:1']. The i-th worker runs its trials
+        on devices[i % len(devices)], which is passed as the device argument of the learner's constructor.
+        :type devices: List[str]
+        :param threads_per_worker: Number of threads of each worker process, which sets the number of threads of
+        PyTorch, OpenMP and ONNX Runtime. On Linux, the workers are also pinned to disjoint sets of cores if there are
+        enough cores.
+        :type threads_per_worker: int
         :return: Dictionary with optimal hyperparameters and provided init_arguments, such that the learner can be
         initialized directly with the returned dict.
         :rtype: Dict[str, Any]
@@ -234,6 +305,7 @@ class HyperparameterTuner(object):
         else:
             assert (self._objective_function is not None), \
                 "Cannot tune hyperparameters, since objective_function is not defined."
+        self._intermediate_objective_function = intermediate_objective_function
 
         # Check validity of hyperparameter definitions
         self._check_hyperparameters()
@@ -249,20 +321,24 @@ class HyperparameterTuner(object):
         optuna.logging.set_verbosity(verbosity)
 
         # Optimize
-        self._study.optimize(
-            self._objective,
-            n_trials=n_trials,
-            n_jobs=n_jobs,
-            timeout=timeout,
-            gc_after_trial=True,
-            show_progress_bar=show_progress_bar,
-        )
+        if n_workers > 0:
+            self._optimize_in_processes(n_workers, n_trials, timeout, devices, threads_per_worker, verbosity)
+        else:
+            self._study.optimize(
+                self._objective,
+                n_trials=n_trials,
+                n_jobs=n_jobs,
+                timeout=timeout,
+                gc_after_trial=True,
+                show_progress_bar=show_progress_bar,
+            )
 
         # Get hyperparameters from trial with lowest objective value
         best_trial = self._study.best_trial
 
         # Reset the number of iters to the value that was specified by the user
-        if not self.iters_is_optimized and 'iters' in self.init_arguments.keys():
+        if not self.iters_is_optimized and not self._learner_class.supports_fit_callbacks and \
+                'iters' in self.init_arguments.keys():
             self.init_arguments['iters'] = self.iters
         return {**self.init_arguments, **best_trial.params}
 
@@ -277,6 +353,82 @@ class HyperparameterTuner(object):
         """
         return self._study
 
+    def _optimize_in_processes(
+            self,
+            n_workers: int,
+            n_trials: Optional[int],
+            timeout: Optional[float],
+            devices: Optional[List[str]],
+            threads_per_worker: Optional[int],
+            verbosity: int,
+    ) -> None:
+        """Run each trial in a new process, with n_workers processes running at the same time.
+
+        The processes load the study from the storage. New trials are started until n_trials trials are started or
+        the timeout is reached, and the running trials are then waited for.
+
+        :return: None
+        """
+        if self._storage_arguments is None:
+            raise ValueError("Running trials in worker processes requires a tuner created with a storage.")
+        if 'device' not in inspect.getfullargspec(self._learner_class.__init__).args:
+            devices = None
+        state = pickle.dumps({
+            'learner_class': self._learner_class,
+            'hyperparameters': self.hyperparameters,
+            'init_arguments': self.init_arguments,
+            'fit_arguments': self.fit_arguments,
+            'eval_arguments': self.eval_arguments,
+            # The objective function of the learner class is often a closure, which cannot be pickled, so it is
+            # obtained again by the processes
+            'objective_function': None if self._objective_function is self._learner_objective_function else
+            self._objective_function,
+            '_intermediate_objective_function': self._intermediate_objective_function,
+            'iters': self.iters,
+            'iters_is_optimized': self.iters_is_optimized,
+        })
+        study = (self._study.study_name, self._study.sampler, self._study.pruner)
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+        # Processes are spawned, since forking a process that uses threads (e.g., CUDA) is unsafe
+        context = multiprocessing.get_context('spawn')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        workers = [None] * n_workers
+        started = 0
+
+        def starting():
+            return (n_trials is None or started < n_trials) and (deadline is None or time.monotonic() < deadline)
+
+        while True:
+            for index, worker in enumerate(workers):
+                if worker is not None:
+                    continue
+                if not starting():
+                    break
+                device = devices[index % len(devices)] if devices else None
+                worker_cores = None
+                if threads_per_worker is not None and threads_per_worker * n_workers <= len(cores):
+                    worker_cores = cores[index * threads_per_worker:(index + 1) * threads_per_worker]
+                workers[index] = context.Process(
+                    target=_run_trial,
+                    args=(state, self._storage_arguments, study, device, threads_per_worker, worker_cores, verbosity),
+                    name='HyperparameterTuner-{}'.format(index),
+                )
+                workers[index].start()
+                started += 1
+            running = [worker for worker in workers if worker is not None]
+            if not running:
+                break
+            # Waits for a trial to end, or for the timeout after which no trial is started
+            wait([worker.sentinel for worker in running],
+                 timeout=max(deadline - time.monotonic(), 0) if deadline is not None and starting() else None)
+            for index, worker in enumerate(workers):
+                if worker is not None and not worker.is_alive():
+                    worker.join()
+                    if worker.exitcode != 0:
+                        # The trial is retried once its heartbeat is stale
+                        print('The process of a trial exited with code {}.'.format(worker.exitcode))
+                    workers[index] = None
+
     def _check_hyperparameters(self) -> None:
         """Check the validity of the provided hyperparameters argument.
         :return: None
@@ -353,6 +505,8 @@ class HyperparameterTuner(object):
         :rtype: float
         """
         hyperparameters = self._suggest_hyperparameters(trial)
+        if self._learner_class.supports_fit_callbacks:
+            return self._objective_with_fit_callback(trial, hyperparameters)
         if self.iters_is_optimized:
             self.iters = deepcopy(hyperparameters['iters'])
             hyperparameters['iters'] = 1
@@ -369,14 +523,49 @@ class HyperparameterTuner(object):
                 raise optuna.exceptions.TrialPruned()
         return objective_value
 
+    def _objective_with_fit_callback(self, trial: Trial, hyperparameters: Dict[str, any]) -> float:
+        """Objective function for the learners that support fit callbacks.
+
+        The learner is trained with a single call of its fit method, which reports the intermediate objective values to
+        the trial each time the model is evaluated on the validation dataset, and stops if the trial should be pruned.
+
+        :param trial: The Optuna trial.
+        :type trial: optuna.trial.Trial
+        :param hyperparameters: The suggested hyperparameters.
+        :type hyperparameters: Dict[str, any]
+        :return: Scalar objective value.
+        :rtype: float
+        """
+        intermediate_objective_function = self._intermediate_objective_function or self._objective_function
+        pruned = []
+
+        def report(learner, step, metrics):
+            trial.report(intermediate_objective_function(metrics), step)
+            if trial.should_prune():
+                pruned.append(step)
+                return True
+            return False
+
+        learner = self._learner_class(**{**self.init_arguments, **hyperparameters})
+        learner.add_fit_callback(report)
+        learner.fit(**self.fit_arguments)
+        if pruned:
+            raise optuna.exceptions.TrialPruned('Trial was pruned at step {}.'.format(pruned[0]))
+        eval_stats = learner.eval(**self.eval_arguments)
+        return self._objective_function(eval_stats)
+
     def _set_iters(self) -> None:
         """Set the number of iterations.
 
         We set iters to 1 in the learner and call the fit and eval method for the number of iters instead. This allows
-        to prune based on the intermediate result.
+        to prune based on the intermediate result. The learners that support fit callbacks report the intermediate
+        results during fit, so their iters are not changed.
 
         :return: None
         """
+        if self._learner_class.supports_fit_callbacks:
+            self.iters = 1
+            return
 
         for idx, hyperparameter in enumerate(self.hyperparameters):
             # We first check if iters is a hyperparameter that is to be tuned
@@ -397,3 +586,78 @@ class HyperparameterTuner(object):
                 else:
                     # iters is not an argument of the learner
                     self.iters = 1
+
+
+def _create_pruner(pruner: Optional[Union[str, BasePruner]]) -> Optional[BasePruner]:
+    """Create the pruner of a study from its name.
+
+    :return: the pruner, or None for the default pruner of Optuna
+    :rtype: optuna.pruners.BasePruner
+    """
+    if pruner is None or isinstance(pruner, BasePruner):
+        return pruner
+    pruners = {
+        'median': optuna.pruners.MedianPruner,
+        'asha': optuna.pruners.SuccessiveHalvingPruner,
+        'hyperband': optuna.pruners.HyperbandPruner,
+    }
+    if pruner not in pruners:
+        raise ValueError("Unknown pruner '{}', choose from {}.".format(pruner, ', '.join(pruners)))
+    return pruners[pruner]()
+
+
+def _create_storage(url: str, heartbeat_interval: Optional[int], max_retries: Optional[int]):
+    """Create the storage of a study, whose failed trials are retried.
+
+    :return: the storage
+    :rtype: optuna.storages.RDBStorage
+    """
+    engine_kwargs = None
+    if url.startswith('sqlite'):
+        # SQLite locks the database while a process writes, the other processes wait instead of failing
+        engine_kwargs = {'connect_args': {'timeout': 60}}
+    callbacks = {}
+    if heartbeat_interval is not None:
+        # The callback was renamed in Optuna 4.9
+        retry = getattr(optuna.storages, 'RetryHeartbeatStaleTrialCallback', None) or \
+            optuna.storages.RetryFailedTrialCallback
+        name = 'heartbeat_stale_trial_callback' if 'heartbeat_stale_trial_callback' in \
+            inspect.signature(optuna.storages.RDBStorage).parameters else 'failed_trial_callback'
+        callbacks[name] = retry(max_retry=max_retries, inherit_intermediate_values=True)
+    return optuna.storages.RDBStorage(
+        url, engine_kwargs=engine_kwargs, heartbeat_interval=heartbeat_interval, **callbacks,
+    )
+
+
+def _run_trial(state, storage_arguments, study, device, threads, cores, verbosity) -> None:
+    """Run a trial of a study in a worker process.
+
+    The threads and cores of the process are set before the learner class is imported, by unpickling the state of
+    the tuner.
+    """
+    if threads is not None:
+        for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENDR_ORT_THREADS'):
+            os.environ[variable] = str(threads)
+    if cores is not None:
+        os.sched_setaffinity(0, cores)
+    optuna.logging.set_verbosity(verbosity)
+
+    tuner = HyperparameterTuner.__new__(HyperparameterTuner)
+    state = pickle.loads(state)
+    tuner._learner_class = state.pop('learner_class')
+    tuner._objective_function = state.pop('objective_function') or tuner._learner_class.get_objective_function()
+    for name, value in state.items():
+        setattr(tuner, name, value)
+    if device is not None:
+        tuner.init_arguments = {**tuner.init_arguments, 'device': device}
+    if threads is not None:
+        import torch
+        torch.set_num_threads(threads)
+
+    study_name, sampler, pruner = study
+    # The sampler is seeded differently in each process, so that the processes do not sample the same values
+    sampler.reseed_rng()
+    study = optuna.load_study(
+        study_name=study_name, storage=_create_storage(*storage_arguments), sampler=sampler, pruner=pruner,
+    )
+    study.optimize(tuner._objective, n_trials=1, gc_after_trial=True)
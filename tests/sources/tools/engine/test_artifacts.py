@@ -0,0 +1,152 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+
+from opendr.engine.helper.artifacts import ArtifactCache
+
+FILES = {"/weights.pth": os.urandom(3 * 1024 ** 2 + 123), "/metadata.json": b'{"format": "pth"}'}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves FILES with HTTP ranges, and records the requests"""
+
+    requests = []
+    # Number of bytes after which the next response is interrupted
+    interrupt = None
+
+    def do_GET(self):
+        StandInHandler.requests.append((self.path, self.headers.get("Range")))
+        content = FILES.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"][len("bytes="):].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+        end = len(content)
+        if StandInHandler.interrupt is not None:
+            end, StandInHandler.interrupt = start + StandInHandler.interrupt, None
+            self.close_connection = True
+        self.wfile.write(content[start:end])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestArtifactCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Artifact cache\n"
+              "**********************************")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.url = "http://127.0.0.1:%d" % cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ArtifactCache(os.path.join(self.temp_dir, "cache"), offline=False, retries=2)
+        StandInHandler.requests = []
+        StandInHandler.interrupt = None
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def test_retrieve(self):
+        filename = os.path.join(self.temp_dir, "model", "weights.pth")
+        self.cache.retrieve(self.url + "/weights.pth", filename)
+        self.assertEqual(self.read(filename), FILES["/weights.pth"])
+
+        # The second retrieval, of a URL with duplicated slashes, is served from the cache
+        other = os.path.join(self.temp_dir, "other.pth")
+        self.cache.retrieve(self.url + "//weights.pth", other)
+        self.assertEqual(self.read(other), FILES["/weights.pth"])
+        self.assertEqual(len(StandInHandler.requests), 1)
+
+        entry = self.cache.lookup(self.url + "/weights.pth")
+        self.assertEqual(entry["sha256"], hashlib.sha256(FILES["/weights.pth"]).hexdigest())
+        self.assertEqual(entry["size"], len(FILES["/weights.pth"]))
+        self.assertEqual(self.cache.manifest(), [entry])
+        self.assertEqual(self.cache.size(), len(FILES["/weights.pth"]))
+
+    def test_resume(self):
+        StandInHandler.interrupt = 1024 ** 2
+        progress = []
+        path = self.cache.fetch(self.url + "/weights.pth",
+                                reporthook=lambda count, block_size, total: progress.append(total))
+        self.assertEqual(self.read(path), FILES["/weights.pth"])
+        # The second request continues from the bytes received by the first one
+        self.assertEqual(StandInHandler.requests, [("/weights.pth", None), ("/weights.pth", "bytes=1048576-")])
+        self.assertEqual(progress[-1], len(FILES["/weights.pth"]))
+
+    def test_checksum(self):
+        with self.assertRaises(ValueError):
+            self.cache.fetch(self.url + "/metadata.json", sha256="0" * 64)
+        self.assertIsNone(self.cache.lookup(self.url + "/metadata.json"))
+        sha256 = hashlib.sha256(FILES["/metadata.json"]).hexdigest()
+        self.assertEqual(self.read(self.cache.fetch(self.url + "/metadata.json", sha256=sha256)),
+                         FILES["/metadata.json"])
+
+        # Corrupted files are found and removed from the manifest
+        with open(self.cache.fetch(self.url + "/metadata.json"), "wb") as file:
+            file.write(b'{"format": "onx"}')
+        self.assertEqual(self.cache.verify(), [self.url + "/metadata.json"])
+        self.assertIsNone(self.cache.lookup(self.url + "/metadata.json"))
+
+    def test_offline(self):
+        offline = ArtifactCache(self.cache.path, offline=True)
+        with self.assertRaises(URLError):
+            offline.fetch(self.url + "/metadata.json")
+        self.cache.fetch(self.url + "/metadata.json")
+        self.assertEqual(self.read(offline.fetch(self.url + "/metadata.json")), FILES["/metadata.json"])
+        self.assertEqual(len(StandInHandler.requests), 1)
+
+    def test_retrieve_many(self):
+        items = [(self.url + name, os.path.join(self.temp_dir, name[1:])) for name in FILES]
+        self.assertEqual(self.cache.retrieve_many(items), [filename for _, filename in items])
+        for name, filename in zip(FILES, [filename for _, filename in items]):
+            self.assertEqual(self.read(filename), FILES[name])
+
+    def test_missing(self):
+        with self.assertRaises(URLError):
+            self.cache.fetch(self.url + "/missing.pth")
+        self.assertEqual(len(StandInHandler.requests), 1)
+        self.cache.remove(self.url + "/missing.pth")
+        self.cache.prune()
+
+
+if __name__ == "__main__":
+    unittest.main()
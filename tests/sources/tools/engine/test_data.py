@@ -0,0 +1,131 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+
+from opendr.engine.data import Image, ImageBatch
+
+
+class TestData(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST engine.data \n**********************************")
+        cls.bgr = np.random.randint(0, 255, (4, 5, 3), dtype=np.uint8)
+        cls.rgb_chw = np.transpose(cv2.cvtColor(cls.bgr, cv2.COLOR_BGR2RGB), (2, 0, 1))
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_image_layouts(self):
+        image = Image(self.bgr)
+        assert np.array_equal(image.data, self.rgb_chw)
+        assert np.array_equal(image.opencv(), self.bgr)
+        assert np.array_equal(image.convert("channels_last", "rgb"), np.transpose(self.rgb_chw, (1, 2, 0)))
+        assert np.array_equal(image.convert("channels_first", "bgr"), np.transpose(self.bgr, (2, 0, 1)))
+
+        image = Image(self.rgb_chw, guess_format=False)
+        assert np.array_equal(image.opencv(), self.bgr)
+
+    def test_image_views(self):
+        image = Image(self.bgr)
+
+        view = image.opencv(copy=False)
+        assert not view.flags.writeable
+        assert view is not image.opencv(copy=False)
+        assert np.shares_memory(view, image.opencv(copy=False))
+        assert not np.shares_memory(image.opencv(), view)
+
+        view = image.numpy(copy=False)
+        assert not view.flags.writeable
+        assert np.array_equal(view, self.rgb_chw)
+
+        # Modifying the data through the data property is reflected in the other layouts
+        image.data[0, 0, 0] = 7
+        assert image.opencv()[0, 0, 2] == 7
+
+        # Setting new data invalidates the cached layouts
+        image.data = np.zeros_like(self.rgb_chw)
+        assert not image.opencv(copy=False).any()
+
+    def test_image_open_many(self):
+        paths = []
+        for i, shape in enumerate([(64, 80, 3), (40, 30, 3)]):
+            paths.append(os.path.join(self.temp_dir, "image_%d.png" % i))
+            cv2.imwrite(paths[-1], np.random.randint(0, 255, shape, dtype=np.uint8))
+
+        images = Image.open_many(paths, workers=2)
+        for path, image in zip(paths, images):
+            assert np.array_equal(image.opencv(), cv2.imread(path))
+            assert np.array_equal(image.data, Image.open(path).data)
+
+        images = Image.open_many(paths, workers=2, max_side=32)
+        assert images[0].data.shape == (3, 26, 32)
+        assert images[1].data.shape == (3, 32, 24)
+
+        with self.assertRaises(FileNotFoundError):
+            Image.open_many(paths + [os.path.join(self.temp_dir, "missing.png")])
+
+    def test_image_open_reduced(self):
+        path = os.path.join(self.temp_dir, "image.jpg")
+        cv2.imwrite(path, np.full((480, 640, 3), 128, dtype=np.uint8))
+
+        assert Image.open(path).data.shape == (3, 480, 640)
+        # Decoded at 1/4 of the resolution and then resized to the requested size
+        assert Image.open(path, max_side=150).data.shape == (3, 112, 150)
+        assert Image.open(path, max_side=160).data.shape == (3, 120, 160)
+        assert Image.open(path, max_side=1000).data.shape == (3, 480, 640)
+
+    def test_image_batch(self):
+        batch = ImageBatch([Image(self.bgr), self.bgr])
+        assert batch.data.shape == (2, 3, 4, 5)
+        assert np.array_equal(batch.data[1], self.rgb_chw)
+        assert np.array_equal(batch[0].opencv(), self.bgr)
+        assert np.shares_memory(batch[0].data, batch.data)
+
+        # Images of a different size are letterboxed into the batch
+        tall = np.random.randint(0, 255, (8, 5, 3), dtype=np.uint8)
+        batch.append(tall)
+        assert len(batch) == 3
+        assert np.array_equal(batch.original_sizes[2], (8, 5))
+        assert batch.scales[2] == 0.5 and np.array_equal(batch.pads[2], (0, 1))
+        assert not batch.data[2, :, :, 0].any() and not batch.data[2, :, :, 4].any()
+        assert np.allclose(batch.to_original([[1, 0, 4, 4]], 2), [[0, 0, 6, 8]])
+
+        # Refilling the batch reuses its memory
+        data = batch.data
+        batch.set([self.bgr])
+        assert len(batch) == 1
+        assert np.shares_memory(batch.data, data)
+        assert batch.scales[0] == 1 and not batch.pads.any()
+
+        # The number of channels is taken from the first image, including for preallocated batches
+        gray = np.random.randint(0, 255, (1, 4, 5), dtype=np.uint8)
+        assert ImageBatch([gray, gray]).data.shape == (2, 1, 4, 5)
+        batch = ImageBatch(size=(4, 5), capacity=2)
+        batch.append(np.random.randint(0, 255, (4, 4, 5), dtype=np.uint8))
+        assert batch.data.shape == (1, 4, 4, 5)
+        with self.assertRaises(ValueError):
+            batch.append(gray)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+
+from opendr.engine.data import PointCloud
+from opendr.engine.datasets import DatasetIterator, MappedDatasetIterator, PointCloudsDatasetIterator, \
+    PrefetchingDatasetIterator
+from opendr.engine.helper.cache import ShardedCache
+
+
+class RangeDatasetIterator(DatasetIterator):
+    def __init__(self, length):
+        super().__init__()
+        self.length = length
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self.length:
+            raise IndexError("RangeDatasetIterator index out of range")
+        return idx
+
+    def __len__(self):
+        return self.length
+
+
+def square(x):
+    return x * x
+
+
+class CountingMap:
+    def __init__(self):
+        self.indices = []
+
+    def __call__(self, idx):
+        self.indices.append(idx)
+        return PointCloud(np.full((idx + 1, 4), idx, dtype=np.float32)), {"index": idx}
+
+
+class TestDatasets(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST engine.datasets \n**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.velodyne_path = os.path.join(cls.temp_dir, "velodyne")
+        os.makedirs(cls.velodyne_path)
+
+        cls.point_clouds = []
+        for i, count in enumerate([5, 0, 12, 3]):
+            points = np.random.rand(count, 4).astype(np.float32)
+            points.tofile(os.path.join(cls.velodyne_path, "%06d.bin" % i))
+            cls.point_clouds.append(points)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def assert_point_clouds(self, dataset):
+        assert len(dataset) == len(self.point_clouds)
+        for i, points in enumerate(self.point_clouds):
+            assert np.array_equal(dataset[i].data, points)
+
+    def test_point_clouds_mmap(self):
+        self.assert_point_clouds(PointCloudsDatasetIterator(self.velodyne_path))
+
+        dataset = PointCloudsDatasetIterator(self.velodyne_path, mmap=True)
+        self.assert_point_clouds(dataset)
+
+        # Memory-mapped point clouds are copy-on-write, modifying them does not change the files
+        point_cloud = dataset[0]
+        point_cloud.data[0, 0] = -1
+        assert dataset[0].data[0, 0] == self.point_clouds[0][0, 0]
+
+    def test_point_clouds_prefetch(self):
+        dataset = PointCloudsDatasetIterator(self.velodyne_path, mmap=True, prefetch=2)
+        for _ in range(2):
+            self.assert_point_clouds(dataset)
+        assert np.array_equal(dataset[1].data, self.point_clouds[1])
+        with self.assertRaises(IndexError):
+            dataset[len(self.point_clouds)]
+
+        # The prefetcher is not pickled, but created again when needed
+        dataset = pickle.loads(pickle.dumps(dataset))
+        self.assert_point_clouds(dataset)
+        dataset.close()
+
+    def test_point_clouds_packed(self):
+        packed_path = PointCloudsDatasetIterator.pack(self.velodyne_path, os.path.join(self.temp_dir, "packed.bin"))
+
+        dataset = PointCloudsDatasetIterator(packed_path, num_point_features=3)
+        assert dataset.num_point_features == 4
+        self.assert_point_clouds(dataset)
+        # The point clouds are views of the memory-mapped file
+        assert not dataset[2].data.flags.owndata
+
+        dataset = pickle.loads(pickle.dumps(dataset))
+        self.assert_point_clouds(dataset)
+
+    def test_prefetching(self):
+        dataset = MappedDatasetIterator(RangeDatasetIterator(20), square)
+        expected = [i * i for i in range(20)]
+
+        with PrefetchingDatasetIterator(dataset, workers=3, prefetch=4) as prefetching:
+            assert len(prefetching) == 20
+            assert list(prefetching) == expected
+            assert [prefetching[i] for i in range(len(prefetching))] == expected
+            assert prefetching[7] == 49 and prefetching[3] == 9
+            assert prefetching[-1] == 361
+            with self.assertRaises(IndexError):
+                prefetching[20]
+            with self.assertRaises(IndexError):
+                prefetching[-21]
+
+        with PrefetchingDatasetIterator(dataset, workers=3, prefetch=4, ordered=False) as prefetching:
+            assert sorted(prefetching) == expected
+
+        with PrefetchingDatasetIterator(dataset, workers=2, mode="process") as prefetching:
+            assert list(prefetching) == expected
+            assert prefetching[5] == 25
+
+        with self.assertRaises(ValueError):
+            PrefetchingDatasetIterator(dataset, mode="fiber")
+
+    def test_mapped_cache(self):
+        cache_path = os.path.join(self.temp_dir, "cache")
+        map_function = CountingMap()
+
+        dataset = MappedDatasetIterator(RangeDatasetIterator(10), map_function, cache=cache_path)
+        for _ in range(2):
+            for i in range(len(dataset)):
+                point_cloud, target = dataset[i]
+                assert np.array_equal(point_cloud.data, np.full((i + 1, 4), i))
+                assert target == {"index": i}
+        assert len(map_function.indices) == 10
+
+        # The cache persists across instances and the loaded arrays are writable views of the shards
+        dataset = MappedDatasetIterator(RangeDatasetIterator(10), map_function, cache=cache_path)
+        point_cloud, _ = dataset[3]
+        assert not point_cloud.data.flags.owndata
+        point_cloud.data[0, 0] = -1
+        assert dataset[3][0].data[0, 0] == 3
+        assert len(map_function.indices) == 10
+
+        # Other datasets and map functions do not share entries
+        MappedDatasetIterator(RangeDatasetIterator(11), map_function, cache=cache_path)[3]
+        assert len(map_function.indices) == 11
+        assert MappedDatasetIterator(RangeDatasetIterator(10), square, cache=cache_path)[3] == 9
+
+        # After pickling, the dataset uses the same cache
+        dataset = pickle.loads(pickle.dumps(dataset))
+        dataset[5]
+        assert len(dataset.map_function.indices) == 11
+
+    def test_mapped_cache_nested(self):
+        cache_path = os.path.join(self.temp_dir, "nested")
+
+        def times_ten(x):
+            return x * 10
+
+        def plus_thousand(x):
+            return x + 1000
+
+        first = MappedDatasetIterator(MappedDatasetIterator(RangeDatasetIterator(5), times_ten), square,
+                                      cache=cache_path)
+        second = MappedDatasetIterator(MappedDatasetIterator(RangeDatasetIterator(5), plus_thousand), square,
+                                       cache=cache_path)
+        assert first.fingerprint != second.fingerprint
+        assert first[1] == 100
+        assert second[1] == 1002001
+
+        # Attributes that cannot be fingerprinted require an explicit fingerprint
+        original = RangeDatasetIterator(5)
+        original.lock = threading.Condition()
+        with self.assertRaises(ValueError):
+            MappedDatasetIterator(original, square, cache=cache_path)
+        assert MappedDatasetIterator(original, square, cache=cache_path, fingerprint="range")[2] == 4
+
+    def test_cache_refresh(self):
+        path = os.path.join(self.temp_dir, "refresh")
+        cache, other = ShardedCache(path), ShardedCache(path)
+        keys = [ShardedCache.key("refresh", i) for i in range(2)]
+
+        # New shards are found on a miss, values appended to known shards after refresh()
+        other.put(keys[0], 0)
+        assert cache.get(keys[0]) == 0
+        other.put(keys[1], 1)
+        cache.refresh()
+        assert cache.get(keys[1]) == 1
+
+        # Misses do not scan the shards again while the directory is unchanged
+        scans = []
+        scan = cache._scan
+        cache._scan = lambda: scans.append(scan())
+        for _ in range(3):
+            assert cache.get(ShardedCache.key("refresh", "missing")) is None
+        assert not scans
+
+    def test_cache_eviction(self):
+        cache = ShardedCache(os.path.join(self.temp_dir, "eviction"), shard_size=1)
+        keys = [ShardedCache.key("eviction", i) for i in range(4)]
+        for i, key in enumerate(keys):
+            cache.put(key, np.full(1024, i, dtype=np.uint8))
+        assert all(key in cache for key in keys)
+        assert len(os.listdir(cache.path)) == 4
+
+        # Use the first value, so that the second one is the least recently used
+        os.utime(cache.path, None)
+        for i, key in enumerate(keys[1:], 1):
+            path = cache.path / cache._index[key][0]
+            os.utime(path, (i, i))
+        cache.evict(cache.size() - 1)
+        assert keys[1] not in cache
+        assert np.array_equal(cache.get(keys[0]), np.full(1024, 0))
+        assert cache.get(keys[1], "missing") == "missing"
+
+        cache.clear()
+        assert cache.size() == 0 and keys[0] not in cache
+
+
+if __name__ == "__main__":
+    unittest.main()
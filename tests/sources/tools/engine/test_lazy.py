@@ -0,0 +1,58 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import subprocess
+import sys
+import unittest
+
+# Frameworks that are not imported with a package of learners, only with the learners that use them
+FRAMEWORKS = ("torch", "torchvision", "mxnet", "gluoncv", "onnxruntime", "tensorboardX")
+
+
+def imported_frameworks(statement):
+    script = "import json, sys\n%s\nprint(json.dumps([name for name in %r if name in sys.modules]))" % (
+        statement, FRAMEWORKS)
+    return json.loads(subprocess.check_output([sys.executable, "-c", script], universal_newlines=True))
+
+
+class TestLazyAttributes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Lazy attributes\n"
+              "**********************************")
+
+    def test_package_import(self):
+        self.assertEqual(imported_frameworks("import opendr.perception.object_detection_2d"), [])
+        self.assertEqual(imported_frameworks("from opendr.perception.pose_estimation import draw"), [])
+
+    def test_learner_import(self):
+        frameworks = imported_frameworks("from opendr.perception.pose_estimation import LightweightOpenPoseLearner")
+        self.assertIn("torch", frameworks)
+        self.assertNotIn("onnxruntime", frameworks)
+        self.assertNotIn("tensorboardX", frameworks)
+
+    def test_attributes(self):
+        import opendr.perception.pose_estimation as pose_estimation
+        from opendr.perception.pose_estimation.lightweight_open_pose.utilities import draw
+
+        self.assertIs(pose_estimation.draw, draw)
+        self.assertIn("draw", vars(pose_estimation))
+        self.assertTrue(set(pose_estimation.__all__) <= set(dir(pose_estimation)))
+        with self.assertRaises(AttributeError):
+            pose_estimation.unknown
+
+
+if __name__ == "__main__":
+    unittest.main()
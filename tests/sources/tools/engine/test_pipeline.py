@@ -0,0 +1,154 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from opendr.engine.pipeline import Pipeline, Stage, StageQueue
+
+
+def slow_double(value, delay=0.02):
+    time.sleep(delay)
+    return 2 * value
+
+
+def create_offset():
+    return 100
+
+
+def add_offset(offset, value):
+    return value + offset
+
+
+class TestStageQueue(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Pipeline\n"
+              "**********************************")
+
+    def test_policies(self):
+        for policy, expected in (("drop_oldest", [2, 3]), ("drop_newest", [1, 2])):
+            stage_queue = StageQueue(2, policy)
+            for item in (1, 2, 3):
+                stage_queue.put(item)
+            stage_queue.close()
+            self.assertEqual([stage_queue.get(), stage_queue.get()], expected)
+            self.assertEqual(stage_queue.dropped, 1)
+
+        stage_queue = StageQueue(1, "block")
+        stage_queue.put(1)
+        with self.assertRaises(Exception):
+            stage_queue.put(2, timeout=0.01)
+        with self.assertRaises(ValueError):
+            StageQueue(1, "unknown")
+
+
+class TestPipeline(unittest.TestCase):
+    def test_stages(self):
+        stages = [Stage("double", slow_double), Stage("offset", add_offset, setup=create_offset)]
+        with Pipeline(stages) as pipeline:
+            start = time.perf_counter()
+            for value in range(10):
+                pipeline.put(value)
+            first = pipeline.get()
+            pipeline.stop()
+            packets = [first] + list(pipeline.results())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual([packet.data for packet in packets], [2 * value + 100 for value in range(10)])
+        self.assertEqual([packet.sequence for packet in packets], list(range(10)))
+        self.assertLess(elapsed, 0.2 * 2)
+
+        metrics = pipeline.metrics()
+        self.assertEqual(metrics["double"]["processed"], 10)
+        self.assertEqual(metrics["double"]["latency"]["count"], 10)
+        self.assertGreater(metrics["double"]["latency"]["p50"], 0.015)
+        self.assertEqual(metrics["pipeline"]["latency"]["count"], 10)
+        self.assertGreater(metrics["pipeline"]["latency"]["p95"], metrics["double"]["latency"]["p50"])
+
+    def test_overlap(self):
+        # Two stages of 20 ms process 10 inputs in about 11 * 20 ms instead of 20 * 20 ms
+        stages = [Stage("first", slow_double), Stage("second", slow_double)]
+        with Pipeline(stages) as pipeline:
+            start = time.perf_counter()
+            for value in range(10):
+                pipeline.put(value)
+            pipeline.stop()
+            self.assertEqual([packet.data for packet in pipeline.results()], [4 * value for value in range(10)])
+        self.assertLess(time.perf_counter() - start, 0.35)
+
+    def test_latest_frame(self):
+        stages = [Stage("slow", lambda value: slow_double(value, 0.05), queue_size=1, policy="drop_oldest")]
+        with Pipeline(stages) as pipeline:
+            for value in range(10):
+                self.assertTrue(pipeline.put(value))
+                time.sleep(0.005)
+            pipeline.stop()
+            outputs = [packet.data for packet in pipeline.results()]
+        # The camera thread is never blocked, and the last frame is always processed
+        self.assertEqual(outputs[-1], 18)
+        self.assertLess(len(outputs), 5)
+        self.assertEqual(pipeline.metrics()["slow"]["dropped"], 10 - len(outputs))
+
+    def test_errors_and_types(self):
+        with self.assertRaises(TypeError):
+            Pipeline([Stage("a", str, output_type=str), Stage("b", int, input_type=int)])
+
+        stages = [Stage("invert", lambda value: 1 / value, input_type=int, output_type=float),
+                  Stage("double", slow_double, input_type=float)]
+        with Pipeline(stages) as pipeline:
+            for value in (1, 0, "2"):
+                pipeline.put(value)
+            pipeline.stop()
+            packets = list(pipeline.results())
+        self.assertEqual(packets[0].data, 2.0)
+        self.assertIsInstance(packets[1].error, ZeroDivisionError)
+        self.assertEqual(packets[1].failed_stage, "invert")
+        self.assertIsInstance(packets[2].error, TypeError)
+        self.assertEqual(pipeline.metrics()["invert"]["errors"], 2)
+        self.assertEqual(pipeline.metrics()["double"]["processed"], 1)
+
+    def test_setup_error(self):
+        def failing_setup():
+            raise ValueError("No model")
+
+        stages = [Stage("double", slow_double, queue_size=1),
+                  Stage("offset", add_offset, setup=failing_setup, workers=2, queue_size=1),
+                  Stage("check", int)]
+        with Pipeline(stages) as pipeline:
+            # More inputs than the queues can hold, which would block if the failed stage stopped taking them
+            for value in range(6):
+                pipeline.put(value, timeout=5)
+            pipeline.stop()
+            packets = list(pipeline.results())
+        self.assertEqual(len(packets), 6)
+        for packet in packets:
+            self.assertEqual(packet.failed_stage, "offset")
+            self.assertIsInstance(packet.error.__cause__, ValueError)
+        self.assertEqual(pipeline.metrics()["offset"]["errors"], 6)
+        self.assertEqual(pipeline.metrics()["check"]["processed"], 0)
+
+    def test_processes(self):
+        stages = [Stage("double", slow_double, workers=2, processes=True),
+                  Stage("offset", add_offset, setup=create_offset, processes=True)]
+        with Pipeline(stages) as pipeline:
+            for value in range(6):
+                pipeline.put(value)
+            pipeline.stop()
+            outputs = sorted(packet.data for packet in pipeline.results())
+        self.assertEqual(outputs, [2 * value + 100 for value in range(6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
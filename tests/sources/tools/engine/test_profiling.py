@@ -0,0 +1,97 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from opendr.engine.learners import Learner
+
+
+class SleepingLearner(Learner):
+    def __init__(self):
+        super().__init__()
+
+    def infer(self, duration):
+        with self._profile("infer"):
+            with self._profile("preprocess"):
+                time.sleep(duration / 2)
+            with self._profile("forward"):
+                time.sleep(duration)
+        return duration
+
+    def fit(self, dataset, val_dataset=None, logging_path='', silent=True, verbose=True):
+        pass
+
+    def eval(self, dataset):
+        pass
+
+    def save(self, path):
+        pass
+
+    def load(self, path):
+        pass
+
+    def optimize(self, target_device):
+        pass
+
+    def reset(self):
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST engine.helper.profiling \n"
+              "**********************************")
+
+    def test_profiling(self):
+        learner = SleepingLearner()
+        assert learner.profiler is None
+        learner.infer(0.001)
+
+        profiler = learner.enable_profiling(max_samples=12)
+        for duration in [0.002] * 4 + [0.02]:
+            learner.infer(duration)
+
+        stats = profiler.stats()
+        assert set(stats) == {"infer", "preprocess", "forward"}
+        # Only the last 12 records are kept
+        assert sum(stage["count"] for stage in stats.values()) == 12
+        assert stats["forward"]["count"] == 4
+        assert stats["forward"]["p50"] < 0.01 < stats["forward"]["p99"]
+        assert stats["infer"]["p50"] >= stats["forward"]["p50"] + stats["preprocess"]["p50"]
+        assert 0 < stats["infer"]["throughput"] < 1 / 0.002
+        assert profiler.summary().splitlines()[1].startswith("infer")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.json")
+            profiler.chrome_trace(path)
+            with open(path) as file:
+                events = json.load(file)["traceEvents"]
+        assert len(events) == 12
+        assert all(event["ph"] == "X" and event["dur"] > 0 for event in events)
+
+        profiler.reset()
+        assert profiler.stats() == {}
+        learner.disable_profiling()
+        learner.infer(0.001)
+        assert learner.profiler is None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from opendr.engine.datasets import DatasetIterator
+from opendr.engine.helper.quantization import calibration_inputs, check_target, quantize_int8
+
+
+class ListDataset(DatasetIterator):
+    def __init__(self, items):
+        super().__init__()
+        self.items = items
+
+    def __getitem__(self, idx):
+        return self.items[idx]
+
+    def __len__(self):
+        return len(self.items)
+
+
+class TestQuantization(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Quantization\n"
+              "**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(
+            torch.nn.Conv2d(3, 16, 3, padding=1), torch.nn.ReLU(),
+            torch.nn.Conv2d(16, 16, 3, padding=1), torch.nn.ReLU(),
+            torch.nn.AdaptiveAvgPool2d(1), torch.nn.Flatten(), torch.nn.Linear(16, 10),
+        ).eval()
+        cls.float_path = os.path.join(cls.temp_dir, "model.onnx")
+        torch.onnx.export(model, torch.randn(1, 3, 16, 16), cls.float_path, input_names=["data"],
+                          output_names=["scores"], dynamo=False)
+        rng = np.random.default_rng(0)
+        cls.images = [rng.standard_normal((3, 16, 16), dtype="float32") for _ in range(8)]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_check_target(self):
+        check_target("onnx", None)
+        check_target("cpu-int8", ListDataset(self.images))
+        with self.assertRaises(ValueError):
+            check_target("tensorrt", None)
+        with self.assertRaises(ValueError):
+            check_target("cpu-int8", None)
+
+    def test_calibration_inputs(self):
+        # (input, target) tuples are supported, and the inputs that are not preprocessed are skipped
+        dataset = ListDataset([(image, index) for index, image in enumerate(self.images)])
+        inputs = calibration_inputs(dataset, lambda image: image[None].astype(np.float64), samples=5)
+        self.assertEqual(len(inputs), 5)
+        self.assertEqual(inputs[0].dtype, np.float32)
+        self.assertEqual(inputs[0].shape, (1, 3, 16, 16))
+        inputs = calibration_inputs(dataset, lambda image: None if image.mean() > 0 else image[None])
+        self.assertEqual(len(inputs), sum(image.mean() <= 0 for image in self.images))
+        with self.assertRaises(ValueError):
+            calibration_inputs(dataset, lambda image: None)
+
+    def test_quantize_int8(self):
+        inputs = calibration_inputs(ListDataset(self.images), lambda image: image[None])
+        int8_path = os.path.join(self.temp_dir, "model_int8.onnx")
+        report = quantize_int8(self.float_path, int8_path, inputs)
+        self.assertTrue(os.path.exists(int8_path))
+        self.assertEqual(report["target"], "cpu-int8")
+        self.assertEqual(report["calibration_samples"], len(self.images))
+        self.assertLess(report["relative_error"], 0.1)
+        self.assertGreater(report["cosine_similarity"], 0.99)
+        self.assertIn("top1_agreement", report)
+        self.assertEqual(report["float_size"], os.path.getsize(self.float_path))
+        self.assertEqual(report["int8_size"], os.path.getsize(int8_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
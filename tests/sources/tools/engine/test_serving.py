@@ -0,0 +1,136 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from opendr.engine.data import Image, ImageBatch
+from opendr.engine.learners import Learner
+from opendr.engine.serving import BatchingExecutor
+
+
+class MeanLearner(Learner):
+    """Returns the mean of each image, and records the size of the batches it processes"""
+
+    supports_batching = True
+
+    def __init__(self, delay=0.01):
+        super().__init__()
+        self.delay = delay
+        self.batch_sizes = []
+
+    def infer(self, input, offset=0):
+        time.sleep(self.delay)
+        if isinstance(input, ImageBatch):
+            self.batch_sizes.append(len(input))
+            return [float(image.mean()) + offset for image in input.numpy()]
+        self.batch_sizes.append(1)
+        if input is None:
+            raise ValueError("No image")
+        return float(input.numpy().mean()) + offset
+
+    def fit(self, dataset):
+        pass
+
+    def eval(self, dataset):
+        pass
+
+    def save(self, path):
+        pass
+
+    def load(self, path):
+        pass
+
+    def optimize(self, target_device):
+        pass
+
+    def reset(self):
+        pass
+
+
+class SingleMeanLearner(MeanLearner):
+    supports_batching = False
+
+
+def image(value):
+    return Image(np.full((3, 8, 8), value, dtype=np.uint8))
+
+
+class TestBatchingExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST BatchingExecutor\n"
+              "**********************************")
+
+    def run_clients(self, executor, clients=8, requests=5):
+        results = {}
+
+        def client(index):
+            results[index] = [executor.infer(image(index * 10 + i)) for i in range(requests)]
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_batching(self):
+        learner = MeanLearner()
+        with BatchingExecutor(learner, max_batch=4, max_latency_ms=20, offset=0.5) as executor:
+            results = self.run_clients(executor)
+        for index, values in results.items():
+            self.assertEqual(values, [index * 10 + i + 0.5 for i in range(5)])
+        self.assertEqual(sum(learner.batch_sizes), 40)
+        self.assertLessEqual(max(learner.batch_sizes), 4)
+        # The concurrent requests are coalesced
+        self.assertLess(len(learner.batch_sizes), 20)
+        self.assertEqual((executor.batches, executor.requests), (len(learner.batch_sizes), 40))
+
+    def test_single_inputs(self):
+        learner = SingleMeanLearner()
+        with BatchingExecutor(learner, max_batch=4, max_latency_ms=20) as executor:
+            results = self.run_clients(executor, clients=4, requests=2)
+        self.assertEqual(results[3], [30, 31])
+        self.assertEqual(learner.batch_sizes, [1] * 8)
+        self.assertLess(executor.batches, 8)
+
+    def test_errors(self):
+        executor = BatchingExecutor(SingleMeanLearner(delay=0), max_latency_ms=50)
+        failing, succeeding = executor.submit(None), executor.submit(image(1))
+        with self.assertRaises(ValueError):
+            failing.result()
+        self.assertIsInstance(succeeding.exception(), ValueError)
+        self.assertEqual(executor.infer(image(2)), 2)
+
+        executor.close()
+        with self.assertRaises(RuntimeError):
+            executor.submit(image(1))
+
+    def test_asyncio(self):
+        async def clients(executor):
+            return await asyncio.gather(*[executor.infer_async(image(i)) for i in range(6)])
+
+        learner = MeanLearner(delay=0)
+        with BatchingExecutor(learner, max_batch=8, max_latency_ms=50) as executor:
+            self.assertEqual(asyncio.run(clients(executor)), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(learner.batch_sizes, [6])
+
+
+if __name__ == "__main__":
+    unittest.main()
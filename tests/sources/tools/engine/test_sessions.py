@@ -0,0 +1,77 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from onnxruntime.datasets import get_example
+
+from opendr.engine.helper.sessions import BoundSession, SessionManager
+
+
+class TestSessionManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST SessionManager\n"
+              "**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.model = get_example("sigmoid.onnx")
+        cls.inputs = np.random.default_rng(0).standard_normal((3, 4, 5), dtype="float32")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_cache(self):
+        manager = SessionManager(threads=2, cache_dir=os.path.join(self.temp_dir, "cache"))
+        session = manager.session(self.model)
+        self.assertEqual(len(os.listdir(manager.cache_dir)), 1)
+        expected = 1 / (1 + np.exp(-self.inputs))
+        np.testing.assert_allclose(session.run(None, {"x": self.inputs})[0], expected, rtol=1e-5)
+
+        # The second session loads the optimized model from the cache
+        session = manager.session(self.model)
+        self.assertEqual(len(os.listdir(manager.cache_dir)), 1)
+        np.testing.assert_allclose(session.run(None, {"x": self.inputs})[0], expected, rtol=1e-5)
+
+        manager.clear()
+        self.assertEqual(os.listdir(manager.cache_dir), [])
+        with self.assertRaises(ValueError):
+            SessionManager(optimization_level="unknown")
+
+    def test_options(self):
+        options = SessionManager(threads=2, shared_pools=False).options()
+        self.assertEqual(options.intra_op_num_threads, 2)
+        self.assertEqual(options.get_session_config_entry("session.intra_op.allow_spinning"), "0")
+
+    def test_io_binding(self):
+        manager = SessionManager(threads=2, cache=False)
+        session = manager.session(self.model)
+        bound_session = manager.session(self.model, io_binding=True)
+        self.assertIsInstance(bound_session, BoundSession)
+        self.assertEqual(bound_session.get_inputs()[0].name, "x")
+
+        first = bound_session.run(None, {"x": self.inputs})[0]
+        np.testing.assert_allclose(first, session.run(None, {"x": self.inputs})[0], rtol=1e-6)
+        # The outputs are written in the same buffers by the next runs
+        second = bound_session.run(["y"], {"x": 2 * self.inputs})[0]
+        self.assertIs(first, second)
+        np.testing.assert_allclose(second, session.run(None, {"x": 2 * self.inputs})[0], rtol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import pickle
+import unittest
+import numpy as np
+
+from opendr.engine.data import Image, PointCloud, SkeletonSequence
+from opendr.engine.target import Heatmap
+from opendr.engine.helper.shared_memory import SharedMemoryPool
+
+
+def consume(pool, inputs, outputs):
+    while True:
+        shared = inputs.get()
+        if shared is None:
+            break
+        with shared as data:
+            outputs.put((type(data).__name__, float(data.numpy().sum())))
+
+
+class TestSharedMemory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST engine.helper.shared_memory \n"
+              "**********************************")
+
+    def setUp(self):
+        self.pool = SharedMemoryPool(size=64 * 1024)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_share(self):
+        image = Image(np.random.randint(0, 255, (40, 30, 3), dtype=np.uint8))
+        objects = [image, PointCloud(np.random.rand(100, 4)), Heatmap(np.random.rand(20, 20), {0: "background"}),
+                   SkeletonSequence(np.random.rand(1, 3, 10, 18, 2))]
+
+        for obj in objects:
+            shared = self.pool.share(obj)
+            # Only the metadata of the object is pickled, not its arrays
+            assert len(pickle.dumps(shared)) < 1024
+
+            opened = shared.open()
+            assert type(opened) is type(obj)
+            assert np.array_equal(opened.numpy(), obj.numpy())
+            if not isinstance(obj, Image):
+                # The arrays are read-only views of the shared memory
+                assert not opened.data.flags.writeable
+
+            copied = shared.open(copy=True)
+            assert np.array_equal(copied.numpy(), obj.numpy())
+            if not isinstance(obj, Image):
+                assert copied.data.flags.writeable
+            del opened
+            shared.release()
+
+        assert np.array_equal(image.opencv(), objects[0].opencv())
+        assert objects[2].class_names == {0: "background"}
+
+    def test_recycle(self):
+        point_cloud = PointCloud(np.ones((1200, 4)))
+        handles = []
+        # Each point cloud takes about 19 KB, so at most 3 fit in the pool with their headers
+        for _ in range(3):
+            handles.append(self.pool.share(point_cloud, references=2))
+        with self.assertRaises(MemoryError):
+            self.pool.share(point_cloud, timeout=0.01)
+
+        handles[0].release()
+        with self.assertRaises(MemoryError):
+            self.pool.share(point_cloud, timeout=0.01)
+        handles[0].release()
+        with self.assertRaises(ValueError):
+            handles[0].release()
+
+        # The released block is recycled, the ring wraps around to its start
+        handles.append(self.pool.share(point_cloud))
+        assert handles[-1].offset == handles[0].offset
+        with handles[-1] as data:
+            assert np.array_equal(data.data, point_cloud.data)
+
+        for shared in handles[1:3]:
+            shared.release()
+            shared.release()
+        assert self.pool.share(point_cloud).offset == handles[0].offset
+
+        with self.assertRaises(ValueError):
+            self.pool.share(PointCloud(np.ones((10000, 4))))
+
+    def test_processes(self):
+        inputs, outputs = multiprocessing.Queue(), multiprocessing.Queue()
+        consumers = [multiprocessing.Process(target=consume, args=(self.pool, inputs, outputs)) for _ in range(2)]
+        for consumer in consumers:
+            consumer.start()
+
+        images = [Image(np.full((64, 48, 3), i, dtype=np.uint8)) for i in range(20)]
+        for image in images:
+            # Each image is sent to one of the consumers
+            inputs.put(self.pool.share(image, timeout=10))
+        for _ in consumers:
+            inputs.put(None)
+
+        results = sorted(outputs.get(timeout=10) for _ in images)
+        for consumer in consumers:
+            consumer.join()
+        assert results == sorted(("Image", float(image.numpy().sum())) for image in images)
+
+
+if __name__ == "__main__":
+    unittest.main()
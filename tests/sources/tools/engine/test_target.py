@@ -2,7 +2,8 @@ import unittest
 import torch
 import numpy as np
 
-from opendr.engine.target import Category
+from opendr.engine.target import Category, BoundingBox, BoundingBoxList, BoundingBox3D, BoundingBox3DList, \
+    CocoBoundingBox, TrackingAnnotation3DList
 
 
 class TestTarget(unittest.TestCase):
@@ -18,6 +19,102 @@ class TestTarget(unittest.TestCase):
         # np.ndarray
         c_t = Category(prediction=1, confidence=np.array(data_list))
 
+    def test_bounding_box_list_from_numpy(self):
+        xyxy = np.array([[0, 0, 10, 20], [5, 5, 6, 8]], dtype=np.float32)
+        scores = np.array([0.9, 0.1])
+        classes = np.array([3, 1])
+        boxes = BoundingBoxList.from_numpy(xyxy, scores, classes, image_id=7)
+
+        assert len(boxes) == 2
+        assert boxes.image_id == 7
+        assert boxes[0].name == 3
+        assert boxes[0].width == 10 and boxes[0].height == 20
+        assert np.isclose(boxes.confidence, 0.5)
+        assert np.allclose(boxes.to_numpy(), np.column_stack([xyxy, scores, classes]))
+        assert np.allclose(BoundingBoxList.from_numpy(boxes.to_numpy()).to_numpy(), boxes.to_numpy())
+        assert np.allclose(boxes.mot(), [[-1, 0, 0, 10, 20, 0.9], [-1, 5, 5, 1, 3, 0.1]])
+        assert BoundingBoxList.from_numpy(np.zeros((0, 4))).to_numpy().shape == (0, 6)
+
+        # The views have the type chosen for the list, with the same output as the boxes built one by one
+        coco_boxes = BoundingBoxList.from_numpy(xyxy, scores, classes, box_type=CocoBoundingBox)
+        expected = CocoBoundingBox(3, 0.0, 0.0, 10.0, 20.0, score=0.9)
+        assert type(coco_boxes[0]) is CocoBoundingBox
+        assert coco_boxes[0].coco() == expected.coco()
+        assert str(coco_boxes[0]) == str(expected)
+        assert coco_boxes[0].iscrowd == 0 and coco_boxes[0].area == 0
+        del coco_boxes.data[1]
+        assert type(coco_boxes[0]) is CocoBoundingBox
+
+    def test_bounding_box_list_views(self):
+        boxes = BoundingBoxList()
+        for i in range(5):
+            boxes.add_box(BoundingBox(name=i, left=i, top=i, width=2, height=3, score=i / 10))
+        assert len(boxes) == 5
+        assert np.isclose(boxes.confidence, 0.2)
+
+        # Boxes are views of the list rows
+        box = boxes[1]
+        assert box is boxes[1]
+        box.left = 100
+        assert boxes.to_numpy()[1, 0] == 100
+
+        boxes.data.sort(key=lambda v: v.confidence, reverse=True)
+        assert [b.name for b in boxes] == [4, 3, 2, 1, 0]
+        assert box is boxes[3] and box.left == 100
+
+        del boxes.data[0]
+        assert [b.name for b in boxes] == [3, 2, 1, 0]
+        assert np.isclose(boxes.confidence, 0.15)
+
+        # Boxes removed from the list keep their values
+        boxes.data = []
+        assert len(boxes) == 0 and boxes.confidence == 0
+        assert box.left == 100 and box.name == 1
+
+    def test_bounding_box_3d_list_kitti(self):
+        boxes_kitti = {
+            "name": np.array(["Car", "Pedestrian", "DontCare"]),
+            "truncated": np.zeros(3),
+            "occluded": np.zeros(3, dtype=np.int64),
+            "alpha": np.zeros(3),
+            "bbox": np.zeros((3, 4)),
+            "dimensions": np.ones((3, 3)),
+            "location": np.arange(9, dtype=np.float64).reshape(3, 3),
+            "rotation_y": np.zeros(3),
+            "score": np.array([0.5, 0.7, 0.0]),
+        }
+        boxes = BoundingBox3DList.from_kitti(boxes_kitti)
+        assert len(boxes) == 3
+        assert np.isclose(boxes.confidence, 0.4)
+
+        # kitti() returns the wrapped arrays without copying
+        kitti = boxes.kitti()
+        assert np.shares_memory(kitti["location"], boxes_kitti["location"])
+        assert list(kitti["index"]) == [0, 1, -1]
+
+        box = boxes[1]
+        assert box.name == "Pedestrian" and box.confidence == 0.7
+        assert np.allclose(box.location, [3, 4, 5])
+        box.location[0] = 100
+        assert boxes_kitti["location"][1, 0] == 100
+
+        boxes.add_box(BoundingBox3D("Cyclist", 0, 1, 0.1, [1, 2, 3, 4], [1, 2, 3], [4, 5, 6], 0.3, score=0.9))
+        assert list(boxes.kitti()["name"]) == ["Car", "Pedestrian", "DontCare", "Cyclist"]
+        assert np.allclose(boxes[3].bbox2d, [1, 2, 3, 4])
+
+        annotations = TrackingAnnotation3DList.from_kitti(boxes_kitti, ids=np.array([1, 2, 3]))
+        assert annotations[2].id == 3 and annotations[2].frame == -1
+        assert "id" not in annotations.kitti(with_tracking_info=False)
+        assert len(annotations.bounding_box_3d_list()) == 3
+
+        # Deleting and sorting boxes do not overwrite the KITTI arrays of the caller
+        location = boxes_kitti["location"].copy()
+        del annotations.data[0]
+        annotations.data.sort(key=lambda box: -box.confidence)
+        assert [box.id for box in annotations] == [2, 3]
+        assert np.array_equal(boxes_kitti["location"], location)
+        assert list(boxes_kitti["name"]) == ["Car", "Pedestrian", "DontCare"]
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,211 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from opendr.engine.target import BoundingBox3DList, BoundingBoxList, Category, Pose, TrackingAnnotation, \
+    TrackingAnnotationList
+from opendr.engine.target_log import TargetLogReader, TargetLogWriter
+
+
+def detections(frame):
+    rng = np.random.default_rng(frame)
+    count = frame % 4
+    corners = rng.uniform(0, 100, (count, 2))
+    boxes = np.concatenate([corners, corners + rng.uniform(1, 50, (count, 2))], axis=1)
+    return BoundingBoxList.from_numpy(boxes, rng.uniform(0, 1, count), rng.integers(0, 5, count), image_id=frame)
+
+
+class TestTargetLog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST TargetLog\n"
+              "**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_bounding_boxes(self):
+        with TargetLogWriter(self.path("boxes.log"), chunk_size=16) as writer:
+            for frame in range(50):
+                writer.write(detections(frame))
+        with TargetLogReader(self.path("boxes.log")) as reader:
+            self.assertEqual(reader.kind, "bounding_boxes")
+            self.assertEqual(len(reader), sum(frame % 4 for frame in range(50)))
+            # Frames without boxes are not stored
+            self.assertEqual(reader.frames.tolist(), [frame for frame in range(50) if frame % 4])
+            for frame in (1, 27, 48):
+                boxes = reader.frame(frame)
+                self.assertEqual(boxes.image_id, frame)
+                np.testing.assert_allclose(boxes.to_numpy(), detections(frame).to_numpy(), rtol=1e-5, atol=1e-4)
+            self.assertEqual(len(reader.frame(48)), 0)
+            frames = [frame for frame, _ in reader]
+            self.assertEqual(frames, reader.frames.tolist())
+
+    def test_append(self):
+        path = self.path("append.log")
+        with TargetLogWriter(path) as writer:
+            writer.write(detections(1))
+            writer.write(detections(2))
+        with TargetLogWriter(path) as writer:
+            # The frames continue from the frames of the log
+            self.assertEqual(writer.next_frame, 2)
+            writer.write(detections(3))
+        size = os.path.getsize(path)
+        with open(path, "ab") as f:
+            # A partial chunk, e.g., of a process that was killed
+            f.write(b"ODRK" + b"\1" * 20)
+        with TargetLogWriter(path) as writer:
+            writer.write(detections(5), frame=5)
+        with TargetLogReader(path) as reader:
+            self.assertEqual(reader.frames.tolist(), [0, 1, 2, 5])
+            self.assertEqual(len(reader.frame(2)), 3)
+        self.assertGreater(os.path.getsize(path), size)
+        with self.assertRaises(ValueError):
+            TargetLogWriter(path, kind="poses")
+        with self.assertRaises(ValueError):
+            TargetLogWriter(path).write([Pose(np.zeros((18, 2)), 1)])
+
+    def test_append_empty_frames(self):
+        path = self.path("append_empty.log")
+        with TargetLogWriter(path) as writer:
+            writer.write(detections(1))
+            writer.write(detections(2))
+            # An empty frame at the end of the log
+            writer.write(detections(4))
+        with TargetLogWriter(path) as writer:
+            self.assertEqual(writer.next_frame, 3)
+            writer.write(detections(3))
+        with TargetLogReader(path) as reader:
+            self.assertEqual(reader.frames.tolist(), [0, 1, 3])
+            self.assertEqual(len(reader), 1 + 2 + 3)
+            self.assertEqual([frame for frame, _ in reader], [0, 1, 3])
+
+    def test_tracking_annotations_mot(self):
+        mot = np.array([
+            [1, 3, 10, 20, 30, 40, 0.9],
+            [1, 4, 15, 25, 35, 45, 0.8],
+            [2, 3, 11, 21, 31, 41, 0.7],
+        ])
+        with TargetLogWriter(self.path("tracks.log")) as writer:
+            writer.write_mot(mot)
+            writer.write(TrackingAnnotationList([TrackingAnnotation(0, 1, 2, 3, 4, id=7, score=0.5)]))
+        with TargetLogReader(self.path("tracks.log")) as reader:
+            self.assertEqual(reader.kind, "tracking_annotations")
+            annotations = reader.frame(1)
+            self.assertEqual([annotation.id for annotation in annotations], [3, 4])
+            self.assertEqual(annotations[1].frame, 1)
+            self.assertEqual(reader.frame(3)[0].id, 7)
+            result = reader.to_mot(self.path("tracks.txt"))
+            np.testing.assert_allclose(result[:3, :7], mot, rtol=1e-6)
+            self.assertTrue(np.all(result[:, 7:] == -1))
+        loaded = np.loadtxt(self.path("tracks.txt"), delimiter=",")
+        np.testing.assert_allclose(TrackingAnnotationList.from_mot(loaded).mot()[:3], mot, atol=1e-2)
+
+    def test_coco(self):
+        coco = [
+            {"image_id": 4, "category_id": 2, "bbox": [1, 2, 3, 4], "score": 0.5},
+            {"image_id": 4, "category_id": 1, "bbox": [5, 6, 7, 8], "score": 0.25},
+            {"image_id": 9, "category_id": 2, "bbox": [1, 1, 2, 2], "score": 1},
+        ]
+        with TargetLogWriter(self.path("coco.log")) as writer:
+            writer.write_coco(coco)
+        with TargetLogReader(self.path("coco.log")) as reader:
+            results = reader.to_coco()
+            self.assertEqual([result["bbox"] for result in results], [annotation["bbox"] for annotation in coco])
+            self.assertEqual(results[1]["area"], 56)
+            self.assertEqual(reader.frame(4)[1].name, 1)
+
+    def test_poses_and_categories(self):
+        keypoints = np.arange(36).reshape(18, 2)
+        pose = Pose(keypoints, 0.75)
+        pose.id = 3
+        with TargetLogWriter(self.path("poses.log")) as writer:
+            writer.write([pose, Pose(keypoints + 1, 0.5)])
+            writer.write([])
+            writer.write(pose)
+        with TargetLogReader(self.path("poses.log")) as reader:
+            poses = reader.frame(0)
+            self.assertEqual([pose.id for pose in poses], [3, None])
+            np.testing.assert_array_equal(poses[1].data, keypoints + 1)
+            self.assertEqual(reader.frame(1), [])
+            self.assertEqual(reader.frames.tolist(), [0, 2])
+
+        with TargetLogWriter(self.path("categories.log")) as writer:
+            writer.write(Category(2, "walk", 0.5))
+            writer.write(Category(1, confidence=np.array([0.1, 0.7, 0.2])))
+        with TargetLogReader(self.path("categories.log")) as reader:
+            walk, = reader.frame(0)
+            self.assertEqual((walk.data, walk.description, walk.confidence), (2, "walk", 0.5))
+            other, = reader.frame(1)
+            self.assertIsNone(other.description)
+            self.assertAlmostEqual(other.confidence, 0.7, places=6)
+
+    def test_bounding_boxes_3d_kitti(self):
+        boxes_kitti = {
+            "name": np.array(["Car", "Pedestrian"]),
+            "truncated": np.array([0.0, 0.5]),
+            "occluded": np.array([0, 2]),
+            "alpha": np.array([0.1, -0.2]),
+            "bbox": np.array([[1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.float64),
+            "dimensions": np.array([[4, 1.5, 1.8], [0.8, 1.7, 0.6]]),
+            "location": np.array([[1, 2, 3], [4, 5, 6]], dtype=np.float64),
+            "rotation_y": np.array([0.3, 0.4]),
+            "score": np.array([0.9, 0.6]),
+        }
+        with TargetLogWriter(self.path("boxes3d.log")) as writer:
+            writer.write(BoundingBox3DList.from_kitti(boxes_kitti), frame=7)
+        with TargetLogReader(self.path("boxes3d.log")) as reader:
+            boxes = reader.frame(7)
+            self.assertEqual(list(boxes.kitti()["name"]), ["Car", "Pedestrian"])
+            np.testing.assert_allclose(boxes.kitti()["dimensions"], boxes_kitti["dimensions"], rtol=1e-6)
+            reader.to_kitti(self.path("kitti"))
+        self.assertEqual(os.listdir(self.path("kitti")), ["000007.txt"])
+
+        with TargetLogWriter(self.path("kitti.log")) as writer:
+            writer.write_kitti(self.path("kitti"))
+        with TargetLogReader(self.path("kitti.log")) as reader:
+            kitti = reader.frame(7).kitti()
+            for column, expected in boxes_kitti.items():
+                if column == "name":
+                    self.assertEqual(list(kitti[column]), list(expected))
+                else:
+                    np.testing.assert_allclose(kitti[column], expected, atol=1e-4)
+
+    def test_refresh(self):
+        path = self.path("live.log")
+        writer = TargetLogWriter(path, kind="bounding_boxes")
+        writer.write(detections(1))
+        writer.flush()
+        reader = TargetLogReader(path)
+        self.assertEqual(len(reader), 1)
+        writer.write(detections(2))
+        writer.close()
+        reader.refresh()
+        self.assertEqual(len(reader), 3)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
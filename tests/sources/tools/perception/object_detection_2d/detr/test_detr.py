@@ -19,6 +19,7 @@ import torch
 import warnings
 from torch.jit import TracerWarning
 from opendr.engine.datasets import ExternalDataset
+from opendr.engine.target import CocoBoundingBox
 from opendr.perception.object_detection_2d import DetrLearner
 from PIL import Image
 import os
@@ -151,6 +152,17 @@ class TestDetrLearner(unittest.TestCase):
         result = self.learner.infer(image)
 
         self.assertGreater(len(result), 0)
+        # The boxes are COCO boxes, whose COCO annotation holds their confidence
+        self.assertIs(type(result[0]), CocoBoundingBox)
+        self.assertEqual(result[0].coco()["confidence"], result[0].confidence)
+        self.assertEqual(result[0].segmentation, [])
+
+        # Each stage is recorded once per inference
+        profiler = self.learner.enable_profiling()
+        self.learner.infer(image)
+        self.assertTrue(all(stats["count"] == 1 for stats in profiler.stats().values()))
+        self.assertEqual(set(profiler.stats()), {"infer", "preprocess", "forward", "postprocess", "target"})
+        self.learner.disable_profiling()
 
     def test_save(self):
         self.learner.model = None
@@ -18,6 +18,7 @@ import shutil
 import torch
 import warnings
 from opendr.engine.datasets import ExternalDataset
+from opendr.engine.target import CocoBoundingBox
 from opendr.perception.object_detection_2d import GemLearner
 import os
 from PIL import Image
@@ -172,6 +173,10 @@ class TestGemLearner(unittest.TestCase):
             self.learners[backbone].download(mode='pretrained_gem')
             result, _, _ = self.learners[backbone].infer(m1_image, m2_image)
             self.assertGreater(len(result), 0)
+            # The boxes are COCO boxes, whose COCO annotation holds their confidence
+            self.assertIs(type(result[0]), CocoBoundingBox)
+            self.assertEqual(result[0].coco()["confidence"], result[0].confidence)
+            self.assertEqual(result[0].segmentation, [])
 
     def test_save(self):
         backbone = 'resnet50'
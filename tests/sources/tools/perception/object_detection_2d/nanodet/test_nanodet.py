@@ -22,6 +22,7 @@ from torch.jit import TracerWarning
 import numpy as np
 from opendr.perception.object_detection_2d import NanodetLearner
 from opendr.engine.datasets import ExternalDataset
+from opendr.engine.data import ImageBatch
 
 device = os.getenv('TEST_DEVICE') if os.getenv('TEST_DEVICE') else 'cpu'
 
@@ -107,9 +108,32 @@ class TestNanodetLearner(unittest.TestCase):
         img = cv2.imread(os.path.join(self.temp_dir, "000000000036.jpg"))
         self.assertIsNotNone(self.detector.infer(input=img),
                              msg="Returned empty BoundingBoxList.")
+        boxes = self.detector.infer(input=ImageBatch([img, img]))
+        self.assertEqual(len(boxes), 2, msg="One BoundingBoxList must be returned per image of the batch.")
+        self.assertTrue(np.allclose(boxes[0].to_numpy(), boxes[1].to_numpy()),
+                        msg="Identical images of a batch must have identical detections.")
+        small_img = cv2.resize(img, (img.shape[1] // 2, img.shape[0] // 2))
+        boxes = self.detector.infer(input=[img, small_img])
+        self.assertEqual(len(boxes), 2, msg="One BoundingBoxList must be returned per image of the list.")
+        self.assertTrue(np.allclose(boxes[1].to_numpy(), self.detector.infer(input=small_img).to_numpy(), atol=1e-3),
+                        msg="Images of a list must have the detections they have on their own.")
         gc.collect()
         print('Finished inference test for Nanodet...')
 
+    def test_profiling(self):
+        print('Starting profiling test for Nanodet...')
+        self.detector.load(os.path.join(self.temp_dir, "nanodet_{}".format(_DEFAULT_MODEL)), verbose=False)
+        img = cv2.imread(os.path.join(self.temp_dir, "000000000036.jpg"))
+        profiler = self.detector.enable_profiling()
+        for _ in range(3):
+            self.detector.infer(input=img)
+        stats = profiler.stats()
+        self.assertEqual(set(stats), {"infer", "preprocess", "forward", "postprocess", "target"})
+        for stage, stage_stats in stats.items():
+            self.assertEqual(stage_stats["count"], 3, msg="Stage {} must be recorded once per inference.".format(stage))
+        self.detector.disable_profiling()
+        print('Finished profiling test for Nanodet...')
+
     def test_save_load(self):
         print('Starting save/load test for Nanodet...')
         self.detector.ort_session = None
@@ -145,6 +169,10 @@ class TestNanodetLearner(unittest.TestCase):
 
         self.detector.optimize(os.path.join(self.temp_dir, "jit"), verbose=False, optimization="jit")
         self.assertIsNotNone(self.detector.jit_model)
+        img = cv2.imread(os.path.join(self.temp_dir, "000000000036.jpg"))
+        self.detector.ort_session = None
+        self.assertEqual(len(self.detector.infer(input=[img, img])), 2,
+                         msg="The exported models must process a batch of images.")
 
         # Cleanup
         rmfile(os.path.join(self.temp_dir, "onnx", "nanodet_{}.onnx".format(_DEFAULT_MODEL)))
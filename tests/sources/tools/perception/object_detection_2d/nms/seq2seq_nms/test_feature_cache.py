@@ -0,0 +1,80 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import tempfile
+import types
+import unittest
+import numpy as np
+import torch
+from opendr.perception.object_detection_2d.nms.seq2seq_nms.algorithm.feature_cache import FeatureCache, \
+    compact_map, dataset_metadata
+from opendr.perception.object_detection_2d.nms.utils.nms_utils import class_weights_from_counts, \
+    compute_class_weights
+
+
+def synthetic_dataset(rng, num_samples=10):
+    src_data = []
+    for i in range(num_samples):
+        src_data.append({'id': i, 'filename': 'img_%d.jpg' % i, 'resolution': (480, 640),
+                         'dt_boxes': [np.zeros((0, 5)), rng.uniform(0, 1, (rng.integers(0, 500), 5))],
+                         'gt_boxes': [np.zeros((0, 4)), rng.uniform(0, 1, (rng.integers(0, 6), 4))]})
+    return types.SimpleNamespace(path='./datasets/PETS', classes=['background', 'human'], class_ids=[-1, 1],
+                                 annotation_file='PETS_train.json', src_data=src_data)
+
+
+class TestFeatureCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Seq2Seq-NMS feature cache\n"
+              "**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.dataset = synthetic_dataset(np.random.default_rng(0))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_class_weights(self):
+        metadata = dataset_metadata(self.dataset)
+        expected = compute_class_weights(pos_weights=[0.9, 0.1], max_dets=400, dataset_nms=self.dataset)
+        weights = class_weights_from_counts(pos_weights=[0.9, 0.1], max_dets=400, dt_counts=metadata['dt_counts'],
+                                            gt_counts=metadata['gt_counts'])
+        np.testing.assert_allclose(expected, weights)
+        self.assertEqual(weights.shape, (2, 2))
+
+    def test_records(self):
+        cache = FeatureCache(self.temp_dir, dataset='PETS', split='train', use_ssd=False)
+        self.assertIsNone(cache.metadata())
+        cache.put_metadata(dataset_metadata(self.dataset))
+        record = {'boxes': np.ones((3, 4), dtype=np.float32), 'maps': np.stack([compact_map(torch.ones(8, 8) * 255)])}
+        cache.put('train', {'app_feats': 'fmod', 'augmentations': 1}, 2, record)
+
+        cache = FeatureCache(self.temp_dir, dataset='PETS', split='train', use_ssd=False)
+        self.assertEqual(cache.metadata()['filenames'], [sample['filename'] for sample in self.dataset.src_data])
+        cached = cache.get('train', {'app_feats': 'fmod', 'augmentations': 1}, 2)
+        np.testing.assert_array_equal(cached['boxes'], record['boxes'])
+        self.assertEqual(cached['maps'].dtype, np.uint8)
+        # Records of another configuration, split or sample are missing
+        self.assertIsNone(cache.get('train', {'app_feats': 'fmod', 'augmentations': 4}, 2))
+        self.assertIsNone(cache.get('train', {'app_feats': 'fmod', 'augmentations': 1}, 3))
+        self.assertIsNone(FeatureCache(self.temp_dir, dataset='PETS', split='test', use_ssd=False).metadata())
+
+    def test_compact_map(self):
+        self.assertEqual(compact_map(torch.tensor([[0.0, 255.0]])).dtype, np.uint8)
+        self.assertEqual(compact_map(torch.tensor([[0.5, 255.0]])).dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy as np
+import torch
+from opendr.perception.object_detection_2d.nms.soft_nms.soft_nms import SoftNMS, soft_nms_decay, _pad_batch, \
+    _pairwise_iou
+from opendr.perception.object_detection_2d.nms.utils.nms_utils import jaccard
+
+
+def sequential_soft_nms(boxes, scores, nms_type, nms_thres, threshold, top_k=400):
+    """Soft-NMS with one loop iteration per detection, as it was implemented before it was vectorized"""
+    boxes, scores = torch.tensor(boxes), torch.tensor(scores)
+    scores, classes = scores.max(dim=1)
+    _, idx = scores.sort(0, descending=True)
+    idx = idx[:top_k]
+    boxes, scores, classes = boxes[idx], scores[idx], classes[idx]
+    dets = torch.cat((boxes, scores.unsqueeze(-1)), dim=1)
+    i = 0
+    while dets.shape[0] > 0:
+        scores[i] = dets[0, 4]
+        iou = jaccard(dets[:1, :-1], dets[1:, :-1]).squeeze(0)
+        weight = torch.ones_like(iou)
+        if nms_type == 'linear':
+            weight[iou > nms_thres] -= iou[iou > nms_thres]
+        else:
+            weight = torch.exp(-(iou * iou) / nms_thres)
+        dets[1:, 4] *= weight
+        dets = dets[1:, :]
+        i = i + 1
+    keep_ids = torch.where(scores > threshold)
+    return [boxes[keep_ids].numpy(), classes[keep_ids].numpy(), scores[keep_ids].numpy()]
+
+
+def random_detections(rng, num_dets, num_classes=3):
+    corners = rng.uniform(0, 500, (num_dets, 2))
+    sizes = rng.uniform(10, 120, (num_dets, 2))
+    boxes = np.concatenate([corners, corners + sizes], axis=1).astype(np.float32)
+    return boxes, rng.uniform(0, 1, (num_dets, num_classes)).astype(np.float32)
+
+
+class TestSoftNMS(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Soft-NMS\n"
+              "**********************************")
+        cls.rng = np.random.default_rng(0)
+
+    def assert_detections_equal(self, expected, actual):
+        for expected_array, actual_array in zip(expected, actual):
+            self.assertEqual(expected_array.shape, actual_array.shape)
+            np.testing.assert_allclose(expected_array, actual_array, rtol=1e-5, atol=1e-6)
+
+    def test_cross_class(self):
+        for nms_type in ('linear', 'gaussian'):
+            for num_dets in (1, 20, 500):
+                boxes, scores = random_detections(self.rng, num_dets)
+                expected = sequential_soft_nms(boxes, scores, nms_type, 0.3, 0.2)
+                nms = SoftNMS(nms_type=nms_type, device='cpu', nms_thres=0.3)
+                # NumPy and torch inputs
+                for inputs in ((boxes, scores), (torch.tensor(boxes), torch.tensor(scores))):
+                    bounding_boxes, detections = nms.run_nms(*inputs, threshold=0.2)
+                    self.assert_detections_equal(expected, detections)
+                    self.assertEqual(len(bounding_boxes), len(expected[2]))
+
+    def test_per_class(self):
+        boxes, scores = random_detections(self.rng, 100)
+        nms = SoftNMS(device='cpu', cross_class=False, post_k=1000)
+        _, (kept_boxes, kept_classes, kept_scores) = nms.run_nms(boxes, scores, threshold=0.2)
+        self.assertTrue(np.all(np.diff(kept_scores) <= 0))
+        for class_id in range(scores.shape[1]):
+            # The boxes of a class are only suppressed by the boxes of the same class
+            class_scores = np.zeros_like(scores)
+            class_scores[:, class_id] = scores[:, class_id]
+            expected = sequential_soft_nms(boxes, class_scores, 'linear', 0.3, 0.2)
+            order = np.argsort(-expected[2], kind='stable')
+            mask = kept_classes == class_id
+            self.assert_detections_equal([expected[0][order], expected[2][order]],
+                                         [kept_boxes[mask], kept_scores[mask]])
+
+        nms.set_post_k(10)
+        _, (_, _, kept_scores) = nms.run_nms(boxes, scores, threshold=0.2)
+        self.assertEqual(len(kept_scores), 10)
+
+    def test_batch(self):
+        for cross_class in (True, False):
+            nms = SoftNMS(nms_type='gaussian', device='cpu', cross_class=cross_class)
+            detections = [random_detections(self.rng, num_dets) for num_dets in (30, 5, 60)]
+            boxes = [boxes for boxes, _ in detections]
+            scores = [scores for _, scores in detections]
+            # Images with different numbers of detections
+            results = nms.run_nms_batch(boxes, scores, threshold=0.1)
+            self.assertEqual(len(results), 3)
+            for image_boxes, image_scores, (_, image_detections) in zip(boxes, scores, results):
+                self.assert_detections_equal(nms.run_nms(image_boxes, image_scores, threshold=0.1)[1],
+                                             image_detections)
+            # Batched tensors
+            results = nms.run_nms_batch(torch.tensor(np.stack(boxes[:1] * 2)), torch.tensor(np.stack(scores[:1] * 2)),
+                                        threshold=0.1)
+            for _, image_detections in results:
+                self.assert_detections_equal(nms.run_nms(boxes[0], scores[0], threshold=0.1)[1], image_detections)
+
+    def test_torch_decay(self):
+        # The vectorized torch path, which SoftNMS runs on cuda, on CPU tensors
+        detections = [random_detections(self.rng, num_dets) for num_dets in (40, 1, 300)]
+        boxes, scores, num_dets = _pad_batch([boxes for boxes, _ in detections],
+                                             [scores for _, scores in detections], 'cpu')
+        self.assertEqual(num_dets, [40, 1, 300])
+        self.assertEqual(tuple(boxes.shape), (3, 300, 4))
+        scores, classes = scores.max(dim=2)
+        scores, idx = scores.sort(dim=-1, descending=True)
+        classes = classes.gather(-1, idx)
+        boxes = boxes.gather(-2, idx[..., None].expand(*idx.shape, 4))
+        for nms_type in ('linear', 'gaussian'):
+            decayed = scores * soft_nms_decay(_pairwise_iou(boxes), nms_type, 0.3)
+            for index, (image_boxes, image_scores) in enumerate(detections):
+                expected = sequential_soft_nms(image_boxes, image_scores, nms_type, 0.3, 0.2)
+                # The padded detections are sorted last, so they never decay the others
+                keep_ids = torch.where(decayed[index] > 0.2)
+                self.assert_detections_equal(expected, [boxes[index][keep_ids].numpy(),
+                                                        classes[index][keep_ids].numpy(),
+                                                        decayed[index][keep_ids].numpy()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy as np
+import torch
+import torchvision
+from opendr.perception.object_detection_2d.nms.cluster_nms.cluster_nms import ClusterNMS, cc_cluster_nms_default, \
+    cc_cluster_diounms
+from opendr.perception.object_detection_2d.nms.fast_nms.fast_nms import FastNMS, cc_fast_nms, fast_nms
+from opendr.perception.object_detection_2d.nms.utils.nms_cpu import CPUNMS, batched_nms
+
+
+def random_detections(rng, num_dets, num_classes=3):
+    corners = rng.uniform(0, 500, (num_dets, 2))
+    sizes = rng.uniform(10, 120, (num_dets, 2))
+    boxes = np.concatenate([corners, corners + sizes], axis=1).astype(np.float32)
+    return boxes, rng.uniform(0, 1, (num_dets, num_classes)).astype(np.float32)
+
+
+def sort_detections(boxes, classes, scores):
+    order = np.lexsort((classes, -scores))
+    return [np.asarray(boxes)[order], np.asarray(classes)[order], np.asarray(scores)[order]]
+
+
+class TestNMSCPU(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST CPU NMS engine\n"
+              "**********************************")
+        cls.rng = np.random.default_rng(0)
+
+    def assert_detections_equal(self, expected, actual):
+        expected, actual = sort_detections(*expected), sort_detections(*actual)
+        for expected_array, actual_array in zip(expected, actual):
+            self.assertEqual(expected_array.shape, actual_array.shape)
+            np.testing.assert_allclose(expected_array, actual_array, rtol=1e-5, atol=1e-6)
+
+    def run_reference(self, function, boxes, scores, threshold=0.2):
+        kept_boxes, classes, kept_scores = function(boxes=torch.tensor(boxes), scores=torch.tensor(scores).t(),
+                                                    iou_thres=0.45, top_k=400, post_k=100)
+        keep = kept_scores > threshold
+        return [kept_boxes[keep].numpy(), classes[keep].numpy(), kept_scores[keep].numpy()]
+
+    def test_torch_implementations(self):
+        for num_dets in (1, 50, 300):
+            boxes, scores = random_detections(self.rng, num_dets)
+            for function, method, cross_class in ((cc_fast_nms, 'fast', True), (fast_nms, 'fast', False),
+                                                  (cc_cluster_nms_default, 'cluster', True),
+                                                  (cc_cluster_diounms, 'cluster_diou', True)):
+                expected = self.run_reference(function, boxes, scores)
+                actual = batched_nms([boxes], [scores], method=method, cross_class=cross_class, threshold=0.2)[0]
+                self.assert_detections_equal(expected, actual)
+
+    def test_torchvision(self):
+        boxes, scores = random_detections(self.rng, 200, num_classes=1)
+        keep = torchvision.ops.nms(torch.tensor(boxes), torch.tensor(scores[:, 0]), 0.45).numpy()
+        for method in ('standard', 'cluster'):
+            kept_boxes, classes, kept_scores = batched_nms([boxes], [scores[:, 0]], method=method, post_k=None)[0]
+            np.testing.assert_array_equal(boxes[keep], kept_boxes)
+            np.testing.assert_array_equal(scores[keep, 0], kept_scores)
+            self.assertTrue(np.all(classes == 0))
+
+    def test_learners(self):
+        boxes, scores = random_detections(self.rng, 100)
+        self.assert_detections_equal(self.run_reference(cc_fast_nms, boxes, scores),
+                                     FastNMS(cross_class=True, device='cpu').run_nms(boxes, scores)[1])
+        self.assert_detections_equal(self.run_reference(cc_cluster_diounms, boxes, scores),
+                                     ClusterNMS(nms_type='diou', device='cpu').run_nms(boxes, scores)[1])
+
+    def test_cpu_nms(self):
+        boxes, scores = random_detections(self.rng, 100)
+        nms = CPUNMS(nms_type='fast')
+        bounding_boxes, detections = nms.run_nms(torch.tensor(boxes), torch.tensor(scores), threshold=0.2)
+        self.assert_detections_equal(self.run_reference(cc_fast_nms, boxes, scores), detections)
+        self.assertEqual(len(bounding_boxes), len(detections[2]))
+
+        nms.set_post_k(5)
+        self.assertEqual(len(nms.run_nms(boxes, scores, threshold=0.0)[1][2]), 5)
+        with self.assertRaises(ValueError):
+            nms.set_type('unknown')
+        with self.assertRaises(ValueError):
+            batched_nms([boxes], [scores], method='unknown')
+
+    def test_batch(self):
+        detections = [random_detections(self.rng, num_dets) for num_dets in (30, 0, 60)]
+        boxes = [boxes for boxes, _ in detections]
+        scores = [scores for _, scores in detections]
+        for method in ('standard', 'fast', 'soft_gaussian'):
+            nms = CPUNMS(nms_type=method, cross_class=False)
+            results = nms.run_nms_batch(boxes, scores, threshold=0.1)
+            self.assertEqual(len(results), 3)
+            # Images without detections
+            self.assertEqual(len(results[1][0]), 0)
+            for image_boxes, image_scores, (_, image_detections) in zip(boxes, scores, results):
+                self.assert_detections_equal(nms.run_nms(image_boxes, image_scores, threshold=0.1)[1],
+                                             image_detections)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,7 @@ import shutil
 import torch
 from opendr.perception.pose_estimation import LightweightOpenPoseLearner
 from opendr.engine.datasets import ExternalDataset
-from opendr.engine.data import Image
+from opendr.engine.data import Image, ImageBatch
 import warnings
 import os
 
@@ -100,6 +100,10 @@ class TestLightweightOpenPoseLearner(unittest.TestCase):
         self.assertGreater(len(self.pose_estimator.infer(img)[0].data), 0,
                            msg="Returned pose must have non-zero number of keypoints.")
 
+        poses = self.pose_estimator.infer(ImageBatch([img, img]), track=False, smooth=False)
+        self.assertEqual(len(poses), 2, msg="One list of poses must be returned per image of the batch.")
+        self.assertGreater(len(poses[1]), 0, msg="Returned poses of the batch must not be empty.")
+
     def test_save_load(self):
         self.pose_estimator.model = None
         self.pose_estimator.ort_session = None
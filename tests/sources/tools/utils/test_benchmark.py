@@ -0,0 +1,94 @@
+# Copyright 2020-2023 OpenDR European Project
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy as np
+from opendr.utils.benchmark import compare_to_baseline, format_nms_table, run_benchmark, run_benchmarks, \
+    run_import_benchmarks, run_nms_benchmark, synthetic_scenes
+
+
+class TestBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Benchmark\n"
+              "**********************************")
+
+    def test_run_benchmark(self):
+        result = run_benchmark("lightweight_open_pose", resolution=(160, 120), batch_size=2, runs=3, warmup=1)
+        self.assertEqual(result["resolution"], [160, 120])
+        self.assertEqual(result["batch_size"], 2)
+        self.assertLessEqual(result["latency_p50"], result["latency_p99"])
+        self.assertGreater(result["throughput"], 0)
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(["lightweight_open_pose"], resolution=(160, 120), runs=2, warmup=1)
+        self.assertNotIn("error", results["lightweight_open_pose"])
+        self.assertGreater(results["lightweight_open_pose"]["import_time"], 0)
+        with self.assertRaises(ValueError):
+            run_benchmarks(["unknown"])
+
+    def test_run_import_benchmarks(self):
+        results = run_import_benchmarks(["opendr.perception.pose_estimation", "unknown"], repeats=1)
+        self.assertEqual(results["opendr.perception.pose_estimation"]["frameworks"], [])
+        self.assertGreater(results["opendr.perception.pose_estimation"]["import_time"], 0)
+        self.assertIn("error", results["unknown"])
+
+    def test_compare_to_baseline(self):
+        baseline = {"a": {"resolution": [640, 480], "batch_size": 1, "latency_p50": 1.0, "latency_p95": 2.0,
+                          "peak_rss_mb": 100, "import_time": 1.0, "startup_time": 1.0}}
+        result = dict(baseline["a"], latency_p50=1.05, latency_p95=3.0)
+        self.assertEqual(compare_to_baseline({"a": result}, baseline, tolerance=0.1),
+                         [("a", "latency_p95", 2.0, 3.0)])
+        # Results of another configuration are not compared
+        self.assertEqual(compare_to_baseline({"a": dict(result, batch_size=2)}, baseline), [])
+        self.assertEqual(compare_to_baseline({"a": {"error": "ImportError"}}, baseline),
+                         [("a", "error", None, "ImportError")])
+        # Accuracy metrics are better when higher
+        baseline = {"fast": {"latency_p50": 1.0, "latency_p95": 1.0, "ap": 0.5, "agreement": 0.9}}
+        result = dict(baseline["fast"], ap=0.495, agreement=0.8)
+        self.assertEqual(compare_to_baseline({"fast": result}, baseline, accuracy_tolerance=0.01),
+                         [("fast", "agreement", 0.9, 0.8)])
+
+    def test_synthetic_scenes(self):
+        scenes = synthetic_scenes(num_scenes=2, num_objects=5, boxes_per_object=4, num_classes=3, false_positives=2)
+        self.assertEqual(len(scenes), 2)
+        for scene in scenes:
+            self.assertEqual(scene["boxes"].shape, (22, 4))
+            self.assertEqual(scene["scores"].shape, (22, 3))
+            self.assertEqual(scene["gt_boxes"].shape, (5, 4))
+            self.assertTrue(np.all(scene["boxes"][:, 2:] > scene["boxes"][:, :2]))
+        # The scenes are reproducible
+        np.testing.assert_array_equal(scenes[0]["boxes"], synthetic_scenes(num_scenes=1, num_objects=5,
+                                                                           boxes_per_object=4, num_classes=3,
+                                                                           false_positives=2)[0]["boxes"])
+
+    def test_run_nms_benchmark(self):
+        scenes = synthetic_scenes(num_scenes=3, num_objects=10)
+        results = run_nms_benchmark(scenes, ["fast", "cluster", "soft_linear"], runs=1, warmup=1)
+        self.assertEqual(list(results), ["fast", "cluster", "soft_linear"])
+        for result in results.values():
+            self.assertNotIn("error", result)
+            self.assertLessEqual(result["latency_p50"], result["latency_p99"])
+            self.assertGreater(result["ap50"], 0)
+        # Cluster-NMS keeps the detections of greedy NMS, which is the default reference
+        self.assertEqual(results["cluster"]["agreement"], 1.0)
+        self.assertLess(results["fast"]["kept"], results["cluster"]["kept"])
+        self.assertIn("soft_linear", format_nms_table(results))
+        with self.assertRaises(ValueError):
+            run_nms_benchmark(scenes, ["unknown"])
+
+
+if __name__ == "__main__":
+    unittest.main()
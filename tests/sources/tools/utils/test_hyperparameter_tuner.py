@@ -12,12 +12,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import shutil
+import tempfile
+import time
 import unittest
+import optuna
 from optuna.study.study import Study
+from optuna.trial import TrialState
 from opendr.utils.hyperparameter_tuner.dummy_learner import DummyLearner
 from opendr.utils.hyperparameter_tuner.hyperparameter_tuner import HyperparameterTuner
 
 
+class CrashingLearner(DummyLearner):
+    """Learner whose first trial crashes its process"""
+    def __init__(self, marker, lr=0.001, epochs=1, optimizer='SGD', out_features=12):
+        super(CrashingLearner, self).__init__(lr=lr, epochs=epochs, optimizer=optimizer, out_features=out_features)
+        self.marker = marker
+
+    def fit(self, dataset, val_dataset=None, logging_path='', silent=False, verbose=False):
+        if not os.path.exists(self.marker):
+            open(self.marker, 'w').close()
+            os._exit(1)
+        super(CrashingLearner, self).fit(dataset)
+
+
 class TestHyperparameterTuner(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -44,5 +63,115 @@ class TestHyperparameterTuner(unittest.TestCase):
         self.assertTrue(type(study) is Study)
 
 
+class TestHyperparameterTunerPruning(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Hyperparameter Tuner pruning\n"
+              "**********************************")
+
+    def test_fit_callbacks(self):
+        learner = DummyLearner(epochs=5)
+        steps = []
+
+        def callback(learner, step, metrics):
+            steps.append(step)
+            self.assertIsInstance(metrics, float)
+            return step == 2
+
+        learner.add_fit_callback(callback)
+        learner.fit(None, val_dataset='val')
+        # Training stops once a callback returns True
+        self.assertEqual(steps, [0, 1, 2])
+
+        learner.remove_fit_callback(callback)
+        learner.fit(None, val_dataset='val')
+        self.assertEqual(steps, [0, 1, 2])
+
+    def test_pruning(self):
+        for pruner in ('median', 'asha', 'hyperband'):
+            tuner = HyperparameterTuner(DummyLearner, pruner=pruner)
+            tuner.optimize(
+                init_arguments={'epochs': 20}, fit_arguments={'dataset': None, 'val_dataset': 'val'},
+                eval_arguments={'dataset': None}, n_trials=20,
+            )
+            trials = tuner.study.trials
+            pruned = [trial for trial in trials if trial.state == TrialState.PRUNED]
+            self.assertGreater(len(pruned), 0, pruner)
+            for trial in pruned:
+                # The pruned trials stop training before the last epoch
+                self.assertLess(max(trial.intermediate_values), 19)
+            for trial in trials:
+                if trial.state == TrialState.COMPLETE:
+                    self.assertEqual(len(trial.intermediate_values), 20)
+
+    def test_unknown_pruner(self):
+        with self.assertRaises(ValueError):
+            HyperparameterTuner(DummyLearner, pruner='unknown')
+        with self.assertRaises(ValueError):
+            HyperparameterTuner(DummyLearner, study=optuna.create_study(), pruner='median')
+
+
+class TestHyperparameterTunerWorkers(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        print("\n\n**********************************\nTEST Hyperparameter Tuner workers\n"
+              "**********************************")
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def storage(self, name):
+        return 'sqlite:///' + os.path.join(self.temp_dir, name + '.db')
+
+    def test_workers(self):
+        tuner = HyperparameterTuner(DummyLearner, storage=self.storage('workers'), study_name='workers')
+        best_params = tuner.optimize(
+            fit_arguments={'dataset': None}, eval_arguments={'dataset': None}, n_trials=4, n_workers=2,
+            threads_per_worker=1,
+        )
+        self.assertEqual(len(tuner.study.get_trials(states=(TrialState.COMPLETE,))), 4)
+        self.assertEqual(best_params, tuner.study.best_params)
+
+        # The study persists between runs
+        tuner = HyperparameterTuner(DummyLearner, storage=self.storage('workers'), study_name='workers')
+        tuner.optimize(fit_arguments={'dataset': None}, eval_arguments={'dataset': None}, n_trials=1, n_workers=1)
+        self.assertEqual(len(tuner.study.trials), 5)
+
+    def test_crashed_trial(self):
+        marker = os.path.join(self.temp_dir, 'crashed')
+        arguments = {
+            'init_arguments': {'marker': marker}, 'fit_arguments': {'dataset': None},
+            'eval_arguments': {'dataset': None}, 'n_workers': 1,
+        }
+        tuner = HyperparameterTuner(CrashingLearner, storage=self.storage('crash'), study_name='crash',
+                                    heartbeat_interval=1)
+        with self.assertRaises(ValueError):
+            # No trial is completed
+            tuner.optimize(n_trials=1, **arguments)
+        crashed, = tuner.study.trials
+        self.assertEqual(crashed.state, TrialState.RUNNING)
+
+        # The crashed trial is retried with the same hyperparameters once its heartbeat is stale
+        time.sleep(2.5)
+        tuner.optimize(n_trials=1, **arguments)
+        retried = tuner.study.trials[-1]
+        self.assertEqual(tuner.study.trials[0].state, TrialState.FAIL)
+        retry = getattr(optuna.storages, 'RetryHeartbeatStaleTrialCallback', None) or \
+            optuna.storages.RetryFailedTrialCallback
+        self.assertEqual(retry.retried_trial_number(retried), crashed.number)
+        self.assertEqual(retried.state, TrialState.COMPLETE)
+        self.assertEqual(retried.params, crashed.params)
+
+    def test_workers_without_storage(self):
+        tuner = HyperparameterTuner(DummyLearner)
+        with self.assertRaises(ValueError):
+            tuner.optimize(fit_arguments={'dataset': None}, eval_arguments={'dataset': None}, n_trials=1,
+                           n_workers=1)
+        with self.assertRaises(ValueError):
+            HyperparameterTuner(DummyLearner, study=tuner.study, storage=self.storage('both'))
+
+
 if __name__ == '__main__':
     unittest.main()